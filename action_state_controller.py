@@ -62,6 +62,9 @@ class ActionStateController:
             ('actionRmsO', window.output.rmsOffset is not None),
             ('actionGapO', window.output.gapOffset is not None),
             ('actionIllu', window.output.cfpOutput is not None),
+            ('actionOffF', window.output.offsetLimitedFold is not None),
+            ('actionAziR', window.output.azimuthRichness is not None),
+            ('actionOvtR', window.output.ovtRichness is not None),
             ('actionSpider', window.output.anaOutput is not None and window.output.binOutput is not None),
             ('actionMoveLt', window.output.anaOutput is not None),
             ('actionMoveRt', window.output.anaOutput is not None),
@@ -116,6 +119,7 @@ class ActionStateController:
             ('actionGeometryFromTemplates', enable and nTemplates > 0),
             ('actionCFPPointAnalysisFromTemplates', enable and experimentalEnabled and nTemplates > 0),
             ('actionCFPPointAnalysisFromGeometry', experimentalEnabled and hasCfpGeometryInputs),
+            ('actionCFPMultiPointAnalysisFromGeometry', experimentalEnabled and hasCfpGeometryInputs),
             ('actionCFPPointAnalysisFromSPSInput', experimentalEnabled and hasCfpSpsInputs),
             ('actionCFPPlaneAnalysisFromTemplates', enable and experimentalEnabled and nTemplates > 0),
             ('actionCFPPlaneAnalysisFromGeometry', experimentalEnabled and hasCfpPlaneGeometryInputs),
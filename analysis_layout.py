@@ -0,0 +1,471 @@
+# coding=utf-8
+
+import json
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+from .project_store import DEFAULT_CHUNK_BYTES
+
+# The analysis trace table is a 4D array anaOutput[x, y, fold, column] with 16 float32 columns:
+#
+#   0, 1 stake x, y | 2 fold | 3..5 src xyz | 6..8 rec xyz | 9..11 cmp xyz | 12 TWT | 13 offset | 14 azimuth | 15 unique flag
+#
+# It can be stored on disk in three ways:
+#
+#   'interleaved' : file shape (nx, ny, fold, 16); the 16 fields of one trace are adjacent (record layout, the default)
+#   'columns'     : file shape (16, nx, ny, fold); each field is a contiguous plane (structure of arrays)
+#   'compact'     : file shape (nx, ny, fold) of COMPACT_RECORD_DTYPE records; see CompactTraceEncoding below
+#
+# In all cases the rest of Roll sees the same [x, y, fold, column] array. For the 'columns' layout this
+# is a strided view (np.moveaxis) on the file, so a read of anaOutput[x, y, :fold, 13] touches fold
+# adjacent floats instead of striding over 16 fields per trace. The price is that writing a single trace
+# during binning touches 16 separate planes.
+#
+# For the 'compact' layout, binning still fills an interleaved float32 file, that is converted to compact records
+# once binning is done (ProjectService.compactAnalysisFile()). The table is then read through a CompactTraceTable,
+# that decodes the records an index touches; it is read-only. A table that can't be encoded within the bounds of
+# CompactTraceEncoding.maximumError() is kept as interleaved float32 traces.
+#
+# The chosen layout is recorded in a small json descriptor next to the .ana.npy file, together with the encoding of
+# a compact file. When the descriptor is missing, the file is taken to be 'interleaved' (all projects created before this option).
+
+ANALYSIS_COLUMN_COUNT = 16
+
+ANALYSIS_LAYOUT_INTERLEAVED = 'interleaved'
+ANALYSIS_LAYOUT_COLUMNS = 'columns'
+ANALYSIS_LAYOUT_COMPACT = 'compact'
+ANALYSIS_LAYOUTS = (ANALYSIS_LAYOUT_INTERLEAVED, ANALYSIS_LAYOUT_COLUMNS, ANALYSIS_LAYOUT_COMPACT)
+
+
+@dataclass
+class AnalysisLayout:
+    layout: str = ANALYSIS_LAYOUT_INTERLEAVED
+    encoding: dict | None = None                                                # CompactTraceEncoding.toDict() of a 'compact' file
+
+    def toJson(self) -> str:
+        return json.dumps(asdict(self), indent=4)
+
+    @classmethod
+    def fromJson(cls, text):
+        data = json.loads(text)
+        layout = data.get('layout', ANALYSIS_LAYOUT_INTERLEAVED)
+        if layout not in ANALYSIS_LAYOUTS:
+            raise ValueError(f'unknown analysis layout: {layout}')
+        encoding = data.get('encoding')
+        if layout == ANALYSIS_LAYOUT_COMPACT and not isinstance(encoding, dict):
+            raise ValueError('compact analysis layout without an encoding')
+        return cls(layout=layout, encoding=encoding)
+
+
+def analysisFileShape(shape, layout=ANALYSIS_LAYOUT_INTERLEAVED):
+    """On-disk shape of a trace table with logical shape (nx, ny, fold, columns)."""
+    nx, ny, fold, columns = shape
+    if layout == ANALYSIS_LAYOUT_COLUMNS:
+        return (columns, nx, ny, fold)
+    if layout == ANALYSIS_LAYOUT_COMPACT:
+        return (nx, ny, fold)
+    return (nx, ny, fold, columns)
+
+
+def analysisFileDtype(layout=ANALYSIS_LAYOUT_INTERLEAVED):
+    """On-disk dtype of a trace table in the given layout."""
+    return COMPACT_RECORD_DTYPE if layout == ANALYSIS_LAYOUT_COMPACT else np.dtype(np.float32)
+
+
+def analysisViews(fileArray, layout=ANALYSIS_LAYOUT_INTERLEAVED, encoding=None):
+    """Return (anaOutput, an2Output) views on an array with analysisFileShape(); no data is copied.
+
+    anaOutput is indexed [x, y, fold, column] and an2Output [trace, column], whatever the layout.
+    A 'compact' file needs its CompactTraceEncoding; its views decode the records that are indexed.
+    """
+    if layout == ANALYSIS_LAYOUT_COMPACT:
+        anaOutput = CompactTraceTable(fileArray, encoding)
+        return anaOutput, CompactTraceRows(anaOutput)
+    if layout == ANALYSIS_LAYOUT_COLUMNS:
+        columns = fileArray.shape[0]
+        anaOutput = np.moveaxis(fileArray, 0, -1)
+        an2Output = fileArray.reshape(columns, -1).T
+    else:
+        columns = fileArray.shape[-1]
+        anaOutput = fileArray
+        an2Output = fileArray.reshape(-1, columns)
+    return anaOutput, an2Output
+
+
+# Compact trace records, used for the 'compact' layout and when the trace table is archived in the project store.
+#
+# A record takes 38 bytes instead of the 64 bytes of a float32 trace:
+#
+#   stkX, stkY      int16 steps from the middle stake numbers; stkX == -32768 marks an empty fold slot
+#   src, rec x, y   int32 steps from an origin in the middle of the survey (1 cm steps, unless the survey is too large for that)
+#   offset          uint32 steps (1 cm steps, unless the offsets are too large for that)
+#   cmp x, y        int16 steps from the midpoint of src and rec; zero for a flat earth, the shift of the reflection point otherwise
+#   src, rec, cmp z int16 steps
+#   azimuth         uint16 steps of COMPACT_AZIMUTH_STEP degrees
+#   twt             uint16; the travel time in 15 bits (steps of 1/32767 of the largest travel time) and the unique flag in the lowest bit
+#
+# The fold column is the fold slot + 1. Offset and azimuth are stored, rather than derived from the quantized src and rec
+# coordinates, as binning computes them from double precision coordinates, and 'Unique offsets' may write back slotted values.
+#
+# Stake numbers, fold and the unique flag round-trip exactly. Every other column decodes to within half its step of the
+# original, plus one float32 ulp of the original for the rounding of the decoded value (maximumError()). encode() checks
+# every trace against these bounds, and raises LossyEncodingError when a column exceeds them (e.g. fractional stake numbers);
+# fromTraceTable() returns None for a table with values that don't fit the steps at all.
+# When the archive has to be an exact copy (the .ana.npy file is removed once it is archived), the encoding is wrapped in a
+# LosslessTraceEncoder, that checks every chunk decodes back bit for bit, and raises LossyEncodingError otherwise.
+#
+# In the store, each chunk of x-rows is written field by field (all stkX values, then all stkY values, ...).
+# Similar values then sit next to each other, which lets zlib compress the trace table much better.
+
+COMPACT_RECORD_DTYPE = np.dtype(
+    [
+        ('stkX', '<i2'),
+        ('stkY', '<i2'),
+        ('srcX', '<i4'),
+        ('srcY', '<i4'),
+        ('recX', '<i4'),
+        ('recY', '<i4'),
+        ('offset', '<u4'),
+        ('cmpX', '<i2'),
+        ('cmpY', '<i2'),
+        ('srcZ', '<i2'),
+        ('recZ', '<i2'),
+        ('cmpZ', '<i2'),
+        ('azimuth', '<u2'),
+        ('twt', '<u2'),
+    ]
+)
+
+COMPACT_COORDINATE_STEPS = (0.01, 0.1, 1.0)                                     # metres; the first step that covers the values is used
+COMPACT_AZIMUTH_STEP = 0.01                                                     # degrees; 0 - 360 degrees takes 36000 steps
+
+_INT16_LIMIT = np.iinfo(np.int16).max - 1
+_INT32_LIMIT = np.iinfo(np.int32).max - 1
+_UINT32_LIMIT = np.iinfo(np.uint32).max - 1
+_TWT_LIMIT = np.iinfo(np.uint16).max >> 1                                       # 15 bits of travel time, the lowest bit holds the unique flag
+_EMPTY_STAKE = np.iinfo(np.int16).min
+
+
+def traceOffsetAzimuth(srcX, srcY, recX, recY):
+    """Offset and azimuth (0 - 360 degrees) of traces from src to rec, computed as in binning."""
+    dx = recX - srcX
+    dy = recY - srcY
+    return np.hypot(dx, dy), np.mod(np.rad2deg(np.arctan2(dx, dy)) + 360.0, 360.0)
+
+
+def _coordinateStep(extent, limit):
+    """First of COMPACT_COORDINATE_STEPS that covers -extent .. extent in integers up to limit; None if there is none."""
+    for step in COMPACT_COORDINATE_STEPS:
+        if extent / step < limit:
+            return step
+    return None
+
+
+def _hasExactColumns(rows):
+    """True when the stake numbers of used traces [n, 16] are integers, and their unique flag is 0 or -1."""
+    if np.any(rows[:, 0:2] != np.rint(rows[:, 0:2])):
+        return False
+    return bool(np.all((rows[:, 15] == 0.0) | (rows[:, 15] == -1.0)))
+
+
+@dataclass
+class CompactTraceEncoding:
+    originX: float = 0.0
+    originY: float = 0.0
+    stakeX: int = 0                                                             # stake numbers are stored relative to these
+    stakeY: int = 0
+    coordStep: float = COMPACT_COORDINATE_STEPS[0]
+    zStep: float = COMPACT_COORDINATE_STEPS[0]
+    cmpStep: float = COMPACT_COORDINATE_STEPS[0]
+    offsetStep: float = COMPACT_COORDINATE_STEPS[0]
+    twtStep: float = 1.0
+    traceShape: tuple = ()                                                      # shape between the first axis and the 16 columns, e.g. (ny, fold)
+
+    def toDict(self) -> dict:
+        return dict(asdict(self), traceShape=list(self.traceShape), codec='compact-trace-v2')
+
+    @classmethod
+    def fromDict(cls, data):
+        if data.get('codec') != 'compact-trace-v2':
+            raise ValueError(f'unknown trace table encoding: {data.get("codec")}')
+        steps = {name: float(data[name]) for name in ('originX', 'originY', 'coordStep', 'zStep', 'cmpStep', 'offsetStep', 'twtStep')}
+        stakes = {name: int(data[name]) for name in ('stakeX', 'stakeY')}
+        return cls(traceShape=tuple(data.get('traceShape', ())), **steps, **stakes)
+
+    @classmethod
+    def fromTraceTable(cls, traces, chunkBytes=DEFAULT_CHUNK_BYTES):
+        """Choose origins and steps for a trace table [..., fold, 16]; returns None when it can't be encoded compactly.
+
+        The table is scanned in blocks of about chunkBytes along its first axis, so a memory mapped table is never loaded as a whole.
+        """
+        if traces.ndim < 3 or traces.shape[-1] != ANALYSIS_COLUMN_COUNT:
+            return None
+
+        rowBytes = traces.itemsize * int(np.prod(traces.shape[1:]))
+        chunkRows = max(1, int(chunkBytes // max(rowBytes, 1)))
+        slots = np.arange(1, traces.shape[-2] + 1)                              # fold column of the used fold slots
+        lo = np.full(4, np.inf)                                                 # x, y, stake x, stake y
+        hi = -lo
+        zMax = shiftMax = twtMax = offsetMax = 0.0
+        for start in range(0, traces.shape[0], chunkRows):
+            block = np.asarray(traces[start:start + chunkRows])
+            used = block[..., 2] > 0
+            if np.any(block[..., 2][used] != np.broadcast_to(slots, used.shape)[used]):
+                return None                                                     # fold isn't the fold slot + 1
+            rows = block[used].astype(np.float64)                               # only the used traces in double precision
+            if rows.size == 0:
+                continue
+            if not _hasExactColumns(rows) or rows[:, 12].min() < 0.0 or rows[:, 13].min() < 0.0:
+                return None
+            if rows[:, 14].min() < 0.0 or rows[:, 14].max() > 360.0:
+                return None
+
+            xy = np.concatenate([rows[:, 3:5], rows[:, 6:8]])
+            values = np.concatenate([xy, np.repeat(rows[:, 0:2], 2, axis=0)], axis=1)
+            lo = np.minimum(lo, values.min(axis=0))
+            hi = np.maximum(hi, values.max(axis=0))
+            zMax = max(zMax, float(np.abs(rows[:, [5, 8, 11]]).max()))
+            shiftMax = max(shiftMax, float(np.abs(rows[:, 9:11] - 0.5 * (rows[:, 3:5] + rows[:, 6:8])).max()))
+            twtMax = max(twtMax, float(rows[:, 12].max()))
+            offsetMax = max(offsetMax, float(rows[:, 13].max()))
+
+        traceShape = tuple(traces.shape[1:-1])
+        if not np.all(np.isfinite(lo)):
+            return cls(traceShape=traceShape)                                   # empty table; nothing to quantize
+
+        originX, originY, stakeX, stakeY = (float(v) for v in np.round(0.5 * (lo + hi)))
+        if max(hi[2] - stakeX, stakeX - lo[2], hi[3] - stakeY, stakeY - lo[3]) > _INT16_LIMIT:
+            return None
+
+        halfSpan = max(hi[0] - originX, originX - lo[0], hi[1] - originY, originY - lo[1])
+        coordStep = _coordinateStep(halfSpan, _INT32_LIMIT)
+        zStep = _coordinateStep(zMax, _INT16_LIMIT)
+        offsetStep = _coordinateStep(offsetMax, _UINT32_LIMIT)
+        if coordStep is None or zStep is None or offsetStep is None:
+            return None
+        cmpStep = _coordinateStep(shiftMax + coordStep, _INT16_LIMIT)          # the shift is taken from the quantized midpoint
+        if cmpStep is None:
+            return None
+
+        twtStep = twtMax / _TWT_LIMIT if twtMax > 0.0 else 1.0
+        return cls(originX, originY, int(stakeX), int(stakeY), coordStep, zStep, cmpStep, offsetStep, twtStep, traceShape)
+
+    def maximumError(self):
+        """Largest error of each decoded column [16], apart from one float32 ulp for rounding; zero for the exact columns."""
+        bound = np.zeros(ANALYSIS_COLUMN_COUNT)
+        bound[[3, 4, 6, 7]] = 0.5 * self.coordStep
+        bound[[5, 8, 11]] = 0.5 * self.zStep
+        bound[[9, 10]] = 0.5 * self.cmpStep
+        bound[12] = 0.5 * self.twtStep
+        bound[13] = 0.5 * self.offsetStep
+        bound[14] = 0.5 * COMPACT_AZIMUTH_STEP
+        return bound
+
+    def encode(self, traces):
+        """Encode float32 traces [..., fold, 16] into COMPACT_RECORD_DTYPE records [..., fold].
+
+        Raises LossyEncodingError when the records don't decode to within maximumError() of the traces.
+        """
+        traces = np.asarray(traces, dtype=np.float32)
+        flat = traces.reshape(-1, ANALYSIS_COLUMN_COUNT).astype(np.float64)
+        records = np.zeros(flat.shape[0], dtype=COMPACT_RECORD_DTYPE)
+        records['stkX'] = _EMPTY_STAKE
+        used = flat[:, 2] > 0
+        rows = flat[used]
+
+        origin = np.array([self.originX, self.originY])
+        src = np.rint((rows[:, 3:5] - origin) / self.coordStep)
+        rec = np.rint((rows[:, 6:8] - origin) / self.coordStep)
+        shift = np.rint((rows[:, 9:11] - origin - 0.5 * (src + rec) * self.coordStep) / self.cmpStep)
+        with np.errstate(invalid='ignore'):                                     # values that don't fit are caught by the check below
+            records['stkX'][used] = np.rint(rows[:, 0] - self.stakeX)
+            records['stkY'][used] = np.rint(rows[:, 1] - self.stakeY)
+            for name, values in (('srcX', src[:, 0]), ('srcY', src[:, 1]), ('recX', rec[:, 0]), ('recY', rec[:, 1]), ('cmpX', shift[:, 0]), ('cmpY', shift[:, 1])):
+                records[name][used] = values
+            for name, column in (('srcZ', 5), ('recZ', 8), ('cmpZ', 11)):
+                records[name][used] = np.rint(rows[:, column] / self.zStep)
+            records['offset'][used] = np.rint(rows[:, 13] / self.offsetStep)
+            records['azimuth'][used] = np.rint(rows[:, 14] / COMPACT_AZIMUTH_STEP)
+            records['twt'][used] = 2 * np.rint(rows[:, 12] / self.twtStep) + (rows[:, 15] == -1.0)
+        records = records.reshape(traces.shape[:-1])
+
+        error = np.abs(self.decode(records).astype(np.float64) - traces)
+        exceeded = ~(error <= self.maximumError() + np.spacing(np.abs(traces)))  # NaN doesn't round-trip either
+        if np.any(exceeded):
+            column = int(np.flatnonzero(exceeded.reshape(-1, ANALYSIS_COLUMN_COUNT).any(axis=0))[0])
+            raise LossyEncodingError(f'column {column} of the trace table does not fit compact records within {self.maximumError()[column]:g}')
+        return records
+
+    def decode(self, records, folds=None):
+        """Decode COMPACT_RECORD_DTYPE records [..., fold] into float32 traces [..., fold, 16].
+
+        The fold column is the position of a record in the last axis + 1, unless folds (broadcast to the records) is given.
+        """
+        flat = records.reshape(-1)
+        traces = np.zeros((flat.shape[0], ANALYSIS_COLUMN_COUNT), dtype=np.float32)
+        used = flat['stkX'] != _EMPTY_STAKE
+        rows = flat[used]
+        if folds is None:
+            folds = np.arange(1, records.shape[-1] + 1)
+
+        origin = np.array([self.originX, self.originY])
+        src = np.stack([rows['srcX'], rows['srcY']], axis=1).astype(np.float64)
+        rec = np.stack([rows['recX'], rows['recY']], axis=1).astype(np.float64)
+        shift = np.stack([rows['cmpX'], rows['cmpY']], axis=1).astype(np.float64)
+        twt = rows['twt'].astype(np.int64)
+
+        decoded = np.empty((rows.shape[0], ANALYSIS_COLUMN_COUNT), dtype=np.float64)
+        decoded[:, 0] = rows['stkX'].astype(np.float64) + self.stakeX
+        decoded[:, 1] = rows['stkY'].astype(np.float64) + self.stakeY
+        decoded[:, 2] = np.broadcast_to(folds, records.shape).reshape(-1)[used]
+        decoded[:, 3:5] = src * self.coordStep + origin
+        decoded[:, 6:8] = rec * self.coordStep + origin
+        decoded[:, 9:11] = 0.5 * (src + rec) * self.coordStep + origin + shift * self.cmpStep
+        for name, column in (('srcZ', 5), ('recZ', 8), ('cmpZ', 11)):
+            decoded[:, column] = rows[name] * self.zStep
+        decoded[:, 12] = (twt >> 1) * self.twtStep
+        decoded[:, 13] = rows['offset'] * self.offsetStep
+        decoded[:, 14] = rows['azimuth'] * COMPACT_AZIMUTH_STEP
+        decoded[:, 15] = -(twt & 1)
+        traces[used] = decoded
+        return traces.reshape(records.shape + (ANALYSIS_COLUMN_COUNT,))
+
+    def packChunk(self, records):
+        """Store records [rows, *traceShape] as bytes [rows, rowBytes], field by field."""
+        flat = records.reshape(-1)
+        planes = np.concatenate([np.ascontiguousarray(flat[name]).view(np.uint8) for name in COMPACT_RECORD_DTYPE.names])
+        return planes.reshape(records.shape[0], -1)
+
+    def unpackChunk(self, raw):
+        """Records [rows, *traceShape] from bytes [rows, rowBytes] written by packChunk()."""
+        rows = raw.shape[0]
+        raw = np.ascontiguousarray(raw).reshape(-1)
+        records = np.empty(raw.size // COMPACT_RECORD_DTYPE.itemsize, dtype=COMPACT_RECORD_DTYPE)
+
+        offset = 0
+        for name in COMPACT_RECORD_DTYPE.names:
+            fieldType = COMPACT_RECORD_DTYPE.fields[name][0]
+            size = records.size * fieldType.itemsize
+            records[name] = raw[offset:offset + size].view(fieldType)
+            offset += size
+
+        return records.reshape((rows,) + self.traceShape)
+
+    def encodeChunk(self, traces):
+        """Encode a block of x-rows [rows, *traceShape, 16] into bytes [rows, rowBytes], stored field by field."""
+        return self.packChunk(self.encode(traces))
+
+    def decodeChunk(self, raw):
+        """Decode bytes [rows, rowBytes] written by encodeChunk() into float32 traces [rows, *traceShape, 16]."""
+        return self.decode(self.unpackChunk(raw))
+
+
+class LossyEncodingError(ValueError):
+    """Compact records don't decode back to the traces they were encoded from, exactly or within maximumError()."""
+
+
+@dataclass
+class LosslessTraceEncoder:
+    """Store encoder that only accepts chunks that a CompactTraceEncoding reproduces bit for bit."""
+
+    encoding: CompactTraceEncoding
+
+    def toDict(self) -> dict:
+        return dict(self.encoding.toDict(), lossless=True)
+
+    def encodeChunk(self, traces):
+        raw = self.encoding.encodeChunk(traces)
+        exact = np.ascontiguousarray(traces, dtype=np.float32).view(np.uint32)
+        if not np.array_equal(self.encoding.decodeChunk(raw).view(np.uint32), exact):
+            raise LossyEncodingError('the compact records do not reproduce the trace table exactly')
+        return raw
+
+
+@dataclass
+class CompactRecordEncoder:
+    """Store encoder for the records of a 'compact' trace table file; the archive holds the live table as it is."""
+
+    encoding: CompactTraceEncoding
+
+    def toDict(self) -> dict:
+        return dict(self.encoding.toDict(), lossless=True)
+
+    def encodeChunk(self, records):
+        return self.encoding.packChunk(records)
+
+
+def _fullKey(key, ndim):
+    """An index as a tuple of ndim entries; an Ellipsis and missing trailing entries become full slices."""
+    key = key if isinstance(key, tuple) else (key,)
+    if any(k is Ellipsis for k in key):
+        i = next(i for i, k in enumerate(key) if k is Ellipsis)
+        key = key[:i] + (slice(None),) * (ndim - len(key) + 1) + key[i + 1:]
+    return key + (slice(None),) * (ndim - len(key))
+
+
+class CompactTraceTable:
+    """Read-only trace table [x, y, fold, column] on a file of COMPACT_RECORD_DTYPE records [x, y, fold].
+
+    Indexing decodes the records it touches into float32 traces, so anaOutput[nX, nY, :, :], anaOutput[:, nY, :, :]
+    and blocks of x-rows read as they do from a float32 memmap. Integer and slice indices are supported.
+    """
+
+    dtype = np.dtype(np.float32)
+    itemsize = dtype.itemsize
+    ndim = 4
+    mode = 'r'
+
+    def __init__(self, records, encoding):
+        self.records = records
+        self.encoding = encoding
+        self.shape = tuple(records.shape) + (ANALYSIS_COLUMN_COUNT,)
+        self.size = int(np.prod(self.shape))
+
+    @property
+    def filename(self):
+        return getattr(self.records, 'filename', None)
+
+    def flush(self):
+        pass                                                                    # read-only; nothing to write
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        x, y, fold, column = _fullKey(key, 4)
+        traces = self.encoding.decode(np.asarray(self.records[x, y]))           # all fold slots, so their fold column is known
+        return traces[..., fold, column]
+
+    def __array__(self, dtype=None, copy=None):
+        return self[...].astype(dtype or self.dtype, copy=False)
+
+
+class CompactTraceRows:
+    """Read-only view [trace, column] of a CompactTraceTable; the an2Output of a 'compact' trace table."""
+
+    dtype = CompactTraceTable.dtype
+    itemsize = CompactTraceTable.itemsize
+    ndim = 2
+
+    def __init__(self, table):
+        self.table = table
+        self.records = table.records.reshape(-1)
+        self.shape = (self.records.shape[0], ANALYSIS_COLUMN_COUNT)
+        self.size = int(np.prod(self.shape))
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        row, column = _fullKey(key, 2)
+        if isinstance(row, (int, np.integer)):
+            row = int(row) % self.shape[0] if -self.shape[0] <= row < self.shape[0] else row
+            return self[row:row + 1, column][0]                                 # IndexError for rows out of range, as for an array
+
+        numbers = np.arange(*row.indices(self.shape[0])) if isinstance(row, slice) else np.arange(self.shape[0])[row]
+        folds = numbers % self.table.shape[2] + 1                               # a trace's fold column follows from its row number
+        return self.table.encoding.decode(np.asarray(self.records[row]), folds)[..., column]
+
+    def __array__(self, dtype=None, copy=None):
+        return self[:].astype(dtype or self.dtype, copy=False)
@@ -119,14 +119,28 @@ class AppSettings:
     kxyArray: object = field(default_factory=lambda: QVector3D(config.kxyArray))
     cfpArray: object = field(default_factory=lambda: QVector3D(config.cfpArray))
     radonSize: int = config.radonSize
+    cfpTransformMode: str = config.cfpTransformMode
     cfpIncoherentQc: bool = config.cfpIncoherentQc
     cfpRun3x3Diagnostics: bool = config.cfpRun3x3Diagnostics
+    cfpAdaptiveGrid: bool = config.cfpAdaptiveGrid
+    cfpAdaptiveTolerance: float = config.cfpAdaptiveTolerance
+    cfpBatchGridSize: int = config.cfpBatchGridSize
     cfpDisplayCutoffFraction: float = config.cfpDisplayCutoffFraction
 
     debug: bool = config.DEFAULT_DEBUG
     debugpy: bool = config.DEFAULT_DEBUGPY
     useNumba: bool = config.useNumba
     useRelativePaths: bool = config.useRelativePaths
+    useProjectStore: bool = config.useProjectStore
+    resultCacheSizeMB: int = config.resultCacheSizeMB
+    stackResponseCacheSizeMB: int = config.stackResponseCacheSizeMB
+    foldOffsetClassWidth: float = config.foldOffsetClassWidth
+    foldAzimuthSectors: int = config.foldAzimuthSectors
+    foldOvtSizeX: float = config.foldOvtSizeX
+    foldOvtSizeY: float = config.foldOvtSizeY
+    foldMinOffset: float = config.foldMinOffset
+    foldMaxOffset: float = config.foldMaxOffset
+    analysisLayout: str = config.analysisLayout
     useExperimental: bool = config.DEFAULT_USE_EXPERIMENTAL
     showSummaries: bool = config.DEFAULT_SHOW_SUMMARIES
 
@@ -185,13 +199,27 @@ def cloneAppSettings(appSettings: AppSettings) -> AppSettings:
         kxyArray=QVector3D(appSettings.kxyArray),
         cfpArray=QVector3D(appSettings.cfpArray),
         radonSize=appSettings.radonSize,
+        cfpTransformMode=appSettings.cfpTransformMode,
         cfpIncoherentQc=appSettings.cfpIncoherentQc,
         cfpRun3x3Diagnostics=appSettings.cfpRun3x3Diagnostics,
+        cfpAdaptiveGrid=appSettings.cfpAdaptiveGrid,
+        cfpAdaptiveTolerance=appSettings.cfpAdaptiveTolerance,
+        cfpBatchGridSize=appSettings.cfpBatchGridSize,
         cfpDisplayCutoffFraction=appSettings.cfpDisplayCutoffFraction,
         debug=appSettings.debug,
         debugpy=appSettings.debugpy,
         useNumba=appSettings.useNumba,
         useRelativePaths=appSettings.useRelativePaths,
+        useProjectStore=appSettings.useProjectStore,
+        resultCacheSizeMB=appSettings.resultCacheSizeMB,
+        stackResponseCacheSizeMB=appSettings.stackResponseCacheSizeMB,
+        foldOffsetClassWidth=appSettings.foldOffsetClassWidth,
+        foldAzimuthSectors=appSettings.foldAzimuthSectors,
+        foldOvtSizeX=appSettings.foldOvtSizeX,
+        foldOvtSizeY=appSettings.foldOvtSizeY,
+        foldMinOffset=appSettings.foldMinOffset,
+        foldMaxOffset=appSettings.foldMaxOffset,
+        analysisLayout=appSettings.analysisLayout,
         useExperimental=appSettings.useExperimental,
         showSummaries=appSettings.showSummaries,
     )
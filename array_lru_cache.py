@@ -0,0 +1,125 @@
+"""
+In this module numpy arrays derived from the analysis cube are cached, and computed ahead of time in a background thread.
+
+ArrayLruCache is a LRU cache bounded by the total size (nbytes) of its arrays. It is the common part of the stack
+response cache (stack_response_cache.py) and the bin slice cache (bin_slice_cache.py).
+
+The cache is bound to the array its entries are derived from, e.g. output.anaOutput; binding it to another array
+clears it. Entries computed by a background thread carry the cache's generation at the start of the prefetch;
+a later prefetch or clear() increases the generation, so outdated entries are dropped rather than stored.
+"""
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+
+import numpy as np
+
+from .numba_cache import launchNumbaThreadPool
+
+
+class ArrayLruCache:
+    """LRU cache of numpy arrays, bounded by their total size; safe to use from the GUI thread and a prefetch thread."""
+
+    def __init__(self, maxBytes: int, threadName: str = 'array-prefetch') -> None:
+        self.maxBytes = max(int(maxBytes), 0)
+        self.totalBytes = 0
+        self.generation = 0                                                     # increased by clear() and prefetchJobs(); results of an older prefetch are dropped
+        self.threadName = threadName
+        self._entries = OrderedDict()                                           # key -> array
+        self._lock = threading.Lock()
+        self._source = None                                                     # array the entries are derived from
+        self._prefetchThread = None
+        self._prefetchError = None                                              # first failed prefetch job, until takePrefetchError() reports it
+        self._prefetchErrorSeen = False                                         # only the first failure is reported
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def bindSource(self, source) -> None:
+        """Clear the cache when its entries were derived from another array than 'source'."""
+        if source is not self._source:
+            self.clear()
+            self._source = source
+
+    def setMaxBytes(self, maxBytes: int) -> None:
+        with self._lock:
+            self.maxBytes = max(int(maxBytes), 0)
+            self._evict()
+
+    def get(self, key) -> np.ndarray | None:
+        with self._lock:
+            array = self._entries.get(key)
+            if array is not None:
+                self._entries.move_to_end(key)
+            return array
+
+    def put(self, key, array: np.ndarray, generation: int | None = None) -> bool:
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return False
+            if array.nbytes > self.maxBytes:
+                return False
+
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.totalBytes -= previous.nbytes
+            self._entries[key] = array
+            self.totalBytes += array.nbytes
+            self._evict()
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.totalBytes = 0
+            self.generation += 1
+
+    def prefetchJobs(self, jobs: list[tuple[object, Callable[[], np.ndarray | None]]]) -> threading.Thread | None:
+        """Run the (key, compute) jobs whose key isn't cached yet in a background (daemon) thread, and cache their results.
+
+        A new prefetch replaces the pending one; a running job is always completed. compute() may return None for 'nothing to cache'.
+        """
+        with self._lock:
+            self.generation += 1
+            generation = self.generation
+            if self.maxBytes <= 0:
+                return None
+            pending = [(key, compute) for key, compute in jobs if key not in self._entries]
+        if not pending:
+            return None
+
+        launchNumbaThreadPool()
+
+        def run():
+            for key, compute in pending:
+                if self.generation != generation:                               # superseded by a newer prefetch, or cleared
+                    return
+                try:
+                    array = compute()
+                except Exception as exc:                                        # prefetching is an optimization only; the array is computed when needed
+                    with self._lock:
+                        if not self._prefetchErrorSeen:
+                            self._prefetchErrorSeen = True
+                            self._prefetchError = exc
+                    return
+                if array is not None:
+                    self.put(key, array, generation)
+
+        self._prefetchThread = threading.Thread(target=run, name=self.threadName, daemon=True)
+        self._prefetchThread.start()
+        return self._prefetchThread
+
+    def takePrefetchError(self) -> Exception | None:
+        """The first exception raised by a prefetch job, returned once so the GUI thread can log it; None otherwise."""
+        with self._lock:
+            error, self._prefetchError = self._prefetchError, None
+            return error
+
+    def _evict(self) -> None:
+        while self._entries and self.totalBytes > self.maxBytes:
+            _, array = self._entries.popitem(last=False)
+            self.totalBytes -= array.nbytes
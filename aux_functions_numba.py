@@ -12,13 +12,20 @@ See: https://stackoverflow.com/questions/57774497/how-do-i-make-a-dummy-do-nothi
 import numpy as np
 from qgis.PyQt.QtCore import QLineF, QRectF  # needed for pointsInRect
 
+from .numba_cache import configureNumbaCache
+
+configureNumbaCache()                                                           # compiled kernels are cached in the plugin folder; must precede the @jit decorators
+
 LOG_RESPONSE_FLOOR = 1.0e-12
 
 try:
-    from numba import jit, prange
+    from numba import get_num_threads, jit, prange
 except ImportError:
     prange = range
 
+    def get_num_threads():
+        return 1
+
     def jit(*args, **kwargs):
         if args and callable(args[0]) and not kwargs:
             return args[0]
@@ -31,7 +38,7 @@ except ImportError:
 # @jit((nb.types.Array(nb.float32, 3, 'C'), nb.boolean), nopython=True)      # numba needs array specs to work properly
 
 
-@jit(nopython=True)
+@jit(nopython=True, cache=True)
 def numbaFilterSlice2D(slice2D: np.ndarray, unique=False):
     # size = slice3D.shape[0]
     # fold = slice3D.shape[1]
@@ -54,7 +61,7 @@ def numbaFilterSlice2D(slice2D: np.ndarray, unique=False):
     return slice2D                                                              # return array, potentially with shape[0,16] when empty
 
 
-@jit(nopython=True)
+@jit(nopython=True, cache=True)
 def numbaSlice3D(slice3D: np.ndarray, unique=False):
     if unique:                                                                  # we'd like to use unique offsets; but does it make sense ?
         havUnique = slice3D[:, :, 15]                                           # get all available cmp values belonging to this slice
@@ -109,23 +116,131 @@ def numbaSliceStats(slice4D: np.ndarray, unique=False):
     return (offsets, azimuth, False)
 
 
-# @jit(nopython=True)
+HISTOGRAM_BLOCK_BYTES = 64 * 1024 * 1024                                       # analysis bins read per call of numbaAccumulateOffsetAzimuth()
+
+
+@jit(nopython=True, cache=True)
+def numbaHistogramBin(value: float, edges: np.ndarray) -> int:
+    # bin i with edges[i] <= value < edges[i + 1] for uniform edges; the last edge is included in the last bin, as in np.histogram()
+    n = edges.shape[0] - 1
+    if not (edges[0] <= value <= edges[n]):                                     # also rejects NaN
+        return -1
+    if value == edges[n]:
+        return n - 1
+    i = min(max(int((value - edges[0]) / (edges[1] - edges[0])), 0), n - 1)    # first guess; corrected for rounding below
+    while i > 0 and value < edges[i]:
+        i -= 1
+    while i < n - 1 and value >= edges[i + 1]:
+        i += 1
+    return i
+
+
+@jit(nopython=True, parallel=True, nogil=True, cache=True)
+def numbaAccumulateOffsetAzimuth(block4D: np.ndarray, aziEdges: np.ndarray, offEdges2D: np.ndarray, offEdges1D: np.ndarray, hist2D: np.ndarray, hist1D: np.ndarray, counts: np.ndarray):
+    # adds the live traces of a block of bins [x, y, fold, 16] to the histograms, without a mask or a copy of the block.
+    # All arrays have a leading axis of size 2: [0] counts all live traces (fold > 0), [1] only the unique ones (fold > 0 and flag == -1).
+    # The second axis holds one partial histogram per part of the block; parts run in parallel and are summed afterwards.
+    # counts[mode, part] holds the number of live traces, counts[2, part] the number of unique flags found in any fold slot.
+    nParts = hist2D.shape[1]
+    nX = block4D.shape[0]
+    for part in prange(nParts):
+        for x in range(part, nX, nParts):
+            for y in range(block4D.shape[1]):
+                for f in range(block4D.shape[2]):
+                    isUnique = block4D[x, y, f, 15] == -1
+                    if isUnique:
+                        counts[2, part] += 1
+                    if block4D[x, y, f, 2] <= 0:
+                        continue
+
+                    offset = block4D[x, y, f, 13]
+                    a = numbaHistogramBin(block4D[x, y, f, 14], aziEdges)
+                    o = numbaHistogramBin(offset, offEdges2D)
+                    o1 = numbaHistogramBin(offset, offEdges1D)
+                    for mode in range(2):
+                        if mode == 1 and not isUnique:
+                            continue
+                        counts[mode, part] += 1
+                        if a >= 0 and o >= 0:
+                            hist2D[mode, part, a, o] += 1
+                        if o1 >= 0:
+                            hist1D[mode, part, o1] += 1
+
+
+def numbaOffsetAzimuthHistograms(anaOutput: np.ndarray, aziEdges: np.ndarray, offEdges2D: np.ndarray, offEdges1D: np.ndarray, unique=False, blockBytes=HISTOGRAM_BLOCK_BYTES):
+    """Azimuth/offset and offset histograms of the live traces in anaOutput; the streaming counterpart of numbaSliceStats().
+
+    Returns (ofAziHist, offsetCounts, noData), equal to np.histogram2d(azimuth, offsets, [aziEdges, offEdges2D])[0] and
+    np.histogram(offsets, offEdges1D)[0] over the offsets and azimuths selected by numbaSliceStats(). The analysis array is read
+    in blocks of whole x-rows of about blockBytes, and no array with the size of the analysis array is ever created.
+    """
+    aziEdges = np.asarray(aziEdges, dtype=np.float64)
+    offEdges2D = np.asarray(offEdges2D, dtype=np.float64)
+    offEdges1D = np.asarray(offEdges1D, dtype=np.float64)
+
+    nParts = max(get_num_threads(), 1)
+    hist2D = np.zeros((2, nParts, aziEdges.shape[0] - 1, offEdges2D.shape[0] - 1), dtype=np.int64)
+    hist1D = np.zeros((2, nParts, offEdges1D.shape[0] - 1), dtype=np.int64)
+    counts = np.zeros((3, nParts), dtype=np.int64)
+
+    rowBytes = max(anaOutput.itemsize * int(np.prod(anaOutput.shape[1:])), 1)
+    blockRows = max(int(blockBytes // rowBytes), 1)
+    for x0 in range(0, anaOutput.shape[0], blockRows):
+        numbaAccumulateOffsetAzimuth(anaOutput[x0:x0 + blockRows], aziEdges, offEdges2D, offEdges1D, hist2D, hist1D, counts)
+
+    mode = 1 if unique is True and counts[2].sum() > 0 else 0                   # unique offsets only when -1 records are available
+    if counts[mode].sum() == 0:
+        return (None, None, True)
+    return (hist2D[mode].sum(axis=0).astype(np.float64), hist1D[mode].sum(axis=0), False)
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def numbaNdft1DPoint(dK: float, slice2D: np.ndarray, inclu2D: np.ndarray, radialRow: np.ndarray):
+    # Kr stack response of one point (bin) into radialRow; shared by the parallel and the serial 1D transform
+    nK = radialRow.shape[0]
+    response = np.zeros(nK, dtype=np.complex128)
+    n = 0
+    for f in range(slice2D.shape[0]):
+        if not inclu2D[f]:                                                      # not all points will be valid, in case of unique offsets
+            continue
+        n += 1
+
+        # the phase recurrence exp(2πi·k·offset) = exp(2πi·(k-1)·offset) · exp(2πi·dK·offset) avoids an exp() per k-value
+        offset = np.float64(slice2D[f, 13])
+        phaseStep = np.exp(2j * np.pi * dK * offset)
+        phase = 1.0 + 0.0j
+        for k in range(nK):
+            response[k] += phase
+            phase *= phaseStep
+
+    a = 1.0 / n if n > 0 else 0.0                                               # normalize by actual nr of available traces; zero response for n = zero
+    for k in range(nK):
+        absResponse = max(abs(response[k]) * a, LOG_RESPONSE_FLOOR)
+        radialRow[k] = np.log(absResponse) * 20.0
+
+
+@jit(nopython=True, parallel=True, nogil=True, cache=True)
 def numbaNdft1D(kMax: float, dK: float, slice3D: np.ndarray, inclu3D: np.ndarray):
     kR = np.arange(0, kMax, dK)                                                 # numpy array with k-values [0 ... kMax]
-    nK = kR.shape[0]                                                            # number of points along y-axis (size of kR array)
     nP = slice3D.shape[0]                                                       # number of points along x-axis
+    radialStk = np.zeros(shape=(nP, kR.shape[0]), dtype=np.float32)             # start with empty array of the right size and type
+
+    for p in prange(nP):                                                        # iterate (in parallel) over all points in the current direction
+        numbaNdft1DPoint(dK, slice3D[p], inclu3D[p], radialStk[p])
+
+    return radialStk
 
-    radialStk = np.zeros(shape=(nP, nK), dtype=np.float32)                      # start with empty array of the right size and type
 
-    for p in range(nP):                                                         # iterate over all points in the current direction
-        offRadial = slice3D[p, :, 13]                                           # get all available offsets belonging to this row
-        incRadial = inclu3D[p, :]                                               # not all points will be valid, in case of unique offsets
-        n = np.count_nonzero(incRadial)                                         # normalize by actual  nr of available traces
-        a = 1 / n if n > 0 else 0                                               # response will be zero for n = zero
-        response = np.dot(incRadial, np.exp(2j * np.pi * kR * offRadial[:, np.newaxis])) * a
-        absResponse = np.maximum(np.abs(response), LOG_RESPONSE_FLOOR)
-        logResponse = np.log(absResponse) * 20.0
-        radialStk[p, :] = logResponse
+@jit(nopython=True, nogil=True, cache=True)                                     # nogil; the GUI keeps running while lines are prefetched
+def numbaNdft1DSerial(kMax: float, dK: float, slice3D: np.ndarray, inclu3D: np.ndarray):
+    # numbaNdft1D() without parallel loops, for background threads.
+    # Numba's default (workqueue) threading layer aborts when parallel kernels are launched concurrently from different threads.
+    kR = np.arange(0, kMax, dK)
+    nP = slice3D.shape[0]
+    radialStk = np.zeros(shape=(nP, kR.shape[0]), dtype=np.float32)
+
+    for p in range(nP):
+        numbaNdft1DPoint(dK, slice3D[p], inclu3D[p], radialStk[p])
 
     return radialStk
 
@@ -138,40 +253,41 @@ def numbaNdft1D(kMax: float, dK: float, slice3D: np.ndarray, inclu3D: np.ndarray
 #    get result in an async manner http://pymotw.com/2/multiprocessing/communication.html
 # 4) save results in a cache to prevent recalculation
 #    see: https://docs.python.org/dev/library/functools.html#functools.lru_cache
+@jit(nopython=True, parallel=True, cache=True)
+def numbaPhaseTable(k: np.ndarray, points: np.ndarray):
+    nP = points.shape[0]
+    nK = k.shape[0]
 
-# there are three nested for loops in the following function; *** SLOW ***. Improve performance by:
-# 1) use numba to get optimized precompiled code
-#    see: https://www.infoworld.com/article/3622013/speed-up-your-python-with-numba.html
-# 2) use numpy arrays, similar as done in the 1D transform
-# 3) spawn a different process.
-#    get result in an async manner http://pymotw.com/2/multiprocessing/communication.html
-# 4) save results in a cache to prevent recalculation
-#    see: https://docs.python.org/dev/library/functools.html#functools.lru_cache
-@jit(nopython=True, parallel=True)
+    phaseTable = np.empty(shape=(nP, nK), dtype=np.complex128)                  # exp(2πi·k·x) for every point (row) and k-value (column)
+
+    for p in prange(nP):                                                        # execute parallel loops
+        for i in range(nK):
+            phaseTable[p, i] = np.exp(2j * np.pi * k[i] * points[p])
+
+    return phaseTable
+
+
+# the 2D transform is separable: sum_p exp(2πi(kx·x_p + ky·y_p)) = sum_p exp(2πi·kx·x_p) · exp(2πi·ky·y_p).
+# Hence it equals the matrix product Ex^T · Ey of two phase tables, with Ex[p, kx] = exp(2πi·kx·x_p) and Ey[p, ky] = exp(2πi·ky·y_p).
+# This takes (nX + nY)·nP complex exponentials instead of nX·nY·nP; the product itself is left to numpy's BLAS,
+# as np.dot in a numba kernel requires scipy.
 def numbaNdft2D(kMin: float, kMax: float, dK: float, offsetX: np.ndarray, offsetY: np.ndarray):
     kX = np.arange(kMin, kMax, dK)
     kY = np.arange(kMin, kMax, dK)
-    nX = kX.shape[0]
-    nY = kY.shape[0]
-    nP = offsetX.shape[0]
-
-    xyCellStk = np.zeros(shape=(nX, nY), dtype=np.float32)  # start with empty array of the right size and type
+    nP = len(offsetX)
 
-    for x in prange(nX):                                                        # execute parallel loops
-        for y in range(nY):
-            # Vectorized inner sum over all points p
-            response = np.sum(np.exp(2j * np.pi * (kX[x] * offsetX + kY[y] * offsetY)))
-            absResponse = np.maximum(np.abs(response) / nP, LOG_RESPONSE_FLOOR)
-            # logResponse = np.round(np.log(absResponse) * 20.0, 2)           # np.round is only handy to review array contents
-            logResponse = np.log(absResponse) * 20.0
-            xyCellStk[x, y] = logResponse
+    phaseX = numbaPhaseTable(kX, np.ascontiguousarray(offsetX, dtype=np.float64))
+    phaseY = numbaPhaseTable(kY, np.ascontiguousarray(offsetY, dtype=np.float64))
+    response = phaseX.T @ phaseY                                                # (nX, nY) sum over all points
 
+    absResponse = np.maximum(np.abs(response) / nP, LOG_RESPONSE_FLOOR)
+    xyCellStk = (np.log(absResponse) * 20.0).astype(np.float32)
     return xyCellStk
 
-# the following function is a non-parallel version of the above function; it is used for testing purposes to check if the parallelization is working properly
+# the following function is a direct (non-separable, non-parallel) version of the above function; it is used for testing purposes to check the outcome of the above
 
 
-@jit(nopython=True)
+@jit(nopython=True, cache=True)
 def numbaNdft2DBeforeGemini(kMin: float, kMax: float, dK: float, offsetX: np.ndarray, offsetY: np.ndarray):
     kX = np.arange(kMin, kMax, dK)
     kY = np.arange(kMin, kMax, dK)
@@ -195,85 +311,44 @@ def numbaNdft2DBeforeGemini(kMin: float, kMax: float, dK: float, offsetX: np.nda
     return xyCellStk
 
 
-@jit(nopython=True)
-def numbaOffInline(slice2D: np.ndarray, ox: float, component: int = 0):
-    xInline = slice2D[:, 9]                                                     # get all available cmp values belonging to this row
-    if component == 1:
-        oInline = slice2D[:, 6] - slice2D[:, 3]                                 # inline offset component
-    elif component == 2:
-        oInline = slice2D[:, 7] - slice2D[:, 4]                                 # x-line offset component
-    elif component == 3:
-        oInline = slice2D[:, 12]                                                # TWT [ms]
-    else:
-        oInline = slice2D[:, 13]                                                # absolute offset magnitude
-
-    x = np.empty((2 * xInline.size), dtype=xInline.dtype)
-    x[0::2] = xInline - ox
-    x[1::2] = xInline + ox
-
-    y = np.empty((2 * oInline.size), dtype=oInline.dtype)
-    y[0::2] = oInline
-    y[1::2] = oInline
-
-    return (x, y)
-
-
-@jit(nopython=True)
-def numbaOffXline(slice2D: np.ndarray, oy: float, component: int = 0):
-    yInline = slice2D[:, 10]                                                    # get all available cmp values belonging to this row
-    if component == 1:
-        oInline = slice2D[:, 6] - slice2D[:, 3]                                 # inline offset component
-    elif component == 2:
-        oInline = slice2D[:, 7] - slice2D[:, 4]                                 # x-line offset component
-    elif component == 3:
-        oInline = slice2D[:, 12]                                                # TWT [ms]
-    else:
-        oInline = slice2D[:, 13]                                                # absolute offset magnitude
-
-    x = np.empty((2 * yInline.size), dtype=yInline.dtype)
-    x[0::2] = yInline - oy
-    x[1::2] = yInline + oy
-
-    y = np.empty((2 * oInline.size), dtype=oInline.dtype)
-    y[0::2] = oInline
-    y[1::2] = oInline
-
-    return (x, y)
-
-
-@jit(nopython=True)
-def numbaAziInline(slice2D: np.ndarray, ox: float):
-    xInline = slice2D[:, 9]                                                   # get all available cmp values belonging to this row
-    oInline = slice2D[:, 14]                                                  # get all available azimuths belonging to this row
-
-    x = np.empty((2 * xInline.size), dtype=xInline.dtype)
-    x[0::2] = xInline - ox
-    x[1::2] = xInline + ox
-
-    y = np.empty((2 * oInline.size), dtype=oInline.dtype)
-    y[0::2] = oInline
-    y[1::2] = oInline
-
-    return (x, y)
-
-
-@jit(nopython=True)
-def numbaAziXline(slice2D: np.ndarray, oy: float):
-    yInline = slice2D[:, 10]                                                  # get all available cmp values belonging to this row
-    oInline = slice2D[:, 14]                                                  # get all available azimuths belonging to this row
-
-    x = np.empty((2 * yInline.size), dtype=yInline.dtype)
-    x[0::2] = yInline - oy
-    x[1::2] = yInline + oy
-
-    y = np.empty((2 * oInline.size), dtype=oInline.dtype)
-    y[0::2] = oInline
-    y[1::2] = oInline
-
-    return (x, y)
-
-
-@jit(nopython=True)
+@jit(nopython=True, cache=True)
+def numbaLineScatter(slice3D: np.ndarray, cmpColumn: int, unique=False):
+    # one pass over a line of bins (bins, fold, 16) for the offset and azimuth plots along that line.
+    # Returns (n, 6) rows of: cmp coordinate (column 9 in-line, 10 cross-line), |offset|, in-line offset, x-line offset, TWT, azimuth
+    size = slice3D.shape[0]
+    fold = slice3D.shape[1]
+
+    useUnique = False
+    if unique:                                                                  # we'd like to use unique offsets; are there any -1 records ?
+        for i in range(size):
+            for j in range(fold):
+                if slice3D[i, j, 15] == -1.0:
+                    useUnique = True
+
+    count = 0
+    for i in range(size):
+        for j in range(fold):
+            if slice3D[i, j, 2] > 0 and (not useUnique or slice3D[i, j, 15] == -1.0):
+                count += 1
+
+    scatter = np.empty((count, 6), dtype=np.float32)
+    k = 0
+    for i in range(size):
+        for j in range(fold):
+            trace = slice3D[i, j, :]
+            if trace[2] > 0 and (not useUnique or trace[15] == -1.0):
+                scatter[k, 0] = trace[cmpColumn]
+                scatter[k, 1] = trace[13]                                       # absolute offset magnitude
+                scatter[k, 2] = trace[6] - trace[3]                             # inline offset component
+                scatter[k, 3] = trace[7] - trace[4]                             # x-line offset component
+                scatter[k, 4] = trace[12]                                       # TWT [ms]
+                scatter[k, 5] = trace[14]                                       # azimuth
+                k += 1
+
+    return scatter
+
+
+@jit(nopython=True, cache=True)
 def numbaOffsetBin(slice2D: np.ndarray, unique=False):
     if unique is True:                                                          # we'd like to use unique offsets
         havUnique = slice2D[:, 15]                                              # get all available cmp values belonging to this row
@@ -299,7 +374,7 @@ def numbaOffsetBin(slice2D: np.ndarray, unique=False):
     return (offsetX, offsetY, noData)
 
 
-@jit(nopython=True)
+@jit(nopython=True, cache=True)
 def numbaSpiderBin(slice2D: np.ndarray):                                        # slicing should already have reduced fold to account for unique fold, if need be
 
     foldX2 = slice2D.shape[0] * 2
@@ -341,7 +416,7 @@ def pointsInRect(pointArray: np.ndarray, rect: QRectF):
     return numbaPointsInRect(pointArray, lt, rt, tp, bm)
 
 
-@jit(nopython=True)
+@jit(nopython=True, cache=True)
 def numbaPointsInRect(pointArray: np.ndarray, lt: float, rt: float, tp: float, bm: float):
     included = (pointArray[:, 0] >= lt) & (pointArray[:, 0] <= rt) & (pointArray[:, 1] >= tp) & (pointArray[:, 1] <= bm)
     return included
@@ -377,7 +452,7 @@ def numbaPointsInRect(pointArray: np.ndarray, lt: float, rt: float, tp: float, b
 #                     LocY[type=float32;offset=48];52;False)'
 
 
-@jit(nopython=True)
+@jit(nopython=True, cache=True)
 def numbaSetPointRecord(array: np.ndarray, index: int, line: float, point: float, block: int, east: float, north: float, pnt: np.ndarray) -> None:
     # pntType1 = np.dtype(
     #     [
@@ -415,7 +490,7 @@ def numbaSetPointRecord(array: np.ndarray, index: int, line: float, point: float
     array[index]['InXps'] = 1                                                   # later, we want to use InXps == 1 to check for any xps orphns
 
 
-@jit(nopython=True)
+@jit(nopython=True, cache=True)
 def numbaSetRelationRecord(array: np.ndarray, index: int, srcLin: float, srcPnt: float, srcInd: int, shtRec: int, recLin: float, recMin: float, recMax: float):
     array[index]['SrcLin'] = float(int(srcLin))
     array[index]['SrcPnt'] = float(int(srcPnt))
@@ -428,7 +503,7 @@ def numbaSetRelationRecord(array: np.ndarray, index: int, srcLin: float, srcPnt:
     array[index]['Uniq'] = 1                                                    # needed for compacting array later (remove empty records)
 
 
-@jit(nopython=True)
+@jit(nopython=True, cache=True)
 def numbaBinBatchParallel(
     srcBatch,
     relIndices,
@@ -511,7 +586,7 @@ def numbaBinBatchParallel(
                         if dist > maxOffset[nx, ny]: maxOffset[nx, ny] = dist  # noqa: E701
 
 
-@jit(nopython=True)
+@jit(nopython=True, cache=True)
 def numbaFixRelationRecord(array: np.ndarray, index: int, recStkX: float):
     recMin = min(array[index]['RecMin'], int(recStkX))
     recMax = max(array[index]['RecMax'], int(recStkX))
@@ -541,7 +616,7 @@ def clipLineF(line: QLineF, border: QRectF) -> QLineF:
     return QLineF(x1, y1, x2, y2)                                               # return the clipped line
 
 
-@jit(nopython=True)
+@jit(nopython=True, cache=True)
 def numbaClipLineF(x1: float, y1: float, x2: float, y2: float, xMin: float, xMax: float, yMin: float, yMax: float) -> tuple:
 
     # Python routine to implement Cohen Sutherland algorithm for line clipping.
@@ -631,7 +706,7 @@ def numbaClipLineF(x1: float, y1: float, x2: float, y2: float, xMin: float, xMax
     return (0.0, 0.0, 0.0, 0.0)                                                 # return a null line
 
 
-@jit(nopython=True, parallel=True)
+@jit(nopython=True, parallel=True, cache=True)
 def pointInPolygon(xy, poly):
     # See: https://stackoverflow.com/questions/52471590/use-multithreading-in-numba
     D = np.empty(len(xy), dtype=bool)
@@ -677,7 +752,7 @@ def pointInPolygon(xy, poly):
 # 20-40 s first-call JIT compile is paid only once per (numba, numpy,
 # python) version triple, not on every QGIS restart.
 # ----------------------------------------------------------------------------
-@jit(nopython=True, cache=False)
+@jit(nopython=True, cache=True)
 def numbaApplyBinUpdatesAnalysis(
     nx,                # int64[N]
     ny,                # int64[N]
@@ -737,7 +812,7 @@ def numbaApplyBinUpdatesAnalysis(
 # Same write hazard caveat: parallel=False because per-(x, y) fold counter
 # is not safe to race across threads. cache=True keeps the JIT artifact.
 # ----------------------------------------------------------------------------
-@jit(nopython=True, cache=False)
+@jit(nopython=True, cache=True)
 def numbaApplyBinUpdatesAnalysisBatch(
     nx,                # int64[N]
     ny,                # int64[N]
@@ -0,0 +1,89 @@
+"""
+In this module the bin slices of the analysis cube, anaOutput[nX, nY, :, :], are cached, and read ahead of the spider.
+
+The analysis cube is a memmap of the analysis file. When the project lives on a network share, reading a bin slice,
+or re-paging the trace table (ChunkedData), can stall the GUI for every step of the spider. After each step, a background
+thread therefore reads the bins ahead in the direction of travel, and the direct neighbours of the spider bin, into memory.
+When the trace table is chunked, it also reads the chunk of the first bin ahead, when that lies in another chunk.
+
+The spider overlay and the stack-cell response then get their bin slice from memory. Cached slices are copies that
+hold all fold levels of a bin; callers slice them to the bin's actual fold.
+"""
+
+import threading
+from functools import partial
+
+import numpy as np
+
+from .array_lru_cache import ArrayLruCache
+
+
+def binSliceKey(nX: int, nY: int) -> tuple:
+    return ('bin', int(nX), int(nY))
+
+
+def chunkKey(chunkSize: int, chunkIndex: int) -> tuple:
+    return ('chunk', int(chunkSize), int(chunkIndex))
+
+
+def readBinSlice(anaOutput: np.ndarray, nX: int, nY: int) -> np.ndarray:
+    """A C-contiguous copy of anaOutput[nX, nY, :, :]; this is where the memmap is read."""
+    return np.array(anaOutput[nX, nY, :, :], dtype=np.float32, order='C')
+
+
+def readChunk(chunked, chunkIndex: int) -> np.ndarray:
+    """A read-only copy of chunk 'chunkIndex' of a ChunkedData trace table; the cached copy is shared by all callers."""
+    chunk = np.copy(chunked.getChunk(chunkIndex))
+    chunk.setflags(write=False)
+    return chunk
+
+
+def prefetchBinOrder(nX: int, nY: int, dX: int, dY: int, xSize: int, ySize: int, radius: int) -> list[tuple[int, int]]:
+    """Bins in the order they are prefetched; (dX, dY) is the last step of the spider, or (0, 0) without a direction of travel.
+
+    Up to 'radius' bins ahead are followed by the four direct neighbours of (nX, nY), one step away.
+    """
+    candidates = []
+    if dX != 0 or dY != 0:
+        candidates = [(nX + dX * i, nY + dY * i) for i in range(1, radius + 1)]
+
+    stride = max(abs(dX), abs(dY), 1)
+    candidates += [(nX + stride, nY), (nX - stride, nY), (nX, nY + stride), (nX, nY - stride)]
+
+    order = []
+    for x, y in candidates:
+        if 0 <= x < xSize and 0 <= y < ySize and (x, y) not in order:
+            order.append((x, y))
+    return order
+
+
+class BinSliceCache(ArrayLruCache):
+    """LRU cache of bin slices and trace table chunks, keyed by binSliceKey() and chunkKey(), and bounded by their total size."""
+
+    def __init__(self, maxBytes: int) -> None:
+        super().__init__(maxBytes, 'bin-slice-prefetch')
+
+    def binSlice(self, anaOutput: np.ndarray, nX: int, nY: int) -> np.ndarray:
+        """The slice of bin (nX, nY); from the cache, or read from anaOutput and cached."""
+        key = binSliceKey(nX, nY)
+        binSlice = self.get(key)
+        if binSlice is None:
+            binSlice = readBinSlice(anaOutput, nX, nY)
+            self.put(key, binSlice)
+        return binSlice
+
+    def chunk(self, chunked, chunkIndex: int) -> np.ndarray:
+        """A read-only copy of chunk 'chunkIndex' of a ChunkedData trace table; from the cache, or read and cached."""
+        key = chunkKey(chunked.chunkSize, chunkIndex)
+        chunk = self.get(key)
+        if chunk is None:
+            chunk = readChunk(chunked, chunkIndex)
+            self.put(key, chunk)
+        return chunk
+
+    def prefetch(self, anaOutput: np.ndarray, bins: list[tuple[int, int]], chunked=None, chunkIndex: int = -1) -> threading.Thread | None:
+        """Read the slices of 'bins', and chunk 'chunkIndex' of 'chunked' when given, in a background (daemon) thread."""
+        jobs = [(binSliceKey(x, y), partial(readBinSlice, anaOutput, x, y)) for x, y in bins]
+        if chunked is not None and 0 <= chunkIndex < chunked.totalChunks:
+            jobs.insert(1, (chunkKey(chunked.chunkSize, chunkIndex), partial(readChunk, chunked, chunkIndex)))
+        return self.prefetchJobs(jobs)
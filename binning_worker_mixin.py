@@ -4,17 +4,19 @@
 from math import ceil
 from timeit import default_timer as timer
 
-import numpy as np
 import pyqtgraph as pg
-from qgis.PyQt.QtCore import QThread, QTimer
+from qgis.PyQt.QtCore import Qt, QThread, QTimer
 from qgis.PyQt.QtWidgets import QApplication, QMessageBox
 
+from .analysis_layout import ANALYSIS_LAYOUT_COMPACT
 from .enums_and_int_flags import MsgType
+from .sidecar_persistence import SidecarPersistenceQueue, SidecarWriteJob
 from .worker_operation_controller import WorkerOperationController
 from .worker_result_appliers import (BinningResultApplier,
                                      CfpAmplitudeMapResultApplier,
                                      CfpFromGeometryTablesResultApplier,
                                      CfpFromTemplatesResultApplier,
+                                     CfpMultiPointResultApplier,
                                      GeometryResultApplier)
 from .worker_threads import (BinFromGeometryWorker, BinningFromGeometryResult,
                              BinningFromTemplatesResult, BinningWorker,
@@ -22,6 +24,8 @@ from .worker_threads import (BinFromGeometryWorker, BinningFromGeometryResult,
                              CfpFromGeometryTablesResult,
                              CfpFromGeometryTablesWorker,
                              CfpFromTemplatesResult, CfpFromTemplatesWorker,
+                             CfpMultiPointFromGeometryTablesResult,
+                             CfpMultiPointFromGeometryTablesWorker,
                              GeometryFromTemplatesResult, GeometryWorker)
 
 
@@ -38,6 +42,7 @@ class BinningWorkerMixin:
             'CfpFromTemplatesWorker': CfpFromTemplatesWorker,
             'CfpAmplitudeMapWorker': CfpAmplitudeMapWorker,
             'CfpFromGeometryTablesWorker': CfpFromGeometryTablesWorker,
+            'CfpMultiPointFromGeometryTablesWorker': CfpMultiPointFromGeometryTablesWorker,
             'timer': timer,
             'QMessageBox': QMessageBox,
         }
@@ -58,6 +63,9 @@ class BinningWorkerMixin:
         if getattr(self, 'cfpFromGeometryTablesResultApplier', None) is None:
             self.cfpFromGeometryTablesResultApplier = CfpFromGeometryTablesResultApplier(self, self._getWorkerRuntimeDependencies)
 
+        if getattr(self, 'cfpMultiPointResultApplier', None) is None:
+            self.cfpMultiPointResultApplier = CfpMultiPointResultApplier(self, self._getWorkerRuntimeDependencies)
+
         if getattr(self, 'cfpAmplitudeMapResultApplier', None) is None:
             self.cfpAmplitudeMapResultApplier = CfpAmplitudeMapResultApplier(self, self._getWorkerRuntimeDependencies)
 
@@ -70,7 +78,16 @@ class BinningWorkerMixin:
         if not self.projectService.touchSidecar(self.fileName, '.ana.npy'):
             return False
 
-        memmapResult = self.projectService.openAnalysisMemmap(self.fileName, shape, mode='r+')
+        memmapResult = None
+        if self.appSettings.analysisLayout == ANALYSIS_LAYOUT_COMPACT:         # binning filled a float32 table; convert it now
+            memmapResult = self.projectService.compactAnalysisFile(self.fileName, shape)
+            if memmapResult.success:
+                self.appendLogMessage('Thread : . . . trace table stored as compact records (read-only)', MsgType.Binning)
+            else:
+                self.appendLogMessage(f'Thread : . . . trace table kept as float32 traces; {memmapResult.errorText}', MsgType.Warning)
+
+        if memmapResult is None or not memmapResult.success:
+            memmapResult = self.projectService.openAnalysisMemmap(self.fileName, shape, mode='r+')
         if not memmapResult.success:
             return False
 
@@ -80,7 +97,7 @@ class BinningWorkerMixin:
         return True
 
     def saveAnalysisSidecars(self, includeHistograms=False):
-        return self.projectService.saveAnalysisSidecars(self.fileName, self.output, includeHistograms=includeHistograms)
+        return self.projectService.saveAnalysisSidecars(self.fileName, self.output, includeHistograms=includeHistograms, useProjectStore=self.appSettings.useProjectStore)
 
     def saveSurveyDataSidecars(self):
         return self.projectService.saveSurveyDataSidecars(
@@ -91,7 +108,122 @@ class BinningWorkerMixin:
             recGeom=self.recGeom,
             relGeom=self.relGeom,
             srcGeom=self.srcGeom,
+            useProjectStore=self.appSettings.useProjectStore,
+        )
+
+    def _ensureSidecarPersistence(self):
+        if getattr(self, 'sidecarPersistence', None) is None:
+            self.sidecarPersistence = SidecarPersistenceQueue(self.projectService, self)
+            self.sidecarPersistence.progress.connect(self.sidecarWriteProgress)
+            self.sidecarPersistence.jobFinished.connect(self.sidecarWriteFinished)
+            self.sidecarPersistence.analysisRestored.connect(self.analysisRestoreFinished)
+        return self.sidecarPersistence
+
+    def persistAnalysisSidecarsInBackground(self, includeHistograms=False):
+        if not self.fileName:
+            return False
+
+        arrays = self.projectService.analysisSidecarArrays(self.output, includeHistograms)
+        self._ensureSidecarPersistence().enqueue(SidecarWriteJob(self.fileName, arrays, self.appSettings.useProjectStore, label='analysis results'))
+        return True
+
+    def persistSurveyDataSidecarsInBackground(self):
+        if not self.fileName:
+            return False
+
+        arrays = self.projectService.surveyDataSidecarArrays(
+            rpsImport=self.rpsImport,
+            spsImport=self.spsImport,
+            xpsImport=self.xpsImport,
+            recGeom=self.recGeom,
+            relGeom=self.relGeom,
+            srcGeom=self.srcGeom,
         )
+        self._ensureSidecarPersistence().enqueue(SidecarWriteJob(self.fileName, arrays, self.appSettings.useProjectStore, label='geometry data'))
+        return True
+
+    def restoreAnalysisInBackground(self):
+        """Unpack the trace table of the opened project from its project store on the sidecar thread; see analysisRestoreFinished()."""
+        if not self.fileName:
+            return False
+
+        self._ensureSidecarPersistence().enqueue(SidecarWriteJob(self.fileName, label='trace table', restoreAnalysis=True))
+        return True
+
+    def analysisRestoreFinished(self, fileName: str, success: bool, errorText: str):
+        if fileName != self.fileName or self.output.binOutput is None:
+            return                                                              # another project was opened (or created) in the meantime
+
+        if not success:
+            self.appendLogMessage(f'Loaded : . . . Analysis &nbsp;: {errorText}', MsgType.Error)
+            self.statusbar.showMessage('Failed to unpack trace table', 3000)
+            return
+
+        result = self.projectService.loadAnalysisTraceTable(self.fileName, self.survey, self.output.maximumFold)
+        for message in result.messages:
+            self.appendLogMessage(message.text, MsgType.Error if message.level == 'error' else MsgType.Info)
+        if result.analysisMemmapResult is None:
+            return
+
+        self.projectLoadApplier.applyAnalysisMemmap(result.analysisMemmapResult)
+        self.appendLogMessage('Loaded : . . . Analysis &nbsp;: trace table unpacked from project store')
+        self.statusbar.showMessage('Unpacked trace table', 3000)
+        self.updateMenuStatus(False)                                            # the trace table dependent actions become available
+
+    def sidecarWriteProgress(self, text: str):
+        self.statusbar.showMessage(text)
+
+    def sidecarWriteFinished(self, label: str, success: bool, errorText: str):
+        if success:
+            self.appendLogMessage(f'Saved&nbsp;&nbsp;: {label} written to disk in the background')
+            self.statusbar.showMessage(f'Saved {label}', 3000)
+        else:
+            self.appendLogMessage(f'saving : Cannot save {label}. Error:{errorText}', MsgType.Error)
+            self.statusbar.showMessage(f'Failed to save {label}', 3000)
+            self.textEdit.document().setModified(True)                           # keep the project 'dirty', so the user is asked to save again
+
+    def waitForPendingSidecarWrites(self):
+        """Block (with a busy cursor) until queued background sidecar writes are on disk; a no-op when nothing is pending."""
+        persistence = getattr(self, 'sidecarPersistence', None)
+        if persistence is None or not persistence.hasPendingWrites():
+            return
+
+        self.appendLogMessage('Saving : waiting for background sidecar writes to complete . . .')
+        self.statusbar.showMessage('Waiting for background sidecar writes to complete ...')
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            while not persistence.waitUntilIdle(timeout=0.1):
+                QApplication.processEvents()                                    # keep delivering progress signals
+        finally:
+            QApplication.restoreOverrideCursor()
+        QApplication.processEvents()                                            # deliver the final jobFinished signal(s)
+
+    def archiveAnalysisOnClose(self):
+        """With the project store enabled, move the trace table of the project being closed into the store.
+
+        The loose .ana.npy file is removed once the store holds it; it is unpacked again in the background when the project is opened.
+        """
+        if not self.appSettings.useProjectStore or not self.fileName:
+            return False
+
+        self.waitForPendingSidecarWrites()                                      # a queued store write may still be updating the same store, or unpacking the trace table
+        if self.output.anaOutput is None:
+            return False
+
+        self.statusbar.showMessage('Archiving trace table in project store ...')
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            archived = self.projectService.archiveAnalysisToStore(self.fileName, self.output.anaOutput)
+        except (OSError, ValueError) as exc:
+            self.appendLogMessage(f'saving : Cannot archive trace table in project store. Error:{exc}', MsgType.Error)
+            return False
+        finally:
+            QApplication.restoreOverrideCursor()
+
+        self.resetAnaTableModel()                                               # release the memmap, before its file is removed
+        if archived and self.projectService.removeArchivedAnalysis(self.fileName):
+            self.appendLogMessage(f'Saved&nbsp;&nbsp;: trace table archived in project store {self.projectService.projectStorePath(self.fileName)}')
+        return archived
 
     def resolveColorMapName(self, value, fallback='CET-L1'):
         name = None
@@ -199,11 +331,12 @@ class BinningWorkerMixin:
         return pg.ColorMap([0.0, 1.0], [(0, 0, 0, 255), (255, 255, 255, 255)])
 
     def testBasicBinningConditions(self) -> bool:
-        if self.survey.unique.apply:
+        # without a trace table, unique fold is counted in per-bin bitsets of offset/azimuth slots; see unique_slots.py
+        if self.survey.unique.apply and self.survey.unique.dOffset <= 0.0:
             QMessageBox.information(
                 self,
                 'Please adjust',
-                "Applying 'Unique offsets' requires using a 'Full Binning' process, as it is implemented as a post-processing step on the trace table",
+                "Applying 'Unique offsets' in a 'Basic Binning' process requires an offset slot size > 0",
             )
             return False
         return True
@@ -229,6 +362,7 @@ class BinningWorkerMixin:
         return True
 
     def prepFullBinningConditions(self) -> bool:
+        self.waitForPendingSidecarWrites()                                      # a queued store write may still be reading the old trace table
         self.resetAnaTableModel()
 
         w = self.survey.output.rctOutput.width()
@@ -243,10 +377,15 @@ class BinningWorkerMixin:
 
         try:
             shape = (nx, ny, fold, 16)
-            anaFileName = self.fileName + '.ana.npy'
-            self.output.anaOutput = np.memmap(anaFileName, shape=shape, dtype=np.float32, mode='w+')
+            layout = self.appSettings.analysisLayout
+            memmapResult = self.projectService.createAnalysisMemmap(self.fileName, shape, layout)
+            if not memmapResult.success:
+                self.appendLogMessage(f'Thread : Unable to create analysis file: {memmapResult.errorText}', MsgType.Error)
+                return False
+
+            self.output.anaOutput = memmapResult.memmap
             self.output.anaOutput.fill(0.0)
-            self.appendLogMessage('Thread : Prepare memory mapped file for full analysis results.', MsgType.Binning)
+            self.appendLogMessage(f'Thread : Prepare memory mapped file for full analysis results ({layout} layout).', MsgType.Binning)
 
             nX, nY, nZ, nC = self.output.anaOutput.shape
             if (nx, ny, fold, 16) != (nX, nY, nZ, nC):
@@ -333,6 +472,11 @@ class BinningWorkerMixin:
         self._ensureWorkerOperationComponents()
         self.workerOperationController.startCfpAnalysisFromGeometryTables()
 
+    def cfpMultiPointAnalysisFromGeometryTables(self):
+        self._logOperationStart('Starting multi-point CFP analysis from geometry tables; preparing worker thread...', MsgType.Analysis)
+        self._ensureWorkerOperationComponents()
+        self.workerOperationController.startCfpMultiPointAnalysisFromGeometryTables()
+
     def cfpPointAnalysisFromSpsTables(self):
         self._logOperationStart('Starting CFP analysis from SPS input tables; preparing worker thread...', MsgType.Analysis)
         self._ensureWorkerOperationComponents()
@@ -389,6 +533,14 @@ class BinningWorkerMixin:
         self._ensureWorkerOperationComponents()
         self.workerOperationController.finishCurrentOperation(result, self.applyCfpFromGeometryTablesWorkerResult, resetAnalysis=False)
 
+    def applyCfpMultiPointWorkerResult(self, result, elapsed):
+        self._ensureWorkerOperationComponents()
+        self.cfpMultiPointResultApplier.apply(result, elapsed)
+
+    def cfpMultiPointThreadFinished(self, result: CfpMultiPointFromGeometryTablesResult):
+        self._ensureWorkerOperationComponents()
+        self.workerOperationController.finishCurrentOperation(result, self.applyCfpMultiPointWorkerResult, resetAnalysis=False)
+
     def applyCfpAmplitudeMapWorkerResult(self, result, elapsed):
         self._ensureWorkerOperationComponents()
         self.cfpAmplitudeMapResultApplier.apply(result, elapsed)
@@ -0,0 +1,157 @@
+"""
+In this module an illumination map is computed on an adaptive grid, instead of evaluating every bin.
+
+The map is first evaluated on a coarse grid of nodes, every 'step' bins in x and y (plus the last row and column).
+Bilinear interpolation between these nodes is exact where the map varies linearly; its error in a coarse tile is
+bounded by (hx² |f_xx| + hy² |f_yy|) / 8, with hx, hy the tile size and f_xx, f_yy the second derivatives.
+
+The second derivatives are estimated from second differences of the coarse nodes. Tiles whose estimated error exceeds
+'tolerance' (relative to the map maximum) are refined down to bin resolution, together with their direct neighbours,
+as a narrow feature may fall in between coarse nodes. All other bins are interpolated from the coarse nodes.
+
+The largest estimated error of the interpolated tiles is returned as the error bound of the map. Like the estimate
+itself it assumes the map is resolved by the coarse grid, so features much smaller than a coarse tile can be missed.
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class AdaptiveGridStats:
+    totalBins: int = 0
+    evaluatedBins: int = 0
+    totalTiles: int = 0
+    refinedTiles: int = 0
+    errorBound: float = 0.0                                                     # estimated max interpolation error, relative to the map maximum
+
+    def summary(self) -> str:
+        fraction = 100.0 * self.evaluatedBins / max(self.totalBins, 1)
+        return (
+            f'adaptive grid: evaluated {self.evaluatedBins:,} of {self.totalBins:,} bins ({fraction:.1f}%), '
+            f'refined {self.refinedTiles:,} of {self.totalTiles:,} tiles, estimated max interpolation error {100.0 * self.errorBound:.2f}% of map max'
+        )
+
+
+def coarseNodes(count: int, step: int) -> np.ndarray:
+    """Node indices 0, step, 2*step, ... along an axis of 'count' bins; the last bin is always a node."""
+    nodes = np.arange(0, count, max(int(step), 1), dtype=np.int64)
+    if nodes[-1] != count - 1:
+        nodes = np.append(nodes, count - 1)
+    return nodes
+
+
+def _secondDerivative(values: np.ndarray, nodes: np.ndarray, axis: int) -> np.ndarray:
+    # second divided differences on a (possibly uneven) node spacing; boundary nodes take the value of their neighbour
+    values = np.moveaxis(values, axis, -1)
+    h = np.diff(nodes).astype(np.float64)
+    derivative = np.zeros_like(values, dtype=np.float64)
+    if nodes.size >= 3:
+        slopes = np.diff(values, axis=-1) / h
+        derivative[..., 1:-1] = 2.0 * np.diff(slopes, axis=-1) / (h[:-1] + h[1:])
+        derivative[..., 0] = derivative[..., 1]
+        derivative[..., -1] = derivative[..., -2]
+    return np.moveaxis(np.abs(derivative), -1, axis)
+
+
+def _tileCornerMax(values: np.ndarray) -> np.ndarray:
+    # largest of the four corner node values of each coarse tile
+    return np.maximum.reduce([values[..., :-1, :-1], values[..., :-1, 1:], values[..., 1:, :-1], values[..., 1:, 1:]])
+
+
+def _interpolationWeights(count: int, nodes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # for each bin, the index of the coarse interval it falls in and its fractional position within that interval
+    index = np.clip(np.searchsorted(nodes, np.arange(count), side='right') - 1, 0, nodes.size - 2)
+    t = (np.arange(count) - nodes[index]) / (nodes[index + 1] - nodes[index])
+    return index, t
+
+
+def bilinearFromNodes(coarse: np.ndarray, nodesX: np.ndarray, nodesY: np.ndarray, nx: int, ny: int) -> np.ndarray:
+    """Interpolate coarse node values [..., len(nodesY), len(nodesX)] to all bins [..., ny, nx]."""
+    ix, tx = _interpolationWeights(nx, nodesX)
+    iy, ty = _interpolationWeights(ny, nodesY)
+    alongX = coarse[..., ix] * (1.0 - tx) + coarse[..., ix + 1] * tx
+    return (alongX[..., iy, :] * (1.0 - ty)[:, None] + alongX[..., iy + 1, :] * ty[:, None]).astype(np.float32)
+
+
+def computeAdaptiveMap(
+    rowFunction: Callable[[int, np.ndarray], np.ndarray],
+    nx: int,
+    ny: int,
+    step: int,
+    tolerance: float,
+    channels: int = 1,
+    onRowDone: Callable[[str, int, int], None] | None = None,
+) -> tuple[np.ndarray, AdaptiveGridStats]:
+    """Compute a map [channels, ny, nx] by evaluating a coarse grid and refining the tiles where it is curved.
+
+    rowFunction(iy, ix) evaluates row iy at the bin indices ix and returns [channels, len(ix)] (or [len(ix)] for a
+    single channel). Tiles are refined when the estimated error of any channel exceeds tolerance * channel maximum.
+    onRowDone(stage, done, total) is called after each evaluated row of the 'coarse' and the 'refine' stage,
+    e.g. for progress reporting or cancellation.
+    """
+    totalBins = nx * ny
+    nodesX = coarseNodes(nx, step)
+    nodesY = coarseNodes(ny, step)
+
+    # too few nodes to estimate curvature in both directions; evaluate all bins
+    if nodesX.size < 3 or nodesY.size < 3:
+        nodesX = np.arange(nx, dtype=np.int64)
+        nodesY = np.arange(ny, dtype=np.int64)
+
+    def evaluate(iy, ix):
+        return np.asarray(rowFunction(int(iy), ix), dtype=np.float32).reshape(channels, ix.size)
+
+    # 1. coarse grid
+    coarse = np.zeros((channels, nodesY.size, nodesX.size), dtype=np.float32)
+    for j, iy in enumerate(nodesY):
+        coarse[:, j, :] = evaluate(iy, nodesX)
+        if onRowDone is not None:
+            onRowDone('coarse', j + 1, nodesY.size)
+
+    ampMap = bilinearFromNodes(coarse, nodesX, nodesY, nx, ny)
+    if nodesX.size == nx and nodesY.size == ny:
+        return ampMap, AdaptiveGridStats(totalBins=totalBins, evaluatedBins=totalBins)
+
+    # 2. estimated interpolation error per coarse tile, relative to the maximum of each channel
+    hx = np.diff(nodesX).astype(np.float64)
+    hy = np.diff(nodesY).astype(np.float64)
+    fxx = _secondDerivative(coarse, nodesX, axis=2)
+    fyy = _secondDerivative(coarse, nodesY, axis=1)
+    tileError = (hx[None, None, :] ** 2 * _tileCornerMax(fxx) + hy[None, :, None] ** 2 * _tileCornerMax(fyy)) / 8.0
+    channelMax = coarse.reshape(channels, -1).max(axis=1)
+    tileError = np.max(tileError / np.where(channelMax > 0.0, channelMax, 1.0)[:, None, None], axis=0)
+
+    # 3. refine the flagged tiles and their neighbours
+    flagged = tileError > tolerance
+    refine = flagged.copy()
+    refine[1:, :] |= flagged[:-1, :]
+    refine[:-1, :] |= flagged[1:, :]
+    refine[:, 1:] |= refine[:, :-1].copy()
+    refine[:, :-1] |= refine[:, 1:].copy()
+
+    exact = np.zeros((ny, nx), dtype=bool)
+    exact[np.ix_(nodesY, nodesX)] = True
+    pending = np.zeros((ny, nx), dtype=bool)
+    for j, i in zip(*np.nonzero(refine)):
+        pending[nodesY[j]:nodesY[j + 1] + 1, nodesX[i]:nodesX[i + 1] + 1] = True
+    pending &= ~exact
+
+    rows = np.flatnonzero(pending.any(axis=1))
+    for done, iy in enumerate(rows):
+        ix = np.flatnonzero(pending[iy])
+        ampMap[:, iy, ix] = evaluate(iy, ix)
+        if onRowDone is not None:
+            onRowDone('refine', done + 1, rows.size)
+
+    remaining = tileError[~refine]
+    stats = AdaptiveGridStats(
+        totalBins=totalBins,
+        evaluatedBins=int(nodesX.size * nodesY.size + np.count_nonzero(pending)),
+        totalTiles=int(refine.size),
+        refinedTiles=int(np.count_nonzero(refine)),
+        errorBound=float(remaining.max()) if remaining.size else 0.0,
+    )
+    return ampMap, stats
@@ -1,3 +1,5 @@
+from typing import NamedTuple
+
 try:
     from numba import jit, prange
 except ImportError:
@@ -14,8 +16,12 @@ except ImportError:
 
 import numpy as np
 
+from .numba_cache import configureNumbaCache
+
+configureNumbaCache()                                                           # compiled kernels are cached in the plugin folder; must precede the @jit decorators
+
 
-@jit(nopython=True, cache=False)
+@jit(nopython=True, cache=True)
 def _compare_source_key(src_ind, src_line, src_point, key_ind, key_line, key_point, idx):
     if key_ind[idx] < src_ind:
         return -1
@@ -32,7 +38,7 @@ def _compare_source_key(src_ind, src_line, src_point, key_ind, key_line, key_poi
     return 0
 
 
-@jit(nopython=True, cache=False)
+@jit(nopython=True, cache=True)
 def _find_source_key(src_ind, src_line, src_point, key_ind, key_line, key_point):
     left = 0
     right = key_ind.shape[0]
@@ -48,7 +54,7 @@ def _find_source_key(src_ind, src_line, src_point, key_ind, key_line, key_point)
     return -1
 
 
-@jit(nopython=True, cache=False)
+@jit(nopython=True, cache=True)
 def _compare_line_key(rec_ind, rec_line, key_ind, key_line, idx):
     if key_ind[idx] < rec_ind:
         return -1
@@ -61,7 +67,7 @@ def _compare_line_key(rec_ind, rec_line, key_ind, key_line, idx):
     return 0
 
 
-@jit(nopython=True, cache=False)
+@jit(nopython=True, cache=True)
 def _find_line_key(rec_ind, rec_line, key_ind, key_line):
     left = 0
     right = key_ind.shape[0]
@@ -77,7 +83,7 @@ def _find_line_key(rec_ind, rec_line, key_ind, key_line):
     return -1
 
 
-@jit(nopython=True, cache=False)
+@jit(nopython=True, cache=True)
 def _lower_bound_int(values, start, end, target):
     left = start
     right = end
@@ -90,7 +96,7 @@ def _lower_bound_int(values, start, end, target):
     return left
 
 
-@jit(nopython=True, cache=False)
+@jit(nopython=True, cache=True)
 def _upper_bound_int(values, start, end, target):
     left = start
     right = end
@@ -103,7 +109,7 @@ def _upper_bound_int(values, start, end, target):
     return left
 
 
-@jit(nopython=True, cache=False)
+@jit(nopython=True, cache=True)
 def scan_cfp_geometry_relations_numba(
     rel_src_ind,
     rel_src_line,
@@ -226,7 +232,262 @@ def scan_cfp_geometry_relations_numba(
     )
 
 
-@jit(parallel=True, nopython=True, cache=False)
+@jit(nopython=True, cache=True)
+def resolve_cfp_geometry_relations_numba(
+    rel_src_ind,
+    rel_src_line,
+    rel_src_point,
+    rel_rec_ind,
+    rel_rec_line,
+    rel_rec_min,
+    rel_rec_max,
+    rel_in_sps,
+    rel_in_rps,
+    src_ind,
+    src_line,
+    src_point,
+    inactive_src_ind,
+    inactive_src_line,
+    inactive_src_point,
+    rec_group_ind,
+    rec_group_line,
+    rec_group_start,
+    rec_group_end,
+    rec_point,
+    rel_src_idx,
+    rel_rec_left,
+    rel_rec_right,
+):
+    """
+    Resolve relation records into (source index, receiver range) once, independent of any focal point.
+
+    The key lookups are those of scan_cfp_geometry_relations_numba. For each relation, rel_src_idx receives the
+    index of its active source (or -1 when it can't be resolved) and [rel_rec_left, rel_rec_right) its receiver range.
+    """
+    total_trace_count = 0
+    inactive_source_relation_count = 0
+    source_orphan_relation_count = 0
+    receiver_orphan_relation_count = 0
+    missing_source_count = 0
+    missing_receiver_count = 0
+
+    n_rel = rel_src_ind.shape[0]
+    for rel_idx in range(n_rel):
+        rel_src_idx[rel_idx] = -1
+        rel_rec_left[rel_idx] = 0
+        rel_rec_right[rel_idx] = 0
+
+        if rel_in_sps[rel_idx] == 0:
+            source_orphan_relation_count += 1
+            continue
+
+        if rel_in_rps[rel_idx] == 0:
+            receiver_orphan_relation_count += 1
+            continue
+
+        src_idx = _find_source_key(rel_src_ind[rel_idx], rel_src_line[rel_idx], rel_src_point[rel_idx], src_ind, src_line, src_point)
+        if src_idx < 0:
+            if _find_source_key(rel_src_ind[rel_idx], rel_src_line[rel_idx], rel_src_point[rel_idx], inactive_src_ind, inactive_src_line, inactive_src_point) >= 0:
+                inactive_source_relation_count += 1
+            else:
+                missing_source_count += 1
+            continue
+
+        rec_group_idx = _find_line_key(rel_rec_ind[rel_idx], rel_rec_line[rel_idx], rec_group_ind, rec_group_line)
+        if rec_group_idx < 0:
+            missing_receiver_count += 1
+            continue
+
+        rec_min = rel_rec_min[rel_idx]
+        rec_max = rel_rec_max[rel_idx]
+        if rec_max < rec_min:
+            continue
+
+        group_start = rec_group_start[rec_group_idx]
+        group_end = rec_group_end[rec_group_idx]
+        left = _lower_bound_int(rec_point, group_start, group_end, rec_min)
+        right = _upper_bound_int(rec_point, group_start, group_end, rec_max)
+        if right <= left:
+            missing_receiver_count += 1
+            continue
+
+        rel_src_idx[rel_idx] = src_idx
+        rel_rec_left[rel_idx] = left
+        rel_rec_right[rel_idx] = right
+        total_trace_count += right - left
+
+    return (
+        total_trace_count,
+        inactive_source_relation_count,
+        source_orphan_relation_count,
+        receiver_orphan_relation_count,
+        missing_source_count,
+        missing_receiver_count,
+    )
+
+
+class RelationSourceIndex(NamedTuple):
+    """Resolved relations sorted into a uniform grid of square cells by the xy position of their source.
+
+    The relations of cell c = cy * nbx + cx are [cell_start[c], cell_start[c + 1]) of src_idx, rec_left and rec_right.
+    """
+
+    src_idx: np.ndarray                                                         # (n,) int64, index of the relation's active source
+    rec_left: np.ndarray                                                        # (n,) int64, receiver range [rec_left, rec_right)
+    rec_right: np.ndarray
+    cell_start: np.ndarray                                                      # (nbx * nby + 1,) int64
+    x0: float
+    y0: float
+    cell_size: float
+    nbx: int
+    nby: int
+
+
+def build_relation_source_index(rel_src_idx, rel_rec_left, rel_rec_right, src_x, src_y, radius, max_cells=4_000_000):
+    """Build a RelationSourceIndex of the resolved relations (rel_src_idx >= 0) for aperture queries with the given radius.
+
+    Cells are as wide as the radius, so a query visits at most 3 x 3 cells.
+    """
+    resolved = rel_src_idx >= 0
+    src_idx = np.asarray(rel_src_idx[resolved], dtype=np.int64)
+    rec_left = np.asarray(rel_rec_left[resolved], dtype=np.int64)
+    rec_right = np.asarray(rel_rec_right[resolved], dtype=np.int64)
+
+    if src_idx.shape[0] == 0:
+        return RelationSourceIndex(src_idx, rec_left, rec_right, np.zeros(2, dtype=np.int64), 0.0, 0.0, 1.0, 1, 1)
+
+    x = np.asarray(src_x, dtype=np.float64)[src_idx]
+    y = np.asarray(src_y, dtype=np.float64)[src_idx]
+    x0 = float(x.min())
+    y0 = float(y.min())
+    width = float(x.max()) - x0
+    height = float(y.max()) - y0
+
+    cell_size = max(float(radius), 1.0)
+    while (int(width // cell_size) + 1) * (int(height // cell_size) + 1) > max_cells:
+        cell_size *= 2.0
+
+    nbx = int(width // cell_size) + 1
+    nby = int(height // cell_size) + 1
+    cx = np.minimum(((x - x0) // cell_size).astype(np.int64), nbx - 1)
+    cy = np.minimum(((y - y0) // cell_size).astype(np.int64), nby - 1)
+    cell = cy * nbx + cx
+
+    order = np.argsort(cell, kind='stable')
+    cell_start = np.zeros(nbx * nby + 1, dtype=np.int64)
+    np.cumsum(np.bincount(cell, minlength=nbx * nby), out=cell_start[1:])
+
+    return RelationSourceIndex(
+        np.ascontiguousarray(src_idx[order]),
+        np.ascontiguousarray(rec_left[order]),
+        np.ascontiguousarray(rec_right[order]),
+        cell_start,
+        x0,
+        y0,
+        float(cell_size),
+        nbx,
+        nby,
+    )
+
+
+@jit(nopython=True, cache=True)
+def _scan_focal_point(index, src_x, src_y, rec_x, rec_y, f_x, f_y, radius, src_count, rec_count, touched_src, touched_rec):
+    """Accumulate the station weights of one focal point in src_count / rec_count; the touched stations are listed in touched_src / touched_rec.
+
+    Returns (contributing relations, contributing traces, resolved traces, touched sources, touched receivers).
+    """
+    r_sq_limit = radius * radius
+    reach = radius * 1.0001 + 1e-3
+    cx0 = max(int(np.floor((f_x - reach - index.x0) / index.cell_size)), 0)
+    cx1 = min(int(np.floor((f_x + reach - index.x0) / index.cell_size)), index.nbx - 1)
+    cy0 = max(int(np.floor((f_y - reach - index.y0) / index.cell_size)), 0)
+    cy1 = min(int(np.floor((f_y + reach - index.y0) / index.cell_size)), index.nby - 1)
+
+    n_relations = 0
+    n_traces = 0
+    n_resolved = 0
+    n_src = 0
+    n_rec = 0
+    for cy in range(cy0, cy1 + 1):
+        # the cells cx0 .. cx1 of a row are adjacent in the index
+        first = index.cell_start[cy * index.nbx + cx0] if cx0 <= cx1 else 0
+        last = index.cell_start[cy * index.nbx + cx1 + 1] if cx0 <= cx1 else 0
+        for rel in range(first, last):
+            src_idx = index.src_idx[rel]
+            dx = src_x[src_idx] - f_x
+            dy = src_y[src_idx] - f_y
+            if dx * dx + dy * dy > r_sq_limit:
+                continue
+
+            n_resolved += index.rec_right[rel] - index.rec_left[rel]
+            receiver_count = 0
+            for rec_idx in range(index.rec_left[rel], index.rec_right[rel]):
+                dx = rec_x[rec_idx] - f_x
+                dy = rec_y[rec_idx] - f_y
+                if dx * dx + dy * dy <= r_sq_limit:
+                    if rec_count[rec_idx] == 0:
+                        touched_rec[n_rec] = rec_idx
+                        n_rec += 1
+                    rec_count[rec_idx] += 1
+                    receiver_count += 1
+
+            if receiver_count > 0:
+                if src_count[src_idx] == 0:
+                    touched_src[n_src] = src_idx
+                    n_src += 1
+                src_count[src_idx] += receiver_count
+                n_relations += 1
+                n_traces += receiver_count
+
+    return n_relations, n_traces, n_resolved, n_src, n_rec
+
+
+@jit(parallel=True, nopython=True, cache=True)
+def scan_cfp_focal_points_numba(index, src_x, src_y, rec_x, rec_y, focal_x, focal_y, radius, counts, src_offsets, rec_offsets, src_stations, src_weights, rec_stations, rec_weights, n_groups):
+    """
+    Scan the relations around many focal points in parallel, using a RelationSourceIndex.
+
+    counts[p] receives (contributing relations, contributing traces, resolved traces, sources, receivers) of focal point p;
+    the weights are those of scan_cfp_geometry_relations_numba for a single focal point.
+    When src_offsets / rec_offsets are given (size n_points + 1, from a first call with empty offsets), the contributing
+    stations of point p and their weights are written to src_stations / src_weights[src_offsets[p] : src_offsets[p + 1]]
+    (and likewise for the receivers).
+
+    The focal points are divided over n_groups groups; each group keeps its own station counters.
+    """
+    n_points = focal_x.shape[0]
+    fill = src_offsets.shape[0] == n_points + 1
+    for group in prange(n_groups):
+        src_count = np.zeros(src_x.shape[0], dtype=np.int64)
+        rec_count = np.zeros(rec_x.shape[0], dtype=np.int64)
+        touched_src = np.empty(src_x.shape[0], dtype=np.int64)
+        touched_rec = np.empty(rec_x.shape[0], dtype=np.int64)
+
+        for p in range(group, n_points, n_groups):
+            n_relations, n_traces, n_resolved, n_src, n_rec = _scan_focal_point(
+                index, src_x, src_y, rec_x, rec_y, focal_x[p], focal_y[p], radius, src_count, rec_count, touched_src, touched_rec
+            )
+            counts[p, 0] = n_relations
+            counts[p, 1] = n_traces
+            counts[p, 2] = n_resolved
+            counts[p, 3] = n_src
+            counts[p, 4] = n_rec
+
+            for k in range(n_src):
+                src_idx = touched_src[k]
+                if fill:
+                    src_stations[src_offsets[p] + k] = src_idx
+                    src_weights[src_offsets[p] + k] = src_count[src_idx]
+                src_count[src_idx] = 0                                          # reset only what was touched
+            for k in range(n_rec):
+                rec_idx = touched_rec[k]
+                if fill:
+                    rec_stations[rec_offsets[p] + k] = rec_idx
+                    rec_weights[rec_offsets[p] + k] = rec_count[rec_idx]
+                rec_count[rec_idx] = 0
+
+
+@jit(parallel=True, nopython=True, cache=True)
 def compute_monochromatic_beam(focal_x, focal_y, focal_z, surf_x, surf_y, freq, v_int):
     """
     Calculates a single frequency wavefront component for the isolated target channels.
@@ -269,7 +530,7 @@ def compute_monochromatic_beam_xy_grid(eval_x, eval_y, eval_z, surf_x, surf_y, s
     return _compute_ft_beam_xy_grid_numba(eval_x, eval_y, eval_z, surf_x, surf_y, surf_z, freq, v_int, focal_x, focal_y)
 
 
-@jit(parallel=True, nopython=True, cache=False)
+@jit(parallel=True, nopython=True, cache=True)
 def _compute_ft_beam_xy_grid_numba(eval_x, eval_y, eval_z, surf_x, surf_y, surf_z, freq, v_int, focal_x, focal_y):
     n_x = len(eval_x)
     n_y = len(eval_y)
@@ -322,71 +583,354 @@ def _compute_ft_beam_xy_grid_numba(eval_x, eval_y, eval_z, surf_x, surf_y, surf_
     return beam_grid
 
 
-@jit(parallel=True, nopython=True, cache=False)
-def compute_illumination_row_numba(focal_y, eval_x, focal_z, src_coords, src_weights, rec_coords, rec_weights, freqs, vint, max_radius, matlab_compat=False):
+# Evaluation modes for the CFP beam and Radon images (config.CFP_TRANSFORM_MODES).
+#
+#   'direct' : explicit double sums of complex exponentials in the numba kernels above and below
+#   'fast'   : the same sums, factorized. exp(i w (x px + y py)) = exp(i w x px) * exp(i w y py), so a beam grid is a
+#              matrix product of two small exponential tables, and on regularly sampled eval and slowness axes the
+#              Radon transform is a chirp-z transform, evaluated with FFTs (Bluestein). Results agree with 'direct'
+#              to float32 rounding; irregular axes fall back to the direct Radon kernel.
+
+
+def _beam_station_terms(eval_z, surf_x, surf_y, surf_z, surf_weights, freq, v_int, focal_x, focal_y):
+    """Slowness vectors and amplitudes of the stations, as in _compute_weighted_ft_beam_xy_grid_numba()."""
+    omega = 2.0 * np.pi * freq
+    p = 1.0 / v_int
+    dx_focus = surf_x.astype(np.float64) - focal_x
+    dy_focus = surf_y.astype(np.float64) - focal_y
+    dz_focus = surf_z.astype(np.float64) - eval_z
+    r_focus = np.sqrt(dx_focus * dx_focus + dy_focus * dy_focus + dz_focus * dz_focus)
+
+    valid = r_focus >= 1e-3
+    r_focus = np.where(valid, r_focus, 1.0)
+    slowness_x = (p * dx_focus / r_focus).astype(np.float32)                    # float32, like the numba kernels
+    slowness_y = (p * dy_focus / r_focus).astype(np.float32)
+    jacobian = (dz_focus * dz_focus) / (r_focus * r_focus * r_focus * r_focus)
+    weight = (1.0 / (4.0 * np.pi * np.pi)) * jacobian * (p * omega) ** 2
+    if surf_weights is not None:
+        weight = weight * surf_weights
+    weight = np.where(valid, weight.astype(np.float32), np.float32(0.0))
+    return slowness_x[valid], slowness_y[valid], weight[valid]
+
+
+def compute_beam_xy_grid_fast(eval_x, eval_y, eval_z, surf_x, surf_y, surf_z, surf_weights, freq, v_int, focal_x=0.0, focal_y=0.0, block_size=4096):
+    """Factorized version of (weighted) compute_monochromatic_beam_xy_grid(); surf_weights may be None.
+
+    beam[y, x] = sum_s w_s exp(i w y' py_s) exp(i w x' px_s) = (Ey * w) @ Ex.T, evaluated in blocks of stations.
+    Only (nx + ny) exponentials are needed per station instead of nx * ny.
+    """
+    n_x = len(eval_x)
+    n_y = len(eval_y)
+    beam_grid = np.zeros((n_y, n_x), dtype=np.complex128)
+
+    slowness_x, slowness_y, weight = _beam_station_terms(eval_z, surf_x, surf_y, surf_z, surf_weights, freq, v_int, focal_x, focal_y)
+    if weight.shape[0] == 0:
+        return beam_grid.astype(np.complex64)
+
+    omega = 2.0 * np.pi * freq
+    x_pos = np.asarray(eval_x, dtype=np.float64) - focal_x
+    y_pos = np.asarray(eval_y, dtype=np.float64) - focal_y
+    for start in range(0, weight.shape[0], block_size):
+        stop = start + block_size
+        e_x = np.exp(1j * omega * np.outer(x_pos, slowness_x[start:stop]))     # (nx, block)
+        e_y = np.exp(1j * omega * np.outer(y_pos, slowness_y[start:stop]))     # (ny, block)
+        beam_grid += (e_y * weight[start:stop]) @ e_x.T
+    return beam_grid.astype(np.complex64)
+
+
+def is_regular_axis(values, rtol=1e-4):
+    """True when values are evenly spaced (at least two samples, non-zero step)."""
+    values = np.asarray(values, dtype=np.float64)
+    if values.shape[0] < 2:
+        return False
+    steps = np.diff(values)
+    step = (values[-1] - values[0]) / (values.shape[0] - 1)
+    return step != 0.0 and bool(np.all(np.abs(steps - step) <= rtol * abs(step)))
+
+
+def chirp_z_axis(data, x, p, scale, axis=-1):
+    """Return sum_k data[..., k] * exp(i * scale * p[j] * x[k]) along axis, for evenly spaced x and p (Bluestein's FFT algorithm)."""
+    data = np.moveaxis(np.asarray(data, dtype=np.complex128), axis, -1)
+    n = data.shape[-1]
+    m = len(p)
+    x0, dx = float(x[0]), (float(x[-1]) - float(x[0])) / (n - 1) if n > 1 else 0.0
+    p0, dp = float(p[0]), (float(p[-1]) - float(p[0])) / (m - 1) if m > 1 else 0.0
+
+    # exp(i s (p0 + j dp)(x0 + k dx)) = exp(i s p0 x0) exp(i s j dp x0) exp(i s p0 k dx) W^(jk), with W = exp(i s dp dx)
+    # and jk = (j^2 + k^2 - (j - k)^2) / 2, which turns the sum into a convolution with the chirp W^(-(j - k)^2 / 2).
+    alpha = scale * dp * dx
+    k = np.arange(n, dtype=np.float64)
+    j = np.arange(m, dtype=np.float64)
+    prepared = data * np.exp(1j * (scale * p0 * dx * k + 0.5 * alpha * k * k))
+
+    length = 1 << int(np.ceil(np.log2(n + m - 1)))
+    lags = np.arange(-(n - 1), m, dtype=np.float64)
+    chirp = np.zeros(length, dtype=np.complex128)
+    chirp[: lags.shape[0]] = np.exp(-0.5j * alpha * lags * lags)
+
+    convolved = np.fft.ifft(np.fft.fft(prepared, length, axis=-1) * np.fft.fft(chirp), axis=-1)[..., n - 1:n - 1 + m]
+    result = convolved * np.exp(1j * (scale * p0 * x0 + scale * dp * x0 * j + 0.5 * alpha * j * j))
+    return np.moveaxis(result, -1, axis)
+
+
+def compute_radon_images_fast(source_field, receiver_field, eval_x, eval_y, px, py, freq):
+    """FFT version of compute_radon_images_numba(), with the same outputs and normalization.
+
+    Falls back to the direct kernel when an eval or slowness axis is not evenly spaced.
+    """
+    if not all(is_regular_axis(axis_values) for axis_values in (eval_x, eval_y, px, py)):
+        return compute_radon_images_numba(source_field, receiver_field, eval_x, eval_y, px, py, freq)
+
+    two_pi_f = 2.0 * np.pi * freq
+    fields = np.stack((source_field, receiver_field))                          # (2, ny, nx)
+    radon = chirp_z_axis(fields, eval_x, px, two_pi_f, axis=-1)                 # (2, ny, npx)
+    radon = chirp_z_axis(radon, eval_y, py, two_pi_f, axis=-2)                  # (2, npy, npx)
+    radon = radon.astype(np.complex64)                                          # the direct kernel accumulates in complex64
+    s_val, r_val = radon[0], radon[1]
+
+    s_abs = np.abs(np.real(s_val))
+    r_abs = np.abs(np.real(r_val))
+    a_abs = np.abs(np.real(np.conj(s_val) * r_val))
+    max_s = float(s_abs.max()) if s_abs.size else 0.0
+    max_r = float(r_abs.max()) if r_abs.size else 0.0
+
+    src_img = (s_abs / max_s).astype(np.float32) if max_s > 0 else np.zeros(s_abs.shape, dtype=np.float32)
+    rec_img = (r_abs / max_r).astype(np.float32) if max_r > 0 else np.zeros(r_abs.shape, dtype=np.float32)
+    avp_img = (a_abs / (max_s * max_r)).astype(np.float32) if max_s > 0 and max_r > 0 else np.zeros(a_abs.shape, dtype=np.float32)
+    return src_img, rec_img, avp_img
+
+
+@jit(nopython=True, cache=True)
+def merge_station_weights_numba(table_bits, table_weights, table_used, count, point_bits, point_weights, start):
+    """
+    Merge stations into an open addressing hash table of unique stations, summing the weights of duplicates.
+
+    Stations are keyed on the bit patterns (uint32) of their float32 x, y, z coordinates; the table capacity is a power of two.
+    Merging starts at point 'start' and stops before inserting a new station into a table that is half full.
+    Returns (count, next): the number of stations in the table and the first point that has not been merged.
+    The caller grows the table and merges again from 'next' until all points have been merged.
+    """
+    mask = table_bits.shape[0] - 1
+    max_count = table_bits.shape[0] // 2
+    for i in range(start, point_bits.shape[0]):
+        bx = np.int64(point_bits[i, 0])
+        by = np.int64(point_bits[i, 1])
+        bz = np.int64(point_bits[i, 2])
+        slot = ((bx * 73856093) ^ (by * 19349663) ^ (bz * 83492791)) & mask     # spatial hash; products fit in int64
+
+        while table_used[slot]:
+            if table_bits[slot, 0] == point_bits[i, 0] and table_bits[slot, 1] == point_bits[i, 1] and table_bits[slot, 2] == point_bits[i, 2]:
+                break
+            slot = (slot + 1) & mask                                            # linear probing
+
+        if not table_used[slot]:
+            if count >= max_count:
+                return count, i
+            table_used[slot] = True
+            table_bits[slot, 0] = point_bits[i, 0]
+            table_bits[slot, 1] = point_bits[i, 1]
+            table_bits[slot, 2] = point_bits[i, 2]
+            count += 1
+
+        table_weights[slot] += point_weights[i]
+
+    return count, point_bits.shape[0]
+
+
+class StationBucketIndex(NamedTuple):
+    """Stations sorted into a uniform grid of square xy cells (compressed row layout).
+
+    The stations of cell c = cy * nbx + cx are coords[cell_start[c] : cell_start[c + 1]].
+    A kernel that only needs stations within a radius of a point then visits the few
+    cells that overlap that circle, instead of all stations of the spread.
+    """
+
+    coords: np.ndarray                                                          # (n, 3) float32, sorted by cell
+    weights: np.ndarray                                                         # (n,) float32, same order as coords
+    cell_start: np.ndarray                                                      # (nbx * nby + 1,) int64
+    x0: float
+    y0: float
+    cell_size: float
+    nbx: int
+    nby: int
+
+
+def build_station_bucket_index(coords, weights, radius, max_cells=4_000_000):
+    """Build a StationBucketIndex for aperture queries with the given radius.
+
+    Cells are half the radius wide, so a query visits at most 5 x 5 cells. For a very
+    small radius relative to the spread, the cell size grows until at most max_cells cells are used.
+    """
+    coords = np.ascontiguousarray(coords, dtype=np.float32).reshape(-1, 3)
+    weights = np.ascontiguousarray(weights, dtype=np.float32).reshape(-1)
+
+    if coords.shape[0] == 0:
+        return StationBucketIndex(coords, weights, np.zeros(2, dtype=np.int64), 0.0, 0.0, 1.0, 1, 1)
+
+    x = coords[:, 0].astype(np.float64)
+    y = coords[:, 1].astype(np.float64)
+    x0 = float(x.min())
+    y0 = float(y.min())
+    width = float(x.max()) - x0
+    height = float(y.max()) - y0
+
+    cell_size = max(0.5 * float(radius), 1.0)
+    if not np.isfinite(cell_size):
+        cell_size = max(width, height) + 1.0                                    # unbounded radius; a single cell holds all stations
+    while (int(width // cell_size) + 1) * (int(height // cell_size) + 1) > max_cells:
+        cell_size *= 2.0
+
+    nbx = int(width // cell_size) + 1
+    nby = int(height // cell_size) + 1
+    cx = np.minimum(((x - x0) // cell_size).astype(np.int64), nbx - 1)
+    cy = np.minimum(((y - y0) // cell_size).astype(np.int64), nby - 1)
+    cell = cy * nbx + cx
+
+    order = np.argsort(cell, kind='stable')
+    cell_start = np.zeros(nbx * nby + 1, dtype=np.int64)
+    np.cumsum(np.bincount(cell, minlength=nbx * nby), out=cell_start[1:])
+
+    return StationBucketIndex(
+        np.ascontiguousarray(coords[order]),
+        np.ascontiguousarray(weights[order]),
+        cell_start,
+        x0,
+        y0,
+        float(cell_size),
+        nbx,
+        nby,
+    )
+
+
+@jit(nopython=True, cache=True)
+def _bucket_cell_range(index, x, y, radius):
+    """Inclusive cell ranges (cx0, cx1, cy0, cy1) that overlap the circle around (x, y); empty when cx0 > cx1 or cy0 > cy1."""
+    reach = radius * 1.0001 + 1e-3                                              # small margin; the kernels apply the exact aperture test
+    cx0 = max(int(np.floor((x - reach - index.x0) / index.cell_size)), 0)
+    cx1 = min(int(np.floor((x + reach - index.x0) / index.cell_size)), index.nbx - 1)
+    cy0 = max(int(np.floor((y - reach - index.y0) / index.cell_size)), 0)
+    cy1 = min(int(np.floor((y + reach - index.y0) / index.cell_size)), index.nby - 1)
+    return cx0, cx1, cy0, cy1
+
+
+@jit(nopython=True, cache=True)
+def _frequency_steps(rates):
+    """Return (uniform, step) for per-frequency rates; evenly spaced rates allow an incremental rotation instead of an exp() per frequency."""
+    n = rates.shape[0]
+    if n < 2:
+        return True, 0.0
+
+    step = rates[1] - rates[0]
+    for i in range(2, n):
+        if abs((rates[i] - rates[i - 1]) - step) > 1e-9 * max(abs(rates[i]), 1.0):
+            return False, 0.0
+    return True, step
+
+
+@jit(nopython=True, cache=True)
+def _accumulate_station_sums(index, dz2_vals, abs_dz_vals, f_x, f_y, max_radius, r_sq_limit, ks, k_uniform, k_step, att, att_uniform, att_step, coherent, incoherent, coh_sum, inc_sum):
+    """Add the aperture stations around (f_x, f_y) to the per-frequency sums of one pixel.
+
+    Distance, aperture test and geometric spreading are evaluated once per station. The per-frequency
+    terms exp(-i k r) (coherent) and exp(-a f t) (incoherent) are then advanced by a constant rotation /
+    decay factor when the frequencies are evenly spaced, so only two exp() calls are made per station.
+    """
+    two_pi = np.float32(2.0 * np.pi)
+    n_freqs = ks.shape[0]
+    coords = index.coords
+    weights = index.weights
+    cell_start = index.cell_start
+    cx0, cx1, cy0, cy1 = _bucket_cell_range(index, f_x, f_y, max_radius)
+
+    for cy in range(cy0, cy1 + 1):
+        for cx in range(cx0, cx1 + 1):
+            cell = cy * index.nbx + cx
+            for idx in range(cell_start[cell], cell_start[cell + 1]):
+                dx = coords[idx, 0] - f_x
+                dy = coords[idx, 1] - f_y
+                r_sq = dx * dx + dy * dy
+                if r_sq > r_sq_limit:
+                    continue
+
+                r = np.sqrt(r_sq + dz2_vals[idx])
+                if r < 1e-3:
+                    continue
+
+                base = (abs_dz_vals[idx] / (two_pi * r * r)) * weights[idx]
+
+                if coherent:
+                    if k_uniform:
+                        phasor = np.exp(-1j * (ks[0] * r))
+                        rotation = np.exp(-1j * (k_step * r)) if n_freqs > 1 else np.complex128(1.0)
+                        for f_idx in range(n_freqs):
+                            coh_sum[f_idx] += base * phasor
+                            phasor *= rotation
+                    else:
+                        for f_idx in range(n_freqs):
+                            coh_sum[f_idx] += base * np.exp(-1j * (ks[f_idx] * r))
+
+                if incoherent:
+                    if att_uniform:
+                        decay = np.exp(-att[0] * r)
+                        factor = np.exp(-att_step * r) if n_freqs > 1 else 1.0
+                        for f_idx in range(n_freqs):
+                            inc_sum[f_idx] += base * decay
+                            decay *= factor
+                    else:
+                        for f_idx in range(n_freqs):
+                            inc_sum[f_idx] += base * np.exp(-att[f_idx] * r)
+
+
+@jit(parallel=True, nopython=True, cache=True)
+def compute_illumination_row_numba(focal_y, eval_x, focal_z, src_index, rec_index, freqs, vint, max_radius, matlab_compat=False):
     """
     Optimized kernel to compute a single row of an illumination (energy) map.
     Applies a moving spatial aperture filter per pixel in parallel.
+    Only the stations in the bucket cells that overlap a pixel's aperture are visited,
+    and all frequencies are accumulated in a single pass over those stations.
+    Frequencies <= 0 are skipped, and a zero interval velocity falls back to 1 m/s.
     """
     _ = matlab_compat
     n_x = len(eval_x)
-    n_sources = src_coords.shape[0]
-    n_receivers = rec_coords.shape[0]
     n_freqs = len(freqs)
     r_sq_limit = np.float32(max_radius * max_radius)
+    safe_vint = np.float32(vint if vint > 1e-6 else 1.0)
 
     row_energy = np.zeros(n_x, dtype=np.float32)
-    two_pi = np.float32(2.0 * np.pi)
 
-    dsz_vals = src_coords[:, 2] - focal_z
+    ks = np.empty(n_freqs, dtype=np.float64)
+    for f_idx in range(n_freqs):
+        ks[f_idx] = 2.0 * np.pi * freqs[f_idx] / safe_vint
+    k_uniform, k_step = _frequency_steps(ks)
+    no_att = np.zeros(n_freqs, dtype=np.float64)
+
+    dsz_vals = src_index.coords[:, 2] - focal_z
     dsz2_vals = dsz_vals * dsz_vals
     abs_dsz_vals = np.abs(dsz_vals)
 
-    drz_vals = rec_coords[:, 2] - focal_z
+    drz_vals = rec_index.coords[:, 2] - focal_z
     drz2_vals = drz_vals * drz_vals
     abs_drz_vals = np.abs(drz_vals)
 
     for ix in prange(n_x):
         f_x = eval_x[ix]
-        pixel_energy = 0.0
-
-        for f_idx in range(n_freqs):
-            k = np.float32(two_pi * freqs[f_idx] / vint)
-            bs = np.complex64(0.0 + 0.0j)
-            br = np.complex64(0.0 + 0.0j)
-
-            for src_idx in range(n_sources):
-                dsx = src_coords[src_idx, 0] - f_x
-                dsy = src_coords[src_idx, 1] - focal_y
-                rs_sq = dsx * dsx + dsy * dsy
-                if rs_sq > r_sq_limit:
-                    continue
+        bs = np.zeros(n_freqs, dtype=np.complex128)
+        br = np.zeros(n_freqs, dtype=np.complex128)
+        unused = np.zeros(n_freqs, dtype=np.float64)
 
-                w = src_weights[src_idx]
-                rs = np.sqrt(rs_sq + dsz2_vals[src_idx])
-                if rs > 1e-3:
-                    bs += np.complex64((abs_dsz_vals[src_idx] / (two_pi * rs * rs)) * w) * np.exp(1j * (-k * rs))
-
-            for rec_idx in range(n_receivers):
-                drx = rec_coords[rec_idx, 0] - f_x
-                dry = rec_coords[rec_idx, 1] - focal_y
-                rr_sq = drx * drx + dry * dry
-                if rr_sq > r_sq_limit:
-                    continue
-
-                w = rec_weights[rec_idx]
-                rr = np.sqrt(rr_sq + drz2_vals[rec_idx])
-                if rr > 1e-3:
-                    br += np.complex64((abs_drz_vals[rec_idx] / (two_pi * rr * rr)) * w) * np.exp(1j * (-k * rr))
-
-            pixel_energy += np.abs(bs * br)
+        _accumulate_station_sums(src_index, dsz2_vals, abs_dsz_vals, f_x, focal_y, max_radius, r_sq_limit, ks, k_uniform, k_step, no_att, True, 0.0, True, False, bs, unused)
+        _accumulate_station_sums(rec_index, drz2_vals, abs_drz_vals, f_x, focal_y, max_radius, r_sq_limit, ks, k_uniform, k_step, no_att, True, 0.0, True, False, br, unused)
 
+        pixel_energy = 0.0
+        for f_idx in range(n_freqs):
+            if freqs[f_idx] > 0.0:
+                pixel_energy += np.abs(bs[f_idx] * br[f_idx])
         row_energy[ix] = pixel_energy
     return row_energy
 
 
-@jit(parallel=True, nopython=True, cache=False)
-def compute_illumination_row_incoherent_numba(focal_y, eval_x, focal_z, src_coords, src_weights, rec_coords, rec_weights, freqs, vint, max_radius, matlab_compat=False):
+@jit(parallel=True, nopython=True, cache=True)
+def compute_illumination_row_incoherent_numba(focal_y, eval_x, focal_z, src_index, rec_index, freqs, vint, max_radius, matlab_compat=False):
     """
     Incoherent illumination QC kernel: ignores phase interference and accumulates
     frequency-weighted amplitude products.
@@ -397,172 +941,126 @@ def compute_illumination_row_incoherent_numba(focal_y, eval_x, focal_z, src_coor
     """
     _ = matlab_compat
     n_x = len(eval_x)
-    n_sources = src_coords.shape[0]
-    n_receivers = rec_coords.shape[0]
     n_freqs = len(freqs)
     r_sq_limit = np.float32(max_radius * max_radius)
-    two_pi = np.float32(2.0 * np.pi)
     safe_vint = np.float32(vint if vint > 1e-6 else 1.0)
     attenuationCoeff = np.float32(0.01)
 
     row_energy = np.zeros(n_x, dtype=np.float32)
 
-    dsz_vals = src_coords[:, 2] - focal_z
+    att = np.empty(n_freqs, dtype=np.float64)
+    for f_idx in range(n_freqs):
+        att[f_idx] = attenuationCoeff * np.float32(freqs[f_idx]) / safe_vint
+    att_uniform, att_step = _frequency_steps(att)
+    no_ks = np.zeros(n_freqs, dtype=np.float64)
+
+    dsz_vals = src_index.coords[:, 2] - focal_z
     dsz2_vals = dsz_vals * dsz_vals
     abs_dsz_vals = np.abs(dsz_vals)
 
-    drz_vals = rec_coords[:, 2] - focal_z
+    drz_vals = rec_index.coords[:, 2] - focal_z
     drz2_vals = drz_vals * drz_vals
     abs_drz_vals = np.abs(drz_vals)
 
     for ix in prange(n_x):
         f_x = eval_x[ix]
-        pixel_energy = 0.0
-
-        for f_idx in range(n_freqs):
-            freq = np.float32(freqs[f_idx])
-            if freq <= 0.0:
-                continue
-
-            src_sum = 0.0
-            rec_sum = 0.0
-
-            for src_idx in range(n_sources):
-                dsx = src_coords[src_idx, 0] - f_x
-                dsy = src_coords[src_idx, 1] - focal_y
-                rs_sq = dsx * dsx + dsy * dsy
-                if rs_sq > r_sq_limit:
-                    continue
-
-                ws = src_weights[src_idx]
-                rs = np.sqrt(rs_sq + dsz2_vals[src_idx])
-                if rs < 1e-3:
-                    continue
+        src_sum = np.zeros(n_freqs, dtype=np.float64)
+        rec_sum = np.zeros(n_freqs, dtype=np.float64)
+        unused = np.zeros(n_freqs, dtype=np.complex128)
 
-                base_src = (abs_dsz_vals[src_idx] / (two_pi * rs * rs)) * ws
-                travel_time_src = rs / safe_vint
-                src_sum += base_src * np.exp(-attenuationCoeff * freq * travel_time_src)
-
-            for rec_idx in range(n_receivers):
-                drx = rec_coords[rec_idx, 0] - f_x
-                dry = rec_coords[rec_idx, 1] - focal_y
-                rr_sq = drx * drx + dry * dry
-                if rr_sq > r_sq_limit:
-                    continue
-
-                wr = rec_weights[rec_idx]
-                rr = np.sqrt(rr_sq + drz2_vals[rec_idx])
-                if rr < 1e-3:
-                    continue
-
-                base_rec = (abs_drz_vals[rec_idx] / (two_pi * rr * rr)) * wr
-                travel_time_rec = rr / safe_vint
-                rec_sum += base_rec * np.exp(-attenuationCoeff * freq * travel_time_rec)
-
-            pixel_energy += src_sum * rec_sum
+        _accumulate_station_sums(src_index, dsz2_vals, abs_dsz_vals, f_x, focal_y, max_radius, r_sq_limit, no_ks, True, 0.0, att, att_uniform, att_step, False, True, unused, src_sum)
+        _accumulate_station_sums(rec_index, drz2_vals, abs_drz_vals, f_x, focal_y, max_radius, r_sq_limit, no_ks, True, 0.0, att, att_uniform, att_step, False, True, unused, rec_sum)
 
+        pixel_energy = 0.0
+        for f_idx in range(n_freqs):
+            if freqs[f_idx] > 0.0:
+                pixel_energy += src_sum[f_idx] * rec_sum[f_idx]
         row_energy[ix] = pixel_energy
 
     return row_energy
 
 
-@jit(parallel=True, nopython=True, cache=False)
-def compute_illumination_row_components_numba(focal_y, eval_x, focal_z, src_coords, src_weights, rec_coords, rec_weights, freqs, vint, max_radius, matlab_compat=False):
-    """Return coherent/incoherent source/receiver row components for 3x3 diagnostics.
-
-    Outputs are four 1D arrays with length=len(eval_x):
-      - src_coherent: sum over frequencies of |B_s|
-      - rec_coherent: sum over frequencies of |B_r|
-      - src_incoherent: sum over frequencies of incoherent source amplitudes
-      - rec_incoherent: sum over frequencies of incoherent receiver amplitudes
+# Source/receiver mode combinations of the 3x3 illumination diagnostics, in the row order of compute_illumination_row_modes_numba().
+# Mode index = 3 * source mode + receiver mode, with 0 = off, 1 = coherent, 2 = incoherent.
+ILLUMINATION_3X3_MODES = (
+    'src_off__rec_off',
+    'src_off__rec_coh',
+    'src_off__rec_incoh',
+    'src_coh__rec_off',
+    'src_coh__rec_coh',
+    'src_coh__rec_incoh',
+    'src_incoh__rec_off',
+    'src_incoh__rec_coh',
+    'src_incoh__rec_incoh',
+)
+
+
+@jit(parallel=True, nopython=True, cache=True)
+def compute_illumination_row_modes_numba(focal_y, eval_x, focal_z, src_index, rec_index, freqs, vint, max_radius, matlab_compat=False):
+    """Return one row of all nine 3x3 diagnostic illumination maps, as a float32 array [9, len(eval_x)].
+
+    Per pixel, the coherent beam sums B_s, B_r and the incoherent amplitude sums S, R are accumulated once
+    for all frequencies. Each source factor (1, |B_s|, S) is then multiplied with each receiver factor
+    (1, |B_r|, R) and summed over the frequencies, in the order of ILLUMINATION_3X3_MODES. The coherent/coherent
+    row matches compute_illumination_row_numba() and the incoherent/incoherent row matches
+    compute_illumination_row_incoherent_numba(), up to rounding. Frequencies <= 0 are skipped.
     """
     _ = matlab_compat
     n_x = len(eval_x)
-    n_sources = src_coords.shape[0]
-    n_receivers = rec_coords.shape[0]
     n_freqs = len(freqs)
     r_sq_limit = np.float32(max_radius * max_radius)
-    two_pi = np.float32(2.0 * np.pi)
     safe_vint = np.float32(vint if vint > 1e-6 else 1.0)
     attenuationCoeff = np.float32(0.01)
 
-    src_coherent = np.zeros(n_x, dtype=np.float32)
-    rec_coherent = np.zeros(n_x, dtype=np.float32)
-    src_incoherent = np.zeros(n_x, dtype=np.float32)
-    rec_incoherent = np.zeros(n_x, dtype=np.float32)
+    modes = np.zeros((9, n_x), dtype=np.float32)
+
+    ks = np.empty(n_freqs, dtype=np.float64)
+    att = np.empty(n_freqs, dtype=np.float64)
+    for f_idx in range(n_freqs):
+        ks[f_idx] = 2.0 * np.pi * freqs[f_idx] / safe_vint
+        att[f_idx] = attenuationCoeff * np.float32(freqs[f_idx]) / safe_vint
+    k_uniform, k_step = _frequency_steps(ks)
+    att_uniform, att_step = _frequency_steps(att)
 
-    dsz_vals = src_coords[:, 2] - focal_z
+    dsz_vals = src_index.coords[:, 2] - focal_z
     dsz2_vals = dsz_vals * dsz_vals
     abs_dsz_vals = np.abs(dsz_vals)
 
-    drz_vals = rec_coords[:, 2] - focal_z
+    drz_vals = rec_index.coords[:, 2] - focal_z
     drz2_vals = drz_vals * drz_vals
     abs_drz_vals = np.abs(drz_vals)
 
     for ix in prange(n_x):
         f_x = eval_x[ix]
-        src_coh_acc = 0.0
-        rec_coh_acc = 0.0
-        src_inc_acc = 0.0
-        rec_inc_acc = 0.0
+        bs = np.zeros(n_freqs, dtype=np.complex128)
+        br = np.zeros(n_freqs, dtype=np.complex128)
+        src_sum = np.zeros(n_freqs, dtype=np.float64)
+        rec_sum = np.zeros(n_freqs, dtype=np.float64)
+
+        _accumulate_station_sums(src_index, dsz2_vals, abs_dsz_vals, f_x, focal_y, max_radius, r_sq_limit, ks, k_uniform, k_step, att, att_uniform, att_step, True, True, bs, src_sum)
+        _accumulate_station_sums(rec_index, drz2_vals, abs_drz_vals, f_x, focal_y, max_radius, r_sq_limit, ks, k_uniform, k_step, att, att_uniform, att_step, True, True, br, rec_sum)
 
+        src_factor = np.ones(3, dtype=np.float64)
+        rec_factor = np.ones(3, dtype=np.float64)
+        acc = np.zeros(9, dtype=np.float64)
         for f_idx in range(n_freqs):
-            freq = np.float32(freqs[f_idx])
-            if freq <= 0.0:
+            if freqs[f_idx] <= 0.0:
                 continue
+            src_factor[1] = np.abs(bs[f_idx])
+            src_factor[2] = src_sum[f_idx]
+            rec_factor[1] = np.abs(br[f_idx])
+            rec_factor[2] = rec_sum[f_idx]
+            for s_mode in range(3):
+                for r_mode in range(3):
+                    acc[3 * s_mode + r_mode] += src_factor[s_mode] * rec_factor[r_mode]
 
-            k = np.float32(two_pi * freq / safe_vint)
-            bs = np.complex64(0.0 + 0.0j)
-            br = np.complex64(0.0 + 0.0j)
-            src_sum = 0.0
-            rec_sum = 0.0
-
-            for src_idx in range(n_sources):
-                dsx = src_coords[src_idx, 0] - f_x
-                dsy = src_coords[src_idx, 1] - focal_y
-                rs_sq = dsx * dsx + dsy * dsy
-                if rs_sq > r_sq_limit:
-                    continue
-
-                ws = src_weights[src_idx]
-                rs = np.sqrt(rs_sq + dsz2_vals[src_idx])
-                if rs < 1e-3:
-                    continue
-
-                base_src = (abs_dsz_vals[src_idx] / (two_pi * rs * rs)) * ws
-                bs += np.complex64(base_src) * np.exp(1j * (-k * rs))
-                src_sum += base_src * np.exp(-attenuationCoeff * freq * (rs / safe_vint))
-
-            for rec_idx in range(n_receivers):
-                drx = rec_coords[rec_idx, 0] - f_x
-                dry = rec_coords[rec_idx, 1] - focal_y
-                rr_sq = drx * drx + dry * dry
-                if rr_sq > r_sq_limit:
-                    continue
-
-                wr = rec_weights[rec_idx]
-                rr = np.sqrt(rr_sq + drz2_vals[rec_idx])
-                if rr < 1e-3:
-                    continue
-
-                base_rec = (abs_drz_vals[rec_idx] / (two_pi * rr * rr)) * wr
-                br += np.complex64(base_rec) * np.exp(1j * (-k * rr))
-                rec_sum += base_rec * np.exp(-attenuationCoeff * freq * (rr / safe_vint))
-
-            src_coh_acc += np.abs(bs)
-            rec_coh_acc += np.abs(br)
-            src_inc_acc += src_sum
-            rec_inc_acc += rec_sum
-
-        src_coherent[ix] = src_coh_acc
-        rec_coherent[ix] = rec_coh_acc
-        src_incoherent[ix] = src_inc_acc
-        rec_incoherent[ix] = rec_inc_acc
+        for mode in range(9):
+            modes[mode, ix] = acc[mode]
 
-    return src_coherent, rec_coherent, src_incoherent, rec_incoherent
+    return modes
 
 
-@jit(parallel=True, nopython=True, cache=False)
+@jit(parallel=True, nopython=True, cache=True)
 def compute_radon_images_numba(source_field, receiver_field, eval_x, eval_y, px, py, freq):
     """
     Computes Radon-domain unit-normalized images directly to avoid multiple grid passes.
@@ -662,7 +1160,7 @@ def compute_radon_images_numba(source_field, receiver_field, eval_x, eval_y, px,
     return src_img, rec_img, avp_img
 
 
-@jit(nopython=True, cache=False)
+@jit(nopython=True, cache=True)
 def calculate_panel_snr_numba(image):
     """
     Extracts an SNR metric (dB) from a unit-normalized [0, 1] Radon panel.
@@ -682,7 +1180,7 @@ def calculate_panel_snr_numba(image):
     return -20.0 * np.log10(avg_noise) if avg_noise > 1e-6 else 60.0
 
 
-@jit(parallel=True, nopython=True, cache=False)
+@jit(parallel=True, nopython=True, cache=True)
 def compute_xy_beam_images_numba(source_field, receiver_field, db_min=-60.0):
     """
     Fused Numba kernel to generate Source, Receiver, and Resolution dB images
@@ -768,7 +1266,7 @@ def compute_monochromatic_weighted_beam_xy_grid(eval_x, eval_y, eval_z, surf_x,
     return _compute_weighted_ft_beam_xy_grid_numba(eval_x, eval_y, eval_z, surf_x, surf_y, surf_z, surf_weights, freq, v_int, focal_x, focal_y)
 
 
-@jit(parallel=True, nopython=True, cache=False)
+@jit(parallel=True, nopython=True, cache=True)
 def _compute_weighted_ft_beam_xy_grid_numba(eval_x, eval_y, eval_z, surf_x, surf_y, surf_z, surf_weights, freq, v_int, focal_x, focal_y):
     n_x = len(eval_x)
     n_y = len(eval_y)
@@ -20,7 +20,11 @@ class ChunkedData:
 
     def getCurrentChunk(self):
         """Returns the current chunk of data"""
-        start = self.currentChunk * self.chunkSize
+        return self.getChunk(self.currentChunk)
+
+    def getChunk(self, chunkIndex):
+        """Returns a specific chunk of data, without moving to it"""
+        start = chunkIndex * self.chunkSize
         end = min(start + self.chunkSize, self.data.shape[0])
         return self.data[start:end]
 
@@ -178,9 +178,19 @@ kxyArray = QVector3D(-50.0, 50.0, 0.5)  # settings for pattern kxy plots (min, m
 # cfp settings
 cfpArray = QVector3D(-800.0, 800.0, 12.5)  # settings for cfp point assessment plots (min, max, step size)
 radonSize = 128               # size of the radon transform (number of points in the kxy array) for cfp analysis in one direction
+CFP_TRANSFORM_DIRECT = 'direct'  # evaluation modes of cfp beam and radon images; see cfp_aux_functions_numba.py
+CFP_TRANSFORM_FAST = 'fast'
+CFP_TRANSFORM_MODES = (CFP_TRANSFORM_FAST, CFP_TRANSFORM_DIRECT)
+cfpTransformMode = CFP_TRANSFORM_FAST  # evaluation of cfp beam and radon images; 'fast' (factorized sums and FFTs) or 'direct' (explicit sums)
 cfpIncoherentQc = False       # switch illumination mode to incoherent QC (diagnostic; no phase interference)
 cfpRun3x3Diagnostics = True   # run source/receiver 3x3 diagnostics matrix during CFP illumination (diagnostic)
 cfpDisplayCutoffFraction = 0.025  # hide illumination values at or below this fraction of the current illumination max
+cfpTileRows = 8               # illumination map rows per tile; the Layout image is refreshed after finished tiles
+cfpPartialUpdateSeconds = 0.5  # minimum time between two partial illumination maps sent to the Layout image
+cfpAdaptiveGrid = False       # compute illumination maps on a coarse grid, refined to bin resolution only where the map is curved
+cfpAdaptiveStep = 8           # coarse grid spacing of the adaptive illumination grid [bins]
+cfpAdaptiveTolerance = 0.01   # refine adaptive grid tiles whose estimated interpolation error exceeds this fraction of the map max
+cfpBatchGridSize = 10         # multi-point CFP analysis uses the centres of an n x n subdivision of the output area as focal points
 
 # useNumba is used to indicate whether or not to use numba (IF it has been installed)
 useNumba = False
@@ -205,6 +215,31 @@ maxRowsPerChunk = 1_000_000
 # filename handling for wells in a .roll project
 useRelativePaths = True   # save well file names relative to .roll project file
 
+# result cache; identical binning/CFP requests reuse earlier results, up to this total size (0 disables the cache)
+resultCacheSizeMB = 256
+
+# stack response cache; in-line and cross-line Kr stack responses of shown and prefetched lines, up to this total size (0 disables the cache)
+stackResponseCacheSizeMB = 64
+stackResponsePrefetchLines = 8   # lines ahead of the spider (and half as many behind) computed in the background
+
+# bin slice cache; bins around the spider and trace table chunks, read ahead of the spider, up to this total size (0 disables the cache)
+binSliceCacheSizeMB = 160        # room for two trace table chunks of maxRowsPerChunk traces, and the bins around the spider
+binSlicePrefetchBins = 4         # bins ahead of the spider read in the background
+
+# fold cubes accumulated while binning, also in Basic Binning; each takes nx * ny * nClasses * 4 bytes (0 disables a cube)
+foldOffsetClassWidth = 0.0       # [m] width of the offset classes of the offset-class fold cube
+foldAzimuthSectors = 0           # number of azimuth sectors of the azimuth-sector fold cube
+foldOvtSizeX = 0.0               # [m] x-size of the offset-vector tiles (OVTs) of the OVT fold cube
+foldOvtSizeY = 0.0               # [m] y-size of the offset-vector tiles
+foldMinOffset = 0.0              # [m] minimum offset of the offset-limited fold map, derived from the offset-class cube
+foldMaxOffset = 0.0              # [m] maximum offset of the offset-limited fold map (0 means no upper limit)
+
+# sidecar storage; when True, analysis and survey arrays are saved in a single compressed, chunked '.roll.store' file
+useProjectStore = False
+
+# trace table layout on disk; 'interleaved' keeps the 16 fields of a trace together, 'columns' stores each field as a contiguous plane
+analysisLayout = 'interleaved'
+
 # style definitions for consistent style across the application
 # toolButtonStyle = 'QToolButton { selection-background-color: blue } QToolButton:checked { background-color: lightblue } QToolButton:pressed { background-color: red }'
 toolButtonStyle = '''
@@ -103,6 +103,9 @@ class _DisplayDockBuilder:
         w.tbRmsO = self._toggleButton(w.actionRmsO)
         w.tbGapO = self._toggleButton(w.actionGapO)
         w.tbIllu = self._toggleButton(w.actionIllu)
+        w.tbOffF = self._toggleButton(w.actionOffF)
+        w.tbAziR = self._toggleButton(w.actionAziR)
+        w.tbOvtR = self._toggleButton(w.actionOvtR)
 
         w.actionArea.setChecked(True)
 
@@ -119,7 +122,7 @@ class _DisplayDockBuilder:
         w.setupSpiderActions()
 
         w.analysisActionGroup = QActionGroup(w)
-        for action in (w.actionNone, w.actionArea, w.actionFold, w.actionMinO, w.actionMaxO, w.actionRmsO, w.actionGapO, w.actionIllu):
+        for action in (w.actionNone, w.actionArea, w.actionFold, w.actionMinO, w.actionMaxO, w.actionRmsO, w.actionGapO, w.actionIllu, w.actionOffF, w.actionAziR, w.actionOvtR):
             w.analysisActionGroup.addAction(action)
 
         w.actionNone.triggered.connect(w.onActionNoneTriggered)
@@ -130,9 +133,12 @@ class _DisplayDockBuilder:
         w.actionRmsO.triggered.connect(w.onActionRmsOTriggered)
         w.actionGapO.triggered.connect(w.onActionGapOTriggered)
         w.actionIllu.triggered.connect(w.onActionIlluTriggered)
+        w.actionOffF.triggered.connect(w.onActionOffFTriggered)
+        w.actionAziR.triggered.connect(w.onActionAziRTriggered)
+        w.actionOvtR.triggered.connect(w.onActionOvtRTriggered)
 
         layout = QVBoxLayout()
-        for button in (w.tbNone, w.tbArea, w.tbFold, w.tbMinO, w.tbMaxO, w.tbRmsO, w.tbGapO, w.tbIllu):
+        for button in (w.tbNone, w.tbArea, w.tbFold, w.tbMinO, w.tbMaxO, w.tbRmsO, w.tbGapO, w.tbIllu, w.tbOffF, w.tbAziR, w.tbOvtR):
             layout.addWidget(button, 0, Qt.AlignmentFlag.AlignHCenter)
         layout.addWidget(QHLine())
         layout.addWidget(w.tbSpider, 0, Qt.AlignmentFlag.AlignHCenter)
@@ -0,0 +1,146 @@
+"""
+In this module the fold of each bin is split into offset classes, azimuth sectors and offset-vector tiles (OVTs).
+
+The cubes are accumulated while binning, from the same bin indices, offsets and azimuths that update the fold map.
+That works for Basic Binning too, so offset-limited fold maps and azimuth or OVT richness maps need neither a Full Binning
+run nor the analysis file (.ana.npy).
+
+  offsetFold[nx, ny, k]   fold of offset class k, i.e. offsets in [k * width, (k + 1) * width); the last class includes the maximum offset
+  azimuthFold[nx, ny, k]  fold of azimuth sector k, i.e. azimuths in [k * 360 / n, (k + 1) * 360 / n) degrees
+  ovtFold[nx, ny, k]      fold of offset-vector tile k = iX * nOvtY + iY; tiles of (sizeX, sizeY) cover the offset rectangle
+
+Like the fold map, the cubes count all traces of a bin, also those beyond the maximum fold kept in the analysis file.
+Each cube takes nx * ny * nClasses * 4 bytes of memory, so they are only created when enabled in the settings.
+The cubes only live in the binning worker; it reduces them to 2D maps (offset-limited fold, azimuth and OVT richness)
+that are displayed and saved like the fold map.
+"""
+
+import math
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+
+FOLD_CLASS_DTYPE = np.uint32                                                    # same type as the fold map
+
+
+@dataclass(frozen=True)
+class FoldClassSpec:
+    offsetClassWidth: float = 0.0                                               # [m]; 0 disables the offset-class cube
+    aziSectors: int = 0                                                         # 0 disables the azimuth-sector cube
+    ovtSizeX: float = 0.0                                                       # [m]; 0 in either direction disables the OVT cube
+    ovtSizeY: float = 0.0
+    minOffset: float = 0.0                                                      # [m] offset range of the offset-limited fold map
+    maxOffset: float = 0.0                                                      # [m]; 0 means no upper limit
+
+    @classmethod
+    def fromAppSettings(cls, appSettings) -> 'FoldClassSpec':
+        return cls(
+            offsetClassWidth=float(appSettings.foldOffsetClassWidth),
+            aziSectors=int(appSettings.foldAzimuthSectors),
+            ovtSizeX=float(appSettings.foldOvtSizeX),
+            ovtSizeY=float(appSettings.foldOvtSizeY),
+            minOffset=float(appSettings.foldMinOffset),
+            maxOffset=float(appSettings.foldMaxOffset),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.offsetClassWidth > 0.0 or self.aziSectors > 0 or (self.ovtSizeX > 0.0 and self.ovtSizeY > 0.0)
+
+
+@dataclass
+class FoldClassCubes:
+    spec: FoldClassSpec
+    nOffsetClasses: int = 0
+    ovtX0: float = 0.0                                                          # lower-left corner of the first offset-vector tile
+    ovtY0: float = 0.0
+    nOvtX: int = 0
+    nOvtY: int = 0
+    offsetFold: np.ndarray | None = field(default=None, repr=False)           # (nx, ny, nOffsetClasses)
+    azimuthFold: np.ndarray | None = field(default=None, repr=False)          # (nx, ny, aziSectors)
+    ovtFold: np.ndarray | None = field(default=None, repr=False)              # (nx, ny, nOvtX * nOvtY)
+
+    @classmethod
+    def create(cls, spec: FoldClassSpec, shape: tuple[int, int], offsetRect: tuple[float, float, float, float], maxRadius: float = 0.0) -> 'FoldClassCubes | None':
+        """Empty cubes for a fold map of 'shape'; None when no cube is enabled.
+
+        offsetRect is (xMin, xMax, yMin, yMax) of the offset vectors that are binned; a maxRadius > 0 limits the offsets further.
+        """
+        if not spec.enabled:
+            return None
+
+        nx, ny = shape
+        xMin, xMax, yMin, yMax = offsetRect
+        cubes = cls(spec)
+
+        if spec.offsetClassWidth > 0.0:
+            maxOffset = max(math.hypot(x, y) for x in (xMin, xMax) for y in (yMin, yMax))
+            if maxRadius > 0.0:
+                maxOffset = min(maxOffset, maxRadius)
+            cubes.nOffsetClasses = max(math.ceil(maxOffset / spec.offsetClassWidth), 1)
+            cubes.offsetFold = np.zeros((nx, ny, cubes.nOffsetClasses), dtype=FOLD_CLASS_DTYPE)
+
+        if spec.aziSectors > 0:
+            cubes.azimuthFold = np.zeros((nx, ny, spec.aziSectors), dtype=FOLD_CLASS_DTYPE)
+
+        if spec.ovtSizeX > 0.0 and spec.ovtSizeY > 0.0:
+            cubes.ovtX0 = xMin
+            cubes.ovtY0 = yMin
+            cubes.nOvtX = max(math.ceil((xMax - xMin) / spec.ovtSizeX), 1)
+            cubes.nOvtY = max(math.ceil((yMax - yMin) / spec.ovtSizeY), 1)
+            cubes.ovtFold = np.zeros((nx, ny, cubes.nOvtX * cubes.nOvtY), dtype=FOLD_CLASS_DTYPE)
+
+        return cubes
+
+    @property
+    def nbytes(self) -> int:
+        return sum(cube.nbytes for cube in (self.offsetFold, self.azimuthFold, self.ovtFold) if cube is not None)
+
+    def copy(self) -> 'FoldClassCubes':
+        return replace(
+            self,
+            offsetFold=None if self.offsetFold is None else self.offsetFold.copy(),
+            azimuthFold=None if self.azimuthFold is None else self.azimuthFold.copy(),
+            ovtFold=None if self.ovtFold is None else self.ovtFold.copy(),
+        )
+
+    def accumulate(self, nx: np.ndarray, ny: np.ndarray, hypArray: np.ndarray, aziArray: np.ndarray) -> None:
+        """Add traces to the cubes; nx, ny are valid bin indices, hypArray the offsets [m] and aziArray the azimuths [deg, 0 - 360)."""
+        if self.offsetFold is not None:
+            offsetClass = np.minimum((hypArray / self.spec.offsetClassWidth).astype(np.int64), self.nOffsetClasses - 1)
+            np.add.at(self.offsetFold, (nx, ny, offsetClass), 1)
+
+        if self.azimuthFold is not None:
+            sector = (aziArray * (self.spec.aziSectors / 360.0)).astype(np.int64) % self.spec.aziSectors
+            np.add.at(self.azimuthFold, (nx, ny, sector), 1)
+
+        if self.ovtFold is not None:
+            # azimuths are measured from the y-axis, see buildBinningArraysFromSelectedReceivers()
+            radians = np.deg2rad(aziArray)
+            tileX = np.clip(np.floor((hypArray * np.sin(radians) - self.ovtX0) / self.spec.ovtSizeX).astype(np.int64), 0, self.nOvtX - 1)
+            tileY = np.clip(np.floor((hypArray * np.cos(radians) - self.ovtY0) / self.spec.ovtSizeY).astype(np.int64), 0, self.nOvtY - 1)
+            np.add.at(self.ovtFold, (nx, ny, tileX * self.nOvtY + tileY), 1)
+
+    def offsetClassEdges(self) -> np.ndarray:
+        return np.arange(self.nOffsetClasses + 1, dtype=np.float64) * self.spec.offsetClassWidth
+
+    def offsetLimitedFold(self, minOffset: float, maxOffset: float) -> np.ndarray:
+        """Fold map of the offset classes that lie within [minOffset, maxOffset]; class edges limit the resolution. A maxOffset <= 0 has no upper limit."""
+        edges = self.offsetClassEdges()
+        inRange = (edges[:-1] >= minOffset) & ((edges[1:] <= maxOffset) | (maxOffset <= 0.0))
+        return self.offsetFold[:, :, inRange].sum(axis=2, dtype=FOLD_CLASS_DTYPE)
+
+    def azimuthRichness(self, minFold: int = 1) -> np.ndarray:
+        """Number of azimuth sectors of each bin with a fold of at least minFold."""
+        return np.count_nonzero(self.azimuthFold >= minFold, axis=2).astype(FOLD_CLASS_DTYPE)
+
+    def ovtRichness(self, minFold: int = 1) -> np.ndarray:
+        """Number of offset-vector tiles of each bin with a fold of at least minFold."""
+        return np.count_nonzero(self.ovtFold >= minFold, axis=2).astype(FOLD_CLASS_DTYPE)
+
+    def foldClassMaps(self) -> tuple[np.ndarray | None, np.ndarray | None, np.ndarray | None]:
+        """Offset-limited fold (using the offset range of the spec), azimuth richness and OVT richness maps; None for a disabled cube."""
+        offsetLimited = None if self.offsetFold is None else self.offsetLimitedFold(self.spec.minOffset, self.spec.maxOffset)
+        azimuthRichness = None if self.azimuthFold is None else self.azimuthRichness()
+        ovtRichness = None if self.ovtFold is None else self.ovtRichness()
+        return offsetLimited, azimuthRichness, ovtRichness
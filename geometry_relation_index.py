@@ -0,0 +1,254 @@
+"""
+In this module the relation records of the geometry tables are resolved once into a GeometryRelationIndex.
+
+Each relation record links a shot (SrcInd, SrcLin, SrcPnt) to a range of receivers (RecInd, RecLin, RecMin..RecMax).
+Resolving it requires the active source and receiver tables sorted on (Index, Line, Point), and a lookup of every
+relation in these tables. The index keeps the outcome of that work:
+
+- the sorted keys and coordinates of the active sources and receivers,
+- the receiver range of every receiver line (RecInd, RecLin),
+- for every relation the index of its source and its range of receivers, [relRecLeft, relRecRight), and
+- for every shot the range of its relations, [shotRelationStart[s], shotRelationStart[s + 1]) in relationOrder.
+
+Relations that can't be resolved (orphans, inactive or missing sources, missing receivers) get relSrcIdx = -1 and are counted.
+
+The index refers to sorted copies of the tables only, never to rows of the tables themselves. It is built once per
+geometry version and reused by the CFP workers. For the tables of the session, the key of that version is made of their
+edit revisions (SessionService.arrayRevisionKey()), so no table has to be hashed; for other tables geometryKey() fingerprints
+their contents. Either way a changed table, including an in-place edit, leads to a different key and hence to a new index.
+"""
+
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+
+from .cfp_aux_functions_numba import (RelationSourceIndex,
+                                      build_relation_source_index,
+                                      resolve_cfp_geometry_relations_numba)
+from .result_cache import arrayFingerprint
+
+
+def geometryKey(srcGeom, relGeom, recGeom) -> str:
+    """Content fingerprint of the three geometry tables; '' when one of them is missing."""
+    if srcGeom is None or relGeom is None or recGeom is None:
+        return ''
+    return '-'.join(arrayFingerprint(table) for table in (srcGeom, relGeom, recGeom))
+
+
+def inUseMask(table) -> np.ndarray:
+    if 'InUse' not in table.dtype.names:
+        return np.ones(table.shape[0], dtype=bool)
+    return table['InUse'] != 0
+
+
+def sortedPointArrays(table):
+    """Index, line, point (int64) and x, y, z (float32) of a point table, sorted on (Index, Line, Point)."""
+    if table.shape[0] == 0:
+        emptyInt = np.empty(0, dtype=np.int64)
+        emptyFloat = np.empty(0, dtype=np.float32)
+        return emptyInt, emptyInt, emptyInt, emptyFloat, emptyFloat, emptyFloat
+
+    pointInd = table['Index'].astype(np.int64, copy=False)
+    pointLine = np.rint(table['Line']).astype(np.int64, copy=False)
+    pointPoint = np.rint(table['Point']).astype(np.int64, copy=False)
+    order = np.lexsort((pointPoint, pointLine, pointInd))
+    return (
+        np.ascontiguousarray(pointInd[order], dtype=np.int64),
+        np.ascontiguousarray(pointLine[order], dtype=np.int64),
+        np.ascontiguousarray(pointPoint[order], dtype=np.int64),
+        np.ascontiguousarray(table['LocX'][order], dtype=np.float32),
+        np.ascontiguousarray(table['LocY'][order], dtype=np.float32),
+        np.ascontiguousarray(table['Elev'][order] - table['Depth'][order], dtype=np.float32),
+    )
+
+
+def lineRanges(pointInd: np.ndarray, pointLine: np.ndarray):
+    """Index, line and [start, end) range of every line in point arrays sorted on (Index, Line, Point)."""
+    if pointInd.shape[0] == 0:
+        emptyInt = np.empty(0, dtype=np.int64)
+        return emptyInt, emptyInt, emptyInt, emptyInt
+
+    lineBreaks = np.empty(pointInd.shape[0], dtype=bool)
+    lineBreaks[0] = True
+    lineBreaks[1:] = (pointInd[1:] != pointInd[:-1]) | (pointLine[1:] != pointLine[:-1])
+    lineStart = np.flatnonzero(lineBreaks).astype(np.int64, copy=False)
+    lineEnd = np.empty_like(lineStart)
+    lineEnd[:-1] = lineStart[1:]
+    lineEnd[-1] = pointInd.shape[0]
+    return np.ascontiguousarray(pointInd[lineStart]), np.ascontiguousarray(pointLine[lineStart]), lineStart, lineEnd
+
+
+def relationKeyArrays(relationChunk):
+    """The integer key arrays of a chunk of relation records, as used by the relation kernels."""
+    relationCount = relationChunk.shape[0]
+    names = relationChunk.dtype.names
+    relInSps = relationChunk['InSps'] if 'InSps' in names else np.ones(relationCount, dtype=np.int64)
+    relInRps = relationChunk['InRps'] if 'InRps' in names else np.ones(relationCount, dtype=np.int64)
+    return (
+        relationChunk['SrcInd'].astype(np.int64, copy=False),
+        np.rint(relationChunk['SrcLin']).astype(np.int64, copy=False),
+        np.rint(relationChunk['SrcPnt']).astype(np.int64, copy=False),
+        relationChunk['RecInd'].astype(np.int64, copy=False),
+        np.rint(relationChunk['RecLin']).astype(np.int64, copy=False),
+        np.rint(relationChunk['RecMin']).astype(np.int64, copy=False),
+        np.rint(relationChunk['RecMax']).astype(np.int64, copy=False),
+        np.ascontiguousarray(relInSps, dtype=np.int64),
+        np.ascontiguousarray(relInRps, dtype=np.int64),
+    )
+
+
+@dataclass
+class GeometryRelationIndex:
+    geometryKey: str
+    sourceArrays: tuple                                                         # active sources; see sortedPointArrays()
+    receiverArrays: tuple                                                       # active receivers; see sortedPointArrays()
+    receiverLines: tuple                                                        # receiver lines; see lineRanges()
+    relSrcIdx: np.ndarray                                                       # per relation, index of its source or -1
+    relRecLeft: np.ndarray                                                      # per relation, receiver range [relRecLeft, relRecRight)
+    relRecRight: np.ndarray
+    relationOrder: np.ndarray                                                   # resolved relations, sorted by shot
+    shotRelationStart: np.ndarray                                               # (nSources + 1,) offsets into relationOrder
+    inactiveSourceCount: int = 0
+    inactiveReceiverCount: int = 0
+    totalTraceCount: int = 0
+    inactiveSourceRelationCount: int = 0
+    sourceOrphanRelationCount: int = 0
+    receiverOrphanRelationCount: int = 0
+    missingSourceCount: int = 0
+    missingReceiverCount: int = 0
+    _sourceIndex: dict = field(default_factory=dict, repr=False, compare=False)  # aperture radius -> RelationSourceIndex
+
+    @property
+    def relationCount(self) -> int:
+        return int(self.relSrcIdx.shape[0])
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [*self.sourceArrays, *self.receiverArrays, *self.receiverLines, self.relSrcIdx, self.relRecLeft, self.relRecRight, self.relationOrder, self.shotRelationStart]
+        return sum(array.nbytes for array in arrays)
+
+    def shotReceiverRanges(self, sourceIndex: int) -> tuple[np.ndarray, np.ndarray]:
+        """Receiver ranges [left, right) of all resolved relations of one (sorted) source."""
+        relations = self.relationOrder[self.shotRelationStart[sourceIndex]:self.shotRelationStart[sourceIndex + 1]]
+        return self.relRecLeft[relations], self.relRecRight[relations]
+
+    def stationTraceCounts(self) -> tuple[np.ndarray, np.ndarray]:
+        """Number of resolved traces of every (sorted) source and receiver."""
+        resolved = self.relSrcIdx >= 0
+        left = self.relRecLeft[resolved]
+        right = self.relRecRight[resolved]
+        sourceCounts = np.bincount(self.relSrcIdx[resolved], weights=right - left, minlength=self.sourceArrays[0].shape[0])
+        receiverCount = self.receiverArrays[0].shape[0]
+        steps = np.bincount(left, minlength=receiverCount + 1) - np.bincount(right, minlength=receiverCount + 1)
+        return sourceCounts.astype(np.float64), np.cumsum(steps[:receiverCount]).astype(np.float64)
+
+    def relationSourceIndex(self, radius: float) -> RelationSourceIndex:
+        """Resolved relations bucketed on source position, for aperture queries with the given radius; kept for the last radius."""
+        radius = float(radius)
+        index = self._sourceIndex.get(radius)
+        if index is None:
+            index = build_relation_source_index(self.relSrcIdx, self.relRecLeft, self.relRecRight, self.sourceArrays[3], self.sourceArrays[4], radius)
+            self._sourceIndex.clear()
+            self._sourceIndex[radius] = index
+        return index
+
+
+def buildGeometryRelationIndex(
+    srcGeom,
+    relGeom,
+    recGeom,
+    key: str = '',
+    chunkSize: int = 250_000,
+    onChunkDone: Callable[[int, int], None] | None = None,
+) -> GeometryRelationIndex:
+    """Sort the active stations and resolve all relation records, in chunks of chunkSize relations.
+
+    onChunkDone(done, total) is called after each chunk, e.g. for progress reporting or cancellation.
+    """
+    sourceMask = inUseMask(srcGeom)
+    receiverMask = inUseMask(recGeom)
+    sourceArrays = sortedPointArrays(srcGeom[sourceMask])
+    inactiveSourceArrays = sortedPointArrays(srcGeom[~sourceMask])
+    receiverArrays = sortedPointArrays(recGeom[receiverMask])
+    receiverLines = lineRanges(receiverArrays[0], receiverArrays[1])
+
+    relationCount = int(relGeom.shape[0])
+    relSrcIdx = np.empty(relationCount, dtype=np.int64)
+    relRecLeft = np.empty(relationCount, dtype=np.int64)
+    relRecRight = np.empty(relationCount, dtype=np.int64)
+    counts = np.zeros(6, dtype=np.int64)
+
+    chunkSize = max(int(chunkSize), 1)
+    chunkCount = (relationCount + chunkSize - 1) // chunkSize
+    for chunkIndex in range(chunkCount):
+        startRow = chunkIndex * chunkSize
+        endRow = min(startRow + chunkSize, relationCount)
+        counts += resolve_cfp_geometry_relations_numba(
+            *relationKeyArrays(relGeom[startRow:endRow]),
+            *sourceArrays[:3],
+            *inactiveSourceArrays[:3],
+            *receiverLines,
+            receiverArrays[2],
+            relSrcIdx[startRow:endRow],
+            relRecLeft[startRow:endRow],
+            relRecRight[startRow:endRow],
+        )
+        if onChunkDone is not None:
+            onChunkDone(chunkIndex + 1, chunkCount)
+
+    # per shot relation ranges
+    resolved = np.flatnonzero(relSrcIdx >= 0)
+    relationOrder = resolved[np.argsort(relSrcIdx[resolved], kind='stable')]
+    shotRelationStart = np.zeros(sourceArrays[0].shape[0] + 1, dtype=np.int64)
+    np.cumsum(np.bincount(relSrcIdx[resolved], minlength=sourceArrays[0].shape[0]), out=shotRelationStart[1:])
+
+    return GeometryRelationIndex(
+        geometryKey=key,
+        sourceArrays=sourceArrays,
+        receiverArrays=receiverArrays,
+        receiverLines=receiverLines,
+        relSrcIdx=relSrcIdx,
+        relRecLeft=relRecLeft,
+        relRecRight=relRecRight,
+        relationOrder=relationOrder,
+        shotRelationStart=shotRelationStart,
+        inactiveSourceCount=int(np.count_nonzero(~sourceMask)),
+        inactiveReceiverCount=int(np.count_nonzero(~receiverMask)),
+        totalTraceCount=int(counts[0]),
+        inactiveSourceRelationCount=int(counts[1]),
+        sourceOrphanRelationCount=int(counts[2]),
+        receiverOrphanRelationCount=int(counts[3]),
+        missingSourceCount=int(counts[4]),
+        missingReceiverCount=int(counts[5]),
+    )
+
+
+class GeometryRelationIndexCache:
+    """The most recently used relation indexes, keyed by geometryKey(); e.g. one for the geometry tables and one for the SPS input tables."""
+
+    def __init__(self, maxEntries: int = 2) -> None:
+        self.maxEntries = max(int(maxEntries), 1)
+        self._entries = OrderedDict()                                           # geometryKey -> GeometryRelationIndex
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any:
+        index = self._entries.get(key) if key else None
+        if index is not None:
+            self._entries.move_to_end(key)
+        return index
+
+    def put(self, index: GeometryRelationIndex) -> None:
+        if not index.geometryKey:
+            return
+        self._entries.pop(index.geometryKey, None)
+        self._entries[index.geometryKey] = index
+        while len(self._entries) > self.maxEntries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
@@ -0,0 +1,205 @@
+"""
+In this module numba's on-disk compilation cache is pointed to a plugin-owned folder,
+and the hot numba kernels can be compiled ahead of their first use in a background thread.
+
+Kernels decorated with @jit(cache=True) store their machine code in the cache folder.
+Numba keys each entry on the kernel's source file (modification time and size) and on the numba version,
+so a changed plugin or numba version simply leads to a recompilation; stale entries are never used.
+
+The cache folder is selected per kernel by a cache locator that only claims the plugin's own source files;
+numba's global cache settings (NUMBA_CACHE_DIR) are left alone, so other plugins and scripts in the same
+QGIS process keep their own cache. configureNumbaCache() must run before the @jit decorators are applied,
+as numba selects the cache location when a kernel is decorated. Hence it is called at the top of the numba modules.
+
+See: https://numba.readthedocs.io/en/stable/developer/caching.html
+"""
+import inspect
+import os
+import threading
+
+import numpy as np
+
+NUMBA_CACHE_FOLDER = '__numba_cache__'
+
+try:
+    import numba
+    from numba.core import caching as numbaCaching
+    from numba.core import types as numbaTypes
+
+    haveNumba = True
+except ImportError:
+    haveNumba = False
+
+
+def numbaCacheDir() -> str:
+    """Plugin-owned folder for numba's compiled kernels."""
+    # cached signatures refer to types (e.g. StationBucketIndex) by their module name, which includes the package name.
+    # A subfolder per package name keeps a differently named copy of the plugin (or the test package) from loading them.
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), NUMBA_CACHE_FOLDER, __package__ or 'roll')
+
+
+def _isPluginSourceFile(pyFile: str) -> bool:
+    pluginFolder = os.path.normcase(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.normcase(os.path.dirname(os.path.abspath(pyFile))) == pluginFolder
+
+
+def _defaultCacheDir() -> str:
+    """Where numba's own locator caches the plugin's kernels: the __pycache__ folder next to the source files."""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), '__pycache__')
+
+
+# The cache locators are not part of numba's public API. When they can't be found (e.g. after a rename in a newer numba),
+# the plugin's locator is not installed, and numba's default locator caches the kernels next to their source files instead.
+_CacheImpl = _SourceFileLocator = PluginCacheLocator = None
+if haveNumba:
+    # the locator classes lost their leading underscore in numba 0.59
+    _CacheImpl = getattr(numbaCaching, 'CacheImpl', None) or getattr(numbaCaching, '_CacheImpl', None)
+    _SourceFileLocator = getattr(numbaCaching, 'UserProvidedCacheLocator', None) or getattr(numbaCaching, '_UserProvidedCacheLocator', None)
+
+if _CacheImpl is not None and _SourceFileLocator is not None:
+
+    class PluginCacheLocator(_SourceFileLocator):
+        """Cache locator for the kernels in the plugin's own source files; they are cached in numbaCacheDir()."""
+
+        def __init__(self, py_func, py_file):                                  # pylint: disable=W0231
+            self._py_file = py_file
+            self._lineno = py_func.__code__.co_firstlineno
+            self._cache_path = numbaCacheDir()
+
+        @classmethod
+        def from_function(cls, py_func, py_file):
+            if numba.config.CACHE_DIR or not _isPluginSourceFile(py_file):     # a user-provided NUMBA_CACHE_DIR takes precedence
+                return None
+            return super(_SourceFileLocator, cls).from_function(py_func, py_file)
+
+
+def _locatorClasses() -> list | None:
+    """numba's (private) list of cache locator classes, or None when this numba version doesn't have it."""
+    if PluginCacheLocator is None:
+        return None
+    locatorClasses = getattr(_CacheImpl, '_locator_classes', None)
+    return locatorClasses if isinstance(locatorClasses, list) else None
+
+
+def configureNumbaCache() -> str:
+    """Cache the plugin's kernels in numbaCacheDir(), unless NUMBA_CACHE_DIR has been set by the user; returns the folder used."""
+    if not haveNumba:
+        return ''
+
+    if numba.config.CACHE_DIR:
+        return numba.config.CACHE_DIR
+
+    locatorClasses = _locatorClasses()
+    if locatorClasses is None:
+        return _defaultCacheDir()                                               # numba's default locator is used
+
+    if PluginCacheLocator not in locatorClasses:
+        locatorClasses.insert(0, PluginCacheLocator)
+    return numbaCacheDir()
+
+
+def releaseNumbaCache() -> None:
+    """Remove the plugin's cache locator from numba; call when the plugin is unloaded."""
+    locatorClasses = _locatorClasses()
+    if locatorClasses is not None and PluginCacheLocator in locatorClasses:
+        locatorClasses.remove(PluginCacheLocator)
+
+
+def precompileKernel(kernel, *args) -> bool:
+    """Compile (or load from the cache) the overload of a @jit kernel that matches args, without running it.
+
+    Parameters with a default value that are not in args are compiled as omitted, as happens when the kernel is called.
+    Returns False when numba is disabled or the kernel is not a numba dispatcher.
+    """
+    if not haveNumba or numba.config.DISABLE_JIT or not hasattr(kernel, 'compile'):
+        return False
+
+    argTypes = [numba.typeof(arg) for arg in args]
+    parameters = list(inspect.signature(kernel.py_func).parameters.values())
+    for parameter in parameters[len(args):]:
+        argTypes.append(numbaTypes.Omitted(parameter.default))
+
+    kernel.compile(tuple(argTypes))
+    return True
+
+
+def launchNumbaThreadPool() -> None:
+    """Start numba's thread pool from the calling thread; call this before running parallel kernels from a short-lived thread.
+
+    A pool that is launched from a short-lived (e.g. warm-up or prefetch) thread can hang the interpreter when it exits.
+    """
+    if haveNumba and not numba.config.DISABLE_JIT:
+        numba.get_num_threads()
+
+
+def _warmUpKernels() -> list:
+    # imported here, as both numba modules import this module themselves
+    from . import aux_functions_numba as fnb
+    from . import cfp_aux_functions_numba as cfp
+
+    # tiny arrays with the dtypes, dimensions and memory layout used by the real calls
+    anaOutput = np.zeros((2, 2, 2, 16), dtype=np.float32)
+    offsets = np.zeros(2, dtype=np.float32)
+    stations = np.zeros((2, 3), dtype=np.float32)
+    weights = np.ones(2, dtype=np.float32)
+    evalX = np.zeros(2, dtype=np.float32)
+    freqs = np.ones(2, dtype=np.float32)
+    index = cfp.build_station_bucket_index(stations, weights, 100.0)
+    radius = np.float64(100.0)                                                  # aperture radius is a numpy float in the CFP worker
+    relations = np.zeros(2, dtype=np.int64)
+    relationIndex = cfp.build_relation_source_index(relations, relations, relations, evalX, evalX, radius)
+    counts = np.zeros((2, 5), dtype=np.int64)
+    focal = np.zeros(2, dtype=np.float64)
+
+    kernels = [
+        (cfp.compute_illumination_row_numba, (0.0, evalX, 0.0, index, index, freqs, 0.0, radius)),
+        (cfp.compute_illumination_row_incoherent_numba, (0.0, evalX, 0.0, index, index, freqs, 0.0, radius)),
+        (cfp.compute_illumination_row_modes_numba, (0.0, evalX, 0.0, index, index, freqs, 0.0, radius)),
+        (cfp.merge_station_weights_numba, (np.zeros((16, 3), dtype=np.uint32), np.zeros(16), np.zeros(16, dtype=np.bool_), 0, stations.view(np.uint32), np.ones(2), 0)),
+        (cfp.scan_cfp_focal_points_numba, (relationIndex, evalX, evalX, evalX, evalX, focal, focal, radius, counts, relations, relations, relations, focal, relations, focal, 2)),
+        (fnb.numbaFilterSlice2D, (anaOutput[0, 0, :, :], False)),
+        (fnb.numbaSlice3D, (anaOutput[0, :, :, :], False)),                     # cross-line stack response
+        (fnb.numbaSlice3D, (anaOutput[:, 0, :, :], False)),                     # in-line stack response (strided view)
+        (fnb.numbaNdft1D, (1.0, 0.5, anaOutput[0, :, :, :], anaOutput[0, :, :, 2] > 0)),
+        (fnb.numbaNdft1D, (1.0, 0.5, anaOutput[:, 0, :, :], anaOutput[:, 0, :, 2] > 0)),
+        (fnb.numbaNdft1DSerial, (1.0, 0.5, anaOutput[0, :, :, :], anaOutput[0, :, :, 2] > 0)),  # prefetched stack responses
+        (fnb.numbaNdft1DSerial, (1.0, 0.5, anaOutput[:, 0, :, :], anaOutput[:, 0, :, 2] > 0)),
+        (fnb.numbaOffsetBin, (anaOutput[0, 0, :, :], False)),
+        (fnb.numbaLineScatter, (anaOutput[:, 0, :, :], 9, False)),                 # in-line offset/azimuth plots (strided view)
+        (fnb.numbaLineScatter, (anaOutput[0, :, :, :], 10, False)),                # cross-line offset/azimuth plots
+        (fnb.numbaSpiderBin, (anaOutput[0, 0, :, :],)),
+        (fnb.numbaPhaseTable, (offsets.astype(np.float64), offsets.astype(np.float64))),
+        (fnb.numbaAccumulateOffsetAzimuth, (anaOutput, focal, focal, focal, np.zeros((2, 1, 1, 1), dtype=np.int64), np.zeros((2, 1, 1), dtype=np.int64), np.zeros((3, 1), dtype=np.int64))),
+    ]
+
+    compiled = []
+    for kernel, args in kernels:
+        if precompileKernel(kernel, *args):
+            compiled.append(kernel.__name__)
+    return compiled
+
+
+def startNumbaWarmUp(onFinished=None) -> threading.Thread | None:
+    """Compile the hot kernels in a background (daemon) thread; returns the thread, or None when numba is not used.
+
+    Kernels are only compiled, never executed, so the warm-up can't interfere with a worker thread that runs a parallel kernel.
+    onFinished(compiledNames, errorText) is called from the warm-up thread when done.
+    """
+    if not haveNumba or numba.config.DISABLE_JIT:
+        return None
+
+    # loading a parallel kernel starts numba's thread pool; do that from the calling thread
+    launchNumbaThreadPool()
+
+    def run():
+        compiled, errorText = [], ''
+        try:
+            compiled = _warmUpKernels()
+        except Exception as e:                                                  # warm-up is an optimization only; kernels still compile on first use
+            errorText = str(e)
+        if onFinished is not None:
+            onFinished(compiled, errorText)
+
+    thread = threading.Thread(target=run, name='numba-warm-up', daemon=True)
+    thread.start()
+    return thread
@@ -2,7 +2,11 @@
 
 from dataclasses import dataclass
 
-from .enums_and_int_flags import AnalysisRedrawReason
+from . import config
+from .bin_slice_cache import BinSliceCache
+from .enums_and_int_flags import AnalysisRedrawReason, MsgType
+from .region_stats import RegionStatistics
+from .stack_response_cache import StackResponseCache
 
 
 @dataclass
@@ -17,9 +21,44 @@ class PlotRedrawCache:
 class PlotRedrawHelper:
     def __init__(self):
         self.cache = PlotRedrawCache()
+        self.stackResponses = StackResponseCache(0)                             # sized from the app settings when used
+        self.binSlices = BinSliceCache(config.binSliceCacheSizeMB * 1024 * 1024)
+        self.regionStats = None                                                 # RegionStatistics of the displayed map, once queried
 
     def reset(self):
         self.cache = PlotRedrawCache()
+        self.stackResponses.clear()                                             # the analysis cube has changed; also stops a pending prefetch
+        self.binSlices.clear()
+        self.regionStats = None
+
+    def stackResponseCache(self, window) -> StackResponseCache:
+        maxBytes = int(window.appSettings.stackResponseCacheSizeMB) * 1024 * 1024
+        if self.stackResponses.maxBytes != maxBytes:
+            self.stackResponses.setMaxBytes(maxBytes)
+        self.stackResponses.bindSource(window.output.anaOutput)
+        self.reportPrefetchError(window, self.stackResponses)
+        return self.stackResponses
+
+    def binSliceCache(self, window) -> BinSliceCache:
+        self.binSlices.bindSource(window.output.anaOutput)
+        self.reportPrefetchError(window, self.binSlices)
+        return self.binSlices
+
+    @staticmethod
+    def reportPrefetchError(window, cache) -> None:
+        """Log the first failure of the cache's prefetch thread; the prefetch thread itself can't write to the log dock."""
+        error = cache.takePrefetchError()
+        if error is not None and hasattr(window, 'appendLogMessage'):
+            window.appendLogMessage(f'Prefetch: {cache.threadName} failed ({error!r}); arrays are read when needed instead', MsgType.Warning)
+
+    def regionStatistics(self, image) -> RegionStatistics:
+        """Summed-area tables and min/max pyramids of the displayed map 'image'; built on the first query after invalidateRegionStatistics()."""
+        if self.regionStats is None:
+            self.regionStats = RegionStatistics(image)
+        return self.regionStats
+
+    def invalidateRegionStatistics(self):
+        self.regionStats = None                                                 # the displayed map or its contents have changed
 
     @staticmethod
     def shouldInvalidatePatternResponse(reason: AnalysisRedrawReason) -> bool:
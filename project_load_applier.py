@@ -24,6 +24,9 @@ class ProjectLoadApplier:
         mainWindow.output.rmsOffset = sidecarResult.rmsOffset
         mainWindow.output.gapOffset = sidecarResult.gapOffset
         mainWindow.output.cfpOutput = sidecarResult.cfpOutput
+        mainWindow.output.offsetLimitedFold = sidecarResult.offsetLimitedFold
+        mainWindow.output.azimuthRichness = sidecarResult.azimuthRichness
+        mainWindow.output.ovtRichness = sidecarResult.ovtRichness
         mainWindow.output.offstHist = sidecarResult.offstHist
         mainWindow.output.ofAziHist = sidecarResult.ofAziHist
         mainWindow.output.minimumFold = sidecarResult.minimumFold
@@ -38,14 +41,19 @@ class ProjectLoadApplier:
         mainWindow.output.maxOffsetGap = sidecarResult.maxOffsetGap
 
         self._applyLayoutImageState()
+        self.applyAnalysisMemmap(sidecarResult.analysisMemmapResult)
 
-        if sidecarResult.analysisMemmapResult is None:
+    def applyAnalysisMemmap(self, analysisMemmapResult):
+        """Show the trace table; also used once it has been unpacked from the project store in the background."""
+        mainWindow = self.mainWindow
+
+        if analysisMemmapResult is None:
             mainWindow.anaModel.setData(None)
             mainWindow.output.an2Output = None
             mainWindow.output.anaOutput = None
         else:
-            mainWindow.output.anaOutput = sidecarResult.analysisMemmapResult.memmap
-            mainWindow.output.an2Output = sidecarResult.analysisMemmapResult.an2Output
+            mainWindow.output.anaOutput = analysisMemmapResult.memmap
+            mainWindow.output.an2Output = analysisMemmapResult.an2Output
 
         mainWindow.setDataAnaTableModel()
 
@@ -60,6 +68,7 @@ class ProjectLoadApplier:
         mainWindow.actionFold.setChecked(True)
         mainWindow.imageType = 1
         mainWindow.layoutImg = mainWindow.output.binOutput
+        mainWindow.plotRedrawHelper.invalidateRegionStatistics()
         mainWindow.layoutMax = mainWindow.output.maximumFold
         mainWindow.prepareLayoutImageAndColorBar(
             mainWindow.layoutImg,
@@ -9,6 +9,12 @@ import numpy as np
 from numpy.lib import recfunctions as rfn
 from qgis.PyQt.QtCore import QFile, QIODevice, QTextStream
 
+from .analysis_layout import (
+    ANALYSIS_LAYOUT_COMPACT, ANALYSIS_LAYOUT_INTERLEAVED, AnalysisLayout,
+    CompactRecordEncoder, CompactTraceEncoding, CompactTraceTable,
+    LosslessTraceEncoder, LossyEncodingError, analysisFileDtype,
+    analysisFileShape, analysisViews)
+from .project_store import DEFAULT_CHUNK_BYTES, ChunkedArrayStore
 from .sps_io_and_qc import pntType1
 
 
@@ -40,6 +46,7 @@ class AnalysisMemmapResult:
     memmap: np.memmap | None = None
     an2Output: np.ndarray | None = None
     errorText: str = ''
+    layout: str = ANALYSIS_LAYOUT_INTERLEAVED
 
 
 @dataclass
@@ -65,6 +72,9 @@ class ProjectSidecarLoadResult:
     rmsOffset: np.ndarray | None = None
     gapOffset: np.ndarray | None = None
     cfpOutput: np.ndarray | None = None
+    offsetLimitedFold: np.ndarray | None = None
+    azimuthRichness: np.ndarray | None = None
+    ovtRichness: np.ndarray | None = None
     offstHist: np.ndarray | None = None
     ofAziHist: np.ndarray | None = None
     minimumFold: int = 0
@@ -79,6 +89,7 @@ class ProjectSidecarLoadResult:
     maxOffsetGap: float = 0.0
     analysisFold: int = 0
     analysisMemmapResult: AnalysisMemmapResult | None = None
+    analysisInStore: bool = False                                               # the trace table is still to be unpacked from the project store
     rpsImport: np.ndarray | None = None
     spsImport: np.ndarray | None = None
     xpsImport: np.ndarray | None = None
@@ -88,7 +99,9 @@ class ProjectSidecarLoadResult:
 
 
 class ProjectService:
-    analysisSidecarSuffixes = ('.bin.npy', '.min.npy', '.max.npy', '.rms.npy', '.gap.npy', '.cfp.npy', '.off.npy', '.azi.npy', '.ana.npy')
+    analysisSidecarSuffixes = ('.bin.npy', '.min.npy', '.max.npy', '.rms.npy', '.gap.npy', '.cfp.npy', '.olf.npy', '.azr.npy', '.ovr.npy', '.off.npy', '.azi.npy', '.ana.npy')
+    projectStoreSuffix = '.store'                                              # single compressed container; entries are keyed by sidecar suffix
+    analysisLayoutSuffix = '.ana.json'                                          # on-disk layout of the .ana.npy trace table; missing means interleaved
 
     def readProjectText(self, fileName):
         qFile = QFile(fileName)
@@ -122,6 +135,181 @@ class ProjectService:
     def sidecarExists(self, fileName, suffix):
         return os.path.exists(self.sidecarPath(fileName, suffix))
 
+    def projectStorePath(self, fileName):
+        return fileName + self.projectStoreSuffix
+
+    def openProjectStore(self, fileName):
+        if not fileName:
+            return None
+        return ChunkedArrayStore(self.projectStorePath(fileName))
+
+    def storedSidecarExists(self, fileName, suffix):
+        store = self.openProjectStore(fileName)
+        if store is None or not store.exists():
+            return False
+        try:
+            return store.contains(suffix)
+        except (OSError, ValueError):
+            return False
+
+    def saveProjectStoreSidecars(self, fileName, arrays, archiveAnalysis=False):
+        store = self.openProjectStore(fileName)
+        if store is None:
+            return False
+
+        # the trace table is archived as 38 byte compact records (see CompactTraceEncoding), or as float32 traces when it doesn't fit them.
+        # A trace table in the 'compact' layout is archived as the records its file holds.
+        # A trace table that lives in its memmap file is only archived when the project is closed (archiveAnalysisToStore()),
+        # so the open project doesn't keep a second copy of it in the store. Encoding the table is by far the slowest part of archiving,
+        # so it is also skipped when its memmap file hasn't changed since it was archived.
+        # As the memmap file is removed once it is archived, that archive must be exact: compact records are only used when they
+        # reproduce the table bit for bit, and the table is archived as plain float32 traces otherwise.
+        encoders, sources = {}, {}
+        traces = arrays.get('.ana.npy')
+        if traces is not None:
+            source = self.analysisSource(traces)
+            if source is not None and (not archiveAnalysis or (source == self.storedAnalysisSource(store) and self.storedAnalysisIsExact(store))):
+                arrays = dict(arrays)
+                arrays['.ana.npy'] = None                                       # live memmap, or up to date; store.write() leaves the stored entry in place
+            elif isinstance(traces, CompactTraceTable):
+                arrays = dict(arrays)
+                arrays['.ana.npy'] = traces.records
+                encoders['.ana.npy'] = CompactRecordEncoder(traces.encoding)
+                sources['.ana.npy'] = source
+            else:
+                encoding = CompactTraceEncoding.fromTraceTable(traces)
+                if encoding is not None:
+                    encoders['.ana.npy'] = LosslessTraceEncoder(encoding) if archiveAnalysis else encoding
+                sources['.ana.npy'] = source
+        try:
+            store.write(arrays, encoders=encoders, sources=sources)
+        except LossyEncodingError:
+            del encoders['.ana.npy']                                            # store.write() left the store as it was; store float32 traces instead
+            store.write(arrays, encoders=encoders, sources=sources)
+
+        # loose .npy sidecars take precedence when loading; remove the stale ones that the store now replaces.
+        # The .ana.npy file is left to removeArchivedAnalysis(), as it is the live memory mapped trace table of the open project.
+        for suffix, array in arrays.items():
+            path = self.sidecarPath(fileName, suffix)
+            if array is not None and suffix != '.ana.npy' and os.path.exists(path):
+                os.remove(path)
+        return True
+
+    def archiveAnalysisToStore(self, fileName, traces):
+        """Archive the memmap trace table of a project that is being closed in its project store; see removeArchivedAnalysis()."""
+        if traces is None:
+            return False
+        return self.saveProjectStoreSidecars(fileName, {'.ana.npy': traces}, archiveAnalysis=True)
+
+    def removeArchivedAnalysis(self, fileName):
+        """Remove the loose .ana.npy file (and its layout descriptor) when the project store holds an exact copy of this version of it.
+
+        When the project is opened again, the trace table is unpacked from the store in the background (restoreAnalysisFromStore()).
+        Call this after the memmap has been released; returns False when the file was kept.
+        """
+        path = self.sidecarPath(fileName, '.ana.npy')
+        if not os.path.exists(path):
+            return False
+
+        store = self.openProjectStore(fileName)
+        source = self.storedAnalysisSource(store) if store is not None else None
+        try:
+            stat = os.stat(path)
+            if source is None or source['size'] != stat.st_size or source['mtime'] != stat.st_mtime_ns:
+                return False                                                    # not archived, or changed since; keep the only copy
+            if not self.storedAnalysisIsExact(store):
+                return False                                                    # archived as an approximation; keep the exact table
+            os.remove(path)
+            self.writeAnalysisLayout(fileName, ANALYSIS_LAYOUT_INTERLEAVED)     # removes the descriptor of a column or compact layout file
+        except OSError:
+            return False                                                        # e.g. still mapped by another view on Windows
+        return True
+
+    def analysisSource(self, traces):
+        """Shape, size and modification time of the memmap file behind a trace table; None for a table that only lives in memory."""
+        path = getattr(traces, 'filename', None)
+        if not path or not os.path.exists(path):
+            return None
+        traces.flush()                                                          # pending writes must be in the file's modification time
+        stat = os.stat(path)
+        source = dict(shape=[int(n) for n in traces.shape], size=stat.st_size, mtime=stat.st_mtime_ns)
+        if isinstance(traces, CompactTraceTable):
+            source['layout'] = ANALYSIS_LAYOUT_COMPACT                          # restored as compact records again
+        return source
+
+    def storedAnalysisSource(self, store):
+        """The analysisSource() of the trace table in the project store, when it was archived from a memmap file."""
+        try:
+            return store.arraySource('.ana.npy') if store.exists() and store.contains('.ana.npy') else None
+        except (OSError, ValueError):
+            return None
+
+    def storedAnalysisIsExact(self, store):
+        """True when the trace table in the project store is plain float32, or compact records that were verified to be lossless."""
+        try:
+            encoding = store.arrayEncoding('.ana.npy')
+        except (OSError, ValueError, KeyError):
+            return False
+        return encoding is None or encoding.get('lossless', False) is True
+
+    def restoreAnalysisFromStore(self, fileName):
+        """Unpack the trace table from the project store into a .ana.npy memmap file, streaming chunk by chunk.
+
+        A table that was archived from a 'compact' file is unpacked as compact records; any other as plain float32 traces.
+        """
+        if not self.storedSidecarExists(fileName, '.ana.npy'):
+            return False
+        try:
+            store = self.openProjectStore(fileName)
+            source = self.storedAnalysisSource(store)
+            path = self.sidecarPath(fileName, '.ana.npy')
+            if source is not None and source.get('layout') == ANALYSIS_LAYOUT_COMPACT:
+                encoding = CompactTraceEncoding.fromDict(store.arrayEncoding('.ana.npy'))
+                store.extractToFile('.ana.npy', path, decode=encoding.unpackChunk)
+                self.writeAnalysisLayout(fileName, ANALYSIS_LAYOUT_COMPACT, encoding.toDict())
+            else:
+                store.extractToFile('.ana.npy', path, decode=self.storedAnalysisDecoder(store))
+                self.writeAnalysisLayout(fileName, ANALYSIS_LAYOUT_INTERLEAVED)  # the store holds the trace table in [x, y, fold, column] order
+
+            if source is not None and source['size'] == os.path.getsize(path):
+                os.utime(path, ns=(os.stat(path).st_atime_ns, source['mtime']))  # the unpacked file is what was archived; don't archive it again
+        except (OSError, ValueError, KeyError):
+            return False
+        return True
+
+    def storedAnalysisDecoder(self, store):
+        """Decoder that turns stored trace table chunks back into float32 traces, or None when they are stored as plain float32."""
+        encoding = store.arrayEncoding('.ana.npy')
+        if encoding is None:
+            return None
+        return CompactTraceEncoding.fromDict(encoding).decodeChunk
+
+    def readAnalysisLayout(self, fileName):
+        return self.readAnalysisDescriptor(fileName).layout
+
+    def readAnalysisDescriptor(self, fileName):
+        """The AnalysisLayout descriptor of the .ana.npy trace table; interleaved when it is missing or can't be read."""
+        path = self.sidecarPath(fileName, self.analysisLayoutSuffix)
+        if not os.path.exists(path):
+            return AnalysisLayout()
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return AnalysisLayout.fromJson(f.read())
+        except (OSError, ValueError):
+            return AnalysisLayout()
+
+    def writeAnalysisLayout(self, fileName, layout, encoding=None):
+        path = self.sidecarPath(fileName, self.analysisLayoutSuffix)
+        if layout == ANALYSIS_LAYOUT_INTERLEAVED:
+            if os.path.exists(path):
+                os.remove(path)                                                 # no descriptor is the same as interleaved; keeps old plugin versions happy
+            return True
+
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(AnalysisLayout(layout=layout, encoding=encoding).toJson())
+        return True
+
     def touchSidecar(self, fileName, suffix):
         path = self.sidecarPath(fileName, suffix)
         if not os.path.exists(path):
@@ -139,13 +327,24 @@ class ProjectService:
     def saveArraySidecar(self, fileName, suffix, array):
         if not fileName or array is None:
             return False
-        np.save(self.sidecarPath(fileName, suffix), array)
+
+        # write to a temporary file first and rename it into place, so an interrupted save never leaves a truncated sidecar
+        path = self.sidecarPath(fileName, suffix)
+        tempPath = path + '.tmp'
+        try:
+            with open(tempPath, 'wb') as f:
+                np.save(f, array)
+            os.replace(tempPath, path)
+        except BaseException:
+            if os.path.exists(tempPath):
+                os.remove(tempPath)
+            raise
         return True
 
     def loadArraySidecar(self, fileName, suffix):
         path = self.sidecarPath(fileName, suffix)
         if not os.path.exists(path):
-            return ArraySidecarResult(exists=False, valid=False)
+            return self.loadStoredArraySidecar(fileName, suffix)
 
         try:
             array = np.load(path)
@@ -154,6 +353,17 @@ class ProjectService:
 
         return ArraySidecarResult(exists=True, valid=True, array=array)
 
+    def loadStoredArraySidecar(self, fileName, suffix):
+        if not self.storedSidecarExists(fileName, suffix):
+            return ArraySidecarResult(exists=False, valid=False)
+
+        try:
+            array = self.openProjectStore(fileName).readArray(suffix)
+        except (OSError, ValueError, KeyError) as exc:
+            return ArraySidecarResult(exists=True, valid=False, errorText=str(exc))
+
+        return ArraySidecarResult(exists=True, valid=True, array=array)
+
     def loadSizedArraySidecar(self, fileName, suffix, expectedShape):
         result = self.loadArraySidecar(fileName, suffix)
         if not result.valid:
@@ -182,57 +392,160 @@ class ProjectService:
 
         return ArraySidecarResult(exists=result.exists, valid=True, array=array, errorText=result.errorText)
 
+    def createAnalysisMemmap(self, fileName, shape, layout=ANALYSIS_LAYOUT_INTERLEAVED):
+        """Create a zero filled trace table file with logical shape (nx, ny, fold, 16), stored in the given layout.
+
+        The 'compact' layout is made by compactAnalysisFile() once the table is filled; until then it is stored interleaved.
+        """
+        path = self.sidecarPath(fileName, '.ana.npy')
+        if layout == ANALYSIS_LAYOUT_COMPACT:
+            layout = ANALYSIS_LAYOUT_INTERLEAVED
+        try:
+            fileArray = np.memmap(path, dtype=np.float32, mode='w+', shape=analysisFileShape(shape, layout))
+            self.writeAnalysisLayout(fileName, layout)
+        except (OSError, ValueError) as exc:
+            return AnalysisMemmapResult(success=False, errorText=str(exc), layout=layout)
+
+        memmap, an2Output = analysisViews(fileArray, layout)
+        return AnalysisMemmapResult(success=True, memmap=memmap, an2Output=an2Output, layout=layout)
+
     def openAnalysisMemmap(self, fileName, shape, mode='r+', allowCopyOnWriteFallback=False):
         path = self.sidecarPath(fileName, '.ana.npy')
         if not os.path.exists(path):
             return AnalysisMemmapResult(success=False, errorText='missing-file')
 
+        descriptor = self.readAnalysisDescriptor(fileName)
+        layout = descriptor.layout
+        fileShape = analysisFileShape(shape, layout)
+        if layout == ANALYSIS_LAYOUT_COMPACT:
+            return self._openCompactAnalysisMemmap(path, fileShape, descriptor)
+
         try:
-            memmap = np.memmap(path, dtype=np.float32, mode=mode, shape=shape)
-            an2Output = memmap.reshape(shape[0] * shape[1] * shape[2], shape[3])
-            return AnalysisMemmapResult(success=True, memmap=memmap, an2Output=an2Output)
+            memmap, an2Output = analysisViews(np.memmap(path, dtype=np.float32, mode=mode, shape=fileShape), layout)
+            return AnalysisMemmapResult(success=True, memmap=memmap, an2Output=an2Output, layout=layout)
         except PermissionError as exc:
             if not allowCopyOnWriteFallback or mode != 'r+':
-                return AnalysisMemmapResult(success=False, errorText=str(exc))
+                return AnalysisMemmapResult(success=False, errorText=str(exc), layout=layout)
 
             try:
-                memmap = np.memmap(path, dtype=np.float32, mode='c', shape=shape)
-                an2Output = memmap.reshape(shape[0] * shape[1] * shape[2], shape[3])
+                memmap, an2Output = analysisViews(np.memmap(path, dtype=np.float32, mode='c', shape=fileShape), layout)
             except (OSError, PermissionError, ValueError) as fallbackExc:
-                return AnalysisMemmapResult(success=False, errorText=str(fallbackExc))
+                return AnalysisMemmapResult(success=False, errorText=str(fallbackExc), layout=layout)
 
-            return AnalysisMemmapResult(success=True, memmap=memmap, an2Output=an2Output, errorText=str(exc))
+            return AnalysisMemmapResult(success=True, memmap=memmap, an2Output=an2Output, errorText=str(exc), layout=layout)
         except (OSError, ValueError) as exc:
-            return AnalysisMemmapResult(success=False, errorText=str(exc))
+            return AnalysisMemmapResult(success=False, errorText=str(exc), layout=layout)
 
-    def saveAnalysisSidecars(self, fileName, output, includeHistograms=False):
-        if not fileName:
-            return False
+    def _openCompactAnalysisMemmap(self, path, fileShape, descriptor):
+        # compact records are only read; the table is decoded on the fly and never written after binning
+        try:
+            encoding = CompactTraceEncoding.fromDict(descriptor.encoding)
+            records = np.memmap(path, dtype=analysisFileDtype(descriptor.layout), mode='r', shape=fileShape)
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            return AnalysisMemmapResult(success=False, errorText=str(exc), layout=descriptor.layout)
+
+        memmap, an2Output = analysisViews(records, descriptor.layout, encoding)
+        return AnalysisMemmapResult(success=True, memmap=memmap, an2Output=an2Output, layout=descriptor.layout)
 
-        self.saveArraySidecar(fileName, '.bin.npy', output.binOutput)
-        self.saveArraySidecar(fileName, '.min.npy', output.minOffset)
-        self.saveArraySidecar(fileName, '.max.npy', output.maxOffset)
-        self.saveArraySidecar(fileName, '.rms.npy', output.rmsOffset)
-        self.saveArraySidecar(fileName, '.gap.npy', output.gapOffset)
-        self.saveArraySidecar(fileName, '.cfp.npy', output.cfpOutput)
+    def compactAnalysisFile(self, fileName, shape, chunkBytes=DEFAULT_CHUNK_BYTES):
+        """Convert the float32 trace table that binning filled into the 'compact' layout, and open it.
 
+        The file is converted block by block into a temporary file, that then replaces it. When the table can't be encoded
+        within CompactTraceEncoding.maximumError(), the float32 file is left as it is, and success is False (errorText says why).
+        Release all views on the float32 table first.
+        """
+        path = self.sidecarPath(fileName, '.ana.npy')
+        tempPath = path + '.tmp'
+        source = self.openAnalysisMemmap(fileName, shape, mode='r')
+        if not source.success:
+            return source
+
+        layout = source.layout
+        try:
+            encoding = CompactTraceEncoding.fromTraceTable(source.memmap, chunkBytes)
+            if encoding is None:
+                return AnalysisMemmapResult(success=False, errorText='values do not fit the steps of compact records', layout=layout)
+
+            records = np.memmap(tempPath, dtype=analysisFileDtype(ANALYSIS_LAYOUT_COMPACT), mode='w+', shape=analysisFileShape(shape, ANALYSIS_LAYOUT_COMPACT))
+            chunkRows = max(1, int(chunkBytes // max(source.memmap.itemsize * int(np.prod(shape[1:])), 1)))
+            for start in range(0, shape[0], chunkRows):
+                records[start:start + chunkRows] = encoding.encode(source.memmap[start:start + chunkRows])
+            records.flush()
+            del records, source                                                 # release both files before the rename
+            os.replace(tempPath, path)
+            self.writeAnalysisLayout(fileName, ANALYSIS_LAYOUT_COMPACT, encoding.toDict())
+        except (OSError, ValueError) as exc:                                    # includes LossyEncodingError
+            if os.path.exists(tempPath):
+                os.remove(tempPath)
+            return AnalysisMemmapResult(success=False, errorText=str(exc), layout=layout)
+
+        return self.openAnalysisMemmap(fileName, shape, mode='r')
+
+    def analysisSidecarArrays(self, output, includeHistograms=False):
+        arrays = {
+            '.bin.npy': output.binOutput,
+            '.min.npy': output.minOffset,
+            '.max.npy': output.maxOffset,
+            '.rms.npy': output.rmsOffset,
+            '.gap.npy': output.gapOffset,
+            '.cfp.npy': output.cfpOutput,
+            '.olf.npy': output.offsetLimitedFold,
+            '.azr.npy': output.azimuthRichness,
+            '.ovr.npy': output.ovtRichness,
+        }
         if includeHistograms:
-            self.saveArraySidecar(fileName, '.off.npy', output.offstHist)
-            self.saveArraySidecar(fileName, '.azi.npy', output.ofAziHist)
+            arrays['.off.npy'] = output.offstHist
+            arrays['.azi.npy'] = output.ofAziHist
+        return arrays
+
+    def surveyDataSidecarArrays(self, *, rpsImport=None, spsImport=None, xpsImport=None, recGeom=None, relGeom=None, srcGeom=None):
+        return {
+            '.rps.npy': rpsImport,
+            '.sps.npy': spsImport,
+            '.xps.npy': xpsImport,
+            '.rec.npy': recGeom,
+            '.rel.npy': relGeom,
+            '.src.npy': srcGeom,
+        }
+
+    def saveSidecarArrays(self, fileName, arrays, useProjectStore=False):
+        if not fileName:
+            return False
+
+        if useProjectStore:
+            return self.saveProjectStoreSidecars(fileName, arrays)
 
+        for suffix, array in arrays.items():
+            if suffix != '.ana.npy':                                            # the trace table lives in its own memmap file
+                self.saveArraySidecar(fileName, suffix, array)
         return True
 
-    def saveSurveyDataSidecars(self, fileName, *, rpsImport=None, spsImport=None, xpsImport=None, recGeom=None, relGeom=None, srcGeom=None):
+    def saveAnalysisSidecars(self, fileName, output, includeHistograms=False, useProjectStore=False):
         if not fileName:
             return False
 
-        self.saveArraySidecar(fileName, '.rps.npy', rpsImport)
-        self.saveArraySidecar(fileName, '.sps.npy', spsImport)
-        self.saveArraySidecar(fileName, '.xps.npy', xpsImport)
-        self.saveArraySidecar(fileName, '.rec.npy', recGeom)
-        self.saveArraySidecar(fileName, '.rel.npy', relGeom)
-        self.saveArraySidecar(fileName, '.src.npy', srcGeom)
-        return True
+        arrays = self.analysisSidecarArrays(output, includeHistograms)
+        if useProjectStore:
+            arrays['.ana.npy'] = output.anaOutput
+        return self.saveSidecarArrays(fileName, arrays, useProjectStore)
+
+    def saveSurveyDataSidecars(self, fileName, *, rpsImport=None, spsImport=None, xpsImport=None, recGeom=None, relGeom=None, srcGeom=None, useProjectStore=False):
+        if not fileName:
+            return False
+
+        arrays = self.surveyDataSidecarArrays(rpsImport=rpsImport, spsImport=spsImport, xpsImport=xpsImport, recGeom=recGeom, relGeom=relGeom, srcGeom=srcGeom)
+        return self.saveSidecarArrays(fileName, arrays, useProjectStore)
+
+    def saveProjectSidecars(self, fileName, output, *, includeHistograms=False, rpsImport=None, spsImport=None, xpsImport=None, recGeom=None, relGeom=None, srcGeom=None, useProjectStore=False):
+        """Save the analysis and survey data sidecars of a project together; the project store is updated once."""
+        if not fileName:
+            return False
+
+        arrays = self.analysisSidecarArrays(output, includeHistograms)
+        if useProjectStore:
+            arrays['.ana.npy'] = output.anaOutput
+        arrays.update(self.surveyDataSidecarArrays(rpsImport=rpsImport, spsImport=spsImport, xpsImport=xpsImport, recGeom=recGeom, relGeom=relGeom, srcGeom=srcGeom))
+        return self.saveSidecarArrays(fileName, arrays, useProjectStore)
 
     def _appendMessage(self, result, level, text):
         result.messages.append(SidecarLoadMessage(level=level, text=text))
@@ -337,6 +650,14 @@ class ProjectService:
         elif cfpResult.exists:
             self._appendMessage(result, 'error', 'Loaded : . . . CFP illumination: Wrong dimensions, compared to analysis area - file ignored')
 
+        for suffix, attr, label in (('.olf.npy', 'offsetLimitedFold', 'Offset-limited fold'), ('.azr.npy', 'azimuthRichness', 'Azimuth richness'), ('.ovr.npy', 'ovtRichness', 'OVT richness')):
+            foldClassResult = self.loadSizedArraySidecar(fileName, suffix, (nx, ny))
+            if foldClassResult.valid:
+                setattr(result, attr, foldClassResult.array)
+                self._appendMessage(result, 'info', f'Loaded : . . . {label} map')
+            elif foldClassResult.exists:
+                self._appendMessage(result, 'error', f'Loaded : . . . {label}: Wrong dimensions, compared to analysis area - file ignored')
+
         offResult = self.loadHistogramSidecar(fileName, '.off.npy', 2)
         if offResult.valid:
             result.offstHist = offResult.array
@@ -351,9 +672,29 @@ class ProjectService:
         elif aziResult.exists:
             self._appendMessage(result, 'error', 'Loaded : . . . azi-offset: Wrong dimensions of histogram - file ignored')
 
+        if result.binOutput is not None and not self.sidecarExists(fileName, '.ana.npy') and self.storedSidecarExists(fileName, '.ana.npy'):
+            result.analysisInStore = True                                       # unpacking takes long; done in the background, then see loadAnalysisTraceTable()
+            self._appendMessage(result, 'info', f'Loaded : . . . Analysis &nbsp;: unpacking trace table from project store {self.projectStorePath(fileName)} in the background')
+            return
+
         if result.binOutput is None or not self.sidecarExists(fileName, '.ana.npy'):
             return
 
+        self._loadAnalysisTraceTable(fileName, survey, result)
+
+    def loadAnalysisTraceTable(self, fileName, survey, maximumFold):
+        """Open the .ana.npy trace table of a project, once restoreAnalysisFromStore() has unpacked it.
+
+        Returns a ProjectSidecarLoadResult in which only analysisFold, analysisMemmapResult and messages are filled in.
+        """
+        result = ProjectSidecarLoadResult(dimensions=self.calculateAnalysisDimensions(survey), maximumFold=maximumFold)
+        if self.sidecarExists(fileName, '.ana.npy'):
+            self._loadAnalysisTraceTable(fileName, survey, result)
+        return result
+
+    def _loadAnalysisTraceTable(self, fileName, survey, result):
+        nx = result.dimensions.nx
+        ny = result.dimensions.ny
         fold = survey.grid.fold if survey.grid.fold > 0 else result.maximumFold
         result.analysisFold = fold
         self._appendMessage(result, 'info', f'Analysis load: fold={fold}, maxFold={result.maximumFold}')
@@ -370,6 +711,9 @@ class ProjectService:
             return
 
         bytesPerCol = nx * ny * fold * 4 if (nx and ny and fold) else 0
+        recordBytes = analysisFileDtype(ANALYSIS_LAYOUT_COMPACT).itemsize
+        if self.readAnalysisLayout(fileName) == ANALYSIS_LAYOUT_COMPACT and fileBytes % recordBytes == 0:
+            fileBytes = fileBytes // recordBytes * 16 * 4                       # the size of the same traces in float32 columns
         if bytesPerCol <= 0 or fileBytes % bytesPerCol != 0:
             self._appendMessage(
                 result,
@@ -471,7 +815,7 @@ class ProjectService:
         self._appendMessage(result, 'info', f'Loading: . . . Analysis dims: nx={result.dimensions.nx}, ny={result.dimensions.ny}, binSize=({dx:.3f},{dy:.3f})')
 
         for suffix in self.analysisSidecarSuffixes:
-            exists = self.sidecarExists(fileName, suffix)
+            exists = self.sidecarExists(fileName, suffix) or self.storedSidecarExists(fileName, suffix)
             result.existingSidecars[suffix] = exists
             self._appendMessage(result, 'info', f'Loading: . . . Analysis file: {suffix} exists={exists}')
 
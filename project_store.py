@@ -0,0 +1,366 @@
+# coding=utf-8
+
+import json
+import os
+import struct
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+
+# A project store is a single file that holds a set of named numpy arrays.
+# Each array is split along its first axis into chunks of roughly chunkBytes,
+# and every chunk is compressed independently with zlib (standard library).
+# The file layout is:
+#
+#   [8-byte header magic] [chunk 0] [chunk 1] ... [json index] [8-byte index length] [8-byte footer magic]
+#
+# Updates append their chunks and a new index (with footer) to the end of the file; only the last index counts.
+# The index keeps a count of the bytes that are no longer referenced, and the file is compacted once these
+# outweigh the chunks that are still in use.
+#
+# The appended chunks are synced to disk before the index that refers to them is written. An append that is cut off
+# (e.g. by a crash or a full disk) leaves a tail without a valid footer; readers then scan back to the last complete
+# index, and the next append overwrites the torn tail.
+#
+# Independent chunks allow random access to part of an array (e.g. a few rows
+# of the 4D analysis trace table) without decompressing the whole file.
+#
+# An array can be written through an encoder (an object with encodeChunk(chunk) and toDict()),
+# that converts each chunk of rows to a more compact representation before compression. The
+# encoder's toDict() is kept in the index, so readers can decode the stored chunks again.
+#
+# Finally, a small dict describing the source of an array (e.g. size and modification time of the file it came from)
+# can be kept in the index, so a writer can tell whether the stored copy is still up to date.
+
+STORE_HEADER_MAGIC = b'ROLLSTR1'
+STORE_FOOTER_MAGIC = b'ROLLIDX1'
+STORE_VERSION = 1
+STORE_SCAN_BYTES = 1024 * 1024                                                  # block size when scanning back for the last complete index
+DEFAULT_CHUNK_BYTES = 4 * 1024 * 1024                                           # raw (uncompressed) bytes per chunk
+DEFAULT_COMPRESS_LEVEL = 3                                                      # zlib level; 3 balances speed and ratio for float32 data
+
+
+@dataclass
+class StoreArrayInfo:
+    name: str
+    shape: tuple
+    dtype: np.dtype
+    chunkRows: int
+    chunkCount: int
+    rawBytes: int
+    storedBytes: int
+
+
+class ChunkedArrayStore:
+    """Single-file container with per-chunk zlib compression and random chunk access."""
+
+    def __init__(self, path):
+        self.path = path
+        self._index = None
+        self._indexBytes = 0
+        self._validBytes = 0                                                    # file size up to the footer of the last complete index
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def _readIndex(self):
+        if self._index is not None:
+            return self._index
+
+        if not self.exists():
+            self._index = {'version': STORE_VERSION, 'arrays': {}}
+            self._indexBytes = 0
+            self._validBytes = 0
+            return self._index
+
+        with open(self.path, 'rb') as f:
+            if f.read(len(STORE_HEADER_MAGIC)) != STORE_HEADER_MAGIC:
+                raise ValueError(f'not a project store: {self.path}')
+
+            size = f.seek(0, os.SEEK_END)
+            end, found = size, self._indexEndingAt(f, size)
+            if found is None:
+                end, found = self._scanForIndex(f, size)                        # the tail of an interrupted append
+            if found is None:
+                raise ValueError(f'incomplete project store (missing index): {self.path}')
+            index, indexLength = found
+
+        if index.get('version', 0) > STORE_VERSION:
+            raise ValueError(f'unsupported project store version {index.get("version")}: {self.path}')
+
+        self._index = index
+        self._indexBytes = indexLength + 16                                     # index and footer; unused once a newer index is appended
+        self._validBytes = end
+        return self._index
+
+    def _indexEndingAt(self, f, end):
+        """(index, indexLength) of a complete index whose footer ends at file offset 'end', or None when there is none."""
+        if end < len(STORE_HEADER_MAGIC) + 16:
+            return None
+        f.seek(end - 16)
+        indexLength = struct.unpack('<Q', f.read(8))[0]
+        if f.read(8) != STORE_FOOTER_MAGIC or indexLength > end - 16 - len(STORE_HEADER_MAGIC):
+            return None
+
+        indexStart = end - 16 - indexLength
+        f.seek(indexStart)
+        try:
+            index = json.loads(f.read(indexLength).decode('utf-8'))
+        except (UnicodeDecodeError, ValueError):
+            return None
+        if not isinstance(index, dict) or not isinstance(index.get('arrays'), dict):
+            return None
+        for entry in index['arrays'].values():
+            if any(offset + storedLength > indexStart for offset, storedLength, _ in entry.get('chunks', [])):
+                return None                                                     # refers to chunks that were not completely written
+        return index, indexLength
+
+    def _scanForIndex(self, f, size):
+        """(end, (index, indexLength)) of the last complete index before a torn tail; (size, None) when there is none."""
+        magicBytes = len(STORE_FOOTER_MAGIC)
+        stop = size
+        while stop > len(STORE_HEADER_MAGIC):
+            start = max(len(STORE_HEADER_MAGIC), stop - STORE_SCAN_BYTES)
+            f.seek(start)
+            block = f.read(min(stop + magicBytes - 1, size) - start)           # a footer that straddles 'stop' was not seen yet
+            pos = len(block)
+            while True:
+                pos = block.rfind(STORE_FOOTER_MAGIC, 0, pos + magicBytes - 1)
+                if pos < 0:
+                    break
+                found = self._indexEndingAt(f, start + pos + magicBytes)
+                if found is not None:
+                    return start + pos + magicBytes, found
+            stop = start
+        return size, None
+
+    def names(self):
+        return list(self._readIndex()['arrays'].keys())
+
+    def contains(self, name):
+        return name in self._readIndex()['arrays']
+
+    def arrayInfo(self, name):
+        entry = self._entry(name)
+        return StoreArrayInfo(
+            name=name,
+            shape=tuple(entry['shape']),
+            dtype=np.lib.format.descr_to_dtype(entry['dtype']),
+            chunkRows=entry['chunkRows'],
+            chunkCount=len(entry['chunks']),
+            rawBytes=sum(chunk[2] for chunk in entry['chunks']),
+            storedBytes=sum(chunk[1] for chunk in entry['chunks']),
+        )
+
+    def arrayEncoding(self, name):
+        """The toDict() of the encoder an array was written with, or None for plain arrays."""
+        return self._entry(name).get('encoding')
+
+    def arraySource(self, name):
+        """The source dict an array was written with, or None when it has none."""
+        return self._entry(name).get('source')
+
+    def _entry(self, name):
+        arrays = self._readIndex()['arrays']
+        if name not in arrays:
+            raise KeyError(name)
+        return arrays[name]
+
+    def _readChunkBytes(self, f, entry, chunkIndex):
+        offset, storedLength, rawLength = entry['chunks'][chunkIndex]
+        f.seek(offset)
+        raw = zlib.decompress(f.read(storedLength))
+        if len(raw) != rawLength:
+            raise ValueError(f'corrupt chunk {chunkIndex} in project store: {self.path}')
+        return raw
+
+    def _decodeChunk(self, entry, raw):
+        dtype = np.lib.format.descr_to_dtype(entry['dtype'])
+        shape = tuple(entry['shape'])
+        rows = np.frombuffer(raw, dtype=dtype)
+        if len(shape) == 0:
+            return rows.reshape(())
+        return rows.reshape((-1,) + shape[1:])
+
+    def readChunk(self, name, chunkIndex):
+        entry = self._entry(name)
+        with open(self.path, 'rb') as f:
+            return self._decodeChunk(entry, self._readChunkBytes(f, entry, chunkIndex)).copy()
+
+    def readRows(self, name, start, stop, decode=None):
+        """Read rows [start, stop) along axis 0, decompressing only the chunks that overlap.
+
+        When decode is given, each stored chunk is passed through decode(chunk) before the rows are taken from it.
+        """
+        entry = self._entry(name)
+        shape = tuple(entry['shape'])
+        if len(shape) == 0:
+            return self.readArray(name)
+
+        nRows = shape[0]
+        start = max(0, min(int(start), nRows))
+        stop = max(start, min(int(stop), nRows))
+
+        if stop == start:
+            rows = self._decodeChunk(entry, b'')
+            return decode(rows) if decode is not None else rows
+
+        parts = []
+        chunkRows = entry['chunkRows']
+        with open(self.path, 'rb') as f:
+            for chunkIndex in range(start // chunkRows, (stop - 1) // chunkRows + 1):
+                rows = self._decodeChunk(entry, self._readChunkBytes(f, entry, chunkIndex))
+                if decode is not None:
+                    rows = decode(rows)
+                chunkStart = chunkIndex * chunkRows
+                parts.append(rows[max(start, chunkStart) - chunkStart:min(stop, chunkStart + rows.shape[0]) - chunkStart])
+        return np.concatenate(parts)
+
+    def readArray(self, name):
+        entry = self._entry(name)
+        shape = tuple(entry['shape'])
+        dtype = np.lib.format.descr_to_dtype(entry['dtype'])
+        with open(self.path, 'rb') as f:
+            parts = [self._readChunkBytes(f, entry, i) for i in range(len(entry['chunks']))]
+        return np.frombuffer(b''.join(parts), dtype=dtype).reshape(shape).copy()
+
+    def extractToFile(self, name, path, decode=None):
+        """Stream the raw (C-ordered) bytes of an array to path, one chunk at a time (e.g. to restore a memmap file).
+
+        When decode is given, each stored chunk is passed through decode(chunk) before it is written.
+        """
+        entry = self._entry(name)
+        tempPath = path + '.part'
+        with open(self.path, 'rb') as f, open(tempPath, 'wb') as out:
+            for chunkIndex in range(len(entry['chunks'])):
+                raw = self._readChunkBytes(f, entry, chunkIndex)
+                if decode is not None:
+                    raw = np.ascontiguousarray(decode(self._decodeChunk(entry, raw))).tobytes()
+                out.write(raw)
+        os.replace(tempPath, path)
+        return self.arrayInfo(name)
+
+    def write(self, arrays, chunkBytes=DEFAULT_CHUNK_BYTES, compressLevel=DEFAULT_COMPRESS_LEVEL, encoders=None, sources=None):
+        """Add or replace the given {name: array} entries; entries that are not named are kept unchanged.
+
+        Arrays set to None are skipped, leaving an existing entry in place (same behavior as skipped .npy sidecars).
+        Arrays listed in encoders ({name: encoder}) are stored in encoded form, chunk by chunk.
+        Arrays listed in sources ({name: dict}) keep that dict in the index (see arraySource()).
+        The new chunks and a new index are appended to the file, so unchanged entries are never copied. Replaced chunks
+        and the previous index are left behind as unused bytes; once these outweigh the chunks that are kept, the file is
+        rewritten next to the old one and renamed into place instead. The chunks are synced to disk before the index that
+        refers to them, so a write that is cut off leaves the previous index as the last complete one.
+        """
+        self._index = None                                                      # another store object may have written the file since
+        oldIndex = self._readIndex()
+        if self.exists() and all(array is None for array in arrays.values()):
+            return True                                                         # nothing to add or replace
+
+        replaced = [name for name, array in arrays.items() if array is not None and name in oldIndex['arrays']]
+        keptBytes = sum(chunk[1] for name, entry in oldIndex['arrays'].items() if name not in replaced for chunk in entry['chunks'])
+        unusedBytes = oldIndex.get('unusedBytes', 0) + self._indexBytes + sum(chunk[1] for name in replaced for chunk in oldIndex['arrays'][name]['chunks'])
+
+        if not self.exists() or unusedBytes > keptBytes:
+            self._rewrite(oldIndex, arrays, chunkBytes, compressLevel, encoders or {}, sources or {})
+        else:
+            self._append(oldIndex, unusedBytes, arrays, chunkBytes, compressLevel, encoders or {}, sources or {})
+        return True
+
+    def _rewrite(self, oldIndex, arrays, chunkBytes, compressLevel, encoders, sources):
+        newIndex = {'version': STORE_VERSION, 'arrays': {}}
+        tempPath = self.path + '.tmp'
+
+        try:
+            with open(tempPath, 'wb') as out:
+                out.write(STORE_HEADER_MAGIC)
+
+                if oldIndex['arrays']:
+                    with open(self.path, 'rb') as f:
+                        for name, entry in oldIndex['arrays'].items():
+                            if arrays.get(name) is not None:
+                                continue                                        # to be replaced
+                            chunks = []
+                            for offset, storedLength, rawLength in entry['chunks']:
+                                f.seek(offset)
+                                chunks.append([out.tell(), storedLength, rawLength])
+                                out.write(f.read(storedLength))                 # copy compressed bytes; no recompression
+                            newIndex['arrays'][name] = dict(entry, chunks=chunks)
+
+                self._writeArrays(out, newIndex, arrays, chunkBytes, compressLevel, encoders, sources)
+
+            os.replace(tempPath, self.path)
+            self._validBytes = os.path.getsize(self.path)
+        except BaseException:
+            self._index = None
+            if os.path.exists(tempPath):
+                os.remove(tempPath)
+            raise
+
+    def _append(self, oldIndex, unusedBytes, arrays, chunkBytes, compressLevel, encoders, sources):
+        newIndex = {'version': STORE_VERSION, 'arrays': dict(oldIndex['arrays']), 'unusedBytes': unusedBytes}
+
+        with open(self.path, 'r+b') as out:
+            end = self._validBytes
+            out.truncate(end)                                                   # drop the torn tail of an interrupted append, if any
+            out.seek(end)
+            try:
+                self._writeArrays(out, newIndex, arrays, chunkBytes, compressLevel, encoders, sources)
+            except BaseException:
+                self._index = None
+                out.truncate(end)                                               # the previous index is at the end of the file again
+                raise
+
+    def _writeArrays(self, out, newIndex, arrays, chunkBytes, compressLevel, encoders, sources):
+        for name, array in arrays.items():
+            if array is None:
+                continue
+            newIndex['arrays'][name] = self._writeArray(out, array, chunkBytes, compressLevel, encoders.get(name))
+            if sources.get(name) is not None:
+                newIndex['arrays'][name]['source'] = sources[name]
+
+        out.flush()
+        os.fsync(out.fileno())                                                  # the chunks are on disk before an index refers to them
+
+        indexBytes = json.dumps(newIndex).encode('utf-8')
+        out.write(indexBytes)
+        out.write(struct.pack('<Q', len(indexBytes)))
+        out.write(STORE_FOOTER_MAGIC)
+        out.flush()
+        os.fsync(out.fileno())
+        self._validBytes = out.tell()
+
+        self._index = newIndex
+        self._indexBytes = len(indexBytes) + 16
+
+    def _writeArray(self, out, array, chunkBytes, compressLevel, encoder=None):
+        array = np.asanyarray(array)
+        shape = array.shape
+        rowBytes = array.itemsize * (int(np.prod(shape[1:])) if len(shape) > 1 else 1)
+        chunkRows = max(1, int(chunkBytes // max(rowBytes, 1)))
+        nRows = shape[0] if len(shape) > 0 else 1
+        flat = array.reshape((1,)) if len(shape) == 0 else array
+        dtype = array.dtype
+
+        chunks = []
+        for start in range(0, nRows, chunkRows):
+            chunk = np.ascontiguousarray(flat[start:start + chunkRows])         # only one chunk in RAM at a time (memmap friendly)
+            if encoder is not None:
+                chunk = np.ascontiguousarray(encoder.encodeChunk(chunk))
+                shape = (nRows,) + chunk.shape[1:]
+                dtype = chunk.dtype
+            raw = chunk.tobytes()
+            packed = zlib.compress(raw, compressLevel)
+            chunks.append([out.tell(), len(packed), len(raw)])
+            out.write(packed)
+
+        entry = {
+            'dtype': np.lib.format.dtype_to_descr(dtype),
+            'shape': list(shape),
+            'chunkRows': chunkRows,
+            'codec': 'zlib',
+            'chunks': chunks,
+        }
+        if encoder is not None:
+            entry['encoding'] = encoder.toDict()
+        return entry
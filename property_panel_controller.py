@@ -758,6 +758,9 @@ class PropertyPanelController:
         window.output.cfpOutput = None
         window.output.ofAziHist = None
         window.output.offstHist = None
+        window.output.offsetLimitedFold = None
+        window.output.azimuthRichness = None
+        window.output.ovtRichness = None
 
         window.output.minOffsetGap = 0.0
         window.output.maxOffsetGap = 0.0
@@ -776,7 +779,11 @@ class PropertyPanelController:
             self.window.fileName + '.rms.npy',
             self.window.fileName + '.gap.npy',
             self.window.fileName + '.cfp.npy',
+            self.window.fileName + '.olf.npy',
+            self.window.fileName + '.azr.npy',
+            self.window.fileName + '.ovr.npy',
             self.window.fileName + '.ana.npy',
+            self.window.fileName + '.ana.json',
         ]
 
         try:
@@ -0,0 +1,130 @@
+"""
+In this module rectangular regions of a 2D analysis map (fold, min/max/rms offsets, offset gaps) are summarized quickly.
+
+RegionStatistics is built once per map, and then answers queries for any rectangle of bins:
+  * count, total and mean come from summed-area tables (integral images), in O(1) per query;
+  * min and max come from min/max pyramids that are reduced separately along x and y (a 'ripmap').
+    A rectangle splits into at most 2 log2(nx) x 2 log2(ny) aligned pyramid cells, so a query doesn't depend on its size.
+
+Non-finite values are treated as empty bins, as the offset maps mark bins without traces with +inf or -inf.
+The tables take about 12 times the memory of a 4-byte map.
+
+See: https://en.wikipedia.org/wiki/Summed-area_table
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class RegionStats:
+    count: int = 0                                                              # number of bins holding a (finite) value
+    total: float = 0.0
+    mean: float = np.nan
+    minimum: float = np.nan
+    maximum: float = np.nan
+
+
+def dyadicCells(start: int, stop: int) -> list[tuple[int, int]]:
+    """Aligned pyramid cells (level, index) that exactly cover [start, stop); cell i of level k covers [i * 2**k, (i + 1) * 2**k)."""
+    cells = []
+    level = 0
+    while start < stop:
+        if start & 1:
+            cells.append((level, start))
+            start += 1
+        if stop & 1:
+            stop -= 1
+            cells.append((level, stop))
+        start >>= 1
+        stop >>= 1
+        level += 1
+    return cells
+
+
+def _halve(array: np.ndarray, axis: int, ufunc, fill) -> np.ndarray:
+    # reduce pairs of cells along axis; an odd cell at the end is paired with the identity value of ufunc
+    if array.shape[axis] % 2:
+        padShape = list(array.shape)
+        padShape[axis] = 1
+        array = np.concatenate((array, np.full(padShape, fill, dtype=array.dtype)), axis=axis)
+    if axis == 0:
+        return ufunc(array[0::2, :], array[1::2, :])
+    return ufunc(array[:, 0::2], array[:, 1::2])
+
+
+def _ripmap(base: np.ndarray, ufunc, fill) -> list[list[np.ndarray]]:
+    # pyramid[kx][ky] reduces blocks of 2**kx by 2**ky bins
+    pyramid = []
+    column = base
+    while True:
+        row = [column]
+        while row[-1].shape[1] > 1:
+            row.append(_halve(row[-1], 1, ufunc, fill))
+        pyramid.append(row)
+        if column.shape[0] <= 1:
+            return pyramid
+        column = _halve(column, 0, ufunc, fill)
+
+
+class RegionStatistics:
+    """Summed-area tables and min/max pyramids of a 2D map; the cost of a region query doesn't depend on the size of the region."""
+
+    def __init__(self, image: np.ndarray) -> None:
+        self.image = image
+        self.shape = image.shape
+
+        valid = np.isfinite(image) if np.issubdtype(image.dtype, np.floating) else np.ones(image.shape, dtype=bool)
+        values = np.where(valid, image, 0).astype(np.float64)
+
+        # integral images with a leading row and column of zeros, so sat[x1, y1] - sat[x0, y1] - sat[x1, y0] + sat[x0, y0] sums [x0, x1) x [y0, y1)
+        self._sumTable = np.zeros((self.shape[0] + 1, self.shape[1] + 1), dtype=np.float64)
+        self._sumTable[1:, 1:] = values.cumsum(axis=0).cumsum(axis=1)
+        self._countTable = np.zeros((self.shape[0] + 1, self.shape[1] + 1), dtype=np.int64)
+        self._countTable[1:, 1:] = valid.cumsum(axis=0, dtype=np.int64).cumsum(axis=1)
+
+        if np.issubdtype(image.dtype, np.floating):
+            lowest, highest = -np.inf, np.inf
+        else:
+            lowest, highest = np.iinfo(image.dtype).min, np.iinfo(image.dtype).max
+        self._minPyramid = _ripmap(np.where(valid, image, highest).astype(image.dtype), np.minimum, highest)
+        self._maxPyramid = _ripmap(np.where(valid, image, lowest).astype(image.dtype), np.maximum, lowest)
+
+    @property
+    def nbytes(self) -> int:
+        pyramidBytes = sum(level.nbytes for pyramid in (self._minPyramid, self._maxPyramid) for row in pyramid for level in row)
+        return self._sumTable.nbytes + self._countTable.nbytes + pyramidBytes
+
+    def _clip(self, x0: int, x1: int, y0: int, y1: int) -> tuple[int, int, int, int]:
+        x0 = min(max(int(x0), 0), self.shape[0])
+        x1 = min(max(int(x1), x0), self.shape[0])
+        y0 = min(max(int(y0), 0), self.shape[1])
+        y1 = min(max(int(y1), y0), self.shape[1])
+        return x0, x1, y0, y1
+
+    @staticmethod
+    def _tableSum(table: np.ndarray, x0: int, x1: int, y0: int, y1: int):
+        return table[x1, y1] - table[x0, y1] - table[x1, y0] + table[x0, y0]
+
+    def _reduce(self, pyramid, reduce, x0: int, x1: int, y0: int, y1: int):
+        yCells = dyadicCells(y0, y1)
+        return reduce(pyramid[kx][ky][ix, iy] for kx, ix in dyadicCells(x0, x1) for ky, iy in yCells)
+
+    def count(self, x0: int, x1: int, y0: int, y1: int) -> int:
+        return int(self._tableSum(self._countTable, *self._clip(x0, x1, y0, y1)))
+
+    def total(self, x0: int, x1: int, y0: int, y1: int) -> float:
+        return float(self._tableSum(self._sumTable, *self._clip(x0, x1, y0, y1)))
+
+    def stats(self, x0: int, x1: int, y0: int, y1: int) -> RegionStats:
+        """Statistics of the bins [x0, x1) x [y0, y1); the rectangle is clipped to the map."""
+        x0, x1, y0, y1 = self._clip(x0, x1, y0, y1)
+        count = int(self._tableSum(self._countTable, x0, x1, y0, y1))
+        if count == 0:
+            return RegionStats()
+
+        total = float(self._tableSum(self._sumTable, x0, x1, y0, y1))
+        minimum = self._reduce(self._minPyramid, min, x0, x1, y0, y1)
+        maximum = self._reduce(self._maxPyramid, max, x0, x1, y0, y1)
+        return RegionStats(count=count, total=total, mean=total / count, minimum=float(minimum), maximum=float(maximum))
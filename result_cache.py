@@ -0,0 +1,124 @@
+# coding=utf-8
+
+import dataclasses
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+# request fields that don't change the outcome of a worker run, and are left out of the cache key
+NON_KEY_REQUEST_FIELDS = frozenset(('analysisFile', 'debugpyEnabled', 'includeProfiling', 'geometryKey', 'relationIndex'))
+
+
+def arrayFingerprint(array) -> str:
+    """Content hash of a numpy array, including dtype and shape."""
+    array = np.ascontiguousarray(array)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(array.dtype.descr).encode('utf-8'))
+    digest.update(str(array.shape).encode('utf-8'))
+    digest.update(array.reshape(-1).view(np.uint8))
+    return digest.hexdigest()
+
+
+def _updateDigest(digest, value) -> None:
+    if value is None:
+        digest.update(b'N;')
+    elif isinstance(value, np.ndarray):
+        digest.update(b'A:' + arrayFingerprint(value).encode('ascii') + b';')
+    elif isinstance(value, (str, bytes)):
+        data = value.encode('utf-8') if isinstance(value, str) else value
+        digest.update(b'S%d:' % len(data) + data + b';')
+    elif isinstance(value, (bool, int, float, np.generic)):
+        digest.update(f'V:{type(value).__name__}:{value!r};'.encode('utf-8'))
+    elif isinstance(value, (tuple, list)):
+        digest.update(b'L%d:' % len(value))
+        for item in value:
+            _updateDigest(digest, item)
+    else:
+        digest.update(f'R:{value!r};'.encode('utf-8'))
+
+
+def requestCacheKey(request, arrayKeys=None) -> str:
+    """Canonical hash of a worker request dataclass: survey xml, scalar settings and array fingerprints.
+
+    arrayKeys ({field name: key}) replaces the fingerprint of array fields whose changes are tracked elsewhere, e.g. by an edit
+    revision of the array; hashing large geometry tables then isn't needed.
+    """
+    arrayKeys = arrayKeys or {}
+    digest = hashlib.sha256()
+    digest.update(type(request).__name__.encode('utf-8'))
+    for field in dataclasses.fields(request):
+        if field.name in NON_KEY_REQUEST_FIELDS:
+            continue
+        digest.update(field.name.encode('utf-8'))
+        if arrayKeys.get(field.name):
+            digest.update(b'K:' + arrayKeys[field.name].encode('utf-8') + b';')
+        else:
+            _updateDigest(digest, getattr(request, field.name))
+    return digest.hexdigest()
+
+
+def _copyResult(result):
+    # copy the arrays, so in-place edits of the displayed maps never alter the cached entry
+    changes = {field.name: getattr(result, field.name).copy() for field in dataclasses.fields(result) if isinstance(getattr(result, field.name), np.ndarray)}
+    return dataclasses.replace(result, **changes)
+
+
+def resultSizeBytes(result) -> int:
+    return sum(getattr(result, field.name).nbytes for field in dataclasses.fields(result) if isinstance(getattr(result, field.name), np.ndarray))
+
+
+class ResultCache:
+    """In-memory LRU cache of worker results, keyed by requestCacheKey() and bounded by total array size."""
+
+    def __init__(self, maxBytes: int) -> None:
+        self.maxBytes = max(int(maxBytes), 0)
+        self._entries = OrderedDict()                                           # key -> (result, sizeBytes)
+        self.totalBytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def setMaxBytes(self, maxBytes: int) -> None:
+        self.maxBytes = max(int(maxBytes), 0)
+        self._evict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return _copyResult(entry[0])
+
+    def put(self, key, result) -> bool:
+        sizeBytes = resultSizeBytes(result)
+        if key is None or sizeBytes > self.maxBytes:
+            return False
+
+        self.discard(key)
+        self._entries[key] = (_copyResult(result), sizeBytes)
+        self.totalBytes += sizeBytes
+        self._evict()
+        return True
+
+    def discard(self, key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.totalBytes -= entry[1]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.totalBytes = 0
+
+    def _evict(self) -> None:
+        while self._entries and self.totalBytes > self.maxBytes:
+            _, (_, sizeBytes) = self._entries.popitem(last=False)
+            self.totalBytes -= sizeBytes
@@ -33,6 +33,7 @@ from qgis.PyQt.QtWidgets import QAction
 
 from .app_settings import readStoredDebugpySetting
 from .cursor_utils import clearBusyCursorState
+from .numba_cache import releaseNumbaCache
 
 try:
     haveDebugpy = True
@@ -289,6 +290,7 @@ class Roll:
         for action in self.actions:
             self.iface.removePluginMenu(self.tr('&Roll'), action)
             self.iface.removeToolBarIcon(action)
+        releaseNumbaCache()                                                     # stop claiming kernel caches in the shared QGIS process
 
     # See: https://gis.stackexchange.com/questions/354346/qgis-plugin-with-dockwidget-and-mainwindow
 
@@ -11,7 +11,7 @@ import traceback
 import webbrowser
 import winsound  # make a sound when an exception ocurs
 from contextlib import suppress
-from math import atan2, ceil, degrees
+from math import atan2, ceil, degrees, floor
 
 # PyQtGraph related imports
 import numpy as np  # Numpy functions needed for plot creation
@@ -29,10 +29,6 @@ from qgis.PyQt.QtWidgets import (QAction, QApplication, QFileDialog,
                                  QWidget)
 from qgis.PyQt.QtXml import QDomDocument
 
-# from .aux_functions_numba import (numbaAziInline, numbaAziXline,
-#                                   numbaFilterSlice2D, numbaNdft1D, numbaNdft2D,
-#                                   numbaOffInline, numbaOffsetBin, numbaOffXline,
-#                                   numbaSlice3D, numbaSliceStats)
 from . import aux_functions_numba as fnb
 from . import config  # used to pass initial settings
 from .action_state_controller import ActionStateController
@@ -57,6 +53,7 @@ from .land_wizard import LandSurveyWizard
 from .logging_dock import createLoggingDock
 from .marine_wizard import MarineSurveyWizard
 from .my_parameters import registerAllParameterTypes
+from .numba_cache import configureNumbaCache
 from .plot_navigation_controller import PlotNavigationController
 from .plot_redraw_helper import PlotRedrawHelper
 from .plot_view_state_controller import PlotViewStateController
@@ -92,6 +89,8 @@ from .spider_navigation_mixin import SpiderNavigationMixin
 from .sps_import_dialog import SpsImportDialog
 from .sps_io_and_qc import (convertCrs, exportDataAsTxt, fileExportAsR01,
                             fileExportAsS01, fileExportAsX01)
+from .stack_response_cache import (computeLineScatter, lineScatterKey,
+                                   lineScatterPairs)
 from .stack_response_controller import StackResponseController
 from .survey_paint_mixin import SurveyPaintMixin
 from .xml_code_editor import QCodeEditor, XMLHighlighter
@@ -832,6 +831,7 @@ class RollMainWindow(QMainWindow, FORM_CLASS, SpiderNavigationMixin, SurveyPaint
         self.actionGeometryFromTemplates.triggered.connect(self.createGeometryFromTemplates)
         self.actionCFPPointAnalysisFromTemplates.triggered.connect(self.cfpPointAnalysisFromTemplates)
         self.actionCFPPointAnalysisFromGeometry.triggered.connect(self.cfpPointAnalysisFromGeometryTables)
+        self.actionCFPMultiPointAnalysisFromGeometry.triggered.connect(self.cfpMultiPointAnalysisFromGeometryTables)
         self.actionCFPPointAnalysisFromSPSInput.triggered.connect(self.cfpPointAnalysisFromSpsTables)
         self.actionCFPPlaneAnalysisFromTemplates.triggered.connect(self.cfpPlaneAnalysisFromTemplates)
         self.actionCFPPlaneAnalysisFromGeometry.triggered.connect(self.cfpPlaneAnalysisFromGeometryTables)
@@ -883,6 +883,7 @@ class RollMainWindow(QMainWindow, FORM_CLASS, SpiderNavigationMixin, SurveyPaint
                 self.appendLogMessage('Library: Numba version is not the latest version, consider upgrading to v0.62.1', MsgType.Warning)
             if self.appSettings.useNumba:
                 self.appendLogMessage('Library: Numba is enabled, running in JIT mode')
+                self.appendLogMessage(f'Library: Numba kernels are compiled in the background and cached in {configureNumbaCache()}')
         else:
             self.appendLogMessage('Library: Numba not available, running pure Python code only', MsgType.Warning)
 
@@ -1958,6 +1959,18 @@ class RollMainWindow(QMainWindow, FORM_CLASS, SpiderNavigationMixin, SurveyPaint
         self.imageType = 7
         self.handleImageSelection()
 
+    def onActionOffFTriggered(self):
+        self.imageType = 8
+        self.handleImageSelection()
+
+    def onActionAziRTriggered(self):
+        self.imageType = 9
+        self.handleImageSelection()
+
+    def onActionOvtRTriggered(self):
+        self.imageType = 10
+        self.handleImageSelection()
+
     def _resolveLayoutAnalysisSurface(self, imageType=None):
         imageType = self.imageType if imageType is None else imageType
         if imageType == 0:
@@ -1981,6 +1994,9 @@ class RollMainWindow(QMainWindow, FORM_CLASS, SpiderNavigationMixin, SurveyPaint
             4: dict(imageAttr='rmsOffset', maxAttr='maxRmsOffset', label='rms offset increments', statusLabel='rms offset inc', valueKind='float', fileSuffix='rms', fileExportLabel='rms-offsets', qgisExportLabel='rms-offset map'),          # noqa: E501 # pylint: disable=C0301
             5: dict(imageAttr='gapOffset', maxAttr='maxOffsetGap', label='maximum offset gap', statusLabel='max offset gap', valueKind='float', fileSuffix='gap', fileExportLabel='max-offset gaps', qgisExportLabel='max-offset gap map'),     # noqa: E501 # pylint: disable=C0301
             6: dict(imageAttr='cfpOutput', maxAttr=None, label='Illumination', statusLabel='illumination', valueKind='float', fileSuffix='cfp', fileExportLabel='illumination map', qgisExportLabel='illumination map'),                        # noqa: E501 # pylint: disable=C0301
+            8: dict(imageAttr='offsetLimitedFold', maxAttr=None, label='offset-limited fold', statusLabel='offset-limited fold', valueKind='int', fileSuffix='olf', fileExportLabel='offset-limited fold map', qgisExportLabel='offset-limited fold map'),  # noqa: E501 # pylint: disable=C0301
+            9: dict(imageAttr='azimuthRichness', maxAttr=None, label='azimuth richness', statusLabel='azimuth sectors', valueKind='int', fileSuffix='azr', fileExportLabel='azimuth richness map', qgisExportLabel='azimuth richness map'),          # noqa: E501 # pylint: disable=C0301
+            10: dict(imageAttr='ovtRichness', maxAttr=None, label='OVT richness', statusLabel='OVTs', valueKind='int', fileSuffix='ovr', fileExportLabel='OVT richness map', qgisExportLabel='OVT richness map'),                                     # noqa: E501 # pylint: disable=C0301
         }
 
         if imageType not in surfaceDefinitions:
@@ -2055,8 +2071,8 @@ class RollMainWindow(QMainWindow, FORM_CLASS, SpiderNavigationMixin, SurveyPaint
         if imageData is None:
             return None
 
-        if imageType in (1, 5):
-            # Fold and offset-gap maps use fold-zero bins as no-data.
+        if imageType in (1, 5, 8, 9, 10):
+            # Fold, offset-gap and fold-class maps use fold-zero bins as no-data.
             if self.output.binOutput is not None and self.output.binOutput.shape == np.asarray(imageData).shape:
                 mask = self.output.binOutput == 0
                 if np.any(mask):
@@ -2094,11 +2110,12 @@ class RollMainWindow(QMainWindow, FORM_CLASS, SpiderNavigationMixin, SurveyPaint
         layoutSurface = self._resolveMaskedLayoutAnalysisSurface()
         self.layoutImg = layoutSurface['imageData']
         self.layoutMax = layoutSurface['maxValue']
+        self.plotRedrawHelper.invalidateRegionStatistics()                      # another map, or the same map masked differently
 
-        if self.imageType in (6, 7) and self.layoutImg is not None:
+        if self.imageType in (6, 7, 8, 9, 10) and self.layoutImg is not None:   # maps without a stored maximum
             self.layoutMax = float(np.nanmax(self.layoutImg)) if np.any(np.isfinite(self.layoutImg)) else 1.0
 
-        rounding = 0.01 if self.imageType in (6, 7) else 10.0
+        rounding = 0.01 if self.imageType in (6, 7) else 1.0 if self.imageType in (9, 10) else 10.0
 
         self.prepareLayoutImageAndColorBar(
             self.layoutImg,
@@ -2796,22 +2813,32 @@ class RollMainWindow(QMainWindow, FORM_CLASS, SpiderNavigationMixin, SurveyPaint
         # call is a no-op when the 3D widget isn't currently shown.
         refreshLayout3DFromSurvey(self)
 
+    def getLineScatter(self, surface: str, line: int):
+        """Offset and azimuth scatter data of an in-line ('scatter-inline') or cross-line, from the stack response cache or computed."""
+        unique = self.survey.unique.apply
+        cache = self.plotRedrawHelper.stackResponseCache(self)
+
+        key = lineScatterKey(surface, line, unique)
+        scatter = cache.get(key)
+        if scatter is None:
+            scatter = computeLineScatter(self.output.anaOutput, surface, line, unique)
+            cache.put(key, scatter)
+        return scatter
+
     def plotOffTrk(self, nY: int, stkY: int, ox: float):
         with self.busyCursor():
             plotTitle = f'{self.plotTitles[1]} [line={stkY}]'
             component = self.getSelectedOffsetComponent('OffTrkComponentActionGroup')
 
-            slice3D = self.output.anaOutput[:, nY, :, :]
-            slice2D = slice3D.reshape(slice3D.shape[0] * slice3D.shape[1], slice3D.shape[2])           # convert to 2D
-            slice2D = fnb.numbaFilterSlice2D(slice2D, self.survey.unique.apply)
+            scatter = self.getLineScatter('scatter-inline', nY)
 
             self.offTrkWidget.plotItem.clear()
             self.offTrkWidget.setTitle(plotTitle, color='b', size='16pt')
             self.updateOffsetPlotComponentLabel(self.offTrkWidget, component)
-            if slice2D.shape[0] == 0:                                           # empty array
+            if scatter.shape[0] == 0:                                           # empty array
                 return
 
-            x, y = fnb.numbaOffInline(slice2D, ox, component)
+            x, y = lineScatterPairs(scatter, 1 + component, ox)                 # offset components are in columns 1 - 4
             self.offTrkWidget.plot(x=x, y=y, connect='pairs', pen=pg.mkPen('k', width=2))
 
     def plotOffBin(self, nX: int, stkX: int, oy: float):
@@ -2819,51 +2846,45 @@ class RollMainWindow(QMainWindow, FORM_CLASS, SpiderNavigationMixin, SurveyPaint
             self.offBinWidget.plotItem.clear()
             component = self.getSelectedOffsetComponent('OffBinComponentActionGroup')
 
-            slice3D = self.output.anaOutput[nX, :, :, :]
-            slice2D = slice3D.reshape(slice3D.shape[0] * slice3D.shape[1], slice3D.shape[2])           # convert to 2D
-            slice2D = fnb.numbaFilterSlice2D(slice2D, self.survey.unique.apply)
+            scatter = self.getLineScatter('scatter-xline', nX)
 
             plotTitle = f'{self.plotTitles[2]} [stake={stkX}]'
             self.offBinWidget.setTitle(plotTitle, color='b', size='16pt')
             self.updateOffsetPlotComponentLabel(self.offBinWidget, component)
 
-            if slice2D.shape[0] == 0:                                           # empty array; nothing to see here...
+            if scatter.shape[0] == 0:                                           # empty array; nothing to see here...
                 return
 
-            x, y = fnb.numbaOffXline(slice2D, oy, component)
+            x, y = lineScatterPairs(scatter, 1 + component, oy)
             self.offBinWidget.plot(x=x, y=y, connect='pairs', pen=pg.mkPen('k', width=2))
 
     def plotAziTrk(self, nY: int, stkY: int, ox: float):
         with self.busyCursor():
             self.aziTrkWidget.plotItem.clear()
 
-            slice3D = self.output.anaOutput[:, nY, :, :]
-            slice2D = slice3D.reshape(slice3D.shape[0] * slice3D.shape[1], slice3D.shape[2])           # convert to 2D
-            slice2D = fnb.numbaFilterSlice2D(slice2D, self.survey.unique.apply)
+            scatter = self.getLineScatter('scatter-inline', nY)                 # shared with plotOffTrk()
 
             plotTitle = f'{self.plotTitles[3]} [line={stkY}]'
             self.aziTrkWidget.setTitle(plotTitle, color='b', size='16pt')
 
-            if slice2D.shape[0] == 0:                                           # empty array; nothing to see here...
+            if scatter.shape[0] == 0:                                           # empty array; nothing to see here...
                 return
 
-            x, y = fnb.numbaAziInline(slice2D, ox)
+            x, y = lineScatterPairs(scatter, 5, ox)                             # azimuths are in column 5
             self.aziTrkWidget.plot(x=x, y=y, connect='pairs', pen=pg.mkPen('k', width=2))
 
     def plotAziBin(self, nX: int, stkX: int, oy: float):
         with self.busyCursor():
             self.aziBinWidget.plotItem.clear()
 
-            slice3D = self.output.anaOutput[nX, :, :, :]
-            slice2D = slice3D.reshape(slice3D.shape[0] * slice3D.shape[1], slice3D.shape[2])           # convert to 2D
-            slice2D = fnb.numbaFilterSlice2D(slice2D, self.survey.unique.apply)
+            scatter = self.getLineScatter('scatter-xline', nX)                  # shared with plotOffBin()
 
             plotTitle = f'{self.plotTitles[4]} [stake={stkX}]'
             self.aziBinWidget.setTitle(plotTitle, color='b', size='16pt')
-            if slice2D.shape[0] == 0:                                           # empty array; nothing to see here...
+            if scatter.shape[0] == 0:                                           # empty array; nothing to see here...
                 return
 
-            x, y = fnb.numbaAziXline(slice2D, oy)
+            x, y = lineScatterPairs(scatter, 5, oy)
             self.aziBinWidget.plot(x=x, y=y, connect='pairs', pen=pg.mkPen('k', width=2))
 
     def createAnalysisImageItem(self, imageData, x0: float, y0: float, dx: float, dy: float, levels=(-50.0, 0.0)):
@@ -3046,11 +3067,12 @@ class RollMainWindow(QMainWindow, FORM_CLASS, SpiderNavigationMixin, SurveyPaint
         oR = np.arange(0, oMax, dO)                                             # numpy array with values [0 ... oMax]
 
         if self.output.offstHist is None:
-            offsets, _, noData = fnb.numbaSliceStats(self.output.anaOutput, self.survey.unique.apply)
+            aR = np.array([0.0, 360.0])                                         # a single azimuth sector; only the offset histogram is used
+            _, y, noData = fnb.numbaOffsetAzimuthHistograms(self.output.anaOutput, aR, oR, oR, self.survey.unique.apply)
             if noData:
                 return None
 
-            y, x = np.histogram(offsets, bins=oR)                               # create a histogram with 100m offset increments
+            x = oR
 
             y1 = np.append(y, 0)                                                # add a dummy value to make x- and y-arrays equal size
             self.output.offstHist = np.stack((x, y1))                           # See: https://numpy.org/doc/stable/reference/generated/numpy.stack.html#numpy.stack
@@ -3109,13 +3131,13 @@ class RollMainWindow(QMainWindow, FORM_CLASS, SpiderNavigationMixin, SurveyPaint
         oMax = ceil(self.output.maxMaxOffset / dO) * dO + dO                    # max y-scale; make sure end value is included
 
         if self.output.ofAziHist is None:                                       # calculate offset/azimuth distribution
-            offsets, azimuth, noData = fnb.numbaSliceStats(self.output.anaOutput, self.survey.unique.apply)
+            aR = np.arange(aMin, aMax, dA)                                      # numpy array with values [0 ... fMax]
+            oR = np.arange(0, oMax, dO)                                         # numpy array with values [0 ... oMax]
+            ofAziHist, _, noData = fnb.numbaOffsetAzimuthHistograms(self.output.anaOutput, aR, oR, oR, self.survey.unique.apply)
             if noData:
                 return None
 
-            aR = np.arange(aMin, aMax, dA)                                      # numpy array with values [0 ... fMax]
-            oR = np.arange(0, oMax, dO)                                         # numpy array with values [0 ... oMax]
-            self.output.ofAziHist = np.histogram2d(x=azimuth, y=offsets, bins=[aR, oR], range=None, density=None, weights=None)[0]
+            self.output.ofAziHist = ofAziHist
 
         return {
             'histogram': self.output.ofAziHist,
@@ -3286,13 +3308,44 @@ class RollMainWindow(QMainWindow, FORM_CLASS, SpiderNavigationMixin, SurveyPaint
         pos2 = (pos[0] + pos[1]) / 2.0
         diff = pos[1] - pos[0]
         self.roiLabels[2].setPos(pos2)
-        self.roiLabels[2].setText(f'|r|={diff.length():.2f}, Ø={degrees(atan2(diff.y(), diff.x())):.2f}°')
+        rulerText = f'|r|={diff.length():.2f}, Ø={degrees(atan2(diff.y(), diff.x())):.2f}°'
+        regionText = self._formatRulerRegionStats(pos[0], pos[1])
+        self.roiLabels[2].setText(rulerText if regionText is None else f'{rulerText}\n{regionText}')
         self.rulerState = self.lineROI.saveState()
 
+    def _formatRulerRegionStats(self, point1, point2):
+        """Statistics of the displayed map over the bins of the rectangle spanned by the ruler's end points."""
+        if self.layoutImg is None or self.imageType <= 0 or self.survey is None or self.survey.binTransform is None:
+            return None
+
+        layoutSurface = self._resolveLayoutAnalysisSurface()
+        if layoutSurface['statusLabel'] is None:
+            return None
+
+        toLocTransform, _ = self.survey.glbTransform.inverted()
+        bins = []
+        for point in (point1, point2):
+            localPoint = toLocTransform.map(point) if self.glob else point      # handle positions are pg.Point, i.e. QPointF
+            binPoint = self.survey.binTransform.map(localPoint)
+            bins.append((floor(binPoint.x()), floor(binPoint.y())))
+
+        x0, x1 = sorted((bins[0][0], bins[1][0]))
+        y0, y1 = sorted((bins[0][1], bins[1][1]))
+        stats = self.plotRedrawHelper.regionStatistics(self.layoutImg).stats(x0, x1 + 1, y0, y1 + 1)
+        if stats.count == 0:
+            return None
+
+        label = layoutSurface['statusLabel']
+        if layoutSurface['valueKind'] == 'int':
+            return f'{label}: mean {stats.mean:,.1f}, min {int(stats.minimum):,d}, max {int(stats.maximum):,d}'
+        return f'{label}: mean {stats.mean:.2f}, min {stats.minimum:.2f}, max {stats.maximum:.2f}'
+
     def closeEvent(self, e):  # main window about to be closed event
         # See: https://doc.qt.io/qt-6/qwidget.html#closeEvent
         # See: https://stackoverflow.com/questions/22460003/pyqts-qmainwindow-closeevent-is-never-called
 
+        self.waitForPendingSidecarWrites()                                      # only blocks while background writes are still pending
+
         if self.fileNew():                                                      # file (maybe) saved and cancel NOT used
             self.dockLogging.setFloating(False)                                 # don't keep floating docking widgets hanging araound once closed
             self.dockDisplay.setFloating(False)                                 # don't keep floating docking widgets hanging araound once closed
@@ -3433,6 +3486,9 @@ class RollMainWindow(QMainWindow, FORM_CLASS, SpiderNavigationMixin, SurveyPaint
         self.output.an2Output = None
         self.output.ofAziHist = None
         self.output.offstHist = None
+        self.output.offsetLimitedFold = None
+        self.output.azimuthRichness = None
+        self.output.ovtRichness = None
         self.output.cfpOutput = None
         self.output.cfpOutputIncoherentQc = None
         self.output.cfpSourceBeamImage = None
@@ -3451,6 +3507,9 @@ class RollMainWindow(QMainWindow, FORM_CLASS, SpiderNavigationMixin, SurveyPaint
         self.output.cfpRadonDy = 1.0
         self.output.cfpFrequency = 40.0
         self.output.cfpFocalZ = 0.0
+        self.output.cfpPointSummary = None
+        self.output.cfpResolutionImages = None
+        self.output.cfpRadonAvpImages = None
         if hasattr(self, 'actionIlluminationQcIncoherent'):
             self.actionIlluminationQcIncoherent.setEnabled(False)
         self.output.recGeom = None
@@ -3477,6 +3536,7 @@ class RollMainWindow(QMainWindow, FORM_CLASS, SpiderNavigationMixin, SurveyPaint
 
     def fileNew(self):                                                          # better create new file created through a wizard
         if self.maybeKillThread() and self.maybeSave():                         # make sure thread is killed AND current file  is saved (all only when needed)
+            self.archiveAnalysisOnClose()                                       # with a project store, the trace table moves into the store
             self.resetNumpyArraysAndModels()                                    # empty all arrays and reset plot titles
 
             # start defining new survey
@@ -3639,8 +3699,8 @@ class RollMainWindow(QMainWindow, FORM_CLASS, SpiderNavigationMixin, SurveyPaint
         chunkSize = config.maxRowsPerChunk                                     # Default chunk size from config
 
         if totalRows <= chunkSize:
-            # Dataset is small enough to display directly
-            self.anaModel.setData(self.output.an2Output)
+            # Dataset is small enough to display directly; a compact trace table is decoded once, a float32 table is shown as it is
+            self.anaModel.setData(np.asarray(self.output.an2Output))
             self.appendLogMessage(f'Loaded : . . . Analysis: {totalRows:,} traces displayed in Trace Table')
         else:
             # Create a ChunkedData view object that will handle paging
@@ -3682,21 +3742,24 @@ class RollMainWindow(QMainWindow, FORM_CLASS, SpiderNavigationMixin, SurveyPaint
             self.survey.paintMode = PaintMode.justBlocks
 
     def saveProjectToPath(self, fileName, projectDirectory, commitCurrentPath=False):
+        self.waitForPendingSidecarWrites()                                      # don't race a background write of the same sidecars
         saveResult = self.projectService.writeProjectXml(fileName, self.survey, projectDirectory, self.appSettings.useRelativePaths, 4)
         success = saveResult.success
 
         if success:
             self.appendLogMessage(f'Saved&nbsp;&nbsp;: {fileName}')
 
-            self.projectService.saveAnalysisSidecars(fileName, self.output, includeHistograms=True)
-            self.projectService.saveSurveyDataSidecars(
+            self.projectService.saveProjectSidecars(
                 fileName,
+                self.output,
+                includeHistograms=True,
                 rpsImport=self.rpsImport,
                 spsImport=self.spsImport,
                 xpsImport=self.xpsImport,
                 recGeom=self.recGeom,
                 relGeom=self.relGeom,
                 srcGeom=self.srcGeom,
+                useProjectStore=self.appSettings.useProjectStore,
             )
 
             if commitCurrentPath:
@@ -3715,6 +3778,7 @@ class RollMainWindow(QMainWindow, FORM_CLASS, SpiderNavigationMixin, SurveyPaint
         projectDirectory = os.path.dirname(fileName)                            # retrieve the directory name
 
         self.sessionService.resetTimers()                                       # reset timers for debugging code
+        self.waitForPendingSidecarWrites()                                      # sidecars of the current project must be complete before switching
 
         readResult = self.projectService.readProjectText(fileName)
         if not readResult.success:                                              # report status message and return False
@@ -3723,6 +3787,7 @@ class RollMainWindow(QMainWindow, FORM_CLASS, SpiderNavigationMixin, SurveyPaint
             return False
 
         self.appendLogMessage(f'Opening: {fileName}')                           # send status message
+        self.archiveAnalysisOnClose()                                           # with a project store, the trace table of the current project moves into the store
 
         self.survey = RollSurvey()                                              # reset the survey object; get rid of all blocks in the list !
         self.runtimeState.projectDirectory = projectDirectory
@@ -3772,6 +3837,8 @@ class RollMainWindow(QMainWindow, FORM_CLASS, SpiderNavigationMixin, SurveyPaint
         self._appendProjectSidecarMessages(sidecarResult)
         self.projectLoadApplier.apply(sidecarResult)
         self.handleImageSelection()                                             # change selection and plot survey
+        if sidecarResult.analysisInStore:
+            self.restoreAnalysisInBackground()                                  # the trace table follows once it is unpacked
 
     def _finalizeLoadedProject(self):
         self.spiderPoint = QPoint(-1, -1)                                       # reset the spider location
@@ -17,6 +17,11 @@ class RollOutput:
         self.maxOffset = None                                                   # numpy array with maximum offset
         self.rmsOffset = None                                                   # numpy array with rms offset increments
         self.gapOffset = None                                                   # numpy array with maximum offset gaps
+        self.foldClasses = None                                                 # offset-class, azimuth-sector and OVT fold cubes (FoldClassCubes), while binning
+        self.offsetLimitedFold = None                                           # numpy array with fold within the offset range of the fold classes
+        self.azimuthRichness = None                                             # numpy array with number of azimuth sectors holding traces
+        self.ovtRichness = None                                                 # numpy array with number of offset-vector tiles holding traces
+        self.uniqueSlots = None                                                 # per-bin unique offset/azimuth slot bitsets (UniqueSlotBitsets), while binning
         self.anaOutput = None                                                   # memory mapped numpy trace record array
         self.cfpOutput = None                                                   # coherent 2D illumination map (physics-facing)
         self.cfpOutputIncoherentQc = None                                       # incoherent 2D illumination QC map (diagnostic)
@@ -39,6 +44,9 @@ class RollOutput:
         self.cfpRadonDy = 1.0                                                   # p_y sampling of CFP Radon-domain image [s/m]
         self.cfpFrequency = 40.0                                                # frequency used for the currently displayed CFP beam
         self.cfpFocalZ = 0.0                                                    # z-coordinate used for the currently displayed CFP beam
+        self.cfpPointSummary = None                                             # per focal point counts and SNR of a multi-point CFP analysis
+        self.cfpResolutionImages = None                                         # per focal point resolution functions of a multi-point CFP analysis
+        self.cfpRadonAvpImages = None                                           # per focal point AVP functions of a multi-point CFP analysis
 
         self.recGeom = None                                                     # numpy array with list of receiver locations
         self.srcGeom = None                                                     # numpy array with list of source locations
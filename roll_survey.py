@@ -23,6 +23,7 @@ from . import config
 from .app_settings import getActiveAppSettings
 from .aux_functions import containsPoint3D
 from .enums_and_int_flags import PaintDetails, PaintMode, SeedType, SurveyType
+from .fold_classes import FoldClassCubes, FoldClassSpec
 from .roll_angles import RollAngles
 from .roll_bingrid import RollBinGrid
 from .roll_binning import BinningType, RollBinning
@@ -39,6 +40,7 @@ from .roll_template import RollTemplate
 from .roll_unique import RollUnique
 from .roll_well import RollWellError
 from .sps_io_and_qc import pntType1, relType2
+from .unique_slots import UniqueSlotBitsets
 
 
 @dataclass(frozen=True)
@@ -1570,6 +1572,7 @@ class RollSurvey(pg.GraphicsObject):
                     self.output.minOffset[x, y] = hypArray[idx]
                 if hypArray[idx] > self.output.maxOffset[x, y]:
                     self.output.maxOffset[x, y] = hypArray[idx]
+            self.accumulateFoldClasses(nx, ny, hypArray, aziArray)
             if profileBaseIndex is not None:
                 self.elapsedTime(timer, profileBaseIndex + 1)
             return True
@@ -1581,6 +1584,7 @@ class RollSurvey(pg.GraphicsObject):
         np.add.at(self.output.binOutput, (nx, ny), 1)
         np.minimum.at(self.output.minOffset, (nx, ny), hypArray)
         np.maximum.at(self.output.maxOffset, (nx, ny), hypArray)
+        self.accumulateFoldClasses(nx, ny, hypArray, aziArray)
         if profileBaseIndex is not None:
             self.elapsedTime(timer, profileBaseIndex + 2)
         return True
@@ -1657,6 +1661,48 @@ class RollSurvey(pg.GraphicsObject):
         self.ensurePointArrayLocalCoordinates(self.output.srcGeom, toLocalTransform)
         self.ensurePointArrayLocalCoordinates(self.output.recGeom, toLocalTransform)
 
+    def createFoldClassCubes(self, spec: FoldClassSpec) -> None:
+        """Set up the offset-class, azimuth-sector and OVT fold cubes that binning fills; call after the fold map has been created."""
+        rect = self.offset.rctOffsets
+        offsetRect = (rect.left(), rect.right(), rect.top(), rect.bottom())
+        self.output.foldClasses = FoldClassCubes.create(spec, self.output.binOutput.shape, offsetRect, self.offset.radOffsets.y())
+
+    def createUniqueSlotBitsets(self) -> None:
+        """Set up per-bin bitsets of unique offset/azimuth slots, when unique fold is applied without a trace table (Basic Binning)."""
+        self.output.uniqueSlots = None
+        if not self.unique.apply or self.output.anaOutput is not None:         # Full Binning prunes the trace table instead
+            return
+
+        rect = self.offset.rctOffsets
+        maxOffset = max(math.hypot(x, y) for x in (rect.left(), rect.right()) for y in (rect.top(), rect.bottom()))
+        if self.offset.radOffsets.y() > 0.0:
+            maxOffset = min(maxOffset, self.offset.radOffsets.y())
+        self.output.uniqueSlots = UniqueSlotBitsets.create(self.unique.dOffset, self.unique.aziSlots, self.output.binOutput.shape, maxOffset)
+
+    def calcFoldClassMaps(self) -> None:
+        """Reduce the fold cubes to offset-limited fold, azimuth richness and OVT richness maps, and release the cubes."""
+        if self.output.foldClasses is None:
+            return
+
+        self.output.offsetLimitedFold, self.output.azimuthRichness, self.output.ovtRichness = self.output.foldClasses.foldClassMaps()
+        self.output.foldClasses = None
+
+    def accumulateFoldClasses(self, nx, ny, hypArray, aziArray) -> None:
+        if self.output.foldClasses is not None:
+            self.output.foldClasses.accumulate(nx, ny, hypArray, aziArray)
+        if self.output.uniqueSlots is not None:
+            self.output.uniqueSlots.accumulate(nx, ny, hypArray, aziArray)
+
+    def calcUniqueFoldFromSlots(self) -> bool:
+        """Replace the fold map by the popcount of the unique slot bitsets, and release the bitsets"""
+        if self.output.uniqueSlots is None or self.output.binOutput is None:
+            return False
+
+        self.message.emit('Calc unique fold')
+        self.output.binOutput = self.output.uniqueSlots.uniqueFold()
+        self.output.uniqueSlots = None
+        return True
+
     def finalizeLiveBinningOutputs(self, fullAnalysis) -> None:
         self.calcFoldAndOffsetEssentials()
 
@@ -1666,6 +1712,7 @@ class RollSurvey(pg.GraphicsObject):
             self.calcUniqueFoldValues()
             self.calcOffsetAndAzimuthDistribution()
         else:
+            self.calcUniqueFoldFromSlots()
             self.output.anaOutput = None
 
     def prepareGeometryRelationBinningLookup(self):
@@ -1941,6 +1988,7 @@ class RollSurvey(pg.GraphicsObject):
                         self.output.binOutput[nx, ny] = self.output.binOutput[nx, ny] + 1
                         self.output.minOffset[nx, ny] = min(self.output.minOffset[nx, ny], hypArray[count])
                         self.output.maxOffset[nx, ny] = max(self.output.maxOffset[nx, ny], hypArray[count])
+                        self.accumulateFoldClasses(nx, ny, hypArray[count:count + 1], aziArray[count:count + 1])
 
                     # rather than checking nx, ny & fold, use exception handling to deal with index errors
                     except IndexError:
@@ -2134,6 +2182,7 @@ class RollSurvey(pg.GraphicsObject):
             self.calcUniqueFoldValues()
             self.calcOffsetAndAzimuthDistribution()
         else:
+            self.calcUniqueFoldFromSlots()
             self.output.anaOutput = None
 
         return True
@@ -2217,6 +2266,7 @@ class RollSurvey(pg.GraphicsObject):
             self.calcUniqueFoldValues()
             self.calcOffsetAndAzimuthDistribution()
         else:
+            self.calcUniqueFoldFromSlots()
             self.output.anaOutput = None
 
         return True
@@ -2337,6 +2387,7 @@ class RollSurvey(pg.GraphicsObject):
             self.calcUniqueFoldValues()
             self.calcOffsetAndAzimuthDistribution()
         else:
+            self.calcUniqueFoldFromSlots()
             self.output.anaOutput = None
 
         return True
@@ -2495,6 +2546,7 @@ class RollSurvey(pg.GraphicsObject):
                     self.output.minOffset[x, y] = hypArray[k]
                 if hypArray[k] > self.output.maxOffset[x, y]:
                     self.output.maxOffset[x, y] = hypArray[k]
+            self.accumulateFoldClasses(nx, ny, hypArray, aziArray)
             if profileBaseIndex is not None:
                 self.elapsedTime(timer, profileBaseIndex + 1)
             return True
@@ -2506,6 +2558,7 @@ class RollSurvey(pg.GraphicsObject):
         np.add.at(self.output.binOutput, (nx, ny), 1)
         np.minimum.at(self.output.minOffset, (nx, ny), hypArray)
         np.maximum.at(self.output.maxOffset, (nx, ny), hypArray)
+        self.accumulateFoldClasses(nx, ny, hypArray, aziArray)
         if profileBaseIndex is not None:
             self.elapsedTime(timer, profileBaseIndex + 2)
         return True
@@ -2617,12 +2670,14 @@ class RollSurvey(pg.GraphicsObject):
                 self.output.anaOutput,
                 int(self.grid.fold),
             )
+            self.accumulateFoldClasses(nx, ny, hypArray, aziArray)
             return True
 
         # Fast path: identical to _applyBinUpdatesVectorized's fast path.
         np.add.at(self.output.binOutput, (nx, ny), 1)
         np.minimum.at(self.output.minOffset, (nx, ny), hypArray)
         np.maximum.at(self.output.maxOffset, (nx, ny), hypArray)
+        self.accumulateFoldClasses(nx, ny, hypArray, aziArray)
         return True
 
     def setupBinFromTemplates(self, fullAnalysis) -> bool:
@@ -3456,6 +3511,7 @@ class RollSurvey(pg.GraphicsObject):
                 self.output.anaOutput,
                 int(self.grid.fold),
             )
+            self.accumulateFoldClasses(nx, ny, hypArray, aziArray)
             if profileBaseIndex is not None:
                 self.elapsedTime(timer, profileBaseIndex + 1)
             return True
@@ -3468,6 +3524,7 @@ class RollSurvey(pg.GraphicsObject):
         np.add.at(self.output.binOutput, (nx, ny), 1)
         np.minimum.at(self.output.minOffset, (nx, ny), hypArray)
         np.maximum.at(self.output.maxOffset, (nx, ny), hypArray)
+        self.accumulateFoldClasses(nx, ny, hypArray, aziArray)
         if profileBaseIndex is not None:
             self.elapsedTime(timer, profileBaseIndex + 2)
         return True
@@ -3753,11 +3810,7 @@ class RollSurvey(pg.GraphicsObject):
         if self.output.anaOutput is None:                                       # this array is essential to calculate the distribution
             return False
 
-        self.message.emit('Calc offset/azimuth distribution - 1/2')
-        offsets, azimuth, noData = fnb.numbaSliceStats(self.output.anaOutput, self.unique.apply)
-        if noData:
-            return False
-
+        self.message.emit('Calc offset/azimuth distribution')
         dA = 5.0                                                                # azimuth increments
         dO = 100.0                                                              # offsets increments
 
@@ -3768,13 +3821,14 @@ class RollSurvey(pg.GraphicsObject):
 
         aR = np.arange(aMin, aMax, dA)                                          # numpy array with values [0 ... fMax]
         oR = np.arange(0, oMax, dO)                                             # numpy array with values [0 ... oMax]
-        self.output.ofAziHist = np.histogram2d(x=azimuth, y=offsets, bins=[aR, oR], range=None, density=None, weights=None)[0]
+        x = np.arange(0, oMax, 50.0)                                            # 50 m offset increments for the offset histogram
 
-        self.message.emit('Calc offset/azimuth distribution - 2/2')
-        dO = 50.0                                                               # offsets increments
-        oR = np.arange(0, oMax, dO)                                             # numpy array with values [0 ... oMax]
-        y, x = np.histogram(offsets, bins=oR)                                   # create a histogram with 100m offset increments
+        # both histograms are accumulated in a single pass over the analysis array, block by block, without masks or copies
+        ofAziHist, y, noData = fnb.numbaOffsetAzimuthHistograms(self.output.anaOutput, aR, oR, x, self.unique.apply)
+        if noData:
+            return False
 
+        self.output.ofAziHist = ofAziHist
         y1 = np.append(y, 0)                                                    # add a dummy value to make x- and y-arrays equal size
         self.output.offstHist = np.stack((x, y1))                               # See: https://numpy.org/doc/stable/reference/generated/numpy.stack.html#numpy.stack
 
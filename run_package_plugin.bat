@@ -116,7 +116,7 @@ echo Staging plugin files from "%pluginDir%"
 rem Exclude local tooling, test material, caches, reports, and packaging helpers
 rem that are useful in the repo but should not be uploaded with the plugin.
 robocopy "%pluginDir%" "%stagePluginDir%" /E /R:1 /W:1 /NFL /NDL /NJH /NJS /NP ^
-    /XD .continue .git .github __pycache__ __archive__ .vscode markdown matlab test %pluginDir%\help\source .pytest_cache .mypy_cache ^
+    /XD .continue .git .github __pycache__ __numba_cache__ __archive__ .vscode markdown matlab test %pluginDir%\help\source .pytest_cache .mypy_cache ^
     /XF *.bat *.pyc *.pyo *.bak *.tmp *.orig *.log *.zip *.ppt *.pptx .buildinfo .buildinfo.bak .flake8 Makefile chat.json .gitignore .pylintrc flake8-report.txt pylint-report.txt full_test_output.txt error_message.txt targeted_tests.log test_run.log test_stack_extract.txt >nul
 set "robocopyExit=%ERRORLEVEL%"
 if %robocopyExit% GEQ 8 goto robocopyFailed
@@ -186,6 +186,6 @@ echo   "%sphinxIndex%"
 echo Run run_sphinx_documentation.bat before this script.
 echo.
 echo Excluded by default:
-echo   .git, .github, __pycache__, __archive__, .vscode, markdown, test,
+echo   .git, .github, __pycache__, __numba_cache__, __archive__, .vscode, markdown, test,
 echo   Python cache files, report and log files, existing zip files, and this batch file.
 exit /b 0
\ No newline at end of file
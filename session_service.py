@@ -1,5 +1,6 @@
 # coding=utf-8
 
+import itertools
 from dataclasses import dataclass
 from time import perf_counter
 
@@ -7,6 +8,10 @@ import numpy as np
 from qgis.PyQt.QtWidgets import QApplication
 
 
+# edit revisions are unique across all session states, so an 'attr@revision' key never refers to two different arrays
+_arrayRevisions = itertools.count(1)
+
+
 @dataclass(frozen=True)
 class _PointArraySpec:
     liveEAttr: str
@@ -52,6 +57,9 @@ class SessionService:
         state.clearSurveyArrays()
 
     def refreshArrayState(self, state, arrayAttr):
+        # every change of a session array passes here, also an in-place edit of it; that gives the array a new edit revision
+        state.revisions[arrayAttr] = next(_arrayRevisions)
+
         spec = self._pointArraySpecs.get(arrayAttr)
         if spec is None:
             return
@@ -69,6 +77,18 @@ class SessionService:
                 bound = self._convexHull(liveE, liveN)
             setattr(state, spec.boundAttr, bound)
 
+    def arrayRevisionKey(self, state, array) -> str:
+        """'attr@revision' of a session array, found by identity; '' for an array that isn't (or no longer is) a session array.
+
+        The key changes with every change of the array, so it can stand in for a hash of the array's content.
+        """
+        if array is None:
+            return ''
+        for arrayAttr, revision in state.revisions.items():
+            if getattr(state, arrayAttr) is array:
+                return f'{arrayAttr}@{revision}'
+        return ''
+
     def _getAliveAndDead(self, geom):
         if geom is None or geom.shape[0] == 0:
             return (None, None, None, None)
@@ -1,6 +1,6 @@
 # coding=utf-8
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 import numpy as np
 
@@ -38,6 +38,8 @@ class SessionState:
     rpsBound: np.ndarray | None = None
     spsBound: np.ndarray | None = None
 
+    revisions: dict = field(default_factory=dict)                               # arrayAttr -> edit revision, see SessionService.refreshArrayState()
+
     def clearImportedArrays(self):
         self.rpsImport = None
         self.spsImport = None
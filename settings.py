@@ -28,9 +28,11 @@ except ImportError:
 
 
 from . import config  # used to pass initial settings
+from .analysis_layout import ANALYSIS_LAYOUTS
 from .app_settings import AppSettings
 from .aux_functions import makeParmsFromPen, makePenFromParms
 from .my_range import MyRangeParameter as rng
+from .numba_cache import startNumbaWarmUp
 
 
 def _getAppSettings(self):
@@ -58,6 +60,9 @@ def _applyNumbaSetting(useNumba):
         else:
             importlib.import_module(moduleName)                                 # load it for the first time, which will ensure proper value of numba.config.DISABLE_JIT is being used
 
+    if useNumba:
+        startNumbaWarmUp()                                                      # compile the hot kernels in the background, or load them from numba's disk cache
+
 
 class SettingsDialog(QDialog):
 
@@ -217,6 +222,14 @@ class SettingsDialog(QDialog):
                 children=[
                     dict(name='Beam dimensions', type='myRange', flat=True, expanded=False, value=appSettings.cfpArray, default=appSettings.cfpArray, suffix=' [m]', twoDim=True),
                     dict(name='Radon transform size', type='myInt', value=appSettings.radonSize, default=appSettings.radonSize, suffix=' [points]'),
+                    dict(
+                        name='Beam/Radon evaluation',
+                        type='list',
+                        limits=list(config.CFP_TRANSFORM_MODES),
+                        value=appSettings.cfpTransformMode,
+                        default=appSettings.cfpTransformMode,
+                        tip='"fast" evaluates beam and Radon images as factorized sums and FFTs (same result to float32 rounding).\n"direct" evaluates the explicit sums; much slower on large beam grids.',
+                    ),
                     dict(
                         name='Display cut-off value',
                         type='float',
@@ -240,6 +253,34 @@ class SettingsDialog(QDialog):
                         default=appSettings.cfpRun3x3Diagnostics,
                         tip='Run source/receiver OFF-COH-INC 3x3 diagnostics matrix for CFP illumination.',
                     ),
+                    dict(
+                        name='Adaptive illumination grid',
+                        type='bool',
+                        value=appSettings.cfpAdaptiveGrid,
+                        default=appSettings.cfpAdaptiveGrid,
+                        tip=(
+                            'Compute illumination maps on a coarse grid first, and refine only the tiles where the map is curved to bin resolution.\n'
+                            'The other bins are interpolated; the estimated interpolation error is reported in the Logging pane.'
+                        ),
+                    ),
+                    dict(
+                        name='Adaptive grid tolerance',
+                        type='float',
+                        value=100.0 * appSettings.cfpAdaptiveTolerance,
+                        default=100.0 * appSettings.cfpAdaptiveTolerance,
+                        limits=[0.01, 100.0],
+                        step=0.1,
+                        suffix=' %',
+                        tip='Tiles with an estimated interpolation error above this percentage of the map maximum are computed at bin resolution.',
+                    ),
+                    dict(
+                        name='Multi-point grid size',
+                        type='int',
+                        value=appSettings.cfpBatchGridSize,
+                        default=appSettings.cfpBatchGridSize,
+                        limits=[1, 100],
+                        tip='Multi-point CFP analysis uses the centres of an n x n subdivision of the output area as focal points.',
+                    ),
                 ],
             ),
         ]
@@ -263,6 +304,25 @@ class SettingsDialog(QDialog):
         tip2 = 'Save well file names relative to .roll project file.\nThis makes moving the project folder easier.'
         tip3 = 'Show summary information of underlying parameters in the property pane'
         tip4 = "Show functionality that hasn't been completed yet.\nWork in progress for the developer to finish !"
+        tip5 = (
+            'Save analysis and survey arrays in a single compressed .store file, instead of separate .npy files.\n'
+            'The trace table moves into the store when the project is closed, and is unpacked again when it is opened.\n'
+            'This reduces disk space and copy times on network shares.'
+        )
+        tip6 = 'Keep results of earlier binning and CFP runs in memory, up to this size.\nRe-running an identical request then returns instantly. Use 0 to disable.'
+        tip7 = 'Keep in-line and cross-line stack responses in memory, up to this size.\nThe lines around the spider are computed ahead in the background. Use 0 to disable.'
+        tip8 = (
+            'Storage of the trace table used by the full analysis. Applies to the next binning run.\n'
+            '"interleaved" keeps all fields of a trace together; "columns" stores each field contiguously,\n'
+            'which speeds up offset/azimuth statistics and histograms on large projects, at the cost of slower binning writes.\n'
+            '"compact" converts the table to 38-byte quantized records after binning (60% of the size, read-only). Coordinates and offsets\n'
+            'use 1 cm steps (coarser on very large surveys), azimuths 0.01 degree steps; every value decodes to within half a step.\n'
+            'A table that doesn\'t fit these records stays "interleaved".'
+        )
+        tip9 = 'Split the fold of each bin in offset classes of this width while binning, also in Basic Binning.\nNeeded for offset-limited fold maps. Uses 4 bytes per bin per class. Use 0 to disable.'
+        tip10 = 'Split the fold of each bin in this number of azimuth sectors while binning, also in Basic Binning.\nNeeded for azimuth richness maps. Uses 4 bytes per bin per sector. Use 0 to disable.'
+        tip11 = 'Split the fold of each bin in offset-vector tiles (OVTs) of this size while binning, also in Basic Binning.\nNeeded for OVT richness maps. Uses 4 bytes per bin per tile. Use 0 to disable.'
+        tip12 = 'Offset range of the offset-limited fold map, derived from the offset classes.\nA maximum offset of 0 means no upper limit.'
 
         misParams = [
             dict(
@@ -273,6 +333,16 @@ class SettingsDialog(QDialog):
                     dict(name='Use Numba', type='bool', value=useNumba, default=useNumba, enabled=haveNumba, tip=tip1),
                     dict(name='Use experimental code', type='bool', value=appSettings.useExperimental, default=appSettings.useExperimental, enabled=True, tip=tip4),
                     dict(name='Use relative paths', type='bool', value=appSettings.useRelativePaths, default=appSettings.useRelativePaths, enabled=True, tip=tip2),
+                    dict(name='Use compressed project store', type='bool', value=appSettings.useProjectStore, default=appSettings.useProjectStore, enabled=True, tip=tip5),
+                    dict(name='Result cache size', type='myInt', value=appSettings.resultCacheSizeMB, default=appSettings.resultCacheSizeMB, limits=[0, 65536], suffix=' [MB]', tip=tip6),
+                    dict(name='Stack response cache size', type='myInt', value=appSettings.stackResponseCacheSizeMB, default=appSettings.stackResponseCacheSizeMB, limits=[0, 65536], suffix=' [MB]', tip=tip7),
+                    dict(name='Offset class width', type='float', value=appSettings.foldOffsetClassWidth, default=appSettings.foldOffsetClassWidth, limits=[0.0, 100000.0], step=50.0, suffix=' [m]', tip=tip9),
+                    dict(name='Azimuth sectors', type='int', value=appSettings.foldAzimuthSectors, default=appSettings.foldAzimuthSectors, limits=[0, 360], tip=tip10),
+                    dict(name='OVT x-size', type='float', value=appSettings.foldOvtSizeX, default=appSettings.foldOvtSizeX, limits=[0.0, 100000.0], step=50.0, suffix=' [m]', tip=tip11),
+                    dict(name='OVT y-size', type='float', value=appSettings.foldOvtSizeY, default=appSettings.foldOvtSizeY, limits=[0.0, 100000.0], step=50.0, suffix=' [m]', tip=tip11),
+                    dict(name='Fold min offset', type='float', value=appSettings.foldMinOffset, default=appSettings.foldMinOffset, limits=[0.0, 100000.0], step=100.0, suffix=' [m]', tip=tip12),
+                    dict(name='Fold max offset', type='float', value=appSettings.foldMaxOffset, default=appSettings.foldMaxOffset, limits=[0.0, 100000.0], step=100.0, suffix=' [m]', tip=tip12),
+                    dict(name='Trace table layout', type='list', limits=list(ANALYSIS_LAYOUTS), value=appSettings.analysisLayout, default=appSettings.analysisLayout, tip=tip8),
                     dict(name='Show summary properties', type='bool', value=appSettings.showSummaries, default=appSettings.showSummaries, enabled=True, tip=tip3),
                 ],
             ),
@@ -399,9 +469,13 @@ class SettingsDialog(QDialog):
         # cfp analysis settings
         appSettings.cfpArray = CFP.child('Beam dimensions').value()
         appSettings.radonSize = CFP.child('Radon transform size').value()
+        appSettings.cfpTransformMode = CFP.child('Beam/Radon evaluation').value()
         appSettings.cfpDisplayCutoffFraction = 0.01 * CFP.child('Display cut-off value').value()
         appSettings.cfpIncoherentQc = CFP.child('Incoherent illumination QC').value()
         appSettings.cfpRun3x3Diagnostics = CFP.child('Run 3x3 src & rec QC').value()
+        appSettings.cfpAdaptiveGrid = CFP.child('Adaptive illumination grid').value()
+        appSettings.cfpAdaptiveTolerance = 0.01 * CFP.child('Adaptive grid tolerance').value()
+        appSettings.cfpBatchGridSize = CFP.child('Multi-point grid size').value()
 
         # debug settings
         # See: https://stackoverflow.com/questions/8391411/how-to-block-calls-to-print
@@ -411,6 +485,16 @@ class SettingsDialog(QDialog):
         # miscellaneous settings
         appSettings.useNumba = MIS.child('Use Numba').value()
         appSettings.useRelativePaths = MIS.child('Use relative paths').value()  # save well file names relative to .roll project file
+        appSettings.useProjectStore = MIS.child('Use compressed project store').value()  # save sidecar arrays in a single compressed file
+        appSettings.resultCacheSizeMB = MIS.child('Result cache size').value()  # in-memory cache of earlier worker results
+        appSettings.stackResponseCacheSizeMB = MIS.child('Stack response cache size').value()  # in-memory cache of stack responses
+        appSettings.foldOffsetClassWidth = MIS.child('Offset class width').value()  # fold cubes accumulated while binning
+        appSettings.foldAzimuthSectors = MIS.child('Azimuth sectors').value()
+        appSettings.foldOvtSizeX = MIS.child('OVT x-size').value()
+        appSettings.foldOvtSizeY = MIS.child('OVT y-size').value()
+        appSettings.foldMinOffset = MIS.child('Fold min offset').value()
+        appSettings.foldMaxOffset = MIS.child('Fold max offset').value()
+        appSettings.analysisLayout = MIS.child('Trace table layout').value()   # on-disk layout of the next trace table
         appSettings.useExperimental = MIS.child('Use experimental code').value()  # use "work in progress" paths
         appSettings.showSummaries = MIS.child('Show summary properties').value()
 
@@ -566,9 +650,15 @@ def readSettings(self):
     # cfp analysis information
     appSettings.cfpArray = rng.read(self.settings.value('settings/cfp/cfpArray', '-800;800;12.5'))
     appSettings.radonSize = self.settings.value('settings/cfp/radonSize', 128, type=int)
+    appSettings.cfpTransformMode = self.settings.value('settings/cfp/cfpTransformMode', config.cfpTransformMode)
+    if appSettings.cfpTransformMode not in config.CFP_TRANSFORM_MODES:
+        appSettings.cfpTransformMode = config.cfpTransformMode
     appSettings.cfpDisplayCutoffFraction = self.settings.value('settings/cfp/cfpDisplayCutoffFraction', config.cfpDisplayCutoffFraction, type=float)
     appSettings.cfpIncoherentQc = self.settings.value('settings/cfp/cfpIncoherentQc', config.cfpIncoherentQc, type=bool)
     appSettings.cfpRun3x3Diagnostics = self.settings.value('settings/cfp/cfpRun3x3Diagnostics', config.cfpRun3x3Diagnostics, type=bool)
+    appSettings.cfpAdaptiveGrid = self.settings.value('settings/cfp/cfpAdaptiveGrid', config.cfpAdaptiveGrid, type=bool)
+    appSettings.cfpAdaptiveTolerance = self.settings.value('settings/cfp/cfpAdaptiveTolerance', config.cfpAdaptiveTolerance, type=float)
+    appSettings.cfpBatchGridSize = self.settings.value('settings/cfp/cfpBatchGridSize', config.cfpBatchGridSize, type=int)
 
     # debug information
     # See: https://forum.qt.io/topic/108622/how-to-get-a-boolean-value-from-qsettings-correctly/8
@@ -578,6 +668,18 @@ def readSettings(self):
     # miscellaneous information
     appSettings.useNumba = self.settings.value('settings/misc/useNumba', False, type=bool)
     appSettings.useRelativePaths = self.settings.value('settings/misc/useRelativePaths', True, type=bool)
+    appSettings.useProjectStore = self.settings.value('settings/misc/useProjectStore', config.useProjectStore, type=bool)
+    appSettings.resultCacheSizeMB = self.settings.value('settings/misc/resultCacheSizeMB', config.resultCacheSizeMB, type=int)
+    appSettings.stackResponseCacheSizeMB = self.settings.value('settings/misc/stackResponseCacheSizeMB', config.stackResponseCacheSizeMB, type=int)
+    appSettings.foldOffsetClassWidth = self.settings.value('settings/misc/foldOffsetClassWidth', config.foldOffsetClassWidth, type=float)
+    appSettings.foldAzimuthSectors = self.settings.value('settings/misc/foldAzimuthSectors', config.foldAzimuthSectors, type=int)
+    appSettings.foldOvtSizeX = self.settings.value('settings/misc/foldOvtSizeX', config.foldOvtSizeX, type=float)
+    appSettings.foldOvtSizeY = self.settings.value('settings/misc/foldOvtSizeY', config.foldOvtSizeY, type=float)
+    appSettings.foldMinOffset = self.settings.value('settings/misc/foldMinOffset', config.foldMinOffset, type=float)
+    appSettings.foldMaxOffset = self.settings.value('settings/misc/foldMaxOffset', config.foldMaxOffset, type=float)
+    appSettings.analysisLayout = self.settings.value('settings/misc/analysisLayout', config.analysisLayout)
+    if appSettings.analysisLayout not in ANALYSIS_LAYOUTS:
+        appSettings.analysisLayout = config.analysisLayout
     appSettings.useExperimental = self.settings.value('settings/misc/useExperimental', config.DEFAULT_USE_EXPERIMENTAL, type=bool)
     appSettings.showSummaries = self.settings.value('settings/misc/showSummaries', config.DEFAULT_SHOW_SUMMARIES, type=bool)
 
@@ -655,9 +757,13 @@ def writeSettings(self):
     # cfp analysis information
     self.settings.setValue('settings/cfp/cfpArray', rng.write(appSettings.cfpArray))
     self.settings.setValue('settings/cfp/radonSize', appSettings.radonSize)
+    self.settings.setValue('settings/cfp/cfpTransformMode', appSettings.cfpTransformMode)
     self.settings.setValue('settings/cfp/cfpDisplayCutoffFraction', appSettings.cfpDisplayCutoffFraction)
     self.settings.setValue('settings/cfp/cfpIncoherentQc', appSettings.cfpIncoherentQc)
     self.settings.setValue('settings/cfp/cfpRun3x3Diagnostics', appSettings.cfpRun3x3Diagnostics)
+    self.settings.setValue('settings/cfp/cfpAdaptiveGrid', appSettings.cfpAdaptiveGrid)
+    self.settings.setValue('settings/cfp/cfpAdaptiveTolerance', appSettings.cfpAdaptiveTolerance)
+    self.settings.setValue('settings/cfp/cfpBatchGridSize', appSettings.cfpBatchGridSize)
 
     # debug information
     self.settings.setValue('settings/debug/logging', appSettings.debug)
@@ -666,6 +772,16 @@ def writeSettings(self):
     # miscellaneous information
     self.settings.setValue('settings/misc/useNumba', appSettings.useNumba)
     self.settings.setValue('settings/misc/useRelativePaths', appSettings.useRelativePaths)
+    self.settings.setValue('settings/misc/useProjectStore', appSettings.useProjectStore)
+    self.settings.setValue('settings/misc/resultCacheSizeMB', appSettings.resultCacheSizeMB)
+    self.settings.setValue('settings/misc/stackResponseCacheSizeMB', appSettings.stackResponseCacheSizeMB)
+    self.settings.setValue('settings/misc/foldOffsetClassWidth', appSettings.foldOffsetClassWidth)
+    self.settings.setValue('settings/misc/foldAzimuthSectors', appSettings.foldAzimuthSectors)
+    self.settings.setValue('settings/misc/foldOvtSizeX', appSettings.foldOvtSizeX)
+    self.settings.setValue('settings/misc/foldOvtSizeY', appSettings.foldOvtSizeY)
+    self.settings.setValue('settings/misc/foldMinOffset', appSettings.foldMinOffset)
+    self.settings.setValue('settings/misc/foldMaxOffset', appSettings.foldMaxOffset)
+    self.settings.setValue('settings/misc/analysisLayout', appSettings.analysisLayout)
     self.settings.setValue('settings/misc/useExperimental', appSettings.useExperimental)
     self.settings.setValue('settings/misc/showSummaries', appSettings.showSummaries)
 
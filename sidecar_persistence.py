@@ -0,0 +1,129 @@
+# coding=utf-8
+
+import queue
+import threading
+from dataclasses import dataclass, field
+
+import numpy as np
+from qgis.PyQt.QtCore import QObject, pyqtSignal
+
+
+@dataclass
+class SidecarWriteJob:
+    fileName: str
+    arrays: dict[str, object] = field(default_factory=dict)                    # {sidecar suffix: array}; None entries are skipped
+    useProjectStore: bool = False
+    label: str = 'sidecars'
+    restoreAnalysis: bool = False                                               # unpack the trace table from the project store instead of writing arrays
+
+
+class SidecarPersistenceQueue(QObject):
+    """Writes project sidecars on a background thread, one job at a time, in submission order.
+
+    Each sidecar is written to a temporary file and renamed into place by ProjectService,
+    so an interrupted write never leaves a truncated file behind. Signals are emitted from
+    the writer thread; Qt queues them to the receiving (GUI) thread.
+
+    A restoreAnalysis job unpacks the trace table of an opened project from its project store, so
+    the GUI doesn't wait for it; it reports through analysisRestored instead of jobFinished.
+    """
+
+    progress = pyqtSignal(str)                                                  # status bar text
+    jobFinished = pyqtSignal(str, bool, str)                                    # label, success, error text
+    analysisRestored = pyqtSignal(str, bool, str)                               # project file name, success, error text
+
+    def __init__(self, projectService, parent=None):
+        super().__init__(parent)
+        self.projectService = projectService
+        self._jobs = queue.Queue()
+        self._pendingCount = 0
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def snapshotArrays(self, arrays):
+        # the GUI may edit geometry tables in place while the writer runs; copy in-memory arrays.
+        # Memory mapped arrays (the trace table) are file backed and are referenced, not copied.
+        snapshot = {}
+        for suffix, array in arrays.items():
+            if isinstance(array, np.ndarray) and not isinstance(array, np.memmap):
+                array = array.copy()
+            snapshot[suffix] = array
+        return snapshot
+
+    def enqueue(self, job: SidecarWriteJob):
+        job.arrays = self.snapshotArrays(job.arrays)
+
+        with self._condition:
+            self._pendingCount += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._startWriter()
+
+        self._jobs.put(job)
+
+    def hasPendingWrites(self):
+        with self._condition:
+            return self._pendingCount > 0
+
+    def waitUntilIdle(self, timeout=None):
+        """Block until all queued jobs have been written; returns False when the timeout expired first."""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._pendingCount == 0, timeout=timeout)
+
+    def _startWriter(self):
+        # call with self._condition held
+        self._thread = threading.Thread(target=self._run, name='RollSidecarWriter', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while True:
+                try:
+                    job = self._jobs.get(timeout=1.0)
+                except queue.Empty:
+                    with self._condition:
+                        if self._pendingCount == 0:
+                            return
+                    continue
+
+                success, errorText = False, 'sidecar writer failed'
+                try:
+                    success, errorText = self._writeJob(job)
+                finally:
+                    with self._condition:                                       # always account for the job, or waitUntilIdle() never returns
+                        self._pendingCount -= 1
+                        self._condition.notify_all()
+
+                if job.restoreAnalysis:
+                    self.analysisRestored.emit(job.fileName, success, errorText)
+                else:
+                    self.jobFinished.emit(job.label, success, errorText)
+        finally:
+            with self._condition:
+                if self._thread is threading.current_thread():
+                    self._thread = None
+                    if self._pendingCount > 0:                                  # left by an unexpected error; keep serving the queue
+                        self._startWriter()
+
+    def _writeJob(self, job):
+        try:
+            if job.restoreAnalysis:
+                self.progress.emit(f'Unpacking {job.label} from project store ...')
+                if not self.projectService.restoreAnalysisFromStore(job.fileName):
+                    return False, f'cannot unpack {job.label} from {self.projectService.projectStorePath(job.fileName)}'
+                return True, ''
+
+            if job.useProjectStore:
+                self.progress.emit(f'Saving {job.label} to project store ...')
+                self.projectService.saveSidecarArrays(job.fileName, job.arrays, useProjectStore=True)
+                return True, ''
+
+            suffixes = [suffix for suffix, array in job.arrays.items() if array is not None and suffix != '.ana.npy']
+            for i, suffix in enumerate(suffixes):
+                self.progress.emit(f'Saving {job.label}: {i + 1}/{len(suffixes)} ({suffix}) ...')
+                self.projectService.saveArraySidecar(job.fileName, suffix, job.arrays[suffix])
+        except (OSError, ValueError) as exc:
+            return False, str(exc)
+        except Exception as exc:                                                # e.g. MemoryError or an encoding error in the store; report, don't kill the writer
+            return False, f'{type(exc).__name__}: {exc}'
+
+        return True, ''
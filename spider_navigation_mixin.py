@@ -28,6 +28,8 @@ from qgis.PyQt.QtWidgets import QApplication, QMessageBox
 
 # from .aux_functions_numba import numbaSpiderBin
 from . import aux_functions_numba as fnb
+from . import config
+from .bin_slice_cache import prefetchBinOrder
 from .enums_and_int_flags import Direction, MsgType
 
 
@@ -98,6 +100,7 @@ class SpiderNavigationMixin:
             self.updateVisiblePlotWidget(plotIndex, direction=direction)
 
         self._syncTraceTableSelection(nX, nY, fold)
+        self._prefetchSpiderNeighbours(direction, step, nX, nY)
 
     # Helpers -------------------------------------------------------------
 
@@ -130,7 +133,7 @@ class SpiderNavigationMixin:
             return
 
         if fold > 0:
-            slice2d = self.output.anaOutput[nX, nY, 0:fold, :]
+            slice2d = self.plotRedrawHelper.binSliceCache(self).binSlice(self.output.anaOutput, nX, nY)[0:fold, :]
             legs = self._spiderLegArrays(slice2d)
             (
                 self.spiderSrcX,
@@ -209,6 +212,21 @@ class SpiderNavigationMixin:
         spiderRecZ[0::2] = slice2d[:, 8]; spiderRecZ[1::2] = slice2d[:, 11]     # noqa: E702
         return spiderSrcX, spiderSrcY, spiderSrcZ, spiderRecX, spiderRecY, spiderRecZ
 
+    def _prefetchSpiderNeighbours(self, direction: Direction, step: int, nX: int, nY: int) -> None:
+        """Read the bins ahead of the spider, its direct neighbours and, if needed, the next trace table chunk in the background."""
+        dX, dY = {Direction.Rt: (step, 0), Direction.Lt: (-step, 0), Direction.Up: (0, step), Direction.Dn: (0, -step)}.get(direction, (0, 0))
+        xAna, yAna, zFold, _ = self.output.anaOutput.shape
+        bins = prefetchBinOrder(nX, nY, dX, dY, xAna, yAna, config.binSlicePrefetchBins)
+
+        chunked, chunkIndex = self.anaModel.getChunkedData(), -1
+        if bins and chunked is not None:
+            aheadX, aheadY = bins[0]
+            chunkIndex = self.anaModel.chunkIndexOfRow((aheadX * yAna + aheadY) * zFold)
+            if chunkIndex == chunked.currentChunk:
+                chunked, chunkIndex = None, -1
+
+        self.plotRedrawHelper.binSliceCache(self).prefetch(self.output.anaOutput, bins, chunked, chunkIndex)
+
     def _syncTraceTableSelection(self, nX: int, nY: int, fold: int) -> None:
         sizeY = self.output.anaOutput.shape[1]
         maxFold = self.output.anaOutput.shape[2]
@@ -239,7 +257,7 @@ class SpiderNavigationMixin:
 
         if chunked.currentChunk != targetChunk and chunked.gotoChunk(targetChunk):
             self.anaModel.layoutAboutToBeChanged.emit()
-            self.anaModel._data = np.copy(chunked.getCurrentChunk())
+            self.anaModel._data = self.plotRedrawHelper.binSliceCache(self).chunk(chunked, targetChunk)
             self.anaModel.layoutChanged.emit()
             self._updatePageInfo()
 
@@ -0,0 +1,91 @@
+"""
+In this module the in-line and cross-line stack responses of the analysis cube are cached, and computed ahead of time.
+
+A stack response covers a complete line of bins: an in-line response is computed from anaOutput[:, nY, :, :],
+a cross-line response from anaOutput[nX, :, :, :]. Responses are kept in a LRU cache that is bounded by their total size,
+and keyed by stackResponseKey(), i.e. by the surface, the line and the settings the response depends on.
+
+After a line has been shown, a background thread computes the responses of the lines around it that aren't cached yet,
+first those ahead in the direction of travel. Stepping through the lines with the spider then mostly reads from memory.
+
+The GUI computes a response with the parallel numbaNdft1D(), the prefetch thread with numbaNdft1DSerial(). Numba's default
+threading layer aborts when parallel kernels are launched concurrently from different threads, and the GUI launches other
+parallel kernels (Kxy responses, offset/azimuth histograms) while lines are prefetched.
+
+The same cache holds the scatter data of the offset and azimuth plots along a line (computeLineScatter()), keyed by
+lineScatterKey(). One read of the line serves both its offset and azimuth plot, for any offset component and spider size.
+"""
+
+import threading
+from functools import partial
+
+import numpy as np
+
+from . import aux_functions_numba as fnb
+from .array_lru_cache import ArrayLruCache
+
+
+def stackResponseKey(surface: str, line: int, unique: bool, kMax: float, dK: float) -> tuple:
+    return (surface, int(line), bool(unique), float(kMax), float(dK))
+
+
+def stackResponseLineCount(anaOutput: np.ndarray, surface: str) -> int:
+    """Number of lines a stack response can be computed for; in-lines run along axis 1, cross-lines along axis 0."""
+    return int(anaOutput.shape[1] if surface == 'stack-inline' else anaOutput.shape[0])
+
+
+def computeStackResponse(anaOutput: np.ndarray, surface: str, line: int, unique: bool, kMax: float, dK: float, parallel: bool = True) -> np.ndarray | None:
+    """Kr stack response of one in-line or cross-line; None when the line holds no bins. Use parallel=False outside the GUI thread."""
+    lineSlice = anaOutput[:, line, :, :] if surface == 'stack-inline' else anaOutput[line, :, :, :]
+    slice3D, included = fnb.numbaSlice3D(lineSlice, unique)
+    if slice3D.shape[0] == 0:
+        return None
+    ndft1D = fnb.numbaNdft1D if parallel else fnb.numbaNdft1DSerial
+    return ndft1D(kMax, dK, slice3D, included)
+
+
+def lineScatterKey(surface: str, line: int, unique: bool) -> tuple:
+    return (surface, int(line), bool(unique))
+
+
+def computeLineScatter(anaOutput: np.ndarray, surface: str, line: int, unique: bool) -> np.ndarray:
+    """Offset and azimuth scatter data of one in-line ('scatter-inline') or cross-line; see numbaLineScatter() for its columns."""
+    if surface == 'scatter-inline':
+        return fnb.numbaLineScatter(anaOutput[:, line, :, :], 9, unique)
+    return fnb.numbaLineScatter(anaOutput[line, :, :, :], 10, unique)
+
+
+def lineScatterPairs(scatter: np.ndarray, column: int, halfWidth: float) -> tuple[np.ndarray, np.ndarray]:
+    """x, y arrays for a plot with connect='pairs'; each trace becomes a horizontal segment of 2 * halfWidth around its cmp."""
+    x = np.empty(2 * scatter.shape[0], dtype=scatter.dtype)
+    x[0::2] = scatter[:, 0] - halfWidth
+    x[1::2] = scatter[:, 0] + halfWidth
+    y = np.repeat(scatter[:, column], 2)
+    return x, y
+
+
+def prefetchLineOrder(line: int, lineCount: int, step: int, radius: int) -> list[int]:
+    """Lines around 'line' in the order they are prefetched; 'step' is the last move, its sign the direction of travel.
+
+    Up to 'radius' lines ahead are followed by up to radius // 2 lines behind; without a direction both sides alternate.
+    """
+    if step == 0:
+        candidates = [line + sign * i for i in range(1, radius + 1) for sign in (1, -1)]
+    else:
+        stride = abs(step)
+        sign = 1 if step > 0 else -1
+        candidates = [line + sign * stride * i for i in range(1, radius + 1)]
+        candidates += [line - sign * stride * i for i in range(1, radius // 2 + 1)]
+    return [candidate for candidate in candidates if 0 <= candidate < lineCount]
+
+
+class StackResponseCache(ArrayLruCache):
+    """LRU cache of stack responses, keyed by stackResponseKey() and bounded by their total size."""
+
+    def __init__(self, maxBytes: int) -> None:
+        super().__init__(maxBytes, 'stack-response-prefetch')
+
+    def prefetch(self, anaOutput: np.ndarray, surface: str, lines: list[int], unique: bool, kMax: float, dK: float) -> threading.Thread | None:
+        """Compute the responses of 'lines' that aren't cached yet in a background (daemon) thread."""
+        jobs = [(stackResponseKey(surface, line, unique, kMax, dK), partial(computeStackResponse, anaOutput, surface, line, unique, kMax, dK, parallel=False)) for line in lines]
+        return self.prefetchJobs(jobs)
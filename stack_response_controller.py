@@ -4,12 +4,20 @@ import numpy as np
 from qgis.PyQt.QtCore import QPoint
 
 from . import aux_functions_numba as fnb
+from . import config
 from .enums_and_int_flags import Direction
+from .stack_response_cache import (computeStackResponse, prefetchLineOrder,
+                                   stackResponseKey, stackResponseLineCount)
+
+# The largest spider step is Ctrl + Shift: 10 x 5 = 50 lines (see SpiderNavigationMixin._spiderStepFromModifiers).
+# A bigger change of line comes from a click or a new analysis, so it has no direction of travel to prefetch along.
+STACK_RESPONSE_JUMP_LINES = 50
 
 
 class StackResponseController:
     def __init__(self, window) -> None:
         self.window = window
+        self.lastStackResponseLine = {}                                         # surface -> last shown line; gives the direction of travel
 
     def getStackResponseRedrawContext(self):
         window = self.window
@@ -94,11 +102,11 @@ class StackResponseController:
 
             responseKey = window.plotRedrawHelper.buildInlineResponseKey(nY)
             if not window.plotRedrawHelper.canReuseInlineResponse(window, responseKey):
-                slice3D, included = fnb.numbaSlice3D(window.output.anaOutput[:, nY, :, :], window.survey.unique.apply)
-                if slice3D.shape[0] == 0:
+                response = self.getLineStackResponse('stack-inline', nY, kMax, dK)
+                if response is None:
                     return
 
-                window.inlineStk = fnb.numbaNdft1D(kMax, dK, slice3D, included)
+                window.inlineStk = response
                 window.plotRedrawHelper.storeInlineResponseKey(responseKey)
 
             window.prepareAnalysisImageAndColorBar(
@@ -123,11 +131,11 @@ class StackResponseController:
 
             responseKey = window.plotRedrawHelper.buildXlineResponseKey(nX)
             if not window.plotRedrawHelper.canReuseXlineResponse(window, responseKey):
-                slice3D, included = fnb.numbaSlice3D(window.output.anaOutput[nX, :, :, :], window.survey.unique.apply)
-                if slice3D.shape[0] == 0:
+                response = self.getLineStackResponse('stack-xline', nX, kMax, dK)
+                if response is None:
                     return
 
-                window.x0lineStk = fnb.numbaNdft1D(kMax, dK, slice3D, included)
+                window.x0lineStk = response
                 window.plotRedrawHelper.storeXlineResponseKey(responseKey)
 
             window.prepareAnalysisImageAndColorBar(
@@ -144,6 +152,30 @@ class StackResponseController:
             plotTitle = f'{window.plotTitles[6]} [stake={stkX}]'
             window.stkBinWidget.setTitle(plotTitle, color='b', size='16pt')
 
+    def getLineStackResponse(self, surface: str, line: int, kMax: float, dK: float):
+        """In-line or cross-line stack response from the stack response cache, or computed; then prefetch the lines around it."""
+        window = self.window
+        anaOutput = window.output.anaOutput
+        unique = window.survey.unique.apply
+        cache = window.plotRedrawHelper.stackResponseCache(window)
+
+        key = stackResponseKey(surface, line, unique, kMax, dK)
+        response = cache.get(key)
+        if response is None:
+            response = computeStackResponse(anaOutput, surface, line, unique, kMax, dK)
+            if response is None:
+                return None
+            cache.put(key, response)
+
+        lastLine = self.lastStackResponseLine.get(surface)
+        self.lastStackResponseLine[surface] = line
+        step = line - lastLine if lastLine is not None else 0
+        if abs(step) > STACK_RESPONSE_JUMP_LINES:                               # a jump rather than a spider step
+            step = 0
+        lines = prefetchLineOrder(line, stackResponseLineCount(anaOutput, surface), step, config.stackResponsePrefetchLines)
+        cache.prefetch(anaOutput, surface, lines, unique, kMax, dK)
+        return response
+
     def getSelectedStackCellPatterns(self):
         window = self.window
 
@@ -170,7 +202,8 @@ class StackResponseController:
         kStart = 1000.0 * (kMin - 0.5 * dK)
         kDelta = 1000.0 * dK
 
-        offsetX, offsetY, noData = fnb.numbaOffsetBin(window.output.anaOutput[nX, nY, :, :], window.survey.unique.apply)
+        binSlice = window.plotRedrawHelper.binSliceCache(window).binSlice(window.output.anaOutput, nX, nY)
+        offsetX, offsetY, noData = fnb.numbaOffsetBin(binSlice, window.survey.unique.apply)
         fold = 0 if noData else offsetX.shape[0]
 
         if noData or offsetX.size == 0:
@@ -106,6 +106,16 @@ class AnaTableModel(QAbstractTableModel):
     def getData(self):
         return self._data
 
+    def getChunkedData(self):
+        """The ChunkedData the model pages through, or None when it shows the data directly"""
+        return self._chunkedData
+
+    def chunkIndexOfRow(self, row: int) -> int:
+        """Index of the chunk that holds trace table row 'row'; -1 when the data isn't chunked"""
+        if self._chunkedData is None:
+            return -1
+        return int(row) // self._chunkedData.chunkSize
+
     def getHeader(self):
         return self._header
 
@@ -6,11 +6,19 @@ import numpy as np
 from .plugin_loader import loadPluginModule
 
 auxFunctionsNumbaModule = loadPluginModule('aux_functions_numba')
+stackResponseCacheModule = loadPluginModule('stack_response_cache')
 
 numbaNdft1D = auxFunctionsNumbaModule.numbaNdft1D
+numbaNdft1DSerial = auxFunctionsNumbaModule.numbaNdft1DSerial
 numbaNdft2D = auxFunctionsNumbaModule.numbaNdft2D
-numbaOffInline = auxFunctionsNumbaModule.numbaOffInline
-numbaOffXline = auxFunctionsNumbaModule.numbaOffXline
+numbaNdft2DBeforeGemini = auxFunctionsNumbaModule.numbaNdft2DBeforeGemini
+numbaFilterSlice2D = auxFunctionsNumbaModule.numbaFilterSlice2D
+numbaLineScatter = auxFunctionsNumbaModule.numbaLineScatter
+numbaOffsetAzimuthHistograms = auxFunctionsNumbaModule.numbaOffsetAzimuthHistograms
+numbaSliceStats = auxFunctionsNumbaModule.numbaSliceStats
+
+computeLineScatter = stackResponseCacheModule.computeLineScatter
+lineScatterPairs = stackResponseCacheModule.lineScatterPairs
 
 
 class AuxFunctionsNumbaTest(unittest.TestCase):
@@ -25,6 +33,26 @@ class AuxFunctionsNumbaTest(unittest.TestCase):
         self.assertTrue(np.isfinite(response).all())
         self.assertLess(response[0, 1], 0.0)
 
+    def testNumbaNdft1DMatchesDirectSumOverIncludedTraces(self):
+        rng = np.random.default_rng(3)
+        slice3D = np.zeros((5, 40, 16), dtype=np.float32)
+        slice3D[:, :, 13] = rng.uniform(0.0, 5000.0, (5, 40))
+        include3D = rng.random((5, 40)) > 0.3
+        include3D[4, :] = False                                                 # an empty bin
+
+        kMax, dK = 0.02, 0.0002
+        response = numbaNdft1D(kMax, dK, slice3D, include3D)
+
+        kR = np.arange(0, kMax, dK)
+        self.assertEqual(response.shape, (5, kR.shape[0]))
+        for p in range(4):
+            offsets = slice3D[p, include3D[p], 13].astype(np.float64)
+            expected = np.abs(np.exp(2j * np.pi * kR * offsets[:, np.newaxis]).sum(axis=0)) / offsets.shape[0]
+            np.testing.assert_allclose(response[p], 20.0 * np.log(np.maximum(expected, 1.0e-12)), atol=1e-3)
+
+        np.testing.assert_allclose(response[4], 20.0 * np.log(1.0e-12), rtol=1e-6)
+        np.testing.assert_array_equal(numbaNdft1DSerial(kMax, dK, slice3D, include3D), response)  # the variant for background threads
+
     def testNumbaNdft2DReturnsFiniteValuesForZeroAmplitudeResponse(self):
         offsetX = np.array([0.0, 1.0], dtype=np.float32)
         offsetY = np.array([0.0, 0.0], dtype=np.float32)
@@ -34,31 +62,89 @@ class AuxFunctionsNumbaTest(unittest.TestCase):
         self.assertTrue(np.isfinite(response).all())
         self.assertLess(response[1, 0], 0.0)
 
-    def testNumbaOffPlotsCanSelectAbsoluteInlineOrXlineComponents(self):
-        slice2D = np.zeros((2, 16), dtype=np.float32)
-        slice2D[:,  9] = np.array([100.0, 200.0], dtype=np.float32)             # cmp-x     # noqa: E241
-        slice2D[:, 10] = np.array([300.0, 400.0], dtype=np.float32)             # cmp-y     # noqa: E241
-        slice2D[:,  3] = np.array([10.0, 20.0], dtype=np.float32)               # src-x     # noqa: E241
-        slice2D[:,  4] = np.array([1.0, 2.0], dtype=np.float32)                 # src-y     # noqa: E241
-        slice2D[:,  6] = np.array([14.0, 29.0], dtype=np.float32)               # rec-x     # noqa: E241
-        slice2D[:,  7] = np.array([6.0, 11.0], dtype=np.float32)                # rec-y     # noqa: E241
-        slice2D[:, 13] = np.array([99.0, 199.0], dtype=np.float32)              # offset    # noqa: E241
-
-        _, absInline = numbaOffInline(slice2D, 5.0, 0)
-        _, inlineInline = numbaOffInline(slice2D, 5.0, 1)
-        _, xlineInline = numbaOffInline(slice2D, 5.0, 2)
-
-        _, absXline = numbaOffXline(slice2D, 5.0, 0)
-        _, inlineXline = numbaOffXline(slice2D, 5.0, 1)
-        _, xlineXline = numbaOffXline(slice2D, 5.0, 2)
-
-        np.testing.assert_array_equal(absInline[0::2], np.array([99.0, 199.0], dtype=np.float32))
-        np.testing.assert_array_equal(inlineInline[0::2], np.array([4.0, 9.0], dtype=np.float32))
-        np.testing.assert_array_equal(xlineInline[0::2], np.array([5.0, 9.0], dtype=np.float32))
-
-        np.testing.assert_array_equal(absXline[0::2], np.array([99.0, 199.0], dtype=np.float32))
-        np.testing.assert_array_equal(inlineXline[0::2], np.array([4.0, 9.0], dtype=np.float32))
-        np.testing.assert_array_equal(xlineXline[0::2], np.array([5.0, 9.0], dtype=np.float32))
+    def testSeparableNumbaNdft2DMatchesDirectTransform(self):
+        rng = np.random.default_rng(5)
+        offsetX = rng.uniform(-3000.0, 3000.0, 60).astype(np.float32)
+        offsetY = rng.uniform(-3000.0, 3000.0, 60).astype(np.float32)
+
+        response = numbaNdft2D(-0.01, 0.01, 0.0005, offsetX, offsetY)
+        expected = numbaNdft2DBeforeGemini(-0.01, 0.01, 0.0005, offsetX, offsetY)
+
+        self.assertEqual(response.dtype, np.float32)
+        self.assertEqual(response.shape, expected.shape)
+        np.testing.assert_allclose(response, expected, atol=1e-3)
+
+    def testStreamingOffsetAzimuthHistogramsMatchNumpyHistograms(self):
+        rng = np.random.default_rng(5)
+        anaOutput = np.zeros((9, 7, 12, 16), dtype=np.float32)
+        anaOutput[..., 2] = rng.integers(0, 2, (9, 7, 12))
+        anaOutput[..., 13] = rng.uniform(0.0, 1050.0, (9, 7, 12))
+        anaOutput[..., 14] = rng.uniform(0.0, 360.0, (9, 7, 12))
+        anaOutput[:, :, 0, 13] = 1100.0                                         # on the last offset edge; counted in the last bin
+        anaOutput[:, :, 1, 14] = 360.0
+        anaOutput[..., 15] = np.where(rng.random((9, 7, 12)) < 0.3, -1.0, 1.0)
+
+        aR = np.arange(0.0, 365.0, 5.0)
+        oR = np.arange(0.0, 1200.0, 100.0)
+        oR1 = np.arange(0.0, 1200.0, 50.0)
+        for unique in (False, True):
+            offsets, azimuth, _ = numbaSliceStats(anaOutput, unique)
+            ofAziHist, offsetCounts, noData = numbaOffsetAzimuthHistograms(anaOutput, aR, oR, oR1, unique, blockBytes=2 * 7 * 12 * 16 * 4)  # two x-rows per block
+
+            self.assertFalse(noData)
+            np.testing.assert_array_equal(ofAziHist, np.histogram2d(x=azimuth, y=offsets, bins=[aR, oR])[0])
+            np.testing.assert_array_equal(offsetCounts, np.histogram(offsets, bins=oR1)[0])
+
+        anaOutput[..., 2] = 0.0
+        self.assertTrue(numbaOffsetAzimuthHistograms(anaOutput, aR, oR, oR1)[2])
+
+    def testNumbaLineScatterHoldsAbsoluteInlineAndXlineOffsetComponents(self):
+        slice3D = np.zeros((2, 1, 16), dtype=np.float32)
+        slice3D[:, 0,  2] = 1.0                                                 # fold      # noqa: E241
+        slice3D[:, 0,  9] = np.array([100.0, 200.0], dtype=np.float32)          # cmp-x     # noqa: E241
+        slice3D[:, 0, 10] = np.array([300.0, 400.0], dtype=np.float32)          # cmp-y     # noqa: E241
+        slice3D[:, 0,  3] = np.array([10.0, 20.0], dtype=np.float32)            # src-x     # noqa: E241
+        slice3D[:, 0,  4] = np.array([1.0, 2.0], dtype=np.float32)              # src-y     # noqa: E241
+        slice3D[:, 0,  6] = np.array([14.0, 29.0], dtype=np.float32)            # rec-x     # noqa: E241
+        slice3D[:, 0,  7] = np.array([6.0, 11.0], dtype=np.float32)             # rec-y     # noqa: E241
+        slice3D[:, 0, 13] = np.array([99.0, 199.0], dtype=np.float32)           # offset    # noqa: E241
+
+        inlineScatter = numbaLineScatter(slice3D, 9, False)
+        xlineScatter = numbaLineScatter(slice3D, 10, False)
+
+        np.testing.assert_array_equal(inlineScatter[:, 0], np.array([100.0, 200.0], dtype=np.float32))
+        np.testing.assert_array_equal(xlineScatter[:, 0], np.array([300.0, 400.0], dtype=np.float32))
+        for scatter in (inlineScatter, xlineScatter):
+            np.testing.assert_array_equal(scatter[:, 1], np.array([99.0, 199.0], dtype=np.float32))
+            np.testing.assert_array_equal(scatter[:, 2], np.array([4.0, 9.0], dtype=np.float32))
+            np.testing.assert_array_equal(scatter[:, 3], np.array([5.0, 9.0], dtype=np.float32))
+
+    def testLineScatterHoldsTheFilteredTracesOfTheLine(self):
+        rng = np.random.default_rng(5)
+        anaOutput = np.zeros((6, 5, 12, 16), dtype=np.float32)
+        anaOutput[:, :, :, 2] = rng.integers(0, 2, (6, 5, 12))                  # fold
+        anaOutput[:, :, :, 13] = rng.uniform(0.0, 4000.0, (6, 5, 12))           # offset
+        for column in (3, 4, 6, 7, 9, 10, 12, 14):
+            anaOutput[:, :, :, column] = rng.uniform(0.0, 1000.0, anaOutput.shape[:3])
+        anaOutput[:, :, ::3, 15] = -1.0                                         # unique traces
+
+        for unique in (False, True):
+            for surface, line, cmpColumn in (('scatter-inline', 2, 9), ('scatter-xline', 4, 10)):
+                lineSlice = anaOutput[:, line, :, :] if surface == 'scatter-inline' else anaOutput[line, :, :, :]
+                slice2D = numbaFilterSlice2D(lineSlice.reshape(-1, 16), unique)
+
+                scatter = computeLineScatter(anaOutput, surface, line, unique)
+                np.testing.assert_array_equal(scatter[:, 0], slice2D[:, cmpColumn])
+                np.testing.assert_array_equal(scatter[:, 1], slice2D[:, 13])                        # |offset|
+                np.testing.assert_allclose(scatter[:, 2], slice2D[:, 6] - slice2D[:, 3], rtol=1e-6)  # in-line offset
+                np.testing.assert_allclose(scatter[:, 3], slice2D[:, 7] - slice2D[:, 4], rtol=1e-6)  # x-line offset
+                np.testing.assert_array_equal(scatter[:, 4], slice2D[:, 12])                        # TWT
+                np.testing.assert_array_equal(scatter[:, 5], slice2D[:, 14])                        # azimuth
+
+                x, y = lineScatterPairs(scatter, 5, 7.5)
+                np.testing.assert_array_equal(x[0::2], scatter[:, 0] - 7.5)
+                np.testing.assert_array_equal(x[1::2], scatter[:, 0] + 7.5)
+                np.testing.assert_array_equal(y, np.repeat(scatter[:, 5], 2))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,92 @@
+# coding=utf-8
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from .plugin_loader import loadPluginModule
+
+binSliceCacheModule = loadPluginModule('bin_slice_cache')
+chunkedDataModule = loadPluginModule('chunked_data')
+
+BinSliceCache = binSliceCacheModule.BinSliceCache
+ChunkedData = chunkedDataModule.ChunkedData
+binSliceKey = binSliceCacheModule.binSliceKey
+chunkKey = binSliceCacheModule.chunkKey
+prefetchBinOrder = binSliceCacheModule.prefetchBinOrder
+
+
+class BinSliceCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        fileName = os.path.join(self.tempDir.name, 'test.ana.npy')
+        self.anaOutput = np.memmap(fileName, dtype=np.float32, mode='w+', shape=(6, 5, 4, 16))
+        self.anaOutput[:] = np.arange(self.anaOutput.size, dtype=np.float32).reshape(self.anaOutput.shape)
+
+    def tearDown(self):
+        del self.anaOutput
+        self.tempDir.cleanup()
+
+    def testPrefetchOrderFollowsDirectionOfTravel(self):
+        self.assertEqual(prefetchBinOrder(2, 2, 1, 0, 6, 5, 3), [(3, 2), (4, 2), (5, 2), (1, 2), (2, 3), (2, 1)])
+        self.assertEqual(prefetchBinOrder(2, 0, 0, -1, 6, 5, 3), [(3, 0), (1, 0), (2, 1)])       # nothing ahead; at the edge
+        self.assertEqual(prefetchBinOrder(0, 0, 0, 0, 6, 5, 3), [(1, 0), (0, 1)])
+
+    def testBinSliceIsACopyReadOnce(self):
+        cache = BinSliceCache(1 << 20)
+        binSlice = cache.binSlice(self.anaOutput, 3, 1)
+
+        self.assertNotIsInstance(binSlice, np.memmap)
+        self.assertTrue(binSlice.flags['C_CONTIGUOUS'])
+        np.testing.assert_array_equal(binSlice, self.anaOutput[3, 1, :, :])
+        self.assertIs(cache.binSlice(self.anaOutput, 3, 1), binSlice)
+
+    def testPrefetchReadsBinsAndChunkInBackground(self):
+        cache = BinSliceCache(1 << 20)
+        chunked = ChunkedData(self.anaOutput.reshape(-1, 16), 40)
+        bins = prefetchBinOrder(2, 2, 0, 1, 6, 5, 2)
+
+        thread = cache.prefetch(self.anaOutput, bins, chunked, 1)
+        thread.join()
+
+        for x, y in bins:
+            np.testing.assert_array_equal(cache.get(binSliceKey(x, y)), self.anaOutput[x, y, :, :])
+        np.testing.assert_array_equal(cache.get(chunkKey(40, 1)), self.anaOutput.reshape(-1, 16)[40:80])
+        self.assertIs(cache.chunk(chunked, 1), cache.get(chunkKey(40, 1)))
+        self.assertEqual(chunked.currentChunk, 0)                               # prefetching doesn't move the table's page
+
+    def testCachedChunkIsReadOnly(self):
+        cache = BinSliceCache(1 << 20)
+        chunked = ChunkedData(self.anaOutput.reshape(-1, 16), 40)
+
+        chunk = cache.chunk(chunked, 0)
+        with self.assertRaises(ValueError):
+            chunk[0, 0] = -1.0
+        self.assertEqual(cache.chunk(chunked, 0)[0, 0], self.anaOutput[0, 0, 0, 0])
+
+    def testFirstPrefetchFailureIsReportedOnce(self):
+        cache = BinSliceCache(1 << 20)
+
+        def fail():
+            raise OSError('share unavailable')
+
+        cache.prefetchJobs([(binSliceKey(0, 0), fail)]).join()
+        cache.prefetchJobs([(binSliceKey(0, 1), fail)]).join()
+
+        self.assertIsInstance(cache.takePrefetchError(), OSError)
+        self.assertIsNone(cache.takePrefetchError())
+
+    def testCacheIsClearedForAnotherAnalysisCube(self):
+        cache = BinSliceCache(1 << 20)
+        cache.bindSource(self.anaOutput)
+        cache.binSlice(self.anaOutput, 0, 0)
+        cache.bindSource(self.anaOutput)
+        self.assertEqual(len(cache), 1)
+
+        cache.bindSource(np.zeros_like(self.anaOutput))
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
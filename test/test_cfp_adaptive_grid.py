@@ -0,0 +1,70 @@
+# coding=utf-8
+import unittest
+
+import numpy as np
+
+from .plugin_loader import loadPluginModule
+
+cfpAdaptiveGridModule = loadPluginModule('cfp_adaptive_grid')
+
+coarseNodes = cfpAdaptiveGridModule.coarseNodes
+computeAdaptiveMap = cfpAdaptiveGridModule.computeAdaptiveMap
+
+
+class CfpAdaptiveGridTest(unittest.TestCase):
+    @staticmethod
+    def createMap(nx=300, ny=240):
+        # a broad illumination patch with a narrow spike in one corner
+        x, y = np.meshgrid(np.arange(nx), np.arange(ny))
+        broad = np.exp(-((x - 150.0) ** 2 + (y - 120.0) ** 2) / (2.0 * 60.0**2))
+        narrow = 0.3 * np.exp(-((x - 60.0) ** 2 + (y - 200.0) ** 2) / (2.0 * 4.0**2))
+        return (broad + narrow).astype(np.float32)
+
+    def testCoarseNodesAlwaysIncludeLastBin(self):
+        np.testing.assert_array_equal(coarseNodes(17, 8), [0, 8, 16])
+        np.testing.assert_array_equal(coarseNodes(20, 8), [0, 8, 16, 19])
+
+    def testRefinesCurvedTilesAndReportsErrorBound(self):
+        exact = self.createMap()
+        evaluated = np.zeros(exact.shape, dtype=np.int32)
+        stages = set()
+
+        def rowFunction(iy, ix):
+            evaluated[iy, ix] += 1
+            return exact[iy, ix]
+
+        ampMap, stats = computeAdaptiveMap(rowFunction, 300, 240, 8, 0.01, onRowDone=lambda stage, done, total: stages.add(stage))
+
+        self.assertEqual(ampMap.shape, (1, 240, 300))
+        self.assertEqual(stages, {'coarse', 'refine'})
+        self.assertEqual(evaluated.max(), 1)                                    # no bin is evaluated twice
+        self.assertEqual(stats.evaluatedBins, np.count_nonzero(evaluated))
+        self.assertLess(stats.evaluatedBins, 0.1 * exact.size)
+        self.assertTrue(np.all(evaluated[190:211, 50:71]))                      # the narrow spike is computed at bin resolution
+
+        np.testing.assert_array_equal(ampMap[0][evaluated > 0], exact[evaluated > 0])
+        error = np.abs(ampMap[0] - exact).max() / exact.max()
+        self.assertLessEqual(stats.errorBound, 0.01)
+        self.assertLessEqual(error, 1.5 * stats.errorBound)
+
+    def testTighterToleranceRefinesMoreTiles(self):
+        exact = self.createMap()
+        rowFunction = lambda iy, ix: np.stack([exact[iy, ix], 2.0 * exact[iy, ix]])  # noqa: E731
+
+        _, loose = computeAdaptiveMap(rowFunction, 300, 240, 8, 0.01, channels=2)
+        tightMap, tight = computeAdaptiveMap(rowFunction, 300, 240, 8, 0.001, channels=2)
+
+        self.assertGreater(tight.refinedTiles, loose.refinedTiles)
+        self.assertLess(tight.errorBound, loose.errorBound)
+        np.testing.assert_allclose(tightMap[1], 2.0 * tightMap[0], rtol=1e-6)
+
+    def testSmallGridIsEvaluatedCompletely(self):
+        exact = self.createMap(12, 10)
+        ampMap, stats = computeAdaptiveMap(lambda iy, ix: exact[iy, ix], 12, 10, 8, 0.01)
+
+        self.assertEqual(stats.evaluatedBins, exact.size)
+        np.testing.assert_array_equal(ampMap[0], exact)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,255 @@
+# coding=utf-8
+import unittest
+
+import numpy as np
+
+from .plugin_loader import loadPluginModule
+
+cfpAuxFunctionsNumbaModule = loadPluginModule('cfp_aux_functions_numba')
+
+ILLUMINATION_3X3_MODES = cfpAuxFunctionsNumbaModule.ILLUMINATION_3X3_MODES
+build_relation_source_index = cfpAuxFunctionsNumbaModule.build_relation_source_index
+build_station_bucket_index = cfpAuxFunctionsNumbaModule.build_station_bucket_index
+chirp_z_axis = cfpAuxFunctionsNumbaModule.chirp_z_axis
+compute_beam_xy_grid_fast = cfpAuxFunctionsNumbaModule.compute_beam_xy_grid_fast
+compute_illumination_row_incoherent_numba = cfpAuxFunctionsNumbaModule.compute_illumination_row_incoherent_numba
+compute_illumination_row_modes_numba = cfpAuxFunctionsNumbaModule.compute_illumination_row_modes_numba
+compute_illumination_row_numba = cfpAuxFunctionsNumbaModule.compute_illumination_row_numba
+compute_monochromatic_beam_xy_grid = cfpAuxFunctionsNumbaModule.compute_monochromatic_beam_xy_grid
+compute_monochromatic_weighted_beam_xy_grid = cfpAuxFunctionsNumbaModule.compute_monochromatic_weighted_beam_xy_grid
+compute_radon_images_fast = cfpAuxFunctionsNumbaModule.compute_radon_images_fast
+compute_radon_images_numba = cfpAuxFunctionsNumbaModule.compute_radon_images_numba
+merge_station_weights_numba = cfpAuxFunctionsNumbaModule.merge_station_weights_numba
+resolve_cfp_geometry_relations_numba = cfpAuxFunctionsNumbaModule.resolve_cfp_geometry_relations_numba
+scan_cfp_focal_points_numba = cfpAuxFunctionsNumbaModule.scan_cfp_focal_points_numba
+scan_cfp_geometry_relations_numba = cfpAuxFunctionsNumbaModule.scan_cfp_geometry_relations_numba
+
+
+class CfpAuxFunctionsNumbaTest(unittest.TestCase):
+    def createStations(self, count, seed):
+        rng = np.random.default_rng(seed)
+        coords = np.column_stack((rng.uniform(0.0, 4000.0, count), rng.uniform(0.0, 3000.0, count), rng.uniform(-5.0, 5.0, count))).astype(np.float32)
+        weights = rng.uniform(1.0, 4.0, count).astype(np.float32)
+        return coords, weights
+
+    def testBucketIndexGroupsStationsPerCell(self):
+        coords, weights = self.createStations(500, seed=1)
+
+        index = build_station_bucket_index(coords, weights, 400.0)
+
+        self.assertEqual(index.cell_size, 200.0)
+        self.assertEqual(index.cell_start.shape[0], index.nbx * index.nby + 1)
+        self.assertEqual(index.cell_start[-1], 500)
+        self.assertEqual(sorted(map(tuple, index.coords.tolist())), sorted(map(tuple, coords.tolist())))
+        for cell in range(index.nbx * index.nby):
+            cellCoords = index.coords[index.cell_start[cell]:index.cell_start[cell + 1]]
+            np.testing.assert_array_equal(np.floor((cellCoords[:, 0] - index.x0) / index.cell_size).clip(max=index.nbx - 1), cell % index.nbx)
+            np.testing.assert_array_equal(np.floor((cellCoords[:, 1] - index.y0) / index.cell_size).clip(max=index.nby - 1), cell // index.nbx)
+
+    def testBucketedIlluminationRowsMatchFullStationScan(self):
+        srcCoords, srcWeights = self.createStations(600, seed=2)
+        recCoords, recWeights = self.createStations(900, seed=3)
+        evalX = np.ascontiguousarray((np.arange(40, dtype=np.float32) + 0.5) * 100.0)
+        freqs = np.array([10.0, 30.0], dtype=np.float32)
+        radius = 500.0
+
+        srcIndex = build_station_bucket_index(srcCoords, srcWeights, radius)
+        recIndex = build_station_bucket_index(recCoords, recWeights, radius)
+        srcAll = build_station_bucket_index(srcCoords, srcWeights, np.inf)     # a single cell; every station is visited
+        recAll = build_station_bucket_index(recCoords, recWeights, np.inf)
+        self.assertEqual((srcAll.nbx, srcAll.nby), (1, 1))
+
+        for kernel in (compute_illumination_row_numba, compute_illumination_row_incoherent_numba, compute_illumination_row_modes_numba):
+            bucketed = kernel(1500.0, evalX, -800.0, srcIndex, recIndex, freqs, 2500.0, radius)
+            scanned = kernel(1500.0, evalX, -800.0, srcAll, recAll, freqs, 2500.0, radius)
+            np.testing.assert_allclose(np.asarray(bucketed), np.asarray(scanned), rtol=1e-5, atol=0.0)
+            self.assertGreater(float(np.max(np.asarray(bucketed))), 0.0)
+
+    def testFrequencyBatchedRowMatchesPerFrequencyReference(self):
+        srcCoords, srcWeights = self.createStations(300, seed=4)
+        recCoords, recWeights = self.createStations(400, seed=5)
+        evalX = np.ascontiguousarray((np.arange(12, dtype=np.float32) + 0.5) * 300.0)
+        focalY, focalZ, vint, radius = 1200.0, -600.0, 2000.0, 700.0
+
+        srcIndex = build_station_bucket_index(srcCoords, srcWeights, radius)
+        recIndex = build_station_bucket_index(recCoords, recWeights, radius)
+
+        def beam(coords, weights, x, k):
+            dx = coords[:, 0].astype(np.float64) - x
+            dy = coords[:, 1].astype(np.float64) - focalY
+            dz = coords[:, 2].astype(np.float64) - focalZ
+            inside = dx * dx + dy * dy <= radius * radius
+            r = np.sqrt(dx[inside] ** 2 + dy[inside] ** 2 + dz[inside] ** 2)
+            return np.sum(np.abs(dz[inside]) / (2.0 * np.pi * r * r) * weights[inside] * np.exp(-1j * k * r))
+
+        for freqs in (np.arange(10.0, 60.0, 5.0, dtype=np.float32), np.array([12.0, 25.0, 31.0], dtype=np.float32)):  # rotation and per-frequency paths
+            expected = np.zeros(evalX.shape[0])
+            for ix, x in enumerate(evalX):
+                for freq in freqs:
+                    k = 2.0 * np.pi * freq / vint
+                    expected[ix] += np.abs(beam(srcCoords, srcWeights, x, k) * beam(recCoords, recWeights, x, k))
+
+            row = compute_illumination_row_numba(focalY, evalX, focalZ, srcIndex, recIndex, freqs, vint, radius)
+            np.testing.assert_allclose(row, expected, rtol=1e-4, atol=1e-6 * expected.max())
+
+    def testModeRowsShareStationSumsWithSingleModeKernels(self):
+        srcCoords, srcWeights = self.createStations(300, seed=6)
+        recCoords, recWeights = self.createStations(400, seed=7)
+        evalX = np.ascontiguousarray((np.arange(16, dtype=np.float32) + 0.5) * 250.0)
+        freqs = np.array([10.0, 20.0, 30.0], dtype=np.float32)
+        radius = 600.0
+        srcIndex = build_station_bucket_index(srcCoords, srcWeights, radius)
+        recIndex = build_station_bucket_index(recCoords, recWeights, radius)
+
+        modes = compute_illumination_row_modes_numba(1500.0, evalX, -700.0, srcIndex, recIndex, freqs, 2500.0, radius)
+        modeRows = dict(zip(ILLUMINATION_3X3_MODES, modes))
+
+        self.assertEqual(modes.shape, (9, evalX.shape[0]))
+        np.testing.assert_array_equal(modeRows['src_off__rec_off'], np.full(evalX.shape[0], 3.0, dtype=np.float32))  # one per frequency
+        coherent = compute_illumination_row_numba(1500.0, evalX, -700.0, srcIndex, recIndex, freqs, 2500.0, radius)
+        incoherent = compute_illumination_row_incoherent_numba(1500.0, evalX, -700.0, srcIndex, recIndex, freqs, 2500.0, radius)
+        np.testing.assert_allclose(modeRows['src_coh__rec_coh'], coherent, rtol=1e-5)
+        np.testing.assert_allclose(modeRows['src_incoh__rec_incoh'], incoherent, rtol=1e-5)
+
+        # a single frequency: every combined mode is the product of its source and receiver factors
+        single = dict(zip(ILLUMINATION_3X3_MODES, compute_illumination_row_modes_numba(1500.0, evalX, -700.0, srcIndex, recIndex, freqs[:1], 2500.0, radius)))
+        for srcMode in ('coh', 'incoh'):
+            for recMode in ('coh', 'incoh'):
+                expected = single[f'src_{srcMode}__rec_off'] * single[f'src_off__rec_{recMode}']
+                np.testing.assert_allclose(single[f'src_{srcMode}__rec_{recMode}'], expected, rtol=1e-5)
+
+        # a zero interval velocity falls back to 1 m/s for the wavenumbers and the attenuation, instead of giving inf/NaN maps
+        self.assertTrue(np.all(np.isfinite(compute_illumination_row_modes_numba(1500.0, evalX, -700.0, srcIndex, recIndex, freqs, 0.0, radius))))
+
+        # the single-mode kernels apply the same velocity guard, and skip the same frequencies <= 0
+        withZero = np.array([0.0, 10.0, 20.0, 30.0], dtype=np.float32)
+        for vint in (2500.0, 0.0):
+            guarded = dict(zip(ILLUMINATION_3X3_MODES, compute_illumination_row_modes_numba(1500.0, evalX, -700.0, srcIndex, recIndex, withZero, vint, radius)))
+            coherent = compute_illumination_row_numba(1500.0, evalX, -700.0, srcIndex, recIndex, withZero, vint, radius)
+            incoherent = compute_illumination_row_incoherent_numba(1500.0, evalX, -700.0, srcIndex, recIndex, withZero, vint, radius)
+            self.assertTrue(np.all(np.isfinite(coherent)))
+            np.testing.assert_allclose(guarded['src_coh__rec_coh'], coherent, rtol=1e-5)
+            np.testing.assert_allclose(guarded['src_incoh__rec_incoh'], incoherent, rtol=1e-5)
+
+    def testFastBeamGridMatchesDirectKernels(self):
+        coords, weights = self.createStations(700, seed=8)
+        evalX = np.ascontiguousarray(1800.0 + np.arange(-400.0, 400.1, 25.0, dtype=np.float32))
+        evalY = np.ascontiguousarray(1400.0 + np.arange(-300.0, 300.1, 25.0, dtype=np.float32))
+        surfX, surfY, surfZ = (np.ascontiguousarray(coords[:, i]) for i in range(3))
+
+        direct = compute_monochromatic_beam_xy_grid(evalX, evalY, -1500.0, surfX, surfY, surfZ, 30.0, 2200.0, focal_x=1800.0, focal_y=1400.0)
+        fast = compute_beam_xy_grid_fast(evalX, evalY, -1500.0, surfX, surfY, surfZ, None, 30.0, 2200.0, focal_x=1800.0, focal_y=1400.0, block_size=256)
+        self.assertEqual(fast.shape, direct.shape)
+        np.testing.assert_allclose(fast, direct, rtol=0.0, atol=1e-5 * np.abs(direct).max())
+
+        direct = compute_monochromatic_weighted_beam_xy_grid(evalX, evalY, -1500.0, surfX, surfY, surfZ, weights.astype(np.float64), 30.0, 2200.0, focal_x=1800.0, focal_y=1400.0)
+        fast = compute_beam_xy_grid_fast(evalX, evalY, -1500.0, surfX, surfY, surfZ, weights.astype(np.float64), 30.0, 2200.0, focal_x=1800.0, focal_y=1400.0)
+        np.testing.assert_allclose(fast, direct, rtol=0.0, atol=1e-5 * np.abs(direct).max())
+
+    def testChirpZAxisMatchesDirectSum(self):
+        rng = np.random.default_rng(9)
+        data = rng.normal(size=(3, 37)) + 1j * rng.normal(size=(3, 37))
+        x = -180.0 + 10.0 * np.arange(37)
+        p = np.linspace(-4e-4, 5e-4, 23)
+
+        expected = data @ np.exp(1j * 2.0 * np.pi * 25.0 * np.outer(x, p))
+        np.testing.assert_allclose(chirp_z_axis(data, x, p, 2.0 * np.pi * 25.0), expected, rtol=0.0, atol=1e-9 * np.abs(expected).max())
+        np.testing.assert_allclose(chirp_z_axis(data.T, x, p, 2.0 * np.pi * 25.0, axis=0), expected.T, rtol=0.0, atol=1e-9 * np.abs(expected).max())
+
+    def testFastRadonImagesMatchDirectKernel(self):
+        coords, _ = self.createStations(400, seed=10)
+        evalX = np.ascontiguousarray(np.arange(-320.0, 320.1, 20.0, dtype=np.float32))
+        evalY = np.ascontiguousarray(np.arange(-240.0, 240.1, 20.0, dtype=np.float32))
+        surfX, surfY, surfZ = (np.ascontiguousarray(coords[:, i]) for i in range(3))
+        sourceField = compute_beam_xy_grid_fast(evalX + 2000.0, evalY + 1500.0, -1200.0, surfX, surfY, surfZ, None, 35.0, 2000.0, 2000.0, 1500.0)
+        receiverField = compute_beam_xy_grid_fast(evalX + 2000.0, evalY + 1500.0, -1200.0, surfX[::2], surfY[::2], surfZ[::2], None, 35.0, 2000.0, 2000.0, 1500.0)
+        px = np.linspace(-1.0 / 2000.0, 1.0 / 2000.0, 48, dtype=np.float32)
+        py = np.linspace(-1.0 / 2000.0, 1.0 / 2000.0, 40, dtype=np.float32)
+
+        direct = compute_radon_images_numba(sourceField, receiverField, evalX, evalY, px, py, 35.0)
+        fast = compute_radon_images_fast(sourceField, receiverField, evalX, evalY, px, py, 35.0)
+        for fastImage, directImage in zip(fast, direct):
+            self.assertEqual(fastImage.shape, (40, 48))
+            np.testing.assert_allclose(fastImage, directImage, rtol=0.0, atol=1e-4)
+
+        irregularX = evalX.copy()
+        irregularX[3] += 5.0                                                    # not evenly spaced; falls back to the direct kernel
+        fallback = compute_radon_images_fast(sourceField, receiverField, irregularX, evalY, px, py, 35.0)
+        for fallbackImage, directImage in zip(fallback, compute_radon_images_numba(sourceField, receiverField, irregularX, evalY, px, py, 35.0)):
+            np.testing.assert_array_equal(fallbackImage, directImage)
+
+    def testMergeStationWeightsStopsAtHalfFullTable(self):
+        points = np.array([[1.0, 2.0, 0.0], [3.0, 4.0, 0.0], [1.0, 2.0, 0.0], [5.0, 6.0, 0.0], [3.0, 4.0, 0.0], [7.0, 8.0, 0.0]], dtype=np.float32)
+        weights = np.array([1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+        tableBits = np.zeros((4, 3), dtype=np.uint32)
+        tableWeights = np.zeros(4, dtype=np.float64)
+        tableUsed = np.zeros(4, dtype=np.bool_)
+
+        count, nextPoint = merge_station_weights_numba(tableBits, tableWeights, tableUsed, 0, points.view(np.uint32), weights, 0)
+        self.assertEqual((count, nextPoint), (2, 3))                            # a third station doesn't fit a half full table of 4 slots
+
+        stations = tableBits[tableUsed].view(np.float32)
+        merged = {tuple(station): weight for station, weight in zip(stations, tableWeights[tableUsed])}
+        self.assertEqual(merged, {(1.0, 2.0, 0.0): 4.0, (3.0, 4.0, 0.0): 2.0})
+
+    def testFocalPointScanMatchesSinglePointRelationScan(self):
+        # sources on 10 lines of 30 points, receivers on 12 lines of 120 points; each shot records 5 receiver lines
+        sourceLine, sourcePoint = (a.ravel().astype(np.int64) for a in np.meshgrid(np.arange(1, 11), np.arange(1, 31), indexing='ij'))
+        sourceInd = np.ones(sourceLine.size, dtype=np.int64)
+        sourceX = (sourcePoint * 50.0).astype(np.float32)
+        sourceY = (sourceLine * 100.0).astype(np.float32)
+        receiverLine, receiverPoint = (a.ravel().astype(np.int64) for a in np.meshgrid(np.arange(1, 13), np.arange(1, 121), indexing='ij'))
+        receiverX = (receiverPoint * 12.5).astype(np.float32)
+        receiverY = (receiverLine * 80.0).astype(np.float32)
+        groupStart = np.arange(0, receiverLine.size, 120, dtype=np.int64)
+        groupArrays = (np.ones(12, dtype=np.int64), np.arange(1, 13, dtype=np.int64), groupStart, groupStart + 120)
+
+        rows = [(line, p, r, 4 * p - 30, 4 * p + 30) for line, p in zip(sourceLine, sourcePoint) for r in range(max(line - 2, 1), min(line + 2, 12) + 1)]
+        rows.append((99, 1, 1, 1, 10))                                          # unknown source line
+        rows = np.array(rows, dtype=np.int64)
+        ones = np.ones(rows.shape[0], dtype=np.int64)
+        relations = (ones, rows[:, 0], rows[:, 1], ones, rows[:, 2], rows[:, 3], rows[:, 4], ones, ones)
+        relations = tuple(np.ascontiguousarray(a) for a in relations)
+        empty = np.empty(0, dtype=np.int64)
+        focalX = np.array([300.0, 800.0, 1500.0, 0.0])
+        focalY = np.array([500.0, 300.0, 900.0, 0.0])
+        radius = 400.0
+
+        relSrcIdx, relRecLeft, relRecRight = (np.empty(rows.shape[0], dtype=np.int64) for _ in range(3))
+        resolved = resolve_cfp_geometry_relations_numba(
+            *relations, sourceInd, sourceLine, sourcePoint, empty, empty, empty, *groupArrays, receiverPoint, relSrcIdx, relRecLeft, relRecRight
+        )
+        self.assertEqual(resolved[4], 1)                                        # missing source lookup
+        self.assertEqual(relSrcIdx[-1], -1)
+
+        index = build_relation_source_index(relSrcIdx, relRecLeft, relRecRight, sourceX, sourceY, radius)
+        counts = np.zeros((focalX.size, 5), dtype=np.int64)
+        emptyFloat = np.empty(0, dtype=np.float64)
+        scanArgs = (index, sourceX, sourceY, receiverX, receiverY, focalX, focalY, radius, counts)
+        scan_cfp_focal_points_numba(*scanArgs, empty, empty, empty, emptyFloat, empty, emptyFloat, 3)
+        sourceOffsets = np.concatenate(([0], np.cumsum(counts[:, 3])))
+        receiverOffsets = np.concatenate(([0], np.cumsum(counts[:, 4])))
+        stations = (np.empty(sourceOffsets[-1], dtype=np.int64), np.empty(sourceOffsets[-1]), np.empty(receiverOffsets[-1], dtype=np.int64), np.empty(receiverOffsets[-1]))
+        scan_cfp_focal_points_numba(*scanArgs, sourceOffsets, receiverOffsets, *stations, 3)
+
+        for p in range(focalX.size):
+            sourceWeights = np.zeros(sourceX.size)
+            receiverWeights = np.zeros(receiverX.size)
+            expected = scan_cfp_geometry_relations_numba(
+                *relations, sourceInd, sourceLine, sourcePoint, sourceX, sourceY, empty, empty, empty, *groupArrays,
+                receiverPoint, receiverX, receiverY, sourceWeights, receiverWeights, focalX[p], focalY[p], radius * radius,
+            )
+            self.assertEqual((counts[p, 2], counts[p, 0], counts[p, 1]), tuple(expected[:3]))
+
+            batchSourceWeights = np.zeros(sourceX.size)
+            batchReceiverWeights = np.zeros(receiverX.size)
+            batchSourceWeights[stations[0][sourceOffsets[p]:sourceOffsets[p + 1]]] = stations[1][sourceOffsets[p]:sourceOffsets[p + 1]]
+            batchReceiverWeights[stations[2][receiverOffsets[p]:receiverOffsets[p + 1]]] = stations[3][receiverOffsets[p]:receiverOffsets[p + 1]]
+            np.testing.assert_array_equal(batchSourceWeights, sourceWeights)
+            np.testing.assert_array_equal(batchReceiverWeights, receiverWeights)
+
+        self.assertTrue(np.all(counts[:, 1] > 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+# coding=utf-8
+import unittest
+
+import numpy as np
+
+from .plugin_loader import loadPluginModule
+
+foldClassesModule = loadPluginModule('fold_classes')
+
+FoldClassCubes = foldClassesModule.FoldClassCubes
+FoldClassSpec = foldClassesModule.FoldClassSpec
+
+
+class FoldClassCubesTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.nx = rng.integers(0, 4, 500)
+        self.ny = rng.integers(0, 3, 500)
+        offX = rng.uniform(-1000.0, 1000.0, 500)
+        offY = rng.uniform(-600.0, 600.0, 500)
+        self.hyp = np.hypot(offX, offY).astype(np.float32)
+        self.azi = ((np.rad2deg(np.arctan2(offX, offY)) + 360.0) % 360.0).astype(np.float32)   # as in buildBinningArraysFromSelectedReceivers()
+        self.offX = offX
+        self.offY = offY
+
+    def testNothingIsCreatedWhenDisabled(self):
+        self.assertFalse(FoldClassSpec().enabled)
+        self.assertFalse(FoldClassSpec(ovtSizeX=100.0).enabled)                # an OVT needs both sizes
+        self.assertIsNone(FoldClassCubes.create(FoldClassSpec(), (4, 3), (-1000.0, 1000.0, -600.0, 600.0)))
+
+    def testCubesMatchHistogramsOfTheTraces(self):
+        spec = FoldClassSpec(offsetClassWidth=250.0, aziSectors=8, ovtSizeX=400.0, ovtSizeY=300.0)
+        cubes = FoldClassCubes.create(spec, (4, 3), (-1000.0, 1000.0, -600.0, 600.0))
+        cubes.accumulate(self.nx[:200], self.ny[:200], self.hyp[:200], self.azi[:200])
+        cubes.accumulate(self.nx[200:], self.ny[200:], self.hyp[200:], self.azi[200:])   # batches add up
+
+        self.assertEqual(cubes.nOffsetClasses, 5)                               # hypot(1000, 600) = 1166 m
+        self.assertEqual((cubes.nOvtX, cubes.nOvtY), (5, 4))
+        fold = np.zeros((4, 3), dtype=np.int64)
+        np.add.at(fold, (self.nx, self.ny), 1)
+        for cube in (cubes.offsetFold, cubes.azimuthFold, cubes.ovtFold):
+            np.testing.assert_array_equal(cube.sum(axis=2), fold)
+
+        for x, y in ((0, 0), (3, 2)):
+            inBin = (self.nx == x) & (self.ny == y)
+            offsetHist, _ = np.histogram(self.hyp[inBin], cubes.offsetClassEdges())
+            np.testing.assert_array_equal(cubes.offsetFold[x, y], offsetHist)
+            aziHist, _ = np.histogram(self.azi[inBin], np.linspace(0.0, 360.0, 9))
+            np.testing.assert_array_equal(cubes.azimuthFold[x, y], aziHist)
+            ovtHist, _, _ = np.histogram2d(self.offX[inBin], self.offY[inBin], [np.linspace(-1000.0, 1000.0, 6), np.linspace(-600.0, 600.0, 5)])
+            np.testing.assert_array_equal(cubes.ovtFold[x, y], ovtHist.reshape(-1))
+
+    def testDerivedMapsNeedNoTraceTable(self):
+        spec = FoldClassSpec(offsetClassWidth=250.0, aziSectors=8)
+        cubes = FoldClassCubes.create(spec, (4, 3), (-1000.0, 1000.0, -600.0, 600.0), maxRadius=900.0)
+        cubes.accumulate(self.nx, self.ny, np.minimum(self.hyp, 900.0), self.azi)
+
+        self.assertEqual(cubes.nOffsetClasses, 4)                               # the radial limit caps the offsets
+        limited = np.zeros((4, 3), dtype=np.int64)
+        inRange = (self.hyp >= 250.0) & (self.hyp < 750.0)
+        np.add.at(limited, (self.nx[inRange], self.ny[inRange]), 1)
+        np.testing.assert_array_equal(cubes.offsetLimitedFold(250.0, 750.0), limited)
+
+        sectors = np.floor(self.azi / 45.0).astype(int)
+        richness = np.zeros((4, 3), dtype=np.int64)
+        for x in range(4):
+            for y in range(3):
+                richness[x, y] = np.unique(sectors[(self.nx == x) & (self.ny == y)]).size
+        np.testing.assert_array_equal(cubes.azimuthRichness(), richness)
+
+    def testFoldClassMapsUseTheOffsetRangeOfTheSpec(self):
+        spec = FoldClassSpec(offsetClassWidth=250.0, aziSectors=8, minOffset=250.0)
+        cubes = FoldClassCubes.create(spec, (4, 3), (-1000.0, 1000.0, -600.0, 600.0))
+        cubes.accumulate(self.nx, self.ny, self.hyp, self.azi)
+        offsetLimited, azimuthRichness, ovtRichness = cubes.foldClassMaps()
+
+        limited = np.zeros((4, 3), dtype=np.int64)
+        inRange = self.hyp >= 250.0                                             # a maximum offset of 0 has no upper limit
+        np.add.at(limited, (self.nx[inRange], self.ny[inRange]), 1)
+        np.testing.assert_array_equal(offsetLimited, limited)
+        np.testing.assert_array_equal(azimuthRichness, cubes.azimuthRichness())
+        self.assertIsNone(ovtRichness)                                          # the OVT cube is disabled
+
+    def testCopyIsIndependent(self):
+        cubes = FoldClassCubes.create(FoldClassSpec(aziSectors=4), (2, 2), (-10.0, 10.0, -10.0, 10.0))
+        copied = cubes.copy()
+        cubes.accumulate(np.array([0]), np.array([1]), np.array([5.0]), np.array([100.0]))
+
+        self.assertEqual(int(copied.azimuthFold.sum()), 0)
+        self.assertEqual(copied.nbytes, 2 * 2 * 4 * 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
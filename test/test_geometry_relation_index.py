@@ -0,0 +1,148 @@
+# coding=utf-8
+import unittest
+
+import numpy as np
+
+from .plugin_loader import loadPluginModule
+
+geometryRelationIndexModule = loadPluginModule('geometry_relation_index')
+
+GeometryRelationIndexCache = geometryRelationIndexModule.GeometryRelationIndexCache
+buildGeometryRelationIndex = geometryRelationIndexModule.buildGeometryRelationIndex
+geometryKey = geometryRelationIndexModule.geometryKey
+
+pointType = np.dtype([('Line', 'f4'), ('Point', 'f4'), ('Index', 'i4'), ('Depth', 'f4'), ('Elev', 'f4'), ('InUse', 'u1'), ('LocX', 'f4'), ('LocY', 'f4')])
+relationType = np.dtype([('SrcLin', 'f4'), ('SrcPnt', 'f4'), ('SrcInd', 'i4'), ('RecLin', 'f4'), ('RecMin', 'f4'), ('RecMax', 'f4'), ('RecInd', 'i4'), ('InSps', 'i4'), ('InRps', 'i4')])
+
+
+class GeometryRelationIndexTest(unittest.TestCase):
+    @staticmethod
+    def createGeometry(seed=7):
+        rng = np.random.default_rng(seed)
+
+        # 4 source lines x 10 shots, 6 receiver lines x 40 receivers; rows are shuffled, as after an edit
+        srcLine, srcPoint = np.meshgrid(np.arange(1, 5), np.arange(1, 11), indexing='ij')
+        srcGeom = np.zeros(srcLine.size, dtype=pointType)
+        srcGeom['Line'] = 1000.0 + srcLine.ravel()
+        srcGeom['Point'] = srcPoint.ravel()
+        srcGeom['Index'] = 1
+        srcGeom['InUse'] = 1
+        srcGeom['LocX'] = 50.0 * srcPoint.ravel()
+        srcGeom['LocY'] = 200.0 * srcLine.ravel()
+        srcGeom['InUse'][[3, 17]] = 0
+        srcGeom = srcGeom[rng.permutation(srcGeom.size)]
+
+        recLine, recPoint = np.meshgrid(np.arange(1, 7), np.arange(1, 41), indexing='ij')
+        recGeom = np.zeros(recLine.size, dtype=pointType)
+        recGeom['Line'] = 2000.0 + recLine.ravel()
+        recGeom['Point'] = recPoint.ravel()
+        recGeom['Index'] = 1
+        recGeom['InUse'] = 1
+        recGeom['LocX'] = 25.0 * recPoint.ravel()
+        recGeom['LocY'] = 100.0 * recLine.ravel()
+        recGeom['InUse'][[5, 100]] = 0
+        recGeom = recGeom[rng.permutation(recGeom.size)]
+
+        # every shot records 3 receiver lines; plus an orphan, an unknown shot and an unknown receiver line
+        rows = []
+        for line in range(1, 5):
+            for point in range(1, 11):
+                for rLine in range(line, line + 3):
+                    rows.append((1000.0 + line, point, 1, 2000.0 + rLine, point, point + 20, 1, 1, 1))
+        rows.append((1001.0, 1.0, 1, 2001.0, 1.0, 10.0, 1, 0, 1))
+        rows.append((1009.0, 1.0, 1, 2001.0, 1.0, 10.0, 1, 1, 1))
+        rows.append((1001.0, 2.0, 1, 2009.0, 1.0, 10.0, 1, 1, 1))
+        relGeom = np.array(rows, dtype=relationType)[rng.permutation(len(rows))]
+        return srcGeom, relGeom, recGeom
+
+    @staticmethod
+    def bruteForceTraceCounts(srcGeom, relGeom, recGeom):
+        activeSources = {(int(s['Line']), int(s['Point'])) for s in srcGeom if s['InUse']}
+        activeReceivers = {(int(r['Line']), int(r['Point'])) for r in recGeom if r['InUse']}
+        sourceCounts, receiverCounts = {}, {}
+        for rel in relGeom:
+            shot = (int(rel['SrcLin']), int(rel['SrcPnt']))
+            if rel['InSps'] == 0 or shot not in activeSources:
+                continue
+            for point in range(int(rel['RecMin']), int(rel['RecMax']) + 1):
+                receiver = (int(rel['RecLin']), point)
+                if receiver in activeReceivers:
+                    sourceCounts[shot] = sourceCounts.get(shot, 0) + 1
+                    receiverCounts[receiver] = receiverCounts.get(receiver, 0) + 1
+        return sourceCounts, receiverCounts
+
+    def testKeyFollowsTableContent(self):
+        srcGeom, relGeom, recGeom = self.createGeometry()
+        key = geometryKey(srcGeom, relGeom, recGeom)
+
+        self.assertEqual(key, geometryKey(srcGeom.copy(), relGeom.copy(), recGeom.copy()))
+        self.assertEqual(geometryKey(srcGeom, None, recGeom), '')
+
+        recGeom['InUse'][0] ^= 1                                                # an in-place edit gives a new key
+        self.assertNotEqual(key, geometryKey(srcGeom, relGeom, recGeom))
+
+    def testIndexMatchesBruteForceRelationLookup(self):
+        srcGeom, relGeom, recGeom = self.createGeometry()
+        chunks = []
+        index = buildGeometryRelationIndex(srcGeom, relGeom, recGeom, 'key', chunkSize=25, onChunkDone=lambda done, total: chunks.append((done, total)))
+
+        self.assertEqual(chunks[-1], (5, 5))
+        self.assertEqual(index.relationCount, relGeom.shape[0])
+        self.assertEqual(index.inactiveSourceCount, 2)
+        self.assertEqual(index.inactiveReceiverCount, 2)
+        self.assertEqual(index.sourceOrphanRelationCount, 1)
+        self.assertEqual(index.missingSourceCount, 1)
+        self.assertEqual(index.missingReceiverCount, 1)
+
+        sourceCounts, receiverCounts = self.bruteForceTraceCounts(srcGeom, relGeom, recGeom)
+        self.assertEqual(index.totalTraceCount, sum(sourceCounts.values()))
+
+        sourceWeights, receiverWeights = index.stationTraceCounts()
+        _, sourceLine, sourcePoint = index.sourceArrays[:3]
+        _, receiverLine, receiverPoint = index.receiverArrays[:3]
+        self.assertTrue(np.all(np.diff(sourceLine * 100 + sourcePoint) > 0))    # sorted on (Index, Line, Point)
+        self.assertEqual(sourceWeights.size, 38)
+        self.assertEqual(receiverWeights.size, 238)
+        for s in range(sourceWeights.size):
+            self.assertEqual(sourceWeights[s], sourceCounts.get((sourceLine[s], sourcePoint[s]), 0))
+        for r in range(receiverWeights.size):
+            self.assertEqual(receiverWeights[r], receiverCounts.get((receiverLine[r], receiverPoint[r]), 0))
+
+    def testShotAndLineRanges(self):
+        srcGeom, relGeom, recGeom = self.createGeometry()
+        index = buildGeometryRelationIndex(srcGeom, relGeom, recGeom)
+        receiverLine = index.receiverArrays[1]
+
+        _, lineLine, lineStart, lineEnd = index.receiverLines
+        np.testing.assert_array_equal(lineLine, np.arange(2001, 2007))
+        for line, start, end in zip(lineLine, lineStart, lineEnd):
+            self.assertTrue(np.all(receiverLine[start:end] == line))
+
+        self.assertEqual(index.shotRelationStart[-1], index.relationOrder.size)
+        for s in range(index.sourceArrays[0].size):
+            left, right = index.shotReceiverRanges(s)
+            self.assertEqual(left.size, 3)                                      # three receiver lines per shot
+            np.testing.assert_array_equal(index.relSrcIdx[index.relationOrder[index.shotRelationStart[s]:index.shotRelationStart[s + 1]]], s)
+            self.assertEqual(int(np.sum(right - left)), index.stationTraceCounts()[0][s])
+
+    def testCacheKeepsMostRecentlyUsedIndexes(self):
+        srcGeom, relGeom, recGeom = self.createGeometry()
+        indexes = [buildGeometryRelationIndex(srcGeom, relGeom, recGeom, key) for key in ('a', 'b', 'c')]
+        cache = GeometryRelationIndexCache(maxEntries=2)
+
+        cache.put(buildGeometryRelationIndex(srcGeom, relGeom, recGeom))       # no key; not kept
+        self.assertEqual(len(cache), 0)
+
+        cache.put(indexes[0])
+        cache.put(indexes[1])
+        self.assertIs(cache.get('a'), indexes[0])                               # 'a' is now the most recent one
+        cache.put(indexes[2])
+
+        self.assertEqual(len(cache), 2)
+        self.assertIs(cache.get('a'), indexes[0])
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNone(cache.get(''))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+# coding=utf-8
+import os
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from .plugin_loader import loadPluginModule
+
+numbaCacheModule = loadPluginModule('numba_cache')
+auxFunctionsNumbaModule = loadPluginModule('aux_functions_numba')
+
+precompileKernel = numbaCacheModule.precompileKernel
+startNumbaWarmUp = numbaCacheModule.startNumbaWarmUp
+numbaOffsetBin = auxFunctionsNumbaModule.numbaOffsetBin
+
+
+@unittest.skipUnless(numbaCacheModule.haveNumba, 'numba is not installed')
+class NumbaCacheTest(unittest.TestCase):
+    def testPrecompiledKernelIsCachedAndMatchesCallWithDefaults(self):
+        import numba
+
+        if numba.config.DISABLE_JIT:
+            self.skipTest('numba JIT is disabled')
+
+        slice2D = np.zeros((3, 16), dtype=np.float32)
+        self.assertTrue(precompileKernel(numbaOffsetBin, slice2D))               # 'unique' is left at its default
+        signatures = list(numbaOffsetBin.signatures)
+
+        offsetX, _, noData = numbaOffsetBin(slice2D)                            # runs the precompiled overload; nothing new is compiled
+        self.assertTrue(noData)
+        self.assertEqual(offsetX.shape, (0,))
+        self.assertEqual(numbaOffsetBin.signatures, signatures)
+
+        cachePath = numbaOffsetBin.stats.cache_path
+        self.assertEqual(os.path.normcase(cachePath), os.path.normcase(numbaCacheModule.configureNumbaCache()))
+        self.assertTrue(any(name.startswith('aux_functions_numba.numbaOffsetBin') for name in os.listdir(cachePath)))
+
+    def testCacheLocationIsNotChangedForOtherCode(self):
+        import numba
+
+        if numba.config.CACHE_DIR:
+            self.skipTest('NUMBA_CACHE_DIR is set by the user')
+
+        self.assertNotIn('NUMBA_CACHE_DIR', os.environ)                         # the process-wide setting is left alone
+        locator = numbaCacheModule.PluginCacheLocator
+        self.assertIsNone(locator.from_function(os.path.join, os.path.__file__))      # not a plugin source file
+        self.assertIsNotNone(locator.from_function(numbaOffsetBin.py_func, auxFunctionsNumbaModule.__file__))
+
+    def testMissingLocatorApiFallsBackToNumbaDefault(self):
+        import numba
+
+        if numba.config.CACHE_DIR:
+            self.skipTest('NUMBA_CACHE_DIR is set by the user')
+
+        with mock.patch.object(numbaCacheModule, '_CacheImpl', object()):     # a numba version without CacheImpl._locator_classes
+            self.assertEqual(numbaCacheModule.configureNumbaCache(), numbaCacheModule._defaultCacheDir())
+            numbaCacheModule.releaseNumbaCache()                                # nothing to remove; must not raise
+
+    def testWarmUpCompilesHotKernelsInBackground(self):
+        finished = []
+        thread = startNumbaWarmUp(lambda compiled, errorText: finished.append((compiled, errorText)))
+        if thread is None:
+            self.skipTest('numba JIT is disabled')
+
+        thread.join()
+        compiled, errorText = finished[0]
+        self.assertEqual(errorText, '')
+        self.assertIn('compute_illumination_row_numba', compiled)
+        self.assertIn('numbaPhaseTable', compiled)
+        self.assertIn('numbaAccumulateOffsetAzimuth', compiled)
+        self.assertIn('numbaLineScatter', compiled)
+
+
+if __name__ == '__main__':
+    unittest.main()
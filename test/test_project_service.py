@@ -3,6 +3,7 @@ import gc
 import os
 import tempfile
 import unittest
+import zlib
 from unittest import mock
 
 import numpy as np
@@ -13,12 +14,19 @@ from .utilities import createTestSurvey, getQgisApp, writeMinimalProjectFixture
 
 QGIS_APP = getQgisApp()
 
+analysisLayoutModule = loadPluginModule('analysis_layout')
 projectServiceModule = loadPluginModule('project_service')
+projectStoreModule = loadPluginModule('project_store')
 rollOutputModule = loadPluginModule('roll_output')
 rollSurveyModule = loadPluginModule('roll_survey')
 spsModule = loadPluginModule('sps_io_and_qc')
 
+COMPACT_RECORD_DTYPE = analysisLayoutModule.COMPACT_RECORD_DTYPE
+CompactTraceEncoding = analysisLayoutModule.CompactTraceEncoding
+LossyEncodingError = analysisLayoutModule.LossyEncodingError
+traceOffsetAzimuth = analysisLayoutModule.traceOffsetAzimuth
 ProjectService = projectServiceModule.ProjectService
+ChunkedArrayStore = projectStoreModule.ChunkedArrayStore
 RollOutput = rollOutputModule.RollOutput
 RollSurvey = rollSurveyModule.RollSurvey
 pntType4 = spsModule.pntType4
@@ -186,6 +194,116 @@ class ProjectServiceTest(unittest.TestCase):
             del memmap
             gc.collect()
 
+    def testColumnLayoutKeepsTraceIndexingAndStoresFieldsContiguously(self):
+        service = ProjectService()
+        shape = (2, 3, 4, 16)
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            projectPath = os.path.join(tempDir, 'project_service.roll')
+
+            created = service.createAnalysisMemmap(projectPath, shape, layout='columns')
+            self.assertTrue(created.success)
+            self.assertIsInstance(created.memmap, np.memmap)
+            self.assertEqual(created.memmap.shape, shape)
+            self.assertEqual(service.readAnalysisLayout(projectPath), 'columns')
+
+            created.memmap[1, 2, 3, 13] = 250.0                                 # offset of the last trace
+            created.memmap[0, 0, 0, 14] = 45.0                                  # azimuth of the first trace
+            created.memmap.flush()
+            self.assertEqual(created.an2Output.shape, (24, 16))
+            self.assertEqual(created.an2Output[23, 13], 250.0)
+
+            raw = np.fromfile(service.sidecarPath(projectPath, '.ana.npy'), dtype=np.float32).reshape(16, 24)
+            self.assertEqual(raw[13, 23], 250.0)                                # the offset plane is contiguous on disk
+            self.assertEqual(raw[14, 0], 45.0)
+
+            opened = service.openAnalysisMemmap(projectPath, shape, mode='r+')
+            self.assertTrue(opened.success)
+            self.assertEqual(opened.layout, 'columns')
+            np.testing.assert_array_equal(opened.memmap, created.memmap)
+            del created, opened
+            gc.collect()
+
+            interleaved = service.createAnalysisMemmap(projectPath, shape)     # back to the default removes the descriptor
+            self.assertTrue(interleaved.success)
+            self.assertFalse(service.sidecarExists(projectPath, '.ana.json'))
+
+            del interleaved
+            gc.collect()
+
+    def testCompactLayoutDecodesTheTraceTableAfterBinning(self):
+        service = ProjectService()
+        anaOutput = self.compactTraceTable()
+        shape = anaOutput.shape
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            projectPath = os.path.join(tempDir, 'project_service.roll')
+            path = service.sidecarPath(projectPath, '.ana.npy')
+
+            created = service.createAnalysisMemmap(projectPath, shape, layout='compact')
+            self.assertEqual(created.layout, 'interleaved')                     # binning fills float32 traces
+            created.memmap[:] = anaOutput
+            del created
+            gc.collect()
+
+            compact = service.compactAnalysisFile(projectPath, shape, chunkBytes=1)
+            self.assertTrue(compact.success, compact.errorText)
+            self.assertEqual(service.readAnalysisLayout(projectPath), 'compact')
+            self.assertEqual(os.path.getsize(path), 6 * 4 * 3 * COMPACT_RECORD_DTYPE.itemsize)
+
+            encoding = CompactTraceEncoding.fromDict(service.readAnalysisDescriptor(projectPath).encoding)
+            table, rows = compact.memmap, compact.an2Output
+            self.assertEqual(table.shape, shape)
+            self.assertEqual(rows.shape, (72, 16))
+            decoded = np.asarray(table)
+            self.assertWithinCompactBounds(decoded, anaOutput, encoding)
+            np.testing.assert_array_equal(decoded[..., [0, 1, 2, 15]], anaOutput[..., [0, 1, 2, 15]])
+            np.testing.assert_array_equal(table[2, 1, :, :], decoded[2, 1])     # bin slice
+            np.testing.assert_array_equal(table[:, 3, :, :], decoded[:, 3])     # in-line stack response
+            np.testing.assert_array_equal(table[4, 1, 1:, 13], decoded[4, 1, 1:, 13])
+            np.testing.assert_array_equal(rows[30:41], decoded.reshape(-1, 16)[30:41])  # a page of the trace table
+            self.assertEqual(rows[-2, 2], 2.0)                                  # fold slot 1 of the last bin
+            self.assertEqual(rows[5, 2], 0.0)                                   # the empty fold slot 2 of bin (0, 1)
+
+            opened = service.openAnalysisMemmap(projectPath, shape)
+            self.assertTrue(opened.success)
+            np.testing.assert_array_equal(np.asarray(opened.an2Output), decoded.reshape(-1, 16))
+
+            # the project store archives the records as they are, and unpacks them as a compact file again
+            self.assertTrue(service.archiveAnalysisToStore(projectPath, table))
+            store = ChunkedArrayStore(service.projectStorePath(projectPath))
+            self.assertTrue(store.arrayEncoding('.ana.npy')['lossless'])
+            records = np.fromfile(path, dtype=COMPACT_RECORD_DTYPE)
+            del compact, opened, table, rows
+            gc.collect()
+
+            self.assertTrue(service.removeArchivedAnalysis(projectPath))
+            self.assertTrue(service.restoreAnalysisFromStore(projectPath))
+            self.assertEqual(service.readAnalysisLayout(projectPath), 'compact')
+            np.testing.assert_array_equal(np.fromfile(path, dtype=COMPACT_RECORD_DTYPE), records)
+
+    def testCompactLayoutKeepsFloat32TracesThatDoNotFit(self):
+        service = ProjectService()
+        anaOutput = self.compactTraceTable()
+        anaOutput[0, 0, 0, 0] += 0.5                                            # a fractional stake number
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            projectPath = os.path.join(tempDir, 'project_service.roll')
+            created = service.createAnalysisMemmap(projectPath, anaOutput.shape, layout='compact')
+            created.memmap[:] = anaOutput
+            del created
+            gc.collect()
+
+            compact = service.compactAnalysisFile(projectPath, anaOutput.shape)
+            self.assertFalse(compact.success)
+            self.assertEqual(service.readAnalysisLayout(projectPath), 'interleaved')
+            self.assertFalse(os.path.exists(service.sidecarPath(projectPath, '.ana.npy') + '.tmp'))
+
+            opened = service.openAnalysisMemmap(projectPath, anaOutput.shape)
+            np.testing.assert_array_equal(opened.memmap, anaOutput)
+            del opened
+            gc.collect()
+
     def testOpenAnalysisMemmapFallsBackToCopyOnWriteWhenWritableOpenIsDenied(self):
         service = ProjectService()
         shape = (2, 3, 1, 16)
@@ -300,6 +418,289 @@ class ProjectServiceTest(unittest.TestCase):
             del anaMemmap
             gc.collect()
 
+    def testProjectStoreReadsChunksAndRowRanges(self):
+        ana = np.arange(6 * 3 * 2 * 16, dtype=np.float32).reshape(6, 3, 2, 16)
+        rel = np.array([(1, 100.5), (2, 200.5)], dtype=[('RecNum', np.int32), ('East', np.float64)])
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            store = ChunkedArrayStore(os.path.join(tempDir, 'project.roll.store'))
+            store.write({'ana': ana, 'rel': rel}, chunkBytes=3 * 2 * 16 * 4 * 2)  # two x-rows per chunk
+
+            reopened = ChunkedArrayStore(store.path)
+            info = reopened.arrayInfo('ana')
+
+            self.assertEqual(info.chunkRows, 2)
+            self.assertEqual(info.chunkCount, 3)
+            np.testing.assert_array_equal(reopened.readArray('ana'), ana)
+            np.testing.assert_array_equal(reopened.readRows('ana', 1, 4), ana[1:4])
+            np.testing.assert_array_equal(reopened.readChunk('ana', 2), ana[4:6])
+            np.testing.assert_array_equal(reopened.readArray('rel'), rel)
+
+            reopened.write({'ana': None, 'extra': np.ones(3, dtype=np.float32)})
+            self.assertEqual(sorted(ChunkedArrayStore(store.path).names()), ['ana', 'extra', 'rel'])
+            np.testing.assert_array_equal(ChunkedArrayStore(store.path).readArray('ana'), ana)
+
+    def testProjectStoreAppendsUpdatesAndCompactsUnusedBytes(self):
+        ana = np.arange(8 * 3 * 2 * 16, dtype=np.float32).reshape(8, 3, 2, 16)
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            store = ChunkedArrayStore(os.path.join(tempDir, 'project.roll.store'))
+            store.write({'ana': ana, 'rec': np.zeros(4, dtype=np.float32)})
+            anaChunks = store._entry('ana')['chunks']
+            size = os.path.getsize(store.path)
+
+            store.write({'rec': np.ones(4, dtype=np.float32)})                 # appended; the trace table isn't copied
+            self.assertEqual(ChunkedArrayStore(store.path)._entry('ana')['chunks'], anaChunks)
+            self.assertLess(os.path.getsize(store.path), size + 1000)
+
+            for value in range(2, 40):
+                store.write({'rec': np.full(4, value, dtype=np.float32)})
+            self.assertLess(os.path.getsize(store.path), 2 * size)             # replaced entries and indexes are compacted away
+
+            with mock.patch.object(ChunkedArrayStore, '_writeArray', autospec=True, side_effect=ValueError('encoding failed')):
+                with self.assertRaises(ValueError):
+                    store.write({'rec': np.zeros(4, dtype=np.float32)})
+
+            reopened = ChunkedArrayStore(store.path)
+            np.testing.assert_array_equal(reopened.readArray('ana'), ana)
+            np.testing.assert_array_equal(reopened.readArray('rec'), np.full(4, 39, dtype=np.float32))
+
+    def testProjectStoreSurvivesAnInterruptedAppend(self):
+        ana = np.arange(8 * 3 * 2 * 16, dtype=np.float32).reshape(8, 3, 2, 16)
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            store = ChunkedArrayStore(os.path.join(tempDir, 'project.roll.store'))
+            store.write({'ana': ana, 'rec': np.zeros(4, dtype=np.float32)})
+            store.write({'rec': np.ones(4, dtype=np.float32)})
+            size = os.path.getsize(store.path)
+
+            with open(store.path, 'ab') as f:
+                f.write(zlib.compress(np.full(64, 3, dtype=np.float32).tobytes()))  # a chunk of an append that was cut off
+                f.write(projectStoreModule.STORE_FOOTER_MAGIC)                  # with a stray footer magic in it
+                f.write(b'{"version": 1, "arrays": {"rec": {"dtype": "<f4"')    # and half of its index
+
+            reopened = ChunkedArrayStore(store.path)
+            np.testing.assert_array_equal(reopened.readArray('ana'), ana)
+            np.testing.assert_array_equal(reopened.readArray('rec'), np.ones(4, dtype=np.float32))
+
+            reopened.write({'rec': np.full(4, 2, dtype=np.float32)})            # overwrites the torn tail
+            self.assertLess(os.path.getsize(store.path), size + 1000)
+            np.testing.assert_array_equal(ChunkedArrayStore(store.path).readArray('rec'), np.full(4, 2, dtype=np.float32))
+            np.testing.assert_array_equal(ChunkedArrayStore(store.path).readArray('ana'), ana)
+
+    def testSaveSidecarsToProjectStoreAndLoadThemBack(self):
+        service = ProjectService()
+        survey = self.createSurvey()
+        survey.grid.fold = 2
+
+        output = RollOutput()
+        output.binOutput = np.full((10, 4), 2.0, dtype=np.float32)
+        output.minOffset = np.full((10, 4), 50.0, dtype=np.float32)
+        output.anaOutput = np.full((10, 4, 2, 16), 5.0, dtype=np.float32)
+        recGeom = np.arange(8, dtype=np.float32).reshape(4, 2)
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            projectPath = os.path.join(tempDir, 'project_service.roll')
+            service.saveArraySidecar(projectPath, '.bin.npy', np.zeros((10, 4), dtype=np.float32))  # stale loose sidecar
+
+            with mock.patch.object(ChunkedArrayStore, 'write', autospec=True, side_effect=ChunkedArrayStore.write) as write:
+                self.assertTrue(service.saveProjectSidecars(projectPath, output, recGeom=recGeom, useProjectStore=True))
+            self.assertEqual(write.call_count, 1)                               # analysis and survey data in one store update
+
+            self.assertTrue(os.path.exists(service.projectStorePath(projectPath)))
+            self.assertFalse(service.sidecarExists(projectPath, '.bin.npy'))
+            np.testing.assert_array_equal(service.loadSizedArraySidecar(projectPath, '.bin.npy', (10, 4)).array, output.binOutput)
+            np.testing.assert_array_equal(service.loadArraySidecar(projectPath, '.rec.npy').array, recGeom)
+
+            result = service.loadProjectSidecars(projectPath, survey)
+
+            self.assertTrue(result.existingSidecars['.ana.npy'])
+            self.assertTrue(result.analysisInStore)                             # left to the background thread
+            self.assertIsNone(result.analysisMemmapResult)
+            self.assertFalse(service.sidecarExists(projectPath, '.ana.npy'))
+            self.assertTrue(any('unpacking trace table from project store' in message.text for message in result.messages))
+
+            self.assertTrue(service.restoreAnalysisFromStore(projectPath))
+            result = service.loadAnalysisTraceTable(projectPath, survey, result.maximumFold)
+            self.assertTrue(result.analysisMemmapResult.success)
+            np.testing.assert_array_equal(result.analysisMemmapResult.memmap, output.anaOutput)
+
+            result.analysisMemmapResult.memmap.flush()
+            del result
+            gc.collect()
+
+    def testUnchangedTraceTableIsNotArchivedAgain(self):
+        service = ProjectService()
+        shape = (4, 3, 2, 16)
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            projectPath = os.path.join(tempDir, 'project_service.roll')
+            path = service.sidecarPath(projectPath, '.ana.npy')
+            memmap = np.memmap(path, dtype=np.float32, mode='w+', shape=shape)
+            memmap.fill(5.0)
+
+            with mock.patch.object(ChunkedArrayStore, '_writeArray', autospec=True, side_effect=ChunkedArrayStore._writeArray) as writeArray:
+                self.assertTrue(service.saveProjectStoreSidecars(projectPath, {'.ana.npy': memmap}))
+                self.assertEqual(writeArray.call_count, 0)                      # a live memmap is only archived when the project is closed
+
+                self.assertTrue(service.archiveAnalysisToStore(projectPath, memmap))
+                self.assertTrue(service.archiveAnalysisToStore(projectPath, memmap))
+                self.assertEqual(writeArray.call_count, 1)                      # the second archive leaves the stored entry in place
+
+                memmap[1, 2, 0, 12] = 7.0
+                os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000_000))  # don't depend on the file system's mtime resolution
+                self.assertTrue(service.archiveAnalysisToStore(projectPath, memmap))
+                self.assertEqual(writeArray.call_count, 2)
+
+            expected = np.array(memmap)
+            del memmap
+            gc.collect()
+
+            self.assertTrue(service.removeArchivedAnalysis(projectPath))
+            self.assertFalse(os.path.exists(path))
+            self.assertTrue(service.restoreAnalysisFromStore(projectPath))
+            restored = np.memmap(path, dtype=np.float32, mode='r', shape=shape)
+            np.testing.assert_array_equal(restored, expected)
+            with mock.patch.object(ChunkedArrayStore, '_writeArray', autospec=True, side_effect=ChunkedArrayStore._writeArray) as writeArray:
+                self.assertTrue(service.archiveAnalysisToStore(projectPath, restored))
+            self.assertEqual(writeArray.call_count, 0)                          # the unpacked table is what the store holds
+            del restored
+            gc.collect()
+
+            os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000_000))  # changed after it was archived
+            self.assertFalse(service.removeArchivedAnalysis(projectPath))
+            self.assertTrue(os.path.exists(path))
+
+    def compactTraceTable(self):
+        rng = np.random.default_rng(7)
+        anaOutput = np.zeros((6, 4, 3, 16), dtype=np.float32)
+        src = np.stack([rng.uniform(480_000.0, 500_000.0, (6, 4, 2)), rng.uniform(6_200_000.0, 6_220_000.0, (6, 4, 2)), rng.uniform(0.0, 50.0, (6, 4, 2))], axis=-1)
+        rec = np.stack([rng.uniform(480_000.0, 500_000.0, (6, 4, 2)), rng.uniform(6_200_000.0, 6_220_000.0, (6, 4, 2)), rng.uniform(0.0, 50.0, (6, 4, 2))], axis=-1)
+        src, rec = src.astype(np.float32).astype(np.float64), rec.astype(np.float32).astype(np.float64)
+        anaOutput[:, :, :2, 0] = 1001.0                                         # stake numbers
+        anaOutput[:, :, :2, 1] = 2002.0
+        anaOutput[:, :, :2, 2] = [1.0, 2.0]                                     # fold slots 0 and 1 are used, slot 2 is empty
+        anaOutput[:, :, :2, 3:6] = src
+        anaOutput[:, :, :2, 6:9] = rec
+        anaOutput[:, :, :2, 9:12] = 0.5 * (src + rec)
+        anaOutput[:, :, :2, 11] = rng.uniform(-3000.0, -1000.0, (6, 4, 2))       # reflector depth
+        anaOutput[:, :, :2, 12] = rng.uniform(0.0, 4000.0, (6, 4, 2))
+        anaOutput[:, :, :2, 13], anaOutput[:, :, :2, 14] = traceOffsetAzimuth(src[..., 0], src[..., 1], rec[..., 0], rec[..., 1])
+        anaOutput[:, :, :1, 15] = -1.0                                          # unique flag
+        return anaOutput
+
+    def assertWithinCompactBounds(self, decoded, traces, encoding):
+        error = np.abs(decoded.astype(np.float64) - traces)
+        self.assertTrue(np.all(error <= encoding.maximumError() + np.spacing(np.abs(traces))))
+
+    def testCompactRecordsShrinkTheTraceTable(self):
+        anaOutput = self.compactTraceTable()
+        encoding = CompactTraceEncoding.fromTraceTable(anaOutput)
+        self.assertEqual(CompactTraceEncoding.fromTraceTable(anaOutput, chunkBytes=1), encoding)  # scanned one x-row at a time
+
+        self.assertLessEqual(COMPACT_RECORD_DTYPE.itemsize, 38)
+        self.assertLessEqual(encoding.encode(anaOutput).nbytes / anaOutput.nbytes, 0.6)
+        self.assertWithinCompactBounds(encoding.decode(encoding.encode(anaOutput)), anaOutput, encoding)
+
+        slotted = anaOutput.copy()
+        slotted[:, :, :2, 13] = np.round(slotted[:, :, :2, 13] / 250.0) * 250.0  # offsets slotted and written back by 'Unique offsets'
+        slotted[:, :, :2, 14] = np.round(slotted[:, :, :2, 14] / 45.0) * 45.0
+        slottedEncoding = CompactTraceEncoding.fromTraceTable(slotted)
+        np.testing.assert_array_equal(slottedEncoding.decode(slottedEncoding.encode(slotted))[..., 13:15], slotted[..., 13:15])
+
+    def testCompactRecordsRejectColumnsOutsideTheirBounds(self):
+        anaOutput = self.compactTraceTable()
+        encoding = CompactTraceEncoding.fromTraceTable(anaOutput)
+
+        fractional = anaOutput.copy()
+        fractional[0, 0, 0, 0] += 0.5                                           # stake numbers must be integers
+        self.assertIsNone(CompactTraceEncoding.fromTraceTable(fractional))
+        with self.assertRaisesRegex(LossyEncodingError, 'column 0'):
+            encoding.encode(fractional)
+
+        beyond = anaOutput.copy()
+        beyond[1, 2, 1, 13] = 1.0e8                                             # an offset out of the range the steps were chosen for
+        with self.assertRaisesRegex(LossyEncodingError, 'column 13'):
+            encoding.encode(beyond)
+
+        flagged = anaOutput.copy()
+        flagged[2, 1, 1, 15] = 1.0                                              # the unique flag is 0 or -1
+        self.assertIsNone(CompactTraceEncoding.fromTraceTable(flagged))
+        with self.assertRaisesRegex(LossyEncodingError, 'column 15'):
+            encoding.encode(flagged)
+
+    def testTraceTableIsStoredAsCompactRecordsWithBoundedError(self):
+        service = ProjectService()
+        anaOutput = self.compactTraceTable()
+
+        encoding = CompactTraceEncoding.fromTraceTable(anaOutput)
+        self.assertEqual(encoding.coordStep, 0.01)
+        self.assertEqual(encoding.traceShape, (4, 3))
+
+        output = RollOutput()
+        output.anaOutput = anaOutput
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            projectPath = os.path.join(tempDir, 'project_service.roll')
+            self.assertTrue(service.saveAnalysisSidecars(projectPath, output, useProjectStore=True))
+
+            store = ChunkedArrayStore(service.projectStorePath(projectPath))
+            self.assertEqual(store.arrayEncoding('.ana.npy')['codec'], 'compact-trace-v2')
+            self.assertLess(store.arrayInfo('.ana.npy').rawBytes, anaOutput.nbytes)
+
+            self.assertTrue(service.restoreAnalysisFromStore(projectPath))
+            rows = np.fromfile(service.sidecarPath(projectPath, '.ana.npy'), dtype=np.float32).reshape(anaOutput.shape)[2:5]
+
+        self.assertEqual(rows.dtype, np.float32)
+        self.assertEqual(rows.shape, (3, 4, 3, 16))
+        expected = anaOutput[2:5]
+        np.testing.assert_array_equal(rows[..., [0, 1, 2, 15]], expected[..., [0, 1, 2, 15]])  # integer columns are lossless
+        np.testing.assert_array_equal(rows[:, :, 2], 0.0)                       # empty slots stay empty
+        self.assertEqual(encoding.zStep, 0.1)                                   # reflector depths need 10 cm steps
+        self.assertWithinCompactBounds(rows, expected, encoding)
+        self.assertEqual(encoding.maximumError()[14], 0.005)                    # azimuths in 0.01 degree steps
+
+    def testArchiveIsExactBeforeTheTraceTableIsRemoved(self):
+        service = ProjectService()
+        lossy = self.compactTraceTable()
+        exact = np.zeros((3, 2, 2, 16), dtype=np.float32)                       # integer coordinates, flat earth, no travel times
+        exact[..., :1, 0:3] = [1001.0, 2002.0, 1.0]
+        exact[..., :1, 3:5] = [480_000.0, 6_200_000.0]
+        exact[..., :1, 6:8] = [480_300.0, 6_200_000.0]
+        exact[..., :1, 9:11] = [480_150.0, 6_200_000.0]
+        exact[..., :1, 13:15] = [300.0, 90.0]
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            for name, table, codec in (('lossy', lossy, None), ('exact', exact, 'compact-trace-v2')):
+                projectPath = os.path.join(tempDir, f'{name}.roll')
+                path = service.sidecarPath(projectPath, '.ana.npy')
+                memmap = np.memmap(path, dtype=np.float32, mode='w+', shape=table.shape)
+                memmap[:] = table
+                self.assertTrue(service.archiveAnalysisToStore(projectPath, memmap))
+                del memmap
+                gc.collect()
+
+                encoding = ChunkedArrayStore(service.projectStorePath(projectPath)).arrayEncoding('.ana.npy')
+                self.assertEqual(encoding and encoding['codec'], codec)          # lossy compact records fall back to float32 traces
+                self.assertTrue(service.removeArchivedAnalysis(projectPath))
+                self.assertTrue(service.restoreAnalysisFromStore(projectPath))
+                restored = np.fromfile(path, dtype=np.float32).reshape(table.shape)
+                np.testing.assert_array_equal(restored.view(np.uint32), table.view(np.uint32))
+
+            # a compact archive that wasn't verified to be lossless never replaces the trace table
+            projectPath = os.path.join(tempDir, 'approximate.roll')
+            path = service.sidecarPath(projectPath, '.ana.npy')
+            memmap = np.memmap(path, dtype=np.float32, mode='w+', shape=lossy.shape)
+            memmap[:] = lossy
+            source = service.analysisSource(memmap)
+            store = service.openProjectStore(projectPath)
+            store.write({'.ana.npy': memmap}, encoders={'.ana.npy': CompactTraceEncoding.fromTraceTable(lossy)}, sources={'.ana.npy': source})
+            del memmap
+            gc.collect()
+
+            self.assertFalse(service.removeArchivedAnalysis(projectPath))
+            self.assertTrue(os.path.exists(path))
+
 
 if __name__ == '__main__':
     unittest.main()
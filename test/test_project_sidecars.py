@@ -56,6 +56,8 @@ auxFunctionsModule = loadPluginModule('aux_functions')
 workerThreadsModule = loadPluginModule('worker_threads')
 binningWorkerMixinModule = loadPluginModule('binning_worker_mixin')
 workerOperationControllerModule = loadPluginModule('worker_operation_controller')
+geometryRelationIndexModule = loadPluginModule('geometry_relation_index')
+stackResponseCacheModule = loadPluginModule('stack_response_cache')
 propertyPanelControllerModule = loadPluginModule('property_panel_controller')
 printPresentationControllerModule = loadPluginModule('print_presentation_controller')
 layoutTabModule = loadPluginModule('roll_main_window_create_layout_tab')
@@ -94,6 +96,7 @@ CfpFromTemplatesRequest = workerThreadsModule.CfpFromTemplatesRequest
 CfpFromTemplatesResult = workerThreadsModule.CfpFromTemplatesResult
 CfpFromGeometryTablesRequest = workerThreadsModule.CfpFromGeometryTablesRequest
 CfpFromGeometryTablesResult = workerThreadsModule.CfpFromGeometryTablesResult
+CfpMultiPointFromGeometryTablesRequest = workerThreadsModule.CfpMultiPointFromGeometryTablesRequest
 CfpAmplitudeMapRequest = workerThreadsModule.CfpAmplitudeMapRequest
 CfpAmplitudeMapResult = workerThreadsModule.CfpAmplitudeMapResult
 BinningWorker = workerThreadsModule.BinningWorker
@@ -101,7 +104,10 @@ BinFromGeometryWorker = workerThreadsModule.BinFromGeometryWorker
 GeometryWorker = workerThreadsModule.GeometryWorker
 CfpFromTemplatesWorker = workerThreadsModule.CfpFromTemplatesWorker
 CfpFromGeometryTablesWorker = workerThreadsModule.CfpFromGeometryTablesWorker
+CfpMultiPointFromGeometryTablesWorker = workerThreadsModule.CfpMultiPointFromGeometryTablesWorker
 CfpAmplitudeMapWorker = workerThreadsModule.CfpAmplitudeMapWorker
+geometryKey = geometryRelationIndexModule.geometryKey
+stackResponseKey = stackResponseCacheModule.stackResponseKey
 Layout3DWidget = layout3DModule.Layout3DWidget
 
 
@@ -1215,12 +1221,12 @@ class ProjectSidecarsTest(unittest.TestCase):
         self.mainWindow.output.binOutput = np.ones((2, 2), dtype=np.float32)
         self.mainWindow.actionOffAziPolar.setChecked(True)
 
-        with patch.object(rollMainWindowModule.fnb, 'numbaSliceStats') as sliceStats:
+        with patch.object(rollMainWindowModule.fnb, 'numbaOffsetAzimuthHistograms') as histogramBuilder:
             with patch.object(self.mainWindow, 'renderOffAziPolar') as renderPolar:
                 with patch.object(self.mainWindow, 'renderOffAziRectangular') as renderRectangular:
                     self.mainWindow.dispatchAnalysisRedraw('off-azi', rollMainWindowModule.AnalysisRedrawReason.offAziDisplayModeChanged)
 
-        sliceStats.assert_not_called()
+        histogramBuilder.assert_not_called()
         self.assertIs(self.mainWindow.output.ofAziHist, histogram)
         renderPolar.assert_called_once()
         renderRectangular.assert_not_called()
@@ -1252,17 +1258,20 @@ class ProjectSidecarsTest(unittest.TestCase):
         self.mainWindow.output.binOutput = np.ones((2, 2), dtype=np.float32)
         self.mainWindow.output.anaOutput = np.ones((1, 1, 1, 16), dtype=np.float32)
 
-        with patch.object(rollMainWindowModule.fnb, 'numbaSliceStats', return_value=(np.array([10.0, 20.0], dtype=np.float32), np.array([0.0, 0.0], dtype=np.float32), False)) as sliceStats:
+        with patch.object(rollMainWindowModule.fnb, 'numbaOffsetAzimuthHistograms', return_value=(None, np.array([2, 0, 0], dtype=np.int64), False)) as histogramBuilder:
             with patch.object(self.mainWindow, 'renderPreparedOffsetPlot') as renderPrepared:
                 with patch.object(self.mainWindow.offsetWidget, 'setTitle'):
                     self.mainWindow.dispatchAnalysisRedraw('offset', rollMainWindowModule.AnalysisRedrawReason.visiblePlotActivated)
 
                     self.assertIs(self.mainWindow.output.offstHist, histogram)
-                    sliceStats.assert_not_called()
+                    histogramBuilder.assert_not_called()
 
                     self.mainWindow.dispatchAnalysisRedraw('offset', rollMainWindowModule.AnalysisRedrawReason.controller)
 
-        sliceStats.assert_called_once_with(self.mainWindow.output.anaOutput, self.mainWindow.survey.unique.apply)
+        histogramBuilder.assert_called_once()
+        self.assertIs(histogramBuilder.call_args[0][0], self.mainWindow.output.anaOutput)
+        self.assertEqual(histogramBuilder.call_args[0][4], self.mainWindow.survey.unique.apply)
+        np.testing.assert_array_equal(self.mainWindow.output.offstHist, [[0.0, 50.0, 100.0, 150.0], [2.0, 0.0, 0.0, 0.0]])
         self.assertIsNot(self.mainWindow.output.offstHist, histogram)
         self.assertEqual(renderPrepared.call_count, 2)
 
@@ -1593,6 +1602,7 @@ class ProjectSidecarsTest(unittest.TestCase):
         self.assertTrue(self.mainWindow.actionCFPPointAnalysisFromGeometry.isVisible())
         self.assertTrue(self.mainWindow.actionCFPPointAnalysisFromTemplates.isEnabled())
         self.assertTrue(self.mainWindow.actionCFPPointAnalysisFromGeometry.isEnabled())
+        self.assertTrue(self.mainWindow.actionCFPMultiPointAnalysisFromGeometry.isEnabled())
 
         self.mainWindow.relGeom = None
 
@@ -1601,6 +1611,7 @@ class ProjectSidecarsTest(unittest.TestCase):
 
         self.assertTrue(self.mainWindow.actionCFPPointAnalysisFromTemplates.isEnabled())
         self.assertFalse(self.mainWindow.actionCFPPointAnalysisFromGeometry.isEnabled())
+        self.assertFalse(self.mainWindow.actionCFPMultiPointAnalysisFromGeometry.isEnabled())
         self.assertFalse(self.mainWindow.actionCFPPointAnalysisFromSPSInput.isEnabled())
 
     def testEnableProcessingMenuItemsEnablesCfpSpsActionsOnlyWhenFullSpsTablesAreAvailable(self):
@@ -1791,6 +1802,44 @@ class ProjectSidecarsTest(unittest.TestCase):
         helper.assert_called_once()
         self.assertIs(helper.call_args[0][1], cached)
 
+    def testPlotStkTrkReadsStackResponseCacheAndPrefetchesNeighbouringLines(self):
+        self.mainWindow.survey = self.createSurvey()
+        self.mainWindow.output.anaOutput = np.zeros((2, 5, 1, 1), dtype=np.float32)
+        cached = np.full((2, 4), -6.0, dtype=np.float32)
+        cache = self.mainWindow.plotRedrawHelper.stackResponseCache(self.mainWindow)
+        cache.put(stackResponseKey('stack-inline', 3, self.mainWindow.survey.unique.apply, 0.15, 0.05), cached)
+
+        with patch.object(self.mainWindow.plotRedrawHelper, 'buildInlineStackAxisValues', return_value=(0.15, 0.05, -25.0, 50.0)):
+            with patch.object(rollMainWindowModule.fnb, 'numbaNdft1D') as computeHelper:
+                with patch.object(cache, 'prefetch') as prefetchHelper:
+                    with patch.object(self.mainWindow, 'prepareAnalysisImageAndColorBar') as helper:
+                        self.mainWindow.plotStkTrk(3, 1000, 25.0, 10.0)
+
+        computeHelper.assert_not_called()
+        self.assertIs(helper.call_args[0][1], cached)
+        prefetchHelper.assert_called_once()
+        self.assertEqual(prefetchHelper.call_args[0][1], 'stack-inline')
+        self.assertEqual(prefetchHelper.call_args[0][2], [4, 2, 1, 0])          # no direction of travel yet; both sides alternate
+
+        self.mainWindow.plotRedrawHelper.reset()
+        self.assertEqual(len(cache), 0)
+
+    def testSpiderPrefetchReadsBinsAheadAndNextTraceTableChunk(self):
+        self.mainWindow.output.anaOutput = np.zeros((4, 3, 2, 16), dtype=np.float32)
+        chunked = SimpleNamespace(chunkSize=6, currentChunk=0, totalChunks=4)
+        cache = self.mainWindow.plotRedrawHelper.binSliceCache(self.mainWindow)
+
+        with patch.object(self.mainWindow.anaModel, '_chunkedData', chunked, create=True):
+            with patch.object(cache, 'prefetch') as prefetchHelper:
+                self.mainWindow._prefetchSpiderNeighbours(rollMainWindowModule.Direction.Rt, 1, 1, 1)
+
+        prefetchHelper.assert_called_once()
+        anaOutput, bins, prefetchChunked, chunkIndex = prefetchHelper.call_args[0]
+        self.assertIs(anaOutput, self.mainWindow.output.anaOutput)
+        self.assertEqual(bins, [(2, 1), (3, 1), (0, 1), (1, 2), (1, 0)])
+        self.assertIs(prefetchChunked, chunked)
+        self.assertEqual(chunkIndex, 2)                                         # bin (2, 1) starts at trace 14
+
     def testPlotStkBinUsesSharedAnalysisImageHelper(self):
         self.mainWindow.survey = self.createSurvey()
         self.mainWindow.output.anaOutput = np.zeros((1, 2, 1, 1), dtype=np.float32)
@@ -2267,9 +2316,8 @@ class ProjectSidecarsTest(unittest.TestCase):
 
             with patch.object(self.mainWindow.projectService, 'writeProjectXml') as writeProjectXml:
                 writeProjectXml.return_value = type('WriteResult', (), {'success': True, 'errorText': ''})()
-                with patch.object(self.mainWindow.projectService, 'saveAnalysisSidecars'):
-                    with patch.object(self.mainWindow.projectService, 'saveSurveyDataSidecars'):
-                        self.mainWindow.fileSave()
+                with patch.object(self.mainWindow.projectService, 'saveProjectSidecars'):
+                    self.mainWindow.fileSave()
 
             self.assertFalse(writeProjectXml.call_args.args[3])
 
@@ -2666,6 +2714,15 @@ class ProjectSidecarsTest(unittest.TestCase):
                 self.xmlString = xmlString
                 self.createArrays = createArrays
 
+            def createUniqueSlotBitsets(self):
+                self.output.uniqueSlots = None
+
+            def createFoldClassCubes(self, spec):
+                self.output.foldClasses = None
+
+            def calcFoldClassMaps(self):
+                pass
+
             def calcNoShotPoints(self):
                 self.calcCalled = True
 
@@ -2746,6 +2803,15 @@ class ProjectSidecarsTest(unittest.TestCase):
                 self.xmlString = xmlString
                 self.createArrays = createArrays
 
+            def createUniqueSlotBitsets(self):
+                self.output.uniqueSlots = None
+
+            def createFoldClassCubes(self, spec):
+                self.output.foldClasses = None
+
+            def calcFoldClassMaps(self):
+                pass
+
             def calcNoShotPoints(self):
                 self.calcCalled = True
 
@@ -2850,8 +2916,8 @@ class ProjectSidecarsTest(unittest.TestCase):
 
         self.assertIsNone(self.mainWindow.layoutImg)
         self.assertIsNone(self.mainWindow.layoutImItem)
-    self.assertIsNone(self.mainWindow.output.anaOutput)
-    self.assertIsNone(self.mainWindow.output.an2Output)
+        self.assertIsNone(self.mainWindow.output.anaOutput)
+        self.assertIsNone(self.mainWindow.output.an2Output)
         handleImageSelection.assert_called_once()
         self.assertIsNone(self.mainWindow.thread)
         self.assertIsNone(self.mainWindow.worker)
@@ -4109,6 +4175,15 @@ class ProjectSidecarsTest(unittest.TestCase):
                 self.xmlString = xmlString
                 self.createArrays = createArrays
 
+            def createUniqueSlotBitsets(self):
+                self.output.uniqueSlots = None
+
+            def createFoldClassCubes(self, spec):
+                self.output.foldClasses = None
+
+            def calcFoldClassMaps(self):
+                pass
+
             def calcNoShotPoints(self):
                 self.calcCalled = True
 
@@ -4246,8 +4321,8 @@ class ProjectSidecarsTest(unittest.TestCase):
 
         self.assertIsNone(self.mainWindow.layoutImg)
         self.assertIsNone(self.mainWindow.layoutImItem)
-    self.assertIsNone(self.mainWindow.output.anaOutput)
-    self.assertIsNone(self.mainWindow.output.an2Output)
+        self.assertIsNone(self.mainWindow.output.anaOutput)
+        self.assertIsNone(self.mainWindow.output.an2Output)
         handleImageSelection.assert_called_once()
         self.assertIsNone(self.mainWindow.thread)
         self.assertIsNone(self.mainWindow.worker)
@@ -4697,6 +4772,42 @@ class ProjectSidecarsTest(unittest.TestCase):
         phase1_idx = next((i for i in range(len(worker.survey.progress.values) - 1) if worker.survey.progress.values[i] == 100 and worker.survey.progress.values[i + 1] == 0), None)
         self.assertIsNotNone(phase1_idx, "Expected phase 1 to end at 100 and phase 2 to start at 0")
 
+    def testCfpBeamAccumulatorMergesDuplicateStationsAsTheyArrive(self):
+        survey = SimpleNamespace(output=SimpleNamespace(rctOutput=None), grid=None, errorText='')
+        rng = np.random.default_rng(38)
+        stations = np.round(rng.uniform(0.0, 2000.0, size=(400, 3)), 1).astype(np.float32)
+
+        table = workerThreadsModule.CfpStationTable(capacity=16)
+        allPoints, allWeights = [], []
+        for _ in range(25):
+            points = stations[rng.integers(0, stations.shape[0], 300)]
+            weights = rng.uniform(0.5, 2.0, points.shape[0])
+            table.add(points, weights)
+            allPoints.append(points)
+            allWeights.append(weights)
+
+        uniquePoints, inverse = np.unique(np.concatenate(allPoints), axis=0, return_inverse=True)
+        points, weights = table.stations()
+        order = np.lexsort(points.T[::-1])
+        self.assertEqual(table.count, uniquePoints.shape[0])
+        self.assertEqual(table.addedCount, 25 * 300)
+        np.testing.assert_array_equal(points[order], uniquePoints)
+        np.testing.assert_allclose(weights[order], np.bincount(inverse.ravel(), weights=np.concatenate(allWeights)))
+
+        def accumulate(flushThresholdPoints):
+            accumulator = workerThreadsModule.CfpBeamAccumulator(survey, -800.0, 20.0, 2000.0, 40.0, focalX=1000.0, focalY=1000.0, cfpArray=(-200.0, 200.0, 25.0))
+            accumulator.flushThresholdPoints = flushThresholdPoints
+            self.assertTrue(accumulator.initializeGrid())
+            for points in allPoints:
+                accumulator.accumulateWeightedPointArrays(points[:100], points[100:], np.full(100, 200.0), np.full(200, 100.0))
+            accumulator.flushBufferedPointArrays()
+            return accumulator.sourceBeamField, accumulator.receiverBeamField
+
+        merged = accumulate(250_000)
+        flushedOften = accumulate(50)                                           # bounded tables; beams are accumulated many times
+        for mergedField, flushedField in zip(merged, flushedOften):
+            np.testing.assert_allclose(flushedField, mergedField, rtol=0.0, atol=1e-5 * np.abs(mergedField).max())
+
     def testCfpFromGeometryTablesWorkerRunUsesChunkedResultPayload(self):
         class SignalCollector:
             def __init__(self):
@@ -4798,6 +4909,138 @@ class ProjectSidecarsTest(unittest.TestCase):
         self.assertIsNotNone(phase1_idx, "Expected phase 1 to end at 100 and phase 2 to start at 0")
         self.assertGreater(len(worker.survey.message.values), 3)
 
+    @staticmethod
+    def createCfpGeometryTables():
+        # 2 source lines of 4 shots, each recording 9 receivers on both receiver lines
+        srcGeom = np.zeros(8, dtype=pntType1)
+        srcGeom['Index'] = 1
+        srcGeom['Line'] = [1.0, 1.0, 1.0, 1.0, 2.0, 2.0, 2.0, 2.0]
+        srcGeom['Point'] = [1.0, 2.0, 3.0, 4.0, 1.0, 2.0, 3.0, 4.0]
+        srcGeom['LocX'] = [50.0, 150.0, 250.0, 350.0, 50.0, 150.0, 250.0, 350.0]
+        srcGeom['LocY'] = [50.0, 50.0, 50.0, 50.0, 150.0, 150.0, 150.0, 150.0]
+        srcGeom['InUse'] = 1
+
+        recGeom = np.zeros(32, dtype=pntType1)
+        recGeom['Index'] = 1
+        recGeom['Line'] = np.repeat([10.0, 20.0], 16)
+        recGeom['Point'] = np.tile(np.arange(1.0, 17.0), 2)
+        recGeom['LocX'] = np.tile(np.arange(16) * 25.0, 2)
+        recGeom['LocY'] = np.repeat([25.0, 175.0], 16)
+        recGeom['InUse'] = 1
+
+        relGeom = np.zeros(16, dtype=relType2)
+        relGeom['SrcInd'] = 1
+        relGeom['SrcLin'] = np.repeat(srcGeom['Line'], 2)
+        relGeom['SrcPnt'] = np.repeat(srcGeom['Point'], 2)
+        relGeom['RecInd'] = 1
+        relGeom['RecLin'] = np.tile([10.0, 20.0], 8)
+        relGeom['RecMin'] = np.repeat(4.0 * srcGeom['Point'] - 4.0, 2)
+        relGeom['RecMax'] = np.repeat(4.0 * srcGeom['Point'] + 4.0, 2)
+        relGeom['InSps'] = 1
+        relGeom['InRps'] = 1
+        return srcGeom, relGeom, recGeom
+
+    @staticmethod
+    def createCfpSurveyStub():
+        # stand-in for RollSurvey; the geometry table workers only need its signals and output area
+        class SignalCollector:
+            def __init__(self):
+                self.values = []
+
+            def emit(self, value):
+                self.values.append(value)
+
+        class SurveyStub:
+            def __init__(self):
+                self.errorText = ''
+                self.progress = SignalCollector()
+                self.message = SignalCollector()
+                self.output = SimpleNamespace(rctOutput=QRectF(0.0, 0.0, 400.0, 200.0))
+                self.grid = SimpleNamespace(binSize=QPointF(25.0, 25.0))
+
+            def fromXmlString(self, xmlString, createArrays):
+                _ = xmlString
+                _ = createArrays
+
+        return SurveyStub
+
+    def testCfpMultiPointWorkerMatchesSinglePointWorkerPerFocalPoint(self):
+        SurveyStub = self.createCfpSurveyStub()
+        srcGeom, relGeom, recGeom = self.createCfpGeometryTables()
+
+        focalPoints = np.array([[100.0, 100.0], [300.0, 60.0], [5000.0, 5000.0]])
+        parameters = dict(xmlString='<survey />', srcGeom=srcGeom, relGeom=relGeom, recGeom=recGeom, focalZ=-100.0, maxDipDegrees=45.0, vint=2500.0, chunkSize=5)
+
+        def runWorker(workerClass, request):
+            with patch.object(workerThreadsModule, 'RollSurvey', SurveyStub):
+                worker = workerClass(request)
+                resultEvents = []
+                worker.resultReady.connect(resultEvents.append)
+                worker.run()
+            self.assertEqual(len(resultEvents), 1)
+            return resultEvents[0]
+
+        result = runWorker(CfpMultiPointFromGeometryTablesWorker, CfpMultiPointFromGeometryTablesRequest(focalPoints=focalPoints, **parameters))
+
+        self.assertTrue(result.success)
+        self.assertEqual(type(result).__name__, 'CfpMultiPointFromGeometryTablesResult')
+        self.assertEqual(result.pointSummary.shape, (3,))
+        self.assertEqual(result.resolutionImages.shape[0], 3)
+        self.assertEqual(result.pointSummary['contributingTraceCount'][2], 0)   # far outside the survey
+        self.assertIn(result.selectedPointIndex, (0, 1))
+
+        for p in range(2):
+            single = runWorker(CfpFromGeometryTablesWorker, CfpFromGeometryTablesRequest(focalX=focalPoints[p, 0], focalY=focalPoints[p, 1], **parameters))
+            point = result.pointSummary[p]
+            self.assertEqual(point['contributingRelationCount'], single.contributingRelationCount)
+            self.assertEqual(point['contributingTraceCount'], single.contributingTraceCount)
+            self.assertEqual(point['totalTraceCount'], single.totalTraceCount)
+            self.assertAlmostEqual(float(point['avpSnr']), single.avpSnr, places=4)
+            np.testing.assert_allclose(result.resolutionImages[p], single.resolutionImage, atol=1e-5)
+            np.testing.assert_allclose(result.radonAvpImages[p], single.radonAvpImage, atol=1e-5)
+
+        selected = result.selectedPointIndex
+        self.assertEqual((result.focalX, result.focalY), tuple(focalPoints[selected]))
+        self.assertEqual(result.totalTraceCount, result.pointSummary[selected]['totalTraceCount'])
+        self.assertEqual(result.contributingTraceCount, result.pointSummary[selected]['contributingTraceCount'])
+        np.testing.assert_array_equal(result.resolutionImage, result.resolutionImages[selected])
+
+    def testCfpGeometryWorkerReusesRelationIndexOfUnchangedTables(self):
+        SurveyStub = self.createCfpSurveyStub()
+        srcGeom, relGeom, recGeom = self.createCfpGeometryTables()
+        key = geometryKey(srcGeom, relGeom, recGeom)
+        parameters = dict(xmlString='<survey />', srcGeom=srcGeom, relGeom=relGeom, recGeom=recGeom, focalX=100.0, focalY=100.0, focalZ=-100.0, maxDipDegrees=45.0, vint=2500.0, chunkSize=5)
+
+        def runWorker(request):
+            with patch.object(workerThreadsModule, 'RollSurvey', SurveyStub):
+                worker = CfpFromGeometryTablesWorker(request)
+                resultEvents = []
+                worker.resultReady.connect(resultEvents.append)
+                worker.run()
+            self.assertEqual(len(resultEvents), 1)
+            return resultEvents[0], worker.survey.message.values
+
+        first, firstMessages = runWorker(CfpFromGeometryTablesRequest(geometryKey=key, **parameters))
+        self.assertTrue(first.success)
+        self.assertIsNotNone(first.relationIndex)
+        self.assertEqual(first.relationIndex.geometryKey, key)
+        self.assertIn('CFP from Geometry Tables - building the relation index', firstMessages)
+
+        second, secondMessages = runWorker(CfpFromGeometryTablesRequest(geometryKey=key, relationIndex=first.relationIndex, **parameters))
+        self.assertTrue(second.success)
+        self.assertIsNone(second.relationIndex)                                 # nothing new to keep
+        self.assertFalse(any('resolved relation chunk' in message for message in secondMessages))
+        self.assertEqual(second.contributingTraceCount, first.contributingTraceCount)
+        self.assertEqual(second.sourceOrphanRelationCount, first.sourceOrphanRelationCount)
+        np.testing.assert_array_equal(second.resolutionImage, first.resolutionImage)
+
+        # an index of other tables is not used
+        relGeom['InSps'][0] = 0
+        third, thirdMessages = runWorker(CfpFromGeometryTablesRequest(geometryKey=geometryKey(srcGeom, relGeom, recGeom), relationIndex=first.relationIndex, **parameters))
+        self.assertTrue(third.success)
+        self.assertIn('CFP from Geometry Tables - building the relation index', thirdMessages)
+        self.assertEqual(third.sourceOrphanRelationCount, first.sourceOrphanRelationCount + 1)
+
     def testCfpPlaneWorkerCoherentAcceptsSingleAndMultiFrequencyArrays(self):
         class SignalCollector:
             def __init__(self):
@@ -5091,6 +5334,83 @@ class ProjectSidecarsTest(unittest.TestCase):
         self.assertAlmostEqual(float(np.nanmax(resultEvents[0].amplitudeMap)), 1.0, places=6)
         self.assertAlmostEqual(float(resultEvents[0].normalizationFactor), 4.0, places=6)
 
+    def testCfpPlaneWorkerStreamsTilesAndMatchesSerialMap(self):
+        class SignalCollector:
+            def __init__(self):
+                self.values = []
+
+            def emit(self, value):
+                self.values.append(value)
+
+        class SurveyStub:
+            def __init__(self):
+                self.errorText = 'cfp plane setup failed'
+                self.progress = SignalCollector()
+                self.message = SignalCollector()
+                self.output = SimpleNamespace(rctOutput=QRectF(0.0, 0.0, 200.0, 100.0))
+                self.grid = SimpleNamespace(binSize=QPointF(10.0, 5.0))
+
+            def fromXmlString(self, xmlString, createArrays):
+                _ = xmlString
+                _ = createArrays
+
+            def prepareGeometryRelationBinningLookup(self):
+                return None
+
+        rng = np.random.default_rng(7)
+        srcCoords = np.column_stack((rng.uniform(0.0, 200.0, 40), rng.uniform(0.0, 100.0, 40), np.zeros(40))).astype(np.float32)
+        recCoords = np.column_stack((rng.uniform(0.0, 200.0, 60), rng.uniform(0.0, 100.0, 60), np.zeros(60))).astype(np.float32)
+        srcWeights = np.ones(40, dtype=np.float32)
+        recWeights = np.ones(60, dtype=np.float32)
+
+        def runWorker(tileRows):
+            with patch.object(workerThreadsModule, 'RollSurvey', SurveyStub):
+                worker = CfpAmplitudeMapWorker(
+                    CfpAmplitudeMapRequest(
+                        xmlString='<survey />',
+                        srcGeom=np.zeros(1, dtype=pntType1),
+                        relGeom=np.zeros(1, dtype=relType2),
+                        recGeom=np.zeros(1, dtype=pntType1),
+                        focalZ=-20.0,
+                        maxDipDegrees=45.0,
+                        vint=2500.0,
+                        frequencies=np.array([20.0, 40.0], dtype=np.float32),
+                        computeIncoherentQc=False,
+                    )
+                )
+                resultEvents = []
+                partialEvents = []
+                worker.resultReady.connect(resultEvents.append)
+                worker.partialResultReady.connect(partialEvents.append)
+                with patch.object(worker, '_gatherTracesFromRelations', return_value=(srcCoords, srcWeights, recCoords, recWeights)):
+                    with patch.object(workerThreadsModule.config, 'cfpTileRows', tileRows), patch.object(workerThreadsModule.config, 'cfpPartialUpdateSeconds', 0.0):
+                        worker.run()
+            return resultEvents, partialEvents
+
+        # untiled serial reference: the rows of the 20 x 20 bin grid computed one after the other
+        frequencies = np.array([20.0, 40.0], dtype=np.float32)
+        apertureRadius = abs(-20.0) * np.tan(np.radians(45.0))
+        evalX = np.ascontiguousarray((np.arange(20, dtype=np.float32) + 0.5) * 10.0)
+        srcIndex = workerThreadsModule.build_station_bucket_index(srcCoords, srcWeights, apertureRadius)
+        recIndex = workerThreadsModule.build_station_bucket_index(recCoords, recWeights, apertureRadius)
+        serialMap = np.zeros((20, 20), dtype=np.float32)
+        for iy in range(20):
+            serialMap[iy, :] = workerThreadsModule.compute_illumination_row_numba((iy + 0.5) * 5.0, evalX, -20.0, srcIndex, recIndex, frequencies, 2500.0, apertureRadius)
+        serialMax = serialMap.max()
+        serialMap /= serialMax
+
+        singleTileResults, singleTilePartials = runWorker(tileRows=1000)
+        tiledResults, tiledPartials = runWorker(tileRows=3)
+
+        self.assertEqual(len(singleTilePartials), 0)                            # a single tile; only the final map is sent
+        self.assertEqual(len(tiledPartials), 6)                                 # 20 rows in 7 tiles; the last tile is the final map
+        self.assertTrue(all(partial.isPartial for partial in tiledPartials))
+        self.assertEqual(tiledPartials[0].amplitudeMap.shape, (20, 20))
+        self.assertFalse(np.any(tiledPartials[0].amplitudeMap[:, 3:]))         # rows of unfinished tiles remain empty
+        for results in (tiledResults, singleTileResults):
+            np.testing.assert_array_equal(results[0].amplitudeMap, serialMap.T)  # Roll plot order is x, y
+            self.assertEqual(results[0].normalizationFactor, float(serialMax))
+
     def testCfp3x3DiagnosticsSummaryIndependentOfModeSelection(self):
         class SignalCollector:
             def __init__(self):
@@ -5209,6 +5529,24 @@ class ProjectSidecarsTest(unittest.TestCase):
         self.assertEqual(firstLevels, (0.0, 1.0))
         self.assertEqual(secondLevels, (0.0, 1.0))
 
+    def testCfpApplierOnlyDisplaysPartialMaps(self):
+        self.mainWindow._ensureWorkerOperationComponents()
+
+        previousMap = np.full((2, 2), 0.5, dtype=np.float32)
+        self.mainWindow.output.cfpOutput = previousMap
+        partialResult = workerThreadsModule.CfpAmplitudeMapResult(
+            success=True,
+            amplitudeMap=np.array([[1.0, 0.0], [0.5, 0.0]], dtype=np.float32),
+            isPartial=True,
+        )
+
+        with patch.object(self.mainWindow, 'prepareLayoutImageAndColorBar'):
+            with patch.object(self.mainWindow, 'plotLayout'):
+                self.mainWindow.applyCfpAmplitudeMapWorkerResult(partialResult, timedelta(seconds=1))
+
+        self.assertIs(self.mainWindow.layoutImg, partialResult.amplitudeMap)
+        self.assertIs(self.mainWindow.output.cfpOutput, previousMap)            # a cancelled run keeps the previous illumination map
+
     def testCfpApplierCompletionLogIncludesNormalizationFactorForBothModes(self):
         self.mainWindow._ensureWorkerOperationComponents()
 
@@ -6201,9 +6539,8 @@ class ProjectSidecarsTest(unittest.TestCase):
             with patch.object(rollMainWindowModule.QFileDialog, 'getSaveFileName', return_value=(targetFileName, '')):
                 with patch.object(self.mainWindow.projectService, 'writeProjectXml', return_value=MagicMock(success=False, errorText='write failure')):
                     with patch.object(rollMainWindowModule.QMessageBox, 'information') as showWriteError:
-                        with patch.object(self.mainWindow.projectService, 'saveAnalysisSidecars') as saveAnalysisSidecars:
-                            with patch.object(self.mainWindow.projectService, 'saveSurveyDataSidecars') as saveSurveyDataSidecars:
-                                success = self.mainWindow.fileSaveAs()
+                        with patch.object(self.mainWindow.projectService, 'saveProjectSidecars') as saveProjectSidecars:
+                            success = self.mainWindow.fileSaveAs()
 
             self.assertFalse(success)
             self.assertEqual(self.mainWindow.fileName, '')
@@ -6211,21 +6548,21 @@ class ProjectSidecarsTest(unittest.TestCase):
             self.assertEqual(self.mainWindow.recentFileList, [])
             self.assertTrue(self.mainWindow.textEdit.document().isModified())
             showWriteError.assert_called_once()
-            saveAnalysisSidecars.assert_not_called()
-            saveSurveyDataSidecars.assert_not_called()
+            saveProjectSidecars.assert_not_called()
 
             with patch.object(rollMainWindowModule.QFileDialog, 'getSaveFileName', return_value=(targetFileName, '')):
-                with patch.object(self.mainWindow.projectService, 'saveAnalysisSidecars') as saveAnalysisSidecars:
-                    with patch.object(self.mainWindow.projectService, 'saveSurveyDataSidecars') as saveSurveyDataSidecars:
-                        success = self.mainWindow.fileSaveAs()
+                with patch.object(self.mainWindow.projectService, 'saveProjectSidecars') as saveProjectSidecars:
+                    success = self.mainWindow.fileSaveAs()
 
             self.assertTrue(success)
             self.assertEqual(self.mainWindow.fileName, targetFileName)
             self.assertEqual(self.mainWindow.projectDirectory, tempDir)
             self.assertEqual(self.mainWindow.recentFileList, [targetFileName])
             self.assertFalse(self.mainWindow.textEdit.document().isModified())
-            saveAnalysisSidecars.assert_called_once_with(targetFileName, self.mainWindow.output, includeHistograms=True)
-            saveSurveyDataSidecars.assert_called_once()
+            saveProjectSidecars.assert_called_once()                            # analysis and survey data sidecars in one go; one store update
+            self.assertEqual(saveProjectSidecars.call_args.args, (targetFileName, self.mainWindow.output))
+            self.assertTrue(saveProjectSidecars.call_args.kwargs['includeHistograms'])
+            self.assertEqual(saveProjectSidecars.call_args.kwargs['useProjectStore'], self.mainWindow.appSettings.useProjectStore)
 
 
 if __name__ == '__main__':
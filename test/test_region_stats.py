@@ -0,0 +1,56 @@
+# coding=utf-8
+import unittest
+
+import numpy as np
+
+from .plugin_loader import loadPluginModule
+
+regionStatsModule = loadPluginModule('region_stats')
+
+RegionStatistics = regionStatsModule.RegionStatistics
+dyadicCells = regionStatsModule.dyadicCells
+
+
+class RegionStatisticsTest(unittest.TestCase):
+    def testDyadicCellsCoverTheRangeExactly(self):
+        for start, stop in ((0, 0), (0, 1), (3, 17), (5, 6), (0, 64), (7, 100)):
+            covered = []
+            for level, index in dyadicCells(start, stop):
+                covered.extend(range(index << level, (index + 1) << level))
+            self.assertEqual(sorted(covered), list(range(start, stop)))
+
+    def testStatsMatchTheRawMap(self):
+        rng = np.random.default_rng(3)
+        fold = rng.integers(0, 500, (37, 53)).astype(np.uint32)
+        offsets = rng.uniform(0.0, 5000.0, (37, 53)).astype(np.float32)
+        offsets[rng.random(offsets.shape) < 0.2] = -np.inf                      # empty bins of a min-offset map
+        offsets[rng.random(offsets.shape) < 0.1] = np.inf
+
+        for image in (fold, offsets):
+            regionStats = RegionStatistics(image)
+            for _ in range(500):
+                x0, x1 = sorted(rng.integers(0, 38, 2))
+                y0, y1 = sorted(rng.integers(0, 54, 2))
+                region = image[x0:x1, y0:y1]
+                values = region[np.isfinite(region)].astype(np.float64)
+
+                stats = regionStats.stats(x0, x1, y0, y1)
+                self.assertEqual(stats.count, values.size)
+                if values.size == 0:
+                    self.assertTrue(np.isnan(stats.mean))
+                    continue
+                self.assertAlmostEqual(stats.total, values.sum(), delta=1e-6 * values.sum())
+                self.assertAlmostEqual(stats.mean, values.mean(), places=3)
+                self.assertEqual(stats.minimum, values.min())
+                self.assertEqual(stats.maximum, values.max())
+
+    def testRegionIsClippedToTheMap(self):
+        image = np.arange(12, dtype=np.uint32).reshape(3, 4)
+        stats = RegionStatistics(image).stats(-5, 2, 2, 99)
+
+        self.assertEqual(stats.count, 4)
+        self.assertEqual((stats.minimum, stats.maximum, stats.total), (2.0, 7.0, 18.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
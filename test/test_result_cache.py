@@ -0,0 +1,72 @@
+# coding=utf-8
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from .plugin_loader import loadPluginModule
+
+resultCacheModule = loadPluginModule('result_cache')
+workerThreadsModule = loadPluginModule('worker_threads')
+
+ResultCache = resultCacheModule.ResultCache
+requestCacheKey = resultCacheModule.requestCacheKey
+BinningFromGeometryRequest = workerThreadsModule.BinningFromGeometryRequest
+BinningFromGeometryResult = workerThreadsModule.BinningFromGeometryResult
+
+
+class ResultCacheTest(unittest.TestCase):
+    def createRequest(self, xmlString='<survey/>', recGeom=None, debugpyEnabled=False):
+        srcGeom = np.arange(6, dtype=np.float32).reshape(3, 2)
+        relGeom = np.arange(4, dtype=np.int32)
+        recGeom = np.arange(8, dtype=np.float64).reshape(4, 2) if recGeom is None else recGeom
+        return BinningFromGeometryRequest(xmlString=xmlString, srcGeom=srcGeom, relGeom=relGeom, recGeom=recGeom, debugpyEnabled=debugpyEnabled)
+
+    def testRequestKeyDependsOnContentOnly(self):
+        key = requestCacheKey(self.createRequest())
+
+        self.assertEqual(key, requestCacheKey(self.createRequest(debugpyEnabled=True)))
+        self.assertNotEqual(key, requestCacheKey(self.createRequest(xmlString='<survey name="other"/>')))
+
+        changedRec = np.arange(8, dtype=np.float64).reshape(4, 2)
+        changedRec[3, 1] += 0.5
+        self.assertNotEqual(key, requestCacheKey(self.createRequest(recGeom=changedRec)))
+        self.assertNotEqual(key, requestCacheKey(self.createRequest(recGeom=np.arange(8, dtype=np.float64).reshape(2, 4))))
+
+    def testArrayKeysReplaceTheContentFingerprint(self):
+        request = self.createRequest()
+        arrayKeys = {'srcGeom': 'srcGeom@1', 'relGeom': 'relGeom@2', 'recGeom': 'recGeom@3'}
+        key = requestCacheKey(request, arrayKeys)
+
+        with mock.patch.object(resultCacheModule, 'arrayFingerprint', side_effect=AssertionError('tables are hashed')):
+            self.assertEqual(key, requestCacheKey(self.createRequest(recGeom=np.zeros((4, 2))), arrayKeys))  # the key says it's unchanged
+        self.assertNotEqual(key, requestCacheKey(request, dict(arrayKeys, recGeom='recGeom@4')))
+        self.assertNotEqual(key, requestCacheKey(request))
+
+    def testCachedResultsAreCopiedAndEvictedLeastRecentlyUsedFirst(self):
+        fold = np.ones((10, 10), dtype=np.float32)                              # 400 bytes per result
+        cache = ResultCache(maxBytes=1000)
+
+        self.assertTrue(cache.put('a', BinningFromGeometryResult(success=True, binOutput=fold)))
+        self.assertTrue(cache.put('b', BinningFromGeometryResult(success=True, binOutput=fold * 2)))
+
+        fold.fill(7.0)                                                          # edits after put() don't reach the cache
+        cached = cache.get('a')
+        np.testing.assert_array_equal(cached.binOutput, np.ones((10, 10), dtype=np.float32))
+        cached.binOutput.fill(9.0)                                              # nor do edits of a returned result
+        np.testing.assert_array_equal(cache.get('a').binOutput, np.ones((10, 10), dtype=np.float32))
+
+        cache.put('c', BinningFromGeometryResult(success=True, binOutput=fold))  # evicts 'b', the least recently used
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+        self.assertEqual(cache.totalBytes, 800)
+
+        self.assertFalse(cache.put('d', BinningFromGeometryResult(success=True, binOutput=np.ones((40, 40), dtype=np.float32))))
+        cache.setMaxBytes(0)
+        self.assertEqual(len(cache), 0)
+        self.assertIsNone(cache.get('a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -38,6 +38,7 @@ QGIS_APP = getQgisApp()
 rollSurveyModule = loadPluginModule('roll_survey')
 
 RollSurvey = rollSurveyModule.RollSurvey
+FoldClassSpec = rollSurveyModule.FoldClassSpec
 BinningType = rollSurveyModule.BinningType
 pntType1 = rollSurveyModule.pntType1
 relType2 = rollSurveyModule.relType2
@@ -128,11 +129,17 @@ class BinFromGeometryEquivalenceTest(unittest.TestCase):
         survey.output.relGeom = relGeom
         survey.nShotPoints = srcGeom.shape[0]
 
-    def runBinning(self, binFnName, fullAnalysis):
+    def runBinning(self, binFnName, fullAnalysis, foldClasses=None, uniqueSlots=None):
         """Build a fresh survey, run the chosen binner, return the output arrays."""
         survey = self.buildSurvey()
         self.populateGeometry(survey)
         survey.calcTransforms(createArrays=True)
+        if foldClasses is not None:
+            survey.createFoldClassCubes(foldClasses)
+        if uniqueSlots is not None:
+            survey.unique.apply = True
+            survey.unique.dOffset, survey.unique.aziSlots = uniqueSlots
+            survey.createUniqueSlotBitsets()
 
         # binFromGeometry8/10 read self.binning.slowness when computing
         # anaOutput[..., 9]. setupBinFromGeometry() normally sets it from
@@ -152,11 +159,13 @@ class BinFromGeometryEquivalenceTest(unittest.TestCase):
 
         return survey
 
-    def runNoRelationBinning(self, binFnName, fullAnalysis):
+    def runNoRelationBinning(self, binFnName, fullAnalysis, foldClasses=None):
         survey = self.buildSurvey()
         self.populateGeometry(survey)
         survey.output.relGeom = None
         survey.calcTransforms(createArrays=True)
+        if foldClasses is not None:
+            survey.createFoldClassCubes(foldClasses)
         survey.binning.slowness = 0.0
 
         if fullAnalysis:
@@ -185,8 +194,10 @@ class BinFromGeometryEquivalenceTest(unittest.TestCase):
         survey.calcNoShotPoints()
         return survey
 
-    def runTemplateBinning(self, routineName, fullAnalysis):
+    def runTemplateBinning(self, routineName, fullAnalysis, foldClasses=None):
         survey = self.buildTemplateSurvey()
+        if foldClasses is not None:
+            survey.createFoldClassCubes(foldClasses)
         survey.binning.slowness = 0.0
         if fullAnalysis:
             nx, ny = survey.output.binOutput.shape
@@ -210,6 +221,36 @@ class BinFromGeometryEquivalenceTest(unittest.TestCase):
         if fullAnalysis:
             np.testing.assert_allclose(reference.output.anaOutput, experimental.output.anaOutput, rtol=0, atol=1e-4)
 
+    def testAllBinningRoutinesAccumulateTheSameFoldClassCubes(self):
+        foldClasses = FoldClassSpec(offsetClassWidth=25.0, aziSectors=4, ovtSizeX=50.0, ovtSizeY=50.0)
+        runs = (
+            (self.runBinning, 'binFromGeometry8', 'binFromGeometry10'),
+            (self.runNoRelationBinning, 'binFromGeometryNoRel', 'binFromGeometryNoRel2'),
+            (self.runTemplateBinning, 'binTemplate8', 'binTemplate10'),
+        )
+        for runFn, referenceName, experimentalName in runs:
+            for fullAnalysis in (False, True):
+                with self.subTest(routine=experimentalName, fullAnalysis=fullAnalysis):
+                    reference = runFn(referenceName, fullAnalysis, foldClasses).output
+                    experimental = runFn(experimentalName, fullAnalysis, foldClasses).output
+                    self.assertGreater(int(reference.binOutput.sum()), 0)
+                    for name in ('offsetFold', 'azimuthFold', 'ovtFold'):
+                        cube = getattr(reference.foldClasses, name)
+                        np.testing.assert_array_equal(cube.sum(axis=2), reference.binOutput)     # every binned trace lands in one class
+                        np.testing.assert_array_equal(getattr(experimental.foldClasses, name), cube)
+
+    def testBasicBinningCountsUniqueFoldFromSlotBitsets(self):
+        fold = self.runBinning('binFromGeometry8', False).output.binOutput
+        single = self.runBinning('binFromGeometry8', False, uniqueSlots=(1.0e6, 1)).output
+        np.testing.assert_array_equal(single.binOutput, (fold > 0).astype(np.uint32))    # one offset slot holds all traces of a bin
+        self.assertIsNone(single.uniqueSlots)                                   # bitsets are released once the fold map is updated
+
+        reference = self.runBinning('binFromGeometry8', False, uniqueSlots=(20.0, 4)).output
+        experimental = self.runBinning('binFromGeometry10', False, uniqueSlots=(20.0, 4)).output
+        np.testing.assert_array_equal(experimental.binOutput, reference.binOutput)
+        self.assertTrue(np.all(reference.binOutput <= fold))
+        self.assertGreater(int(reference.binOutput.sum()), 0)
+
     def testBinFromGeometry10MatchesBinFromGeometry8FastPath(self):
         """fullAnalysis=False: binOutput / minOffset / maxOffset must match exactly."""
         survey8 = self.runBinning('binFromGeometry8', False)
@@ -53,6 +53,24 @@ class SessionServiceTest(unittest.TestCase):
         self.assertIsNone(self.state.recDeadE)
         self.assertIsNone(self.state.recDeadN)
 
+    def testEveryArrayChangeGivesANewRevisionKey(self):
+        relGeom = np.zeros(3, dtype=[('SrcLin', 'f4'), ('InSps', 'i4')])
+        self.assertEqual(self.service.arrayRevisionKey(self.state, relGeom), '')   # not a session array yet
+
+        self.service.setArray(self.state, 'relGeom', relGeom)
+        key = self.service.arrayRevisionKey(self.state, relGeom)
+        self.assertTrue(key.startswith('relGeom@'))
+        self.assertEqual(key, self.service.arrayRevisionKey(self.state, relGeom))
+
+        relGeom['InSps'][0] = 1                                                 # an in-place edit, followed by the usual refresh
+        self.service.refreshArrayState(self.state, 'relGeom')
+        self.assertNotEqual(key, self.service.arrayRevisionKey(self.state, relGeom))
+
+        otherState = SessionState()
+        self.service.setArray(otherState, 'relGeom', relGeom.copy())
+        self.assertNotEqual(key, self.service.arrayRevisionKey(otherState, otherState.relGeom))
+        self.assertEqual(self.service.arrayRevisionKey(self.state, relGeom.copy()), '')
+
     def testClearSurveyArraysClearsImportedAndGeometryState(self):
         self.state.rpsImport = np.zeros(1, dtype=np.float32)
         self.state.recGeom = np.zeros(1, dtype=np.float32)
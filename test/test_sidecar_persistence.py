@@ -0,0 +1,117 @@
+# coding=utf-8
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from .plugin_loader import loadPluginModule
+from .utilities import getQgisApp
+
+QGIS_APP, _, _, _ = getQgisApp()
+
+projectServiceModule = loadPluginModule('project_service')
+sidecarPersistenceModule = loadPluginModule('sidecar_persistence')
+
+ProjectService = projectServiceModule.ProjectService
+SidecarPersistenceQueue = sidecarPersistenceModule.SidecarPersistenceQueue
+SidecarWriteJob = sidecarPersistenceModule.SidecarWriteJob
+
+
+class SidecarPersistenceQueueTest(unittest.TestCase):
+    def testQueuedJobsAreWrittenInOrderAndSnapshotted(self):
+        service = ProjectService()
+        persistence = SidecarPersistenceQueue(service)
+        binOutput = np.full((4, 3), 2.0, dtype=np.float32)
+        finished = []
+        persistence.jobFinished.connect(lambda label, success, errorText: finished.append((label, success)))
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            projectPath = os.path.join(tempDir, 'persistence.roll')
+
+            persistence.enqueue(SidecarWriteJob(projectPath, {'.bin.npy': binOutput, '.min.npy': None}, label='analysis results'))
+            binOutput.fill(9.0)                                                 # edits after enqueue() must not leak into the file
+            persistence.enqueue(SidecarWriteJob(projectPath, {'.rec.npy': np.arange(4, dtype=np.float32)}, label='geometry data'))
+
+            self.assertTrue(persistence.waitUntilIdle(timeout=10.0))
+            QGIS_APP.processEvents()
+
+            self.assertFalse(persistence.hasPendingWrites())
+            np.testing.assert_array_equal(service.loadArraySidecar(projectPath, '.bin.npy').array, np.full((4, 3), 2.0, dtype=np.float32))
+            np.testing.assert_array_equal(service.loadArraySidecar(projectPath, '.rec.npy').array, np.arange(4, dtype=np.float32))
+            self.assertFalse(service.sidecarExists(projectPath, '.min.npy'))
+            self.assertEqual([name for name in os.listdir(tempDir) if name.endswith('.tmp')], [])
+            self.assertEqual(finished, [('analysis results', True), ('geometry data', True)])
+
+    def testProjectStoreJobAndWaitWithoutPendingWrites(self):
+        service = ProjectService()
+        persistence = SidecarPersistenceQueue(service)
+
+        self.assertTrue(persistence.waitUntilIdle(timeout=0.0))
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            projectPath = os.path.join(tempDir, 'persistence.roll')
+            gapOffset = np.full((2, 2), 15.0, dtype=np.float32)
+
+            persistence.enqueue(SidecarWriteJob(projectPath, {'.gap.npy': gapOffset}, useProjectStore=True))
+
+            self.assertTrue(persistence.waitUntilIdle(timeout=10.0))
+            self.assertTrue(service.storedSidecarExists(projectPath, '.gap.npy'))
+            np.testing.assert_array_equal(service.loadArraySidecar(projectPath, '.gap.npy').array, gapOffset)
+
+    def testUnexpectedWriteErrorIsReportedAndDoesNotStallTheQueue(self):
+        class FailingOnceService(ProjectService):
+            failed = False
+
+            def saveArraySidecar(self, fileName, suffix, array):
+                if not self.failed:
+                    self.failed = True
+                    raise TypeError('cannot encode sidecar')                    # not an OSError or ValueError
+                return super().saveArraySidecar(fileName, suffix, array)
+
+        service = FailingOnceService()
+        persistence = SidecarPersistenceQueue(service)
+        finished = []
+        persistence.jobFinished.connect(lambda label, success, errorText: finished.append((label, success, errorText)))
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            projectPath = os.path.join(tempDir, 'persistence.roll')
+            persistence.enqueue(SidecarWriteJob(projectPath, {'.bin.npy': np.ones((2, 2), dtype=np.float32)}, label='analysis results'))
+
+            self.assertTrue(persistence.waitUntilIdle(timeout=10.0))
+            persistence.enqueue(SidecarWriteJob(projectPath, {'.rec.npy': np.arange(4, dtype=np.float32)}, label='geometry data'))
+            self.assertTrue(persistence.waitUntilIdle(timeout=10.0))
+            QGIS_APP.processEvents()
+
+            self.assertEqual(finished[0][:2], ('analysis results', False))
+            self.assertIn('TypeError', finished[0][2])
+            self.assertEqual(finished[1][:2], ('geometry data', True))
+            self.assertTrue(service.sidecarExists(projectPath, '.rec.npy'))
+
+
+    def testRestoreJobUnpacksTraceTableAndReportsSeparately(self):
+        service = ProjectService()
+        persistence = SidecarPersistenceQueue(service)
+        finished, restored = [], []
+        persistence.jobFinished.connect(lambda label, success, errorText: finished.append(label))
+        persistence.analysisRestored.connect(lambda fileName, success, errorText: restored.append((fileName, success)))
+        anaOutput = np.full((3, 2, 2, 16), 5.0, dtype=np.float32)
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            projectPath = os.path.join(tempDir, 'persistence.roll')
+            missingPath = os.path.join(tempDir, 'missing.roll')
+            service.saveProjectStoreSidecars(projectPath, {'.ana.npy': anaOutput})
+
+            persistence.enqueue(SidecarWriteJob(projectPath, label='trace table', restoreAnalysis=True))
+            persistence.enqueue(SidecarWriteJob(missingPath, label='trace table', restoreAnalysis=True))
+
+            self.assertTrue(persistence.waitUntilIdle(timeout=10.0))
+            QGIS_APP.processEvents()
+
+            self.assertEqual(restored, [(projectPath, True), (missingPath, False)])
+            self.assertEqual(finished, [])
+            np.testing.assert_array_equal(np.fromfile(service.sidecarPath(projectPath, '.ana.npy'), dtype=np.float32).reshape(anaOutput.shape), anaOutput)
+
+
+if __name__ == '__main__':
+    unittest.main()
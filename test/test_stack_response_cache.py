@@ -0,0 +1,79 @@
+# coding=utf-8
+import unittest
+
+import numpy as np
+
+from .plugin_loader import loadPluginModule
+
+stackResponseCacheModule = loadPluginModule('stack_response_cache')
+
+StackResponseCache = stackResponseCacheModule.StackResponseCache
+computeStackResponse = stackResponseCacheModule.computeStackResponse
+prefetchLineOrder = stackResponseCacheModule.prefetchLineOrder
+stackResponseKey = stackResponseCacheModule.stackResponseKey
+
+
+class StackResponseCacheTest(unittest.TestCase):
+    @staticmethod
+    def createAnalysisCube(nx=6, ny=5, fold=12, seed=11):
+        rng = np.random.default_rng(seed)
+        anaOutput = np.zeros((nx, ny, fold, 16), dtype=np.float32)
+        anaOutput[:, :, :, 2] = rng.integers(0, 2, (nx, ny, fold))              # fold
+        anaOutput[:, :, :, 13] = rng.uniform(0.0, 4000.0, (nx, ny, fold))       # offset
+        return anaOutput
+
+    def testCacheEvictsLeastRecentlyUsedResponses(self):
+        responses = [np.full((4, 8), float(i), dtype=np.float32) for i in range(3)]
+        cache = StackResponseCache(2 * responses[0].nbytes)
+
+        cache.put('a', responses[0])
+        cache.put('b', responses[1])
+        self.assertIs(cache.get('a'), responses[0])                             # 'a' is now the most recent one
+        cache.put('c', responses[2])
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.totalBytes, 2 * responses[0].nbytes)
+
+        cache.setMaxBytes(0)
+        self.assertEqual(len(cache), 0)
+        self.assertFalse(cache.put('a', responses[0]))
+
+    def testKeyIncludesUniqueFlagAndKAxis(self):
+        key = stackResponseKey('stack-inline', 3, False, 0.02, 0.0001)
+
+        self.assertEqual(key, stackResponseKey('stack-inline', np.int64(3), np.False_, 0.02, 0.0001))
+        self.assertNotEqual(key, stackResponseKey('stack-xline', 3, False, 0.02, 0.0001))
+        self.assertNotEqual(key, stackResponseKey('stack-inline', 3, True, 0.02, 0.0001))
+        self.assertNotEqual(key, stackResponseKey('stack-inline', 3, False, 0.02, 0.0002))
+
+    def testPrefetchOrderFollowsDirectionOfTravel(self):
+        self.assertEqual(prefetchLineOrder(5, 10, 1, 4), [6, 7, 8, 9, 4, 3])
+        self.assertEqual(prefetchLineOrder(5, 10, -2, 4), [3, 1, 7, 9])
+        self.assertEqual(prefetchLineOrder(5, 10, 0, 2), [6, 4, 7, 3])
+
+    def testPrefetchComputesMissingLinesInBackground(self):
+        anaOutput = self.createAnalysisCube()
+        cache = StackResponseCache(1 << 20)
+
+        thread = cache.prefetch(anaOutput, 'stack-xline', [1, 2, 4], False, 0.02, 0.0005)
+        thread.join()
+
+        self.assertEqual(len(cache), 3)
+        for line in (1, 2, 4):
+            expected = computeStackResponse(anaOutput, 'stack-xline', line, False, 0.02, 0.0005)
+            np.testing.assert_array_equal(cache.get(stackResponseKey('stack-xline', line, False, 0.02, 0.0005)), expected)
+
+        self.assertIsNone(cache.prefetch(anaOutput, 'stack-xline', [1, 2], False, 0.02, 0.0005))  # all cached already
+
+    def testResponsesOfClearedGenerationAreDropped(self):
+        cache = StackResponseCache(1 << 20)
+        generation = cache.generation
+        cache.clear()
+
+        self.assertFalse(cache.put('a', np.zeros(4, dtype=np.float32), generation))
+        self.assertTrue(cache.put('a', np.zeros(4, dtype=np.float32)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+# coding=utf-8
+import unittest
+
+import numpy as np
+
+from .plugin_loader import loadPluginModule
+
+uniqueSlotsModule = loadPluginModule('unique_slots')
+
+UniqueSlotBitsets = uniqueSlotsModule.UniqueSlotBitsets
+
+
+class UniqueSlotBitsetsTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        self.nx = rng.integers(0, 5, 2000)
+        self.ny = rng.integers(0, 4, 2000)
+        self.hyp = rng.uniform(0.0, 3000.0, 2000).astype(np.float32)
+        self.azi = rng.uniform(0.0, 360.0, 2000).astype(np.float32)
+
+    def referenceFold(self, dOffset, aziSlots):
+        offsetSlot = np.round(self.hyp / dOffset).astype(int)
+        aziSlot = np.round(self.azi * aziSlots / 360.0).astype(int) % aziSlots
+        fold = np.zeros((5, 4), dtype=np.uint32)
+        for x in range(5):
+            for y in range(4):
+                inBin = (self.nx == x) & (self.ny == y)
+                fold[x, y] = len(set(zip(offsetSlot[inBin], aziSlot[inBin])))
+        return fold
+
+    def testUniqueFoldCountsOccupiedSlots(self):
+        for dOffset, aziSlots in ((200.0, 1), (250.0, 6), (500.0, 12)):
+            bitsets = UniqueSlotBitsets.create(dOffset, aziSlots, (5, 4), 3000.0)
+            bitsets.accumulate(self.nx[:700], self.ny[:700], self.hyp[:700], self.azi[:700])
+            bitsets.accumulate(self.nx[700:], self.ny[700:], self.hyp[700:], self.azi[700:])   # batches add up
+
+            np.testing.assert_array_equal(bitsets.uniqueFold(), self.referenceFold(dOffset, aziSlots))
+
+    def testMemoryIsOneBitPerSlot(self):
+        bitsets = UniqueSlotBitsets.create(200.0, 4, (5, 4), 3000.0)
+
+        self.assertEqual(bitsets.nOffsetSlots, 16)                              # slots 0 - 3000 m, rounded to the nearest 200 m
+        self.assertEqual(bitsets.nbytes, 5 * 4 * 8)
+        self.assertIsNone(UniqueSlotBitsets.create(0.0, 4, (5, 4), 3000.0))
+
+    def testAzimuthsWrapAround(self):
+        bitsets = UniqueSlotBitsets.create(100.0, 4, (1, 1), 1000.0)
+        nx = np.zeros(3, dtype=np.int64)
+        bitsets.accumulate(nx, nx, np.array([400.0, 420.0, 380.0]), np.array([1.0, 359.0, 40.0]))
+
+        self.assertEqual(int(bitsets.uniqueFold()[0, 0]), 1)                    # 1 and 359 degrees share the slot around north
+        bitsets.accumulate(nx[:1], nx[:1], np.array([5000.0]), np.array([1.0]))
+        self.assertEqual(int(bitsets.uniqueFold()[0, 0]), 2)                    # offsets beyond the maximum share the last slot
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+In this module the unique fold of each bin is determined while binning, without a trace table.
+
+Unique fold counts the distinct (offset slot, azimuth slot) cells in a bin, using the slots of the 'Unique offsets' settings:
+  offset slot   round(offset / dOffset)
+  azimuth slot  round(azimuth / (360 / aziSlots)), where 360 degrees wraps to 0; with a single azimuth slot only offsets count
+
+Each bin holds a bitset with one bit per cell, that is set when a trace falls into that cell.
+The unique fold is then the number of bits set (a popcount), so it is available from Basic Binning as well.
+The bitsets take nx * ny * ceil(nOffsetSlots * aziSlots / 8) bytes of memory.
+
+Compared to calcUniqueFoldValues(), which flags unique traces in the analysis file, the bitsets count all traces of a bin,
+also those beyond the maximum fold kept in the analysis file. With a single azimuth slot the bitsets ignore azimuths,
+whereas calcUniqueFoldValues() still keeps traces with different (unslotted) azimuths apart.
+"""
+
+import math
+from dataclasses import dataclass, field
+
+import numpy as np
+
+# number of bits set in each possible byte value
+POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+@dataclass
+class UniqueSlotBitsets:
+    dOffset: float
+    aziSlots: int = 1
+    nOffsetSlots: int = 1
+    bits: np.ndarray | None = field(default=None, repr=False)                 # (nx, ny, nBytes) packed bitsets, bit k = offsetSlot * aziSlots + aziSlot
+
+    @classmethod
+    def create(cls, dOffset: float, aziSlots: int, shape: tuple[int, int], maxOffset: float) -> 'UniqueSlotBitsets | None':
+        """Empty bitsets for a fold map of 'shape'; None when the offset slot isn't valid. Offsets beyond maxOffset share the last slot."""
+        if dOffset <= 0.0:
+            return None
+
+        aziSlots = max(int(aziSlots), 1)
+        nOffsetSlots = int(round(max(maxOffset, 0.0) / dOffset)) + 1
+        nBytes = math.ceil(nOffsetSlots * aziSlots / 8)
+
+        nx, ny = shape
+        return cls(dOffset, aziSlots, nOffsetSlots, np.zeros((nx, ny, nBytes), dtype=np.uint8))
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
+
+    def cellIndex(self, hypArray: np.ndarray, aziArray: np.ndarray) -> np.ndarray:
+        """Bit index of the (offset slot, azimuth slot) cell of each trace."""
+        offsetSlot = np.minimum(np.round(hypArray / self.dOffset).astype(np.int64), self.nOffsetSlots - 1)
+        if self.aziSlots == 1:
+            return offsetSlot
+
+        aziSlot = np.round(aziArray * (self.aziSlots / 360.0)).astype(np.int64) % self.aziSlots
+        return offsetSlot * self.aziSlots + aziSlot
+
+    def accumulate(self, nx: np.ndarray, ny: np.ndarray, hypArray: np.ndarray, aziArray: np.ndarray) -> None:
+        """Set the cells of traces in the bitsets; nx, ny are valid bin indices, hypArray the offsets [m] and aziArray the azimuths [deg, 0 - 360)."""
+        cell = self.cellIndex(hypArray, aziArray)
+        mask = np.left_shift(1, cell & 7).astype(np.uint8)
+        np.bitwise_or.at(self.bits, (nx, ny, cell >> 3), mask)
+
+    def uniqueFold(self) -> np.ndarray:
+        """Unique fold map, i.e. the number of occupied cells in each bin."""
+        fold = np.zeros(self.bits.shape[:2], dtype=np.uint32)
+        for i in range(self.bits.shape[2]):                                     # one byte at a time, to avoid an (nx, ny, nBytes) temporary
+            fold += POPCOUNT_TABLE[self.bits[:, :, i]]
+        return fold
@@ -1,6 +1,6 @@
 # coding=utf-8
 
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from datetime import timedelta
 from math import ceil
 from typing import Any, Callable, Protocol, cast
@@ -10,11 +10,15 @@ from qgis.PyQt.QtCore import QThread
 
 from .cursor_utils import clearBusyCursorOverrides
 from .enums_and_int_flags import MsgType
+from .fold_classes import FoldClassSpec
+from .geometry_relation_index import GeometryRelationIndexCache, geometryKey
+from .result_cache import ResultCache, requestCacheKey
 from .worker_threads import (BinningFromGeometryRequest,
                              BinningFromTemplatesRequest,
                              CfpAmplitudeMapRequest,
                              CfpFromGeometryTablesRequest,
                              CfpFromTemplatesRequest,
+                             CfpMultiPointFromGeometryTablesRequest,
                              GeometryFromTemplatesRequest)
 
 
@@ -52,6 +56,7 @@ class WorkerJobSpec:
     resultHandler: Callable[[object, timedelta], None]
     resetAnalysisOnFinish: bool = False
     completionTabIndex: int | None = None
+    cacheKey: str | None = None                                                 # set for jobs whose result can be reused from the result cache
 
 
 @dataclass
@@ -68,6 +73,8 @@ class WorkerOperationController:
         self.window = window
         self.runtimeDependenciesProvider = runtimeDependenciesProvider
         self.activeOperation: ActiveWorkerOperation | None = None
+        self._resultCache: ResultCache | None = None
+        self._relationIndexCache: GeometryRelationIndexCache | None = None
 
     def startBinningFromTemplates(self, fullAnalysis: bool) -> bool:
         if fullAnalysis:
@@ -141,6 +148,22 @@ class WorkerOperationController:
             )
         )
 
+    def startCfpMultiPointAnalysisFromGeometryTables(self) -> bool:
+        if self.window.survey is None:
+            self.window.appendLogMessage('Thread : No survey has been defined', MsgType.Error)
+            return False
+
+        if self.window.srcGeom is None or self.window.relGeom is None or self.window.recGeom is None:
+            self.window.appendLogMessage('Thread : Source, relation, and receiver geometry tables have not all been defined', MsgType.Error)
+            return False
+
+        focalPoints = self._resolveCfpBatchFocalPoints()
+        if focalPoints.shape[0] == 0:
+            self.window.appendLogMessage('Thread : The output area has not been defined; no CFP focal points available', MsgType.Error)
+            return False
+
+        return self._startJob(self._buildCfpMultiPointAnalysisFromGeometryTablesJob(focalPoints))
+
     def startCfpAnalysisFromSpsTables(self) -> bool:
         if self.window.survey is None:
             self.window.appendLogMessage('Thread : No survey has been defined', MsgType.Error)
@@ -282,6 +305,7 @@ class WorkerOperationController:
             analysisFile=self.window.output.anaOutput,
             debugpyEnabled=self.window.appSettings.debugpy,
             includeProfiling=self.window.appSettings.debug,
+            foldClasses=FoldClassSpec.fromAppSettings(self.window.appSettings),
         )
         return WorkerJobSpec(
             name='bin-from-templates',
@@ -291,6 +315,7 @@ class WorkerOperationController:
             workerFactory=dependencies['BinningWorker'],
             request=request,
             resultHandler=self.window.applyBinningWorkerResult,
+            cacheKey=None if fullAnalysis else self._resultCacheKey(request),   # a full analysis also fills the trace table; not cached
         )
 
     def _buildBinningFromGeometryJob(self, fullAnalysis: bool, progressLabelText: str) -> WorkerJobSpec:
@@ -304,6 +329,7 @@ class WorkerOperationController:
             analysisFile=self.window.output.anaOutput,
             debugpyEnabled=self.window.appSettings.debugpy,
             includeProfiling=self.window.appSettings.debug,
+            foldClasses=FoldClassSpec.fromAppSettings(self.window.appSettings),
         )
         return WorkerJobSpec(
             name='bin-from-geometry',
@@ -313,6 +339,7 @@ class WorkerOperationController:
             workerFactory=dependencies['BinFromGeometryWorker'],
             request=request,
             resultHandler=self.window.applyBinningWorkerResult,
+            cacheKey=None if fullAnalysis else self._resultCacheKey(request),
         )
 
     def _buildBinningFromSpsJob(self, fullAnalysis: bool, progressLabelText: str) -> WorkerJobSpec:
@@ -325,6 +352,7 @@ class WorkerOperationController:
             extended=fullAnalysis,
             analysisFile=self.window.output.anaOutput,
             debugpyEnabled=self.window.appSettings.debugpy,
+            foldClasses=FoldClassSpec.fromAppSettings(self.window.appSettings),
         )
         return WorkerJobSpec(
             name='bin-from-sps',
@@ -334,6 +362,7 @@ class WorkerOperationController:
             workerFactory=dependencies['BinFromGeometryWorker'],
             request=request,
             resultHandler=self.window.applyBinningWorkerResult,
+            cacheKey=None if fullAnalysis else self._resultCacheKey(request),
         )
 
     def _buildGeometryFromTemplatesJob(self) -> WorkerJobSpec:
@@ -373,6 +402,7 @@ class WorkerOperationController:
             vint=rmsVelocity,
             cfpArray=cfpArray,
             radonSize=self.window.appSettings.radonSize,
+            transformMode=self.window.appSettings.cfpTransformMode,
             debugpyEnabled=self.window.appSettings.debugpy,
         )
         return WorkerJobSpec(
@@ -386,6 +416,7 @@ class WorkerOperationController:
             workerFactory=dependencies['CfpFromTemplatesWorker'],
             request=request,
             resultHandler=self.window.applyCfpFromTemplatesWorkerResult,
+            cacheKey=self._resultCacheKey(request),
         )
 
     def _buildCfpAnalysisFromGeometryTablesJob(self, srcGeom, relGeom, recGeom, sourceName: str) -> WorkerJobSpec:
@@ -411,9 +442,11 @@ class WorkerOperationController:
             vint=rmsVelocity,
             cfpArray=cfpArray,
             radonSize=self.window.appSettings.radonSize,
+            transformMode=self.window.appSettings.cfpTransformMode,
             chunkSize=25_000,
             debugpyEnabled=self.window.appSettings.debugpy,
             sourceName=sourceName,
+            **self._relationIndexFields(srcGeom, relGeom, recGeom),
         )
         return WorkerJobSpec(
             name=f"cfp-from-{sourceName.lower().replace(' ', '-')}",
@@ -426,6 +459,47 @@ class WorkerOperationController:
             workerFactory=dependencies['CfpFromGeometryTablesWorker'],
             request=request,
             resultHandler=self.window.applyCfpFromGeometryTablesWorkerResult,
+            cacheKey=self._resultCacheKey(request),
+        )
+
+    def _buildCfpMultiPointAnalysisFromGeometryTablesJob(self, focalPoints: np.ndarray) -> WorkerJobSpec:
+        dependencies = self.runtimeDependenciesProvider()
+        cfpArrayValue = self.window.appSettings.cfpArray
+        cfpArray = (float(cfpArrayValue.x()), float(cfpArrayValue.y()), float(cfpArrayValue.z()))
+        focalZ = self._resolveCfpFocalZ()
+        maxDipDegrees = self._resolveCfpMaxDipDegrees()
+        frequency = self._resolveCfpFrequencyList()[0]
+        rmsVelocity = self._resolveCfpRmsVelocity()
+
+        request = CfpMultiPointFromGeometryTablesRequest(
+            xmlString=self.window.survey.toXmlString(),
+            srcGeom=self.window.srcGeom,
+            relGeom=self.window.relGeom,
+            recGeom=self.window.recGeom,
+            focalZ=focalZ,
+            frequency=frequency,
+            maxDipDegrees=maxDipDegrees,
+            vint=rmsVelocity,
+            cfpArray=cfpArray,
+            radonSize=self.window.appSettings.radonSize,
+            transformMode=self.window.appSettings.cfpTransformMode,
+            chunkSize=250_000,
+            debugpyEnabled=self.window.appSettings.debugpy,
+            focalPoints=focalPoints,
+            **self._relationIndexFields(self.window.srcGeom, self.window.relGeom, self.window.recGeom),
+        )
+        return WorkerJobSpec(
+            name='cfp-multi-point-from-geometry-tables',
+            progressLabelText='CFP from Geometry Tables - relation lookup',
+            startMessage=(
+                "Thread : Started 'CFP Multi-point Analysis (Geometry Tables)'"
+                f' at {focalPoints.shape[0]:,} focal points, z={focalZ:.2f}, Vint={rmsVelocity:.1f}m/s'
+            ),
+            startMessageType=MsgType.Analysis,
+            workerFactory=dependencies['CfpMultiPointFromGeometryTablesWorker'],
+            request=request,
+            resultHandler=self.window.applyCfpMultiPointWorkerResult,
+            cacheKey=self._resultCacheKey(request),
         )
 
     def _buildCfpPlaneAnalysisFromTemplatesJob(self) -> WorkerJobSpec:
@@ -447,6 +521,8 @@ class WorkerOperationController:
             frequencies=np.array(frequencyList, dtype=np.float32),
             computeIncoherentQc=self.window.appSettings.cfpIncoherentQc,
             run3x3Diagnostics=self.window.appSettings.cfpRun3x3Diagnostics,
+            adaptiveGrid=self.window.appSettings.cfpAdaptiveGrid,
+            adaptiveTolerance=self.window.appSettings.cfpAdaptiveTolerance,
             sourceName='Templates',
             debugpyEnabled=self.window.appSettings.debugpy,
         )
@@ -461,6 +537,7 @@ class WorkerOperationController:
             workerFactory=dependencies['CfpAmplitudeMapWorker'],
             request=request,
             resultHandler=self.window.applyCfpAmplitudeMapWorkerResult,
+            cacheKey=self._resultCacheKey(request),
         )
 
     def _buildCfpPlaneAnalysisFromGeometryTablesJob(self, srcGeom, relGeom, recGeom, sourceName: str) -> WorkerJobSpec:
@@ -482,8 +559,11 @@ class WorkerOperationController:
             frequencies=np.array(frequencyList, dtype=np.float32),
             computeIncoherentQc=self.window.appSettings.cfpIncoherentQc,
             run3x3Diagnostics=self.window.appSettings.cfpRun3x3Diagnostics,
+            adaptiveGrid=self.window.appSettings.cfpAdaptiveGrid,
+            adaptiveTolerance=self.window.appSettings.cfpAdaptiveTolerance,
             sourceName=sourceName,
             debugpyEnabled=self.window.appSettings.debugpy,
+            **self._relationIndexFields(srcGeom, relGeom, recGeom),
         )
         return WorkerJobSpec(
             name=f"cfp-illumination-from-{sourceName.lower().replace(' ', '-')}",
@@ -496,6 +576,7 @@ class WorkerOperationController:
             workerFactory=dependencies['CfpAmplitudeMapWorker'],
             request=request,
             resultHandler=self.window.applyCfpAmplitudeMapWorkerResult,
+            cacheKey=self._resultCacheKey(request),
         )
 
     def _resolveLocalCfpTargetXY(self) -> tuple[float, float]:
@@ -522,6 +603,19 @@ class WorkerOperationController:
         center = outputRect.center()
         return (float(center.x()), float(center.y()))
 
+    def _resolveCfpBatchFocalPoints(self) -> np.ndarray:
+        # centres of an n x n subdivision of the output area, in local coordinates
+        survey = self.window.survey
+        outputRect = getattr(getattr(survey, 'output', None), 'rctOutput', None)
+        if outputRect is None or not hasattr(outputRect, 'isValid') or not outputRect.isValid():
+            return np.empty((0, 2), dtype=np.float64)
+
+        n = max(int(self.window.appSettings.cfpBatchGridSize), 1)
+        x = outputRect.left() + (np.arange(n) + 0.5) * outputRect.width() / n
+        y = outputRect.top() + (np.arange(n) + 0.5) * outputRect.height() / n
+        focalX, focalY = np.meshgrid(x, y)
+        return np.column_stack((focalX.ravel(), focalY.ravel()))
+
     def _resolveCfpMaxDipDegrees(self) -> float:
         defaultMaxDipDegrees = 40.0
         survey = self.window.survey
@@ -609,7 +703,68 @@ class WorkerOperationController:
             return float(localPlane.anchor.z())
         return float(survey.globalPlane.anchor.z())
 
+    def resultCache(self) -> ResultCache:
+        maxBytes = int(self.window.appSettings.resultCacheSizeMB) * 1024 * 1024
+        if self._resultCache is None:
+            self._resultCache = ResultCache(maxBytes)
+        elif self._resultCache.maxBytes != maxBytes:
+            self._resultCache.setMaxBytes(maxBytes)
+        return self._resultCache
+
+    def relationIndexCache(self) -> GeometryRelationIndexCache:
+        if self._relationIndexCache is None:
+            self._relationIndexCache = GeometryRelationIndexCache()
+        return self._relationIndexCache
+
+    def _arrayRevisionKey(self, array) -> str:
+        # the edit revision of a session array stands in for a hash of its content; '' for other arrays
+        return self.window.sessionService.arrayRevisionKey(self.window.sessionState, array)
+
+    def _relationIndexFields(self, srcGeom, relGeom, recGeom) -> dict[str, Any]:
+        # the relation index of earlier runs on the same geometry tables; an edited table has a new revision, hence a different key
+        keys = [self._arrayRevisionKey(table) for table in (srcGeom, relGeom, recGeom)]
+        key = '-'.join(keys) if all(keys) else geometryKey(srcGeom, relGeom, recGeom)
+        return {'geometryKey': key, 'relationIndex': self.relationIndexCache().get(key)}
+
+    def _keepRelationIndex(self, result) -> None:
+        # a relation index built by the worker is kept here for later runs, rather than in the result (cache)
+        relationIndex = getattr(result, 'relationIndex', None)
+        if relationIndex is None:
+            return
+        result.relationIndex = None
+        if getattr(result, 'success', False):
+            self.relationIndexCache().put(relationIndex)
+
+    def _resultCacheKey(self, request) -> str | None:
+        if self.resultCache().maxBytes <= 0:
+            return None
+        arrayKeys = {field.name: self._arrayRevisionKey(value) for field in fields(request) if isinstance(value := getattr(request, field.name), np.ndarray)}
+        return requestCacheKey(request, arrayKeys)
+
+    def _startCachedJob(self, job: WorkerJobSpec) -> bool:
+        if job.cacheKey is None:
+            return False
+
+        result = self.resultCache().get(job.cacheKey)
+        if result is None:
+            return False
+
+        self._showRunningUi(job.progressLabelText)
+        self.window.appendLogMessage(job.startMessage, job.startMessageType)
+        self.window.appendLogMessage('Thread : . . . identical request found in result cache; reusing the earlier result', job.startMessageType)
+        self._setStartTime()
+        self.finishCurrentOperation(result, job.resultHandler, resetAnalysis=job.resetAnalysisOnFinish, completionTabIndex=job.completionTabIndex)
+        return True
+
+    def _cacheJobResult(self, job: WorkerJobSpec, result) -> None:
+        if job.cacheKey is None or not getattr(result, 'success', False) or getattr(result, 'isPartial', False):
+            return
+        self.resultCache().put(job.cacheKey, result)
+
     def _startJob(self, job: WorkerJobSpec) -> bool:
+        if self._startCachedJob(job):
+            return True
+
         self._showRunningUi(job.progressLabelText)
         self.window.appendLogMessage(job.startMessage, job.startMessageType)
 
@@ -706,6 +861,9 @@ class WorkerOperationController:
         if activeOperation is None or activeOperation.job is not job:
             return
 
+        self._keepRelationIndex(result)
+        if not activeOperation.cancelRequested:
+            self._cacheJobResult(job, result)
         self.finishCurrentOperation(
             result,
             job.resultHandler,
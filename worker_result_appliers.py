@@ -78,20 +78,23 @@ class CfpAmplitudeMapResultApplier:
             )
             return
 
-        # Update output
-        self.window.output.cfpOutput = result.amplitudeMap
-        self.window.output.cfpOutputIncoherentQc = result.incoherentAmplitudeMap
-        actionIllu = getattr(self.window, 'actionIllu', None)
-        if actionIllu is not None:
-            actionIllu.setChecked(True)
-
-        actionIlluminationQc = getattr(self.window, 'actionIlluminationQcIncoherent', None)
-        if actionIlluminationQc is not None:
-            actionIlluminationQc.setEnabled(result.incoherentAmplitudeMap is not None)
+        isPartial = getattr(result, 'isPartial', False)
+        if not isPartial:
+            # Update output; partial tile maps are only displayed, so a cancelled run keeps the previous illumination map
+            self.window.output.cfpOutput = result.amplitudeMap
+            self.window.output.cfpOutputIncoherentQc = result.incoherentAmplitudeMap
+            actionIllu = getattr(self.window, 'actionIllu', None)
+            if actionIllu is not None:
+                actionIllu.setChecked(True)
+
+            actionIlluminationQc = getattr(self.window, 'actionIlluminationQcIncoherent', None)
+            if actionIlluminationQc is not None:
+                actionIlluminationQc.setEnabled(result.incoherentAmplitudeMap is not None)
 
         # Update layout image view
         self.window.imageType = 6
         self.window.layoutImg = result.amplitudeMap
+        self.window.plotRedrawHelper.invalidateRegionStatistics()
 
         levels = (0.0, 1.0)
 
@@ -104,13 +107,16 @@ class CfpAmplitudeMapResultApplier:
         )
         self.window.plotLayout()
 
-        if not getattr(result, 'isPartial', False):
+        if not isPartial:
             if modeLabel == 'incoherent QC':
                 self.window.appendLogMessage('Thread : . . . incoherent illumination QC mode enabled (diagnostic; phase interference ignored).', MsgType.Analysis)
             summaryLines = getattr(result, 'diagnosticsSummaryLines', None)
             if summaryLines:
                 for line in summaryLines:
                     self.window.appendLogMessage(line, MsgType.Analysis)
+            adaptiveSummary = getattr(result, 'adaptiveSummary', '')
+            if adaptiveSummary:
+                self.window.appendLogMessage(f'Thread : . . . {adaptiveSummary}', MsgType.Analysis)
             normalizationFactor = float(getattr(result, 'normalizationFactor', 1.0) or 1.0)
             self.window.appendLogMessage(
                 f"Thread : Completed 'CFP Plane Illumination v1 ({sourceName}, {modeLabel})'. Elapsed time:{elapsed}, normFactor={normalizationFactor:.6g}",
@@ -169,6 +175,7 @@ class BinningResultApplier:
         self.window.output.maxOffset = result.maxOffset
         self.window.output.rmsOffset = result.rmsOffset
         self.window.output.gapOffset = result.gapOffset
+        self.window.plotRedrawHelper.invalidateRegionStatistics()               # the fold and offset maps have been replaced
 
         self.window.output.minimumFold = result.minimumFold
         self.window.output.maximumFold = result.maximumFold
@@ -182,6 +189,9 @@ class BinningResultApplier:
         self.window.output.maxOffsetGap = 0.0 if result.maxOffsetGap is None else result.maxOffsetGap
         self.window.output.ofAziHist = result.ofAziHist
         self.window.output.offstHist = result.offstHist
+        self.window.output.offsetLimitedFold = result.offsetLimitedFold
+        self.window.output.azimuthRichness = result.azimuthRichness
+        self.window.output.ovtRichness = result.ovtRichness
 
     def _logSummary(self, elapsed: timedelta) -> None:
         self.window.appendLogMessage(f'Thread : Binning completed. Elapsed time:{elapsed} ', MsgType.Binning)
@@ -233,8 +243,8 @@ class BinningResultApplier:
             self.window.textEdit.document().setModified(True)
             return 'Analysis results are yet to be saved.'
 
-        self.window.saveAnalysisSidecars(includeHistograms=True)
-        return 'Analysis results have been saved.'
+        self.window.persistAnalysisSidecarsInBackground(includeHistograms=True)
+        return 'Analysis results are being saved in the background.'
 
     def _logProfiling(self, profiling) -> None:
         if not self.window.appSettings.debug or profiling is None:
@@ -350,8 +360,8 @@ class GeometryResultApplier:
             self.window.textEdit.document().setModified(True)
             return 'Analysis results are yet to be saved.'
 
-        self.window.saveSurveyDataSidecars()
-        return 'Analysis results have been saved.'
+        self.window.persistSurveyDataSidecarsInBackground()
+        return 'Geometry data is being saved in the background.'
 
 
 class CfpFromTemplatesResultApplier:
@@ -481,3 +491,72 @@ class CfpFromGeometryTablesResultApplier:
                 f'{result.contributingTraceCount:,} traces contributed from {sourceName}.'
             ),
         )
+
+
+class CfpMultiPointResultApplier:
+    def __init__(self, window, runtimeDependenciesProvider: Callable[[], dict[str, object]]) -> None:
+        self.window = window
+        self.runtimeDependenciesProvider = runtimeDependenciesProvider
+
+    def apply(self, result, elapsed: timedelta) -> None:
+        if not result.success:
+            self.window.appendLogMessage("Thread : . . . aborted CFP Multi-point Analysis (Geometry Tables)", MsgType.Error)
+            self.window.appendLogMessage(f'Thread : . . . {result.errorText}', MsgType.Error)
+            self.runtimeDependenciesProvider()['QMessageBox'].information(self.window, 'Interrupted', 'Worker thread aborted')
+            return
+
+        summary = result.pointSummary
+        self.window.appendLogMessage(
+            f"Thread : Completed 'CFP Multi-point Analysis (Geometry Tables)' at {summary.shape[0]:,} focal points. Elapsed time:{elapsed} ",
+            MsgType.Analysis,
+        )
+        self.window.appendLogMessage(
+            (
+                'Thread : . . . '
+                f'z={result.focalZ:.2f}, aperture={result.maxDipDegrees:.1f}deg, radius={result.apertureRadius:.2f}m, '
+                f'frequency={result.frequency:.1f}Hz, Vint={result.vint:.1f}m/s; '
+                f'relation records: {result.totalRelationCount:,}'
+            ),
+            MsgType.Analysis,
+        )
+        if result.sourceOrphanRelationCount or result.receiverOrphanRelationCount or result.missingSourceCount or result.missingReceiverCount:
+            self.window.appendLogMessage(
+                (
+                    'Thread : . . . '
+                    f'source orphans: {result.sourceOrphanRelationCount:,}; receiver orphans: {result.receiverOrphanRelationCount:,}; '
+                    f'missing source lookups: {result.missingSourceCount:,}; missing receiver ranges: {result.missingReceiverCount:,}'
+                ),
+                MsgType.Warning,
+            )
+        for p, point in enumerate(summary):
+            self.window.appendLogMessage(
+                (
+                    f'Thread : . . . point {p + 1:>4}: ({point["focalX"]:.2f}, {point["focalY"]:.2f}), '
+                    f'traces={point["contributingTraceCount"]:,}/{point["totalTraceCount"]:,}, sources={point["sourceCount"]:,}, receivers={point["receiverCount"]:,}, '
+                    f'SNR Source={point["sourceSnr"]:.1f}dB, Receiver={point["receiverSnr"]:.1f}dB, AVP={point["avpSnr"]:.1f}dB'
+                ),
+                MsgType.Analysis,
+            )
+
+        self.window.output.cfpPointSummary = summary
+        self.window.output.cfpResolutionImages = result.resolutionImages
+        self.window.output.cfpRadonAvpImages = result.radonAvpImages
+        if result.selectedPointIndex < 0:
+            self.window.appendLogMessage('Thread : . . . no focal point received any contributing traces', MsgType.Warning)
+            return
+
+        # display the focal point with the lowest AVP SNR
+        self.window.appendLogMessage(
+            f'Thread : . . . displaying point {result.selectedPointIndex + 1} at ({result.focalX:.2f}, {result.focalY:.2f}), the lowest AVP SNR',
+            MsgType.Analysis,
+        )
+        _copyCfpDisplayOutputs(self.window, result)
+        _logCfpSnr(self.window, result)
+
+        self.window.renderSelectedCfpSlice()
+        _showCfpAnalysisTab(self.window)
+        self.runtimeDependenciesProvider()['QMessageBox'].information(
+            self.window,
+            'Done',
+            f'Worker thread completed. CFP analysis done at {summary.shape[0]:,} focal points.',
+        )
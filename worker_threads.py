@@ -1,7 +1,8 @@
 import os
 import sys
+import time
 from collections.abc import Callable
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from numbers import Real
 from typing import Any, cast
 
@@ -9,12 +10,19 @@ import numpy as np
 from qgis.PyQt.QtCore import QObject, QThread, pyqtSignal
 
 from . import config
+from .cfp_adaptive_grid import computeAdaptiveMap
 from .cfp_aux_functions_numba import (
-    calculate_panel_snr_numba, compute_illumination_row_components_numba,
-    compute_illumination_row_incoherent_numba, compute_illumination_row_numba,
+    ILLUMINATION_3X3_MODES, build_station_bucket_index,
+    calculate_panel_snr_numba, compute_beam_xy_grid_fast,
+    compute_illumination_row_incoherent_numba,
+    compute_illumination_row_modes_numba, compute_illumination_row_numba,
     compute_monochromatic_beam_xy_grid,
-    compute_monochromatic_weighted_beam_xy_grid, compute_radon_images_numba,
-    compute_xy_beam_images_numba, scan_cfp_geometry_relations_numba)
+    compute_monochromatic_weighted_beam_xy_grid, compute_radon_images_fast,
+    compute_radon_images_numba, compute_xy_beam_images_numba,
+    merge_station_weights_numba, scan_cfp_focal_points_numba)
+from .fold_classes import FoldClassSpec
+from .geometry_relation_index import (GeometryRelationIndex,
+                                      buildGeometryRelationIndex)
 from .roll_survey import RollSurvey
 
 # debugpy  is needed to debug a worker thread.
@@ -66,11 +74,22 @@ def computeMonochromaticWeightedBeamXyGridSafe(evalX, evalY, evalZ, surfX, surfY
         raise RuntimeError(f"CFP weighted beam grid calculation failed: {e}") from e
 
 
-def scanCfpGeometryRelationsSafe(*args):
+def computeBeamXyGridFastSafe(evalX, evalY, evalZ, surfX, surfY, surfZ, surfWeights, frequency, vint, focalX=0.0, focalY=0.0):
+    """
+    Factorized (fast) CFP beam grid; surfWeights may be None.
+    No silent fallback; errors are raised like those of the direct beam grid wrappers.
+    """
+    try:
+        return compute_beam_xy_grid_fast(evalX, evalY, evalZ, surfX, surfY, surfZ, surfWeights, frequency, vint, focal_x=focalX, focal_y=focalY)
+    except Exception as e:
+        raise RuntimeError(f"CFP beam grid calculation failed: {e}") from e
+
+
+def mergeStationWeightsSafe(*args):
     try:
-        return scan_cfp_geometry_relations_numba(*args)
+        return merge_station_weights_numba(*args)
     except ImportError:
-        pyFunc = getattr(scan_cfp_geometry_relations_numba, 'py_func', None)
+        pyFunc = getattr(merge_station_weights_numba, 'py_func', None)
         if pyFunc is None or not callable(pyFunc):
             raise
         return _callPythonFallback(pyFunc, *args)
@@ -86,6 +105,14 @@ def computeRadonImagesSafe(sourceField, receiverField, evalX, evalY, px, py, fre
         return _callPythonFallback(pyFunc, sourceField, receiverField, evalX, evalY, px, py, frequency)
 
 
+def computeRadonImagesFastSafe(sourceField, receiverField, evalX, evalY, px, py, frequency):
+    # the FFT path uses the direct kernel on irregular axes; a numba failure there falls back like the direct path
+    try:
+        return compute_radon_images_fast(sourceField, receiverField, evalX, evalY, px, py, frequency)
+    except ImportError:
+        return computeRadonImagesSafe(sourceField, receiverField, evalX, evalY, px, py, frequency)
+
+
 def computeXyBeamImagesSafe(sourceField, receiverField, dbMin=-60.0):
 
     """
@@ -119,6 +146,12 @@ def _copyCfpImageForRollPlot(arr: Any) -> Any:
     return _copyArrayIfNumpy(arr)
 
 
+def cfpTileBands(rowCount: int, tileRows: int) -> list[tuple[int, int]]:
+    """Split the rows of a CFP illumination map into bands (tiles) of at most tileRows rows, as (start, stop) pairs."""
+    tileRows = max(int(tileRows), 1)
+    return [(start, min(start + tileRows, rowCount)) for start in range(0, rowCount, tileRows)]
+
+
 def _safeNonNegative(value: Any) -> float | None:
     if isinstance(value, Real):
         return max(float(value), 0.0)
@@ -140,6 +173,7 @@ class BinningFromTemplatesRequest:
     analysisFile: object = None
     debugpyEnabled: bool = False
     includeProfiling: bool = False
+    foldClasses: FoldClassSpec = field(default_factory=FoldClassSpec)          # offset-class, azimuth-sector and OVT fold cubes to accumulate
 
 
 @dataclass
@@ -163,6 +197,9 @@ class BinningFromTemplatesResult:
     gapOffset: Any = None
     ofAziHist: Any = None
     offstHist: Any = None
+    offsetLimitedFold: Any = None
+    azimuthRichness: Any = None
+    ovtRichness: Any = None
     cmpTransform: Any = None
     anaOutputShape: tuple[int, ...] | None = None
     profiling: 'GeometryProfilingPayload | None' = None
@@ -179,6 +216,7 @@ class BinningFromGeometryRequest:
     analysisFile: object = None
     debugpyEnabled: bool = False
     includeProfiling: bool = False
+    foldClasses: FoldClassSpec = field(default_factory=FoldClassSpec)          # offset-class, azimuth-sector and OVT fold cubes to accumulate
 
 
 @dataclass
@@ -202,6 +240,9 @@ class BinningFromGeometryResult:
     gapOffset: Any = None
     ofAziHist: Any = None
     offstHist: Any = None
+    offsetLimitedFold: Any = None
+    azimuthRichness: Any = None
+    ovtRichness: Any = None
     cmpTransform: Any = None
     anaOutputShape: tuple[int, ...] | None = None
     profiling: 'GeometryProfilingPayload | None' = None
@@ -226,6 +267,7 @@ class CfpFromTemplatesRequest:
     vint: float = 2000.0
     cfpArray: tuple[float, float, float] | None = None
     radonSize: int = config.radonSize
+    transformMode: str = config.cfpTransformMode
     debugpyEnabled: bool = False
     matlab_compat: bool = True
 
@@ -244,10 +286,18 @@ class CfpFromGeometryTablesRequest:
     vint: float = 2000.0
     cfpArray: tuple[float, float, float] | None = None
     radonSize: int = config.radonSize
+    transformMode: str = config.cfpTransformMode
     chunkSize: int = 25_000
     debugpyEnabled: bool = False
     matlab_compat: bool = True
     sourceName: str = 'Geometry Tables'
+    geometryKey: str = ''                                                       # edit revisions of the three tables, or their geometryKey()
+    relationIndex: Any = None                                                   # GeometryRelationIndex of an earlier run; reused when its key matches
+
+
+@dataclass
+class CfpMultiPointFromGeometryTablesRequest(CfpFromGeometryTablesRequest):
+    focalPoints: Any = None                                                     # (n, 2) focal x, y; focalX, focalY are not used
 
 
 @dataclass
@@ -262,9 +312,13 @@ class CfpAmplitudeMapRequest:
     frequencies: np.ndarray = None
     computeIncoherentQc: bool = False
     run3x3Diagnostics: bool = False
+    adaptiveGrid: bool = False
+    adaptiveTolerance: float = config.cfpAdaptiveTolerance
     sourceName: str = 'Templates'
     debugpyEnabled: bool = False
     matlab_compat: bool = True
+    geometryKey: str = ''                                                       # edit revisions of the three tables, or their geometryKey()
+    relationIndex: Any = None                                                   # GeometryRelationIndex of an earlier run; reused when its key matches
 
 
 @dataclass
@@ -333,6 +387,8 @@ class CfpAmplitudeMapResult:
     isPartial: bool = False
     elapsed: Any = None
     diagnosticsSummaryLines: list[str] | None = None
+    adaptiveSummary: str = ''
+    relationIndex: Any = None                                                   # GeometryRelationIndex built by this run, for reuse by later runs
 
 
 @dataclass
@@ -376,6 +432,97 @@ class CfpFromGeometryTablesResult:
     radonY0: float = 0.0
     radonDx: float = 1.0
     radonDy: float = 1.0
+    relationIndex: Any = None                                                   # GeometryRelationIndex built by this run, for reuse by later runs
+
+
+CFP_POINT_SUMMARY_DTYPE = np.dtype(
+    [
+        ('focalX', '<f8'),
+        ('focalY', '<f8'),
+        ('contributingRelationCount', '<i8'),
+        ('contributingTraceCount', '<i8'),
+        ('totalTraceCount', '<i8'),
+        ('sourceCount', '<i8'),
+        ('receiverCount', '<i8'),
+        ('sourceSnr', '<f4'),
+        ('receiverSnr', '<f4'),
+        ('avpSnr', '<f4'),
+    ]
+)
+
+
+@dataclass
+class CfpMultiPointFromGeometryTablesResult(CfpFromGeometryTablesResult):
+    # the inherited single point fields (focalX, images, SNR, ...) describe the selected point, the one with the lowest AVP SNR
+    pointSummary: Any = None                                                    # CFP_POINT_SUMMARY_DTYPE records, one per focal point
+    resolutionImages: Any = None                                                # (n, ny, nx) resolution image per focal point
+    radonAvpImages: Any = None                                                  # (n, nky, nkx) AVP function per focal point
+    selectedPointIndex: int = -1
+
+
+def _reusableRelationIndex(index, key: str):
+    # an index is only reused for the tables it was built from
+    if index is None or not key or index.geometryKey != key:
+        return None
+    return index
+
+
+def _numbaThreadCount() -> int:
+    try:
+        import numba
+
+        return int(numba.get_num_threads())
+    except ImportError:
+        return os.cpu_count() or 1
+
+
+class CfpStationTable:
+    """Unique (x, y, z) stations with their summed weights; duplicate stations are merged as they arrive.
+
+    Memory grows with the number of unique stations only, however often a station is added.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.count = 0                                                          # unique stations in the table
+        self.addedCount = 0                                                     # stations added, duplicates included
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int) -> None:
+        capacity = 1 << max(int(capacity) - 1, 15).bit_length()                 # power of two, at least 16
+        self._bits = np.zeros((capacity, 3), dtype=np.uint32)
+        self._weights = np.zeros(capacity, dtype=np.float64)
+        self._used = np.zeros(capacity, dtype=np.bool_)
+        self.count = 0
+
+    def _merge(self, pointBits: np.ndarray, weights: np.ndarray) -> None:
+        start = 0
+        while start < pointBits.shape[0]:
+            self.count, start = mergeStationWeightsSafe(self._bits, self._weights, self._used, self.count, pointBits, weights, start)
+            if start < pointBits.shape[0]:
+                self._grow()
+
+    def _grow(self) -> None:
+        bits, weights = self._bits[self._used], self._weights[self._used]
+        self._allocate(2 * self._bits.shape[0])
+        self._merge(bits, weights)
+
+    def add(self, points: np.ndarray, weights: np.ndarray | None = None) -> None:
+        if points is None or points.shape[0] == 0:
+            return
+
+        # adding 0.0 turns -0.0 into 0.0, so both map onto the same station key
+        coords = np.ascontiguousarray(points[:, :3], dtype=np.float32) + np.float32(0.0)
+        weights = np.ones(coords.shape[0], dtype=np.float64) if weights is None else np.ascontiguousarray(weights, dtype=np.float64)
+        self._merge(coords.view(np.uint32), weights)
+        self.addedCount += int(coords.shape[0])
+
+    def stations(self) -> tuple[np.ndarray, np.ndarray]:
+        """Return the unique stations [n, 3] (float32) and their weights [n] (float64)."""
+        return self._bits[self._used].view(np.float32), self._weights[self._used]
+
+    def clear(self) -> None:
+        self._allocate(1024)
+        self.addedCount = 0
 
 
 class CfpBeamAccumulator:
@@ -390,6 +537,7 @@ class CfpBeamAccumulator:
         focalY: float | None = None,
         cfpArray: tuple[float, float, float] | None = None,
         radonSize: int = config.radonSize,
+        transformMode: str = config.cfpTransformMode,
     ):
         self.survey = survey
         self.focalZ = focalZ
@@ -398,8 +546,7 @@ class CfpBeamAccumulator:
         self.maxDipDegrees = maxDipDegrees
         self.focalX = focalX
         self.focalY = focalY
-        self.flushThresholdPoints = 250_000
-        self.weightCollapseThresholdPoints = 2_048
+        self.flushThresholdPoints = 250_000                                     # unique stations kept per table before their beams are accumulated
         self.sourceBeamField = None
         self.receiverBeamField = None
         self.sourceBeamImage = None
@@ -425,12 +572,9 @@ class CfpBeamAccumulator:
         self.evalY = None
         self.cfpArray = cfpArray
         self.radonSize = max(int(radonSize), 2)
-        self._bufferedSourceArrays = []
-        self._bufferedReceiverArrays = []
-        self._bufferedSourceWeights = []
-        self._bufferedReceiverWeights = []
-        self._bufferedSourcePointCount = 0
-        self._bufferedReceiverPointCount = 0
+        self.transformMode = transformMode
+        self._sourceStations = CfpStationTable()
+        self._receiverStations = CfpStationTable()
 
     def initializeGrid(self) -> bool:
         outputRect = getattr(self.survey.output, 'rctOutput', None)
@@ -526,146 +670,34 @@ class CfpBeamAccumulator:
         recY = np.ascontiguousarray(recY, dtype=np.float32)
         recZ = np.ascontiguousarray(recZ, dtype=np.float32)
 
-        if srcWeights is None:
-            self.sourceBeamField += computeMonochromaticBeamXyGridSafe(
-                self.evalX,
-                self.evalY,
-                self.focalZ,
-                srcX,
-                srcY,
-                srcZ,
-                self.frequency,
-                self.vint,
-                self.focalX,
-                self.focalY,
-            )
-        else:
-            self.sourceBeamField += computeMonochromaticWeightedBeamXyGridSafe(
-                self.evalX,
-                self.evalY,
-                self.focalZ,
-                srcX,
-                srcY,
-                srcZ,
-                np.ascontiguousarray(srcWeights, dtype=np.float64),
-                self.frequency,
-                self.vint,
-                self.focalX,
-                self.focalY,
-            )
-
-        if recWeights is None:
-            self.receiverBeamField += computeMonochromaticBeamXyGridSafe(
-                self.evalX,
-                self.evalY,
-                self.focalZ,
-                recX,
-                recY,
-                recZ,
-                self.frequency,
-                self.vint,
-                self.focalX,
-                self.focalY,
-            )
-        else:
-            self.receiverBeamField += computeMonochromaticWeightedBeamXyGridSafe(
-                self.evalX,
-                self.evalY,
-                self.focalZ,
-                recX,
-                recY,
-                recZ,
-                np.ascontiguousarray(recWeights, dtype=np.float64),
-                self.frequency,
-                self.vint,
-                self.focalX,
-                self.focalY,
-            )
-
-    def _collapsePointWeights(self, points: np.ndarray, weights: np.ndarray | None = None, force: bool = False) -> tuple[np.ndarray, np.ndarray | None]:
-        if points is None or points.shape[0] == 0:
-            return np.empty((0, 3), dtype=np.float32), None
-
-        if weights is not None:
-            weights = np.ascontiguousarray(weights, dtype=np.float64)
-
-        if not force and points.shape[0] < self.weightCollapseThresholdPoints:
-            return points, weights
-
-        pointCoords = np.ascontiguousarray(points[:, :3], dtype=np.float32)
-        if weights is None:
-            collapsedPoints, counts = np.unique(pointCoords, axis=0, return_counts=True)
-            if collapsedPoints.shape[0] == points.shape[0]:
-                return collapsedPoints, None
-
-            return collapsedPoints, counts.astype(np.float64, copy=False)
-
-        collapsedPoints, inverse = np.unique(pointCoords, axis=0, return_inverse=True)
-        if collapsedPoints.shape[0] == points.shape[0]:
-            return pointCoords, weights
+        self.sourceBeamField += self._beamXyGrid(srcX, srcY, srcZ, srcWeights)
+        self.receiverBeamField += self._beamXyGrid(recX, recY, recZ, recWeights)
 
-        collapsedWeights = np.bincount(inverse, weights=weights).astype(np.float64, copy=False)
-        return collapsedPoints, collapsedWeights
+    def _beamXyGrid(self, surfX, surfY, surfZ, surfWeights=None):
+        if surfWeights is not None:
+            surfWeights = np.ascontiguousarray(surfWeights, dtype=np.float64)
 
-    def compactBufferedPointArrays(self) -> None:
-        if not self._bufferedSourceArrays or not self._bufferedReceiverArrays:
-            return
-
-        sourcePoints = self._bufferedSourceArrays[0] if len(self._bufferedSourceArrays) == 1 else np.concatenate(self._bufferedSourceArrays, axis=0)
-        receiverPoints = self._bufferedReceiverArrays[0] if len(self._bufferedReceiverArrays) == 1 else np.concatenate(self._bufferedReceiverArrays, axis=0)
-        sourceWeights = self._combineBufferedWeights(self._bufferedSourceWeights, self._bufferedSourceArrays)
-        receiverWeights = self._combineBufferedWeights(self._bufferedReceiverWeights, self._bufferedReceiverArrays)
-
-        sourcePoints, sourceWeights = self._collapsePointWeights(sourcePoints, sourceWeights, force=True)
-        receiverPoints, receiverWeights = self._collapsePointWeights(receiverPoints, receiverWeights, force=True)
+        if self.transformMode == config.CFP_TRANSFORM_FAST:
+            return computeBeamXyGridFastSafe(self.evalX, self.evalY, self.focalZ, surfX, surfY, surfZ, surfWeights, self.frequency, self.vint, self.focalX, self.focalY)
 
-        self._bufferedSourceArrays = [sourcePoints]
-        self._bufferedReceiverArrays = [receiverPoints]
-        self._bufferedSourceWeights = [sourceWeights]
-        self._bufferedReceiverWeights = [receiverWeights]
-        self._bufferedSourcePointCount = int(sourcePoints.shape[0])
-        self._bufferedReceiverPointCount = int(receiverPoints.shape[0])
-
-    @staticmethod
-    def _combineBufferedWeights(weightArrays, pointArrays) -> np.ndarray | None:
-        if not any(weights is not None for weights in weightArrays):
-            return None
-
-        combinedWeights = []
-        for points, weights in zip(pointArrays, weightArrays):
-            if weights is None:
-                combinedWeights.append(np.ones(points.shape[0], dtype=np.float64))
-            else:
-                combinedWeights.append(np.ascontiguousarray(weights, dtype=np.float64))
+        if surfWeights is None:
+            return computeMonochromaticBeamXyGridSafe(self.evalX, self.evalY, self.focalZ, surfX, surfY, surfZ, self.frequency, self.vint, self.focalX, self.focalY)
+        return computeMonochromaticWeightedBeamXyGridSafe(self.evalX, self.evalY, self.focalZ, surfX, surfY, surfZ, surfWeights, self.frequency, self.vint, self.focalX, self.focalY)
 
-        return combinedWeights[0] if len(combinedWeights) == 1 else np.concatenate(combinedWeights)
-
-    def _bufferPointArrays(self, sourcePoints, receiverPoints, sourceWeights=None, receiverWeights=None) -> None:
-        self._bufferedSourceArrays.append(sourcePoints)
-        self._bufferedReceiverArrays.append(receiverPoints)
-        self._bufferedSourceWeights.append(sourceWeights)
-        self._bufferedReceiverWeights.append(receiverWeights)
-        self._bufferedSourcePointCount += int(sourcePoints.shape[0])
-        self._bufferedReceiverPointCount += int(receiverPoints.shape[0])
+    def _addStations(self, sourcePoints, receiverPoints, sourceWeights=None, receiverWeights=None) -> None:
+        self._sourceStations.add(sourcePoints, sourceWeights)
+        self._receiverStations.add(receiverPoints, receiverWeights)
+        if max(self._sourceStations.count, self._receiverStations.count) >= self.flushThresholdPoints:
+            self.flushBufferedPointArrays()
 
     def flushBufferedPointArrays(self) -> None:
-        if not self._bufferedSourceArrays or not self._bufferedReceiverArrays:
+        if self._sourceStations.count == 0 or self._receiverStations.count == 0:
             return
 
-        sourcePoints = self._bufferedSourceArrays[0] if len(self._bufferedSourceArrays) == 1 else np.concatenate(self._bufferedSourceArrays, axis=0)
-        receiverPoints = self._bufferedReceiverArrays[0] if len(self._bufferedReceiverArrays) == 1 else np.concatenate(self._bufferedReceiverArrays, axis=0)
-        sourceWeights = self._combineBufferedWeights(self._bufferedSourceWeights, self._bufferedSourceArrays)
-        receiverWeights = self._combineBufferedWeights(self._bufferedReceiverWeights, self._bufferedReceiverArrays)
-
-        self._bufferedSourceArrays = []
-        self._bufferedReceiverArrays = []
-        self._bufferedSourceWeights = []
-        self._bufferedReceiverWeights = []
-        self._bufferedSourcePointCount = 0
-        self._bufferedReceiverPointCount = 0
-
-        sourcePoints, sourceWeights = self._collapsePointWeights(sourcePoints, sourceWeights)
-        receiverPoints, receiverWeights = self._collapsePointWeights(receiverPoints, receiverWeights)
+        sourcePoints, sourceWeights = self._sourceStations.stations()
+        receiverPoints, receiverWeights = self._receiverStations.stations()
+        self._sourceStations.clear()
+        self._receiverStations.clear()
 
         self.accumulateCoordinates(
             sourcePoints[:, 0],
@@ -685,9 +717,7 @@ class CfpBeamAccumulator:
         if sourcePoints.shape[0] == 0 or receiverPoints.shape[0] == 0:
             return
 
-        self._bufferPointArrays(sourcePoints, receiverPoints)
-        if max(self._bufferedSourcePointCount, self._bufferedReceiverPointCount) >= self.flushThresholdPoints:
-            self.flushBufferedPointArrays()
+        self._addStations(sourcePoints, receiverPoints)
 
     def accumulateWeightedPointArrays(self, sourcePoints, receiverPoints, sourceWeights, receiverWeights) -> None:
         if sourcePoints is None or receiverPoints is None:
@@ -702,9 +732,7 @@ class CfpBeamAccumulator:
         if sourceWeights.shape[0] != sourcePoints.shape[0] or receiverWeights.shape[0] != receiverPoints.shape[0]:
             raise ValueError('weighted CFP point arrays must match their weight arrays')
 
-        self._bufferPointArrays(sourcePoints, receiverPoints, sourceWeights, receiverWeights)
-        if max(self._bufferedSourcePointCount, self._bufferedReceiverPointCount) >= self.flushThresholdPoints:
-            self.compactBufferedPointArrays()
+        self._addStations(sourcePoints, receiverPoints, sourceWeights, receiverWeights)
 
     def _finalizeRadonImages(self, progressHandler=None, messageHandler=None, progressStart: int = 0, progressEnd: int = 100, phaseLabel: str = 'CFP analysis') -> None:
         if self.sourceBeamField is None or self.receiverBeamField is None or self.evalX is None or self.evalY is None:
@@ -727,7 +755,8 @@ class CfpBeamAccumulator:
 
         # Highly integrated Numba path computes everything: Transform, AVP, and Unit Images in fused passes.
         try:
-            self.radonSourceBeamImage, self.radonReceiverBeamImage, self.radonAvpImage = computeRadonImagesSafe(
+            radonImages = computeRadonImagesFastSafe if self.transformMode == config.CFP_TRANSFORM_FAST else computeRadonImagesSafe
+            self.radonSourceBeamImage, self.radonReceiverBeamImage, self.radonAvpImage = radonImages(
                 self.sourceBeamField,
                 self.receiverBeamField,
                 np.ascontiguousarray(self.evalX - self.focalX, dtype=np.float32),
@@ -809,6 +838,8 @@ class BinFromGeometryWorker(QObject):
         # the following function also calculates the required transforms
         self.survey.fromXmlString(request.xmlString, True)                      # fully populate the object AND create arrays
         self.survey.output.anaOutput = request.analysisFile
+        self.survey.createFoldClassCubes(request.foldClasses)
+        self.survey.createUniqueSlotBitsets()
         self.survey.output.srcGeom = request.srcGeom
         self.survey.output.relGeom = request.relGeom
         self.survey.output.recGeom = request.recGeom
@@ -852,6 +883,7 @@ class BinFromGeometryWorker(QObject):
         if not success:
             return BinningFromGeometryResult(success=False, errorText=self.survey.errorText, profiling=profiling)
 
+        self.survey.calcFoldClassMaps()
         output = self.survey.output
         minRmsOffset = _safeNonNegative(output.minRmsOffset) if output.rmsOffset is not None else None
         maxRmsOffset = _safeNonNegative(output.maxRmsOffset) if output.rmsOffset is not None else None
@@ -876,6 +908,9 @@ class BinFromGeometryWorker(QObject):
             gapOffset=output.gapOffset,
             ofAziHist=output.ofAziHist,
             offstHist=output.offstHist,
+            offsetLimitedFold=output.offsetLimitedFold,
+            azimuthRichness=output.azimuthRichness,
+            ovtRichness=output.ovtRichness,
             cmpTransform=self.survey.cmpTransform,
             anaOutputShape=None if output.anaOutput is None else output.anaOutput.shape,
             profiling=profiling,
@@ -896,6 +931,8 @@ class BinningWorker(QObject):
         # the following function also calculates the required transforms, and optionally creates th binning arrays
         self.survey.fromXmlString(request.xmlString, True)                      # fully populate the object AND create arrays
         self.survey.output.anaOutput = request.analysisFile
+        self.survey.createFoldClassCubes(request.foldClasses)
+        self.survey.createUniqueSlotBitsets()
 
     def run(self):
         """Long-running task."""
@@ -934,6 +971,7 @@ class BinningWorker(QObject):
         if not success:
             return BinningFromTemplatesResult(success=False, errorText=self.survey.errorText, profiling=profiling)
 
+        self.survey.calcFoldClassMaps()
         output = self.survey.output
         minRmsOffset = _safeNonNegative(output.minRmsOffset) if output.rmsOffset is not None else None
         maxRmsOffset = _safeNonNegative(output.maxRmsOffset) if output.rmsOffset is not None else None
@@ -958,6 +996,9 @@ class BinningWorker(QObject):
             gapOffset=output.gapOffset,
             ofAziHist=output.ofAziHist,
             offstHist=output.offstHist,
+            offsetLimitedFold=output.offsetLimitedFold,
+            azimuthRichness=output.azimuthRichness,
+            ovtRichness=output.ovtRichness,
             cmpTransform=self.survey.cmpTransform,
             anaOutputShape=None if output.anaOutput is None else output.anaOutput.shape,
             profiling=profiling,
@@ -1055,6 +1096,7 @@ class CfpFromTemplatesWorker(QObject):
             self.focalY,
             self.cfpArray,
             self.radonSize,
+            getattr(request, 'transformMode', config.cfpTransformMode),
         )
 
         self.survey.fromXmlString(request.xmlString, False)
@@ -1149,13 +1191,16 @@ class CfpFromTemplatesWorker(QObject):
 class CfpAmplitudeMapWorker(QObject):
     finished = pyqtSignal()
     resultReady = pyqtSignal(object)
-    # partialResultReady = pyqtSignal(object)
+    partialResultReady = pyqtSignal(object)
 
     def __init__(self, request: CfpAmplitudeMapRequest):
         super().__init__()
         self.survey = RollSurvey()
         self.request = request
         self.matlab_compat = getattr(request, 'matlab_compat', False)
+        self.adaptiveGridStats = None                                           # set when the map is computed on an adaptive grid
+        self.reuseRelationIndex = False                                         # set when the request's relation index may be used
+        self.builtRelationIndex = None
         self.survey.fromXmlString(request.xmlString, False)
         self.survey.output.srcGeom = request.srcGeom
         self.survey.output.relGeom = request.relGeom
@@ -1186,6 +1231,8 @@ class CfpAmplitudeMapWorker(QObject):
             if self.survey.output.srcGeom is not None and self.survey.output.relGeom is not None and self.survey.output.recGeom is not None:
                 self.survey.message.emit('CFP illumination - gathering active geometry traces')
                 self.survey.progress.emit(5)
+                # filling in local coordinates changes the tables; an index of the original tables can't be used then
+                self.reuseRelationIndex = not self._needsLocalCoordinates(self.survey.output.srcGeom, self.survey.output.recGeom)
                 self.survey.prepareGeometryRelationBinningLookup()
                 srcCoords, srcWeights, recCoords, recWeights = self._gatherTracesFromRelations()
                 self.survey.progress.emit(gatherProgressEnd)
@@ -1196,10 +1243,14 @@ class CfpAmplitudeMapWorker(QObject):
             if srcCoords.shape[0] == 0 or recCoords.shape[0] == 0:
                 raise ValueError("No active traces available for Illumination mapping")
 
+            # bucket the stations once, so each pixel only visits the stations inside its aperture
+            srcIndex = build_station_bucket_index(srcCoords, srcWeights, apertureRadius)
+            recIndex = build_station_bucket_index(recCoords, recWeights, apertureRadius)
+
             freqs = self.request.frequencies if self.request.frequencies is not None else np.array([40.0], dtype=np.float32)
-            # partialEmitEvery = max(1, ny // 20)
 
             runDiagnostics3x3 = bool(getattr(self.request, 'run3x3Diagnostics', False))
+            adaptiveGrid = bool(getattr(self.request, 'adaptiveGrid', False))
             if runDiagnostics3x3:
                 self.survey.message.emit('CFP illumination - running source/receiver diagnostics grid (3x3)')
                 modeMaps = self._compute3x3ModeMaps(
@@ -1207,10 +1258,8 @@ class CfpAmplitudeMapWorker(QObject):
                     y0,
                     dy,
                     evalX,
-                    srcCoords,
-                    srcWeights,
-                    recCoords,
-                    recWeights,
+                    srcIndex,
+                    recIndex,
                     freqs,
                     apertureRadius,
                     gatherProgressEnd,
@@ -1220,58 +1269,54 @@ class CfpAmplitudeMapWorker(QObject):
                 else:
                     ampMap = modeMaps['src_coh__rec_coh']
                 diagnosticsSummaryLines = self._build3x3DiagnosticsSummary(modeMaps)
+            elif adaptiveGrid:
+                # coarse grid first; only the tiles where the coarse map is curved are computed at bin resolution
+                self.survey.message.emit('CFP illumination - computing adaptive grid')
+                rowKernel = compute_illumination_row_incoherent_numba if incoherentAmpMap is not None else compute_illumination_row_numba
+                ampMap = self._computeAdaptiveRows(rowKernel, 1, ny, y0, dy, evalX, srcIndex, recIndex, freqs, apertureRadius, gatherProgressEnd, 'CFP illumination')[0]
             else:
-                # 3. Iterate over the Grid
+                # 3. Iterate over the Grid, in bands of rows (tiles); finished tiles are streamed to the Layout image
                 currentThread = QThread.currentThread()
-                for iy in range(ny):
-                    if currentThread.isInterruptionRequested():
-                        raise StopIteration
-
-                    focalY = y0 + (iy + 0.5) * dy
-
-                    # Switch mode: compute either coherent or incoherent illumination, never both.
-                    if incoherentAmpMap is not None:
-                        ampMap[iy, :] = compute_illumination_row_incoherent_numba(
-                            focalY,
-                            evalX,
-                            self.request.focalZ,
-                            srcCoords,
-                            srcWeights,
-                            recCoords,
-                            recWeights,
-                            freqs,
-                            self.request.vint,
-                            apertureRadius,
-                        )
-                    else:
-                        ampMap[iy, :] = compute_illumination_row_numba(
-                            focalY,
-                            evalX,
-                            self.request.focalZ,
-                            srcCoords,
-                            srcWeights,
-                            recCoords,
-                            recWeights,
-                            freqs,
-                            self.request.vint,
-                            apertureRadius,
-                        )
-
-                    self.survey.progress.emit(gatherProgressEnd + int((iy + 1) * (100 - gatherProgressEnd) / ny))
-                    self.survey.message.emit(f"CFP illumination - row {iy + 1} / {ny}")
-
-                # # Emit throttled partial results to limit UI redraw and copy overhead.
-                # if (iy + 1) % partialEmitEvery == 0 or (iy + 1) == ny:
-                #     partial = CfpAmplitudeMapResult(
-                #         success=True,
-                #         amplitudeMap=_copyCfpImageForRollPlot(ampMap),
-                #         x0=x0,
-                #         y0=y0,
-                #         dx=dx,
-                #         dy=dy,
-                #         isPartial=True,
-                #     )
-                #     self.partialResultReady.emit(partial)
+                lastPartialTime = time.perf_counter()
+                for rowStart, rowStop in cfpTileBands(ny, config.cfpTileRows):
+                    for iy in range(rowStart, rowStop):
+                        if currentThread.isInterruptionRequested():
+                            raise StopIteration
+
+                        focalY = y0 + (iy + 0.5) * dy
+
+                        # Switch mode: compute either coherent or incoherent illumination, never both.
+                        if incoherentAmpMap is not None:
+                            ampMap[iy, :] = compute_illumination_row_incoherent_numba(
+                                focalY,
+                                evalX,
+                                self.request.focalZ,
+                                srcIndex,
+                                recIndex,
+                                freqs,
+                                self.request.vint,
+                                apertureRadius,
+                            )
+                        else:
+                            ampMap[iy, :] = compute_illumination_row_numba(
+                                focalY,
+                                evalX,
+                                self.request.focalZ,
+                                srcIndex,
+                                recIndex,
+                                freqs,
+                                self.request.vint,
+                                apertureRadius,
+                            )
+
+                        self.survey.progress.emit(gatherProgressEnd + int((iy + 1) * (100 - gatherProgressEnd) / ny))
+                        self.survey.message.emit(f"CFP illumination - row {iy + 1} / {ny}")
+
+                    # Emit throttled partial results to limit UI redraw and copy overhead; the final map follows below.
+                    now = time.perf_counter()
+                    if rowStop < ny and now - lastPartialTime >= config.cfpPartialUpdateSeconds:
+                        lastPartialTime = now
+                        self.partialResultReady.emit(self._partialResult(ampMap, x0, y0, dx, dy))
 
             incoherentResultMap = None
             modeLabel = 'coherent'
@@ -1297,6 +1342,8 @@ class CfpAmplitudeMapWorker(QObject):
                 dx=dx,
                 dy=dy,
                 diagnosticsSummaryLines=diagnosticsSummaryLines,
+                adaptiveSummary=self.adaptiveGridStats.summary() if self.adaptiveGridStats is not None else '',
+                relationIndex=self.builtRelationIndex,
             )
             self.resultReady.emit(result)
 
@@ -1307,6 +1354,13 @@ class CfpAmplitudeMapWorker(QObject):
         finally:
             self.finished.emit()
 
+    @staticmethod
+    def _partialResult(ampMap: np.ndarray, x0: float, y0: float, dx: float, dy: float) -> CfpAmplitudeMapResult:
+        # normalize a copy by the current maximum; the rows still being computed remain zero
+        maxVal = ampMap.max()
+        partialMap = ampMap / maxVal if maxVal > 0 else ampMap.copy()
+        return CfpAmplitudeMapResult(success=True, amplitudeMap=_copyCfpImageForRollPlot(partialMap), x0=x0, y0=y0, dx=dx, dy=dy, isPartial=True)
+
     @staticmethod
     def _emptyWeightedStations() -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
         emptyPoints = np.empty((0, 3), dtype=np.float32)
@@ -1314,10 +1368,9 @@ class CfpAmplitudeMapWorker(QObject):
         return emptyPoints, emptyWeights, emptyPoints, emptyWeights
 
     @staticmethod
-    def _inUseMask(table) -> np.ndarray:
-        if 'InUse' not in table.dtype.names:
-            return np.ones(table.shape[0], dtype=bool)
-        return table['InUse'] != 0
+    def _needsLocalCoordinates(*tables) -> bool:
+        # RollSurvey.ensurePointArrayLocalCoordinates() fills in LocX, LocY of a table when both are all zero
+        return any(table is not None and table.shape[0] > 0 and np.all(table['LocX'] == 0.0) and np.all(table['LocY'] == 0.0) for table in tables)
 
     @staticmethod
     def _collapseWeightedCoordinates(points: np.ndarray, weights: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
@@ -1340,101 +1393,29 @@ class CfpAmplitudeMapWorker(QObject):
         if rel.shape[0] == 0 or srcGeom.shape[0] == 0 or recGeom.shape[0] == 0:
             return self._emptyWeightedStations()
 
-        srcGeom = np.sort(srcGeom[self._inUseMask(srcGeom)], order=['Index', 'Line', 'Point'])
-        recGeom = np.sort(recGeom[self._inUseMask(recGeom)], order=['Index', 'Line', 'Point'])
-        if srcGeom.shape[0] == 0 or recGeom.shape[0] == 0:
-            return self._emptyWeightedStations()
-
-        srcKeys = np.rec.fromarrays(
-            [
-                srcGeom['Index'].astype(np.int32),
-                np.rint(srcGeom['Line']).astype(np.int32),
-                np.rint(srcGeom['Point']).astype(np.int32),
-            ],
-            names='Ind,Lin,Pnt',
-        )
-        relSrcKeys = np.rec.fromarrays(
-            [
-                rel['SrcInd'].astype(np.int32),
-                np.rint(rel['SrcLin']).astype(np.int32),
-                np.rint(rel['SrcPnt']).astype(np.int32),
-            ],
-            names='Ind,Lin,Pnt',
-        )
-
-        srcIdx = np.searchsorted(srcKeys, relSrcKeys, side='left')
-        validSrc = srcIdx < srcKeys.shape[0]
-        if srcKeys.shape[0] > 0:
-            safeSrcIdx = np.minimum(srcIdx, srcKeys.shape[0] - 1)
-            validSrc &= srcKeys[safeSrcIdx] == relSrcKeys
-        else:
-            safeSrcIdx = np.zeros(rel.shape[0], dtype=np.int64)
-
-        relInSps = rel['InSps'] != 0 if 'InSps' in rel.dtype.names else np.ones(rel.shape[0], dtype=bool)
-        relInRps = rel['InRps'] != 0 if 'InRps' in rel.dtype.names else np.ones(rel.shape[0], dtype=bool)
-        validRange = rel['RecMax'] >= rel['RecMin']
-        validMask = validSrc & relInSps & relInRps & validRange
-        if not np.any(validMask):
-            return self._emptyWeightedStations()
-
-        recIndex = recGeom['Index'].astype(np.int32)
-        recLine = np.rint(recGeom['Line']).astype(np.int32)
-        recPoint = np.rint(recGeom['Point']).astype(np.int32)
-        groupLookup = {}
-        groupStart = 0
-        while groupStart < recGeom.shape[0]:
-            groupEnd = groupStart + 1
-            while groupEnd < recGeom.shape[0] and recIndex[groupEnd] == recIndex[groupStart] and recLine[groupEnd] == recLine[groupStart]:
-                groupEnd += 1
-            groupLookup[(int(recIndex[groupStart]), int(recLine[groupStart]))] = (groupStart, groupEnd)
-            groupStart = groupEnd
-
-        sourceWeights = np.zeros(srcGeom.shape[0], dtype=np.float64)
-        receiverWeights = np.zeros(recGeom.shape[0], dtype=np.float64)
-
-        validRows = np.flatnonzero(validMask)
-        relRecInd = rel['RecInd'].astype(np.int32)
-        relRecLine = np.rint(rel['RecLin']).astype(np.int32)
-        relRecMin = np.rint(rel['RecMin']).astype(np.int32)
-        relRecMax = np.rint(rel['RecMax']).astype(np.int32)
-
-        for relIdx in validRows:
-            group = groupLookup.get((int(relRecInd[relIdx]), int(relRecLine[relIdx])))
-            if group is None:
-                continue
-
-            start, end = group
-            first = start + np.searchsorted(recPoint[start:end], relRecMin[relIdx], side='left')
-            last = start + np.searchsorted(recPoint[start:end], relRecMax[relIdx], side='right')
-            if last <= first:
-                continue
-
-            sourceWeights[safeSrcIdx[relIdx]] += float(last - first)
-            receiverWeights[first:last] += 1.0
-
+        # station weights are their number of resolved traces
+        index = None
+        if self.reuseRelationIndex:
+            index = _reusableRelationIndex(getattr(self.request, 'relationIndex', None), getattr(self.request, 'geometryKey', ''))
+        if index is None:
+            # the tables have been sorted in place by now, which doesn't change their edit revision; the index is built
+            # from sorted copies of them anyway, so the request's key still applies
+            key = getattr(self.request, 'geometryKey', '') if self.reuseRelationIndex else ''
+            index = buildGeometryRelationIndex(srcGeom, rel, recGeom, key)
+            self.builtRelationIndex = index if key else None
+
+        sourceWeights, receiverWeights = index.stationTraceCounts()
         sourceMask = sourceWeights > 0.0
         receiverMask = receiverWeights > 0.0
         if not np.any(sourceMask) or not np.any(receiverMask):
             return self._emptyWeightedStations()
 
-        sourcePoints = np.column_stack(
-            (
-                srcGeom['LocX'][sourceMask].astype(np.float32),
-                srcGeom['LocY'][sourceMask].astype(np.float32),
-                (srcGeom['Elev'][sourceMask] - srcGeom['Depth'][sourceMask]).astype(np.float32),
-            )
-        )
-        receiverPoints = np.column_stack(
-            (
-                recGeom['LocX'][receiverMask].astype(np.float32),
-                recGeom['LocY'][receiverMask].astype(np.float32),
-                (recGeom['Elev'][receiverMask] - recGeom['Depth'][receiverMask]).astype(np.float32),
-            )
-        )
+        sourceX, sourceY, sourceZ = index.sourceArrays[3:]
+        receiverX, receiverY, receiverZ = index.receiverArrays[3:]
         return (
-            np.ascontiguousarray(sourcePoints, dtype=np.float32),
+            np.ascontiguousarray(np.column_stack((sourceX[sourceMask], sourceY[sourceMask], sourceZ[sourceMask])), dtype=np.float32),
             np.ascontiguousarray(sourceWeights[sourceMask], dtype=np.float32),
-            np.ascontiguousarray(receiverPoints, dtype=np.float32),
+            np.ascontiguousarray(np.column_stack((receiverX[receiverMask], receiverY[receiverMask], receiverZ[receiverMask])), dtype=np.float32),
             np.ascontiguousarray(receiverWeights[receiverMask], dtype=np.float32),
         )
 
@@ -1457,18 +1438,38 @@ class CfpAmplitudeMapWorker(QObject):
         self.survey.progress.emit(progressEnd)
         return self._gatherTracesFromRelations()
 
-    def _compute3x3ModeMaps(self, ny, y0, dy, evalX, srcCoords, srcWeights, recCoords, recWeights, freqs, apertureRadius, gatherProgressEnd):
-        modeMaps = {
-            'src_off__rec_off': np.ones((ny, evalX.shape[0]), dtype=np.float32),
-            'src_off__rec_coh': np.zeros((ny, evalX.shape[0]), dtype=np.float32),
-            'src_off__rec_incoh': np.zeros((ny, evalX.shape[0]), dtype=np.float32),
-            'src_coh__rec_off': np.zeros((ny, evalX.shape[0]), dtype=np.float32),
-            'src_coh__rec_coh': np.zeros((ny, evalX.shape[0]), dtype=np.float32),
-            'src_coh__rec_incoh': np.zeros((ny, evalX.shape[0]), dtype=np.float32),
-            'src_incoh__rec_off': np.zeros((ny, evalX.shape[0]), dtype=np.float32),
-            'src_incoh__rec_coh': np.zeros((ny, evalX.shape[0]), dtype=np.float32),
-            'src_incoh__rec_incoh': np.zeros((ny, evalX.shape[0]), dtype=np.float32),
-        }
+    def _computeAdaptiveRows(self, rowKernel, channels, ny, y0, dy, evalX, srcIndex, recIndex, freqs, apertureRadius, gatherProgressEnd, label):
+        # evaluate a row kernel on an adaptive grid; returns maps [channels, ny, nx] and keeps the grid statistics for the log
+        currentThread = QThread.currentThread()
+        coarseProgressEnd = gatherProgressEnd + (100 - gatherProgressEnd) // 4
+
+        def rowFunction(iy, ix):
+            focalY = y0 + (iy + 0.5) * dy
+            return rowKernel(focalY, evalX[ix], self.request.focalZ, srcIndex, recIndex, freqs, self.request.vint, apertureRadius)
+
+        def onRowDone(stage, done, total):
+            if currentThread.isInterruptionRequested():
+                raise StopIteration
+            if stage == 'coarse':
+                self.survey.progress.emit(gatherProgressEnd + int(done * (coarseProgressEnd - gatherProgressEnd) / total))
+            else:
+                self.survey.progress.emit(coarseProgressEnd + int(done * (100 - coarseProgressEnd) / total))
+            self.survey.message.emit(f'{label} - {stage} row {done} / {total}')
+
+        tolerance = getattr(self.request, 'adaptiveTolerance', config.cfpAdaptiveTolerance)
+        maps, self.adaptiveGridStats = computeAdaptiveMap(rowFunction, evalX.shape[0], ny, config.cfpAdaptiveStep, tolerance, channels, onRowDone)
+        return maps
+
+    def _compute3x3ModeMaps(self, ny, y0, dy, evalX, srcIndex, recIndex, freqs, apertureRadius, gatherProgressEnd):
+        # a single kernel pass per row accumulates the source/receiver sums once and derives all nine mode rows from them
+        if bool(getattr(self.request, 'adaptiveGrid', False)):
+            channels = len(ILLUMINATION_3X3_MODES)
+            modeStack = self._computeAdaptiveRows(
+                compute_illumination_row_modes_numba, channels, ny, y0, dy, evalX, srcIndex, recIndex, freqs, apertureRadius, gatherProgressEnd, 'CFP illumination diagnostics'
+            )
+            return self._normalizedModeMaps({key: modeStack[mode] for mode, key in enumerate(ILLUMINATION_3X3_MODES)})
+
+        modeMaps = {key: np.zeros((ny, evalX.shape[0]), dtype=np.float32) for key in ILLUMINATION_3X3_MODES}
 
         currentThread = QThread.currentThread()
         for iy in range(ny):
@@ -1476,34 +1477,27 @@ class CfpAmplitudeMapWorker(QObject):
                 raise StopIteration
 
             focalY = y0 + (iy + 0.5) * dy
-            srcCoh, recCoh, srcInc, recInc = compute_illumination_row_components_numba(
+            modeRows = compute_illumination_row_modes_numba(
                 focalY,
                 evalX,
                 self.request.focalZ,
-                srcCoords,
-                srcWeights,
-                recCoords,
-                recWeights,
+                srcIndex,
+                recIndex,
                 freqs,
                 self.request.vint,
                 apertureRadius,
             )
-
-            modeMaps['src_off__rec_coh'][iy, :] = recCoh
-            modeMaps['src_off__rec_incoh'][iy, :] = recInc
-            modeMaps['src_coh__rec_off'][iy, :] = srcCoh
-            modeMaps['src_coh__rec_coh'][iy, :] = srcCoh * recCoh
-            modeMaps['src_coh__rec_incoh'][iy, :] = srcCoh * recInc
-            modeMaps['src_incoh__rec_off'][iy, :] = srcInc
-            modeMaps['src_incoh__rec_coh'][iy, :] = srcInc * recCoh
-            modeMaps['src_incoh__rec_incoh'][iy, :] = srcInc * recInc
+            for mode, key in enumerate(ILLUMINATION_3X3_MODES):
+                modeMaps[key][iy, :] = modeRows[mode]
 
             self.survey.progress.emit(gatherProgressEnd + int((iy + 1) * (100 - gatherProgressEnd) / ny))
             self.survey.message.emit(f'CFP illumination diagnostics - row {iy + 1} / {ny}')
 
+        return self._normalizedModeMaps(modeMaps)
+
+    @staticmethod
+    def _normalizedModeMaps(modeMaps: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
         for key, value in modeMaps.items():
-            if key == 'src_off__rec_off':
-                continue
             maxVal = float(np.max(value)) if value.size else 0.0
             if maxVal > 0.0:
                 value /= maxVal
@@ -1601,7 +1595,9 @@ class CfpFromGeometryTablesWorker(QObject):
         self.receiverOrphanRelationCount = 0
         self.missingSourceCount = 0
         self.missingReceiverCount = 0
-        self.inactiveSourceKeys = set()
+        self.geometryKey = getattr(request, 'geometryKey', '')
+        self.relationIndex = getattr(request, 'relationIndex', None)
+        self.builtRelationIndex = None
         self.apertureRadius = abs(self.focalZ) * np.tan(np.radians(self.maxDipDegrees))
         self.beamAccumulator = CfpBeamAccumulator(
             self.survey,
@@ -1613,6 +1609,7 @@ class CfpFromGeometryTablesWorker(QObject):
             self.focalY,
             self.cfpArray,
             self.radonSize,
+            getattr(request, 'transformMode', config.cfpTransformMode),
         )
 
         self.survey.fromXmlString(request.xmlString, False)
@@ -1620,100 +1617,6 @@ class CfpFromGeometryTablesWorker(QObject):
         self.survey.output.relGeom = request.relGeom
         self.survey.output.recGeom = request.recGeom
 
-    @staticmethod
-    def _roundedIntField(table, fieldName: str) -> np.ndarray:
-        return np.rint(table[fieldName]).astype(np.int64, copy=False)
-
-    @staticmethod
-    def _intField(table, fieldName: str) -> np.ndarray:
-        return table[fieldName].astype(np.int64, copy=False)
-
-    @staticmethod
-    def _onesIntArray(size: int) -> np.ndarray:
-        return np.ones(size, dtype=np.int64)
-
-    @staticmethod
-    def _inUseMask(table) -> np.ndarray:
-        if 'InUse' not in table.dtype.names:
-            return np.ones(table.shape[0], dtype=bool)
-        return table['InUse'] != 0
-
-    @staticmethod
-    def _sortedSourceArrays(table):
-        if table.shape[0] == 0:
-            emptyInt = np.empty(0, dtype=np.int64)
-            emptyFloat = np.empty(0, dtype=np.float32)
-            return emptyInt, emptyInt, emptyInt, emptyFloat, emptyFloat, emptyFloat
-
-        sourceInd = CfpFromGeometryTablesWorker._intField(table, 'Index')
-        sourceLine = CfpFromGeometryTablesWorker._roundedIntField(table, 'Line')
-        sourcePoint = CfpFromGeometryTablesWorker._roundedIntField(table, 'Point')
-        order = np.lexsort((sourcePoint, sourceLine, sourceInd))
-        sourceInd = np.ascontiguousarray(sourceInd[order], dtype=np.int64)
-        sourceLine = np.ascontiguousarray(sourceLine[order], dtype=np.int64)
-        sourcePoint = np.ascontiguousarray(sourcePoint[order], dtype=np.int64)
-        sourceX = np.ascontiguousarray(table['LocX'][order], dtype=np.float32)
-        sourceY = np.ascontiguousarray(table['LocY'][order], dtype=np.float32)
-        sourceZ = np.ascontiguousarray(table['Elev'][order] - table['Depth'][order], dtype=np.float32)
-        return sourceInd, sourceLine, sourcePoint, sourceX, sourceY, sourceZ
-
-    @staticmethod
-    def _sortedReceiverArrays(table):
-        if table.shape[0] == 0:
-            emptyInt = np.empty(0, dtype=np.int64)
-            emptyFloat = np.empty(0, dtype=np.float32)
-            return emptyInt, emptyInt, emptyInt, emptyFloat, emptyFloat, emptyFloat, emptyInt, emptyInt, emptyInt, emptyInt
-
-        receiverInd = CfpFromGeometryTablesWorker._intField(table, 'Index')
-        receiverLine = CfpFromGeometryTablesWorker._roundedIntField(table, 'Line')
-        receiverPoint = CfpFromGeometryTablesWorker._roundedIntField(table, 'Point')
-        order = np.lexsort((receiverPoint, receiverLine, receiverInd))
-        receiverInd = np.ascontiguousarray(receiverInd[order], dtype=np.int64)
-        receiverLine = np.ascontiguousarray(receiverLine[order], dtype=np.int64)
-        receiverPoint = np.ascontiguousarray(receiverPoint[order], dtype=np.int64)
-        receiverX = np.ascontiguousarray(table['LocX'][order], dtype=np.float32)
-        receiverY = np.ascontiguousarray(table['LocY'][order], dtype=np.float32)
-        receiverZ = np.ascontiguousarray(table['Elev'][order] - table['Depth'][order], dtype=np.float32)
-
-        groupBreaks = np.empty(receiverInd.shape[0], dtype=bool)
-        groupBreaks[0] = True
-        groupBreaks[1:] = (receiverInd[1:] != receiverInd[:-1]) | (receiverLine[1:] != receiverLine[:-1])
-        groupStart = np.flatnonzero(groupBreaks).astype(np.int64, copy=False)
-        groupEnd = np.empty_like(groupStart)
-        groupEnd[:-1] = groupStart[1:]
-        groupEnd[-1] = receiverInd.shape[0]
-        groupInd = np.ascontiguousarray(receiverInd[groupStart], dtype=np.int64)
-        groupLine = np.ascontiguousarray(receiverLine[groupStart], dtype=np.int64)
-        return receiverInd, receiverLine, receiverPoint, receiverX, receiverY, receiverZ, groupInd, groupLine, groupStart, groupEnd
-
-    def _buildSourceScanArrays(self):
-        sourceMask = self._inUseMask(self.srcGeom)
-        self.inactiveSourceCount = int(np.count_nonzero(~sourceMask))
-        activeSourceArrays = self._sortedSourceArrays(self.srcGeom[sourceMask])
-        inactiveSourceArrays = self._sortedSourceArrays(self.srcGeom[~sourceMask])
-        return activeSourceArrays, inactiveSourceArrays
-
-    def _buildReceiverScanArrays(self):
-        receiverMask = self._inUseMask(self.recGeom)
-        self.inactiveReceiverCount = int(np.count_nonzero(~receiverMask))
-        return self._sortedReceiverArrays(self.recGeom[receiverMask])
-
-    def _relationChunkArrays(self, relationChunk):
-        relationCount = relationChunk.shape[0]
-        relInSps = self._intField(relationChunk, 'InSps') if 'InSps' in relationChunk.dtype.names else self._onesIntArray(relationCount)
-        relInRps = self._intField(relationChunk, 'InRps') if 'InRps' in relationChunk.dtype.names else self._onesIntArray(relationCount)
-        return (
-            self._intField(relationChunk, 'SrcInd'),
-            self._roundedIntField(relationChunk, 'SrcLin'),
-            self._roundedIntField(relationChunk, 'SrcPnt'),
-            self._intField(relationChunk, 'RecInd'),
-            self._roundedIntField(relationChunk, 'RecLin'),
-            self._roundedIntField(relationChunk, 'RecMin'),
-            self._roundedIntField(relationChunk, 'RecMax'),
-            np.ascontiguousarray(relInSps, dtype=np.int64),
-            np.ascontiguousarray(relInRps, dtype=np.int64),
-        )
-
     def run(self):
         try:
             if haveDebugpy and self.debugpyEnabled:
@@ -1732,6 +1635,87 @@ class CfpFromGeometryTablesWorker(QObject):
             finally:
                 self.finished.emit()
 
+    def _prepareRelationIndex(self, progressEnd: int = 100) -> GeometryRelationIndex | None:
+        """Reuse the relation index of the request when it belongs to these tables, or build it; None when cancelled."""
+        totalRelations = int(self.relGeom.shape[0])
+        self.totalRelationCount = totalRelations
+        self.chunkCount = (totalRelations + self.chunkSize - 1) // self.chunkSize if totalRelations > 0 else 0
+
+        index = _reusableRelationIndex(self.relationIndex, self.geometryKey)
+        if index is not None:
+            self.survey.message.emit(f'CFP from {self.sourceName} - reusing the relation index of unchanged geometry tables')
+        else:
+            self.survey.message.emit(f'CFP from {self.sourceName} - building the relation index')
+            currentThread = QThread.currentThread()
+
+            def onChunkDone(done: int, total: int) -> None:
+                if currentThread.isInterruptionRequested():
+                    raise StopIteration
+                self.survey.progress.emit((done * progressEnd) // total)
+                self.survey.message.emit(f'CFP from {self.sourceName} - resolved relation chunk {done:,}/{total:,}')
+
+            try:
+                index = buildGeometryRelationIndex(self.srcGeom, self.relGeom, self.recGeom, self.geometryKey, self.chunkSize, onChunkDone)
+            except StopIteration:
+                return None
+            self.builtRelationIndex = index
+
+        self.survey.progress.emit(progressEnd)
+        self.inactiveSourceCount = index.inactiveSourceCount
+        self.inactiveReceiverCount = index.inactiveReceiverCount
+        self.inactiveSourceRelationCount = index.inactiveSourceRelationCount
+        self.sourceOrphanRelationCount = index.sourceOrphanRelationCount
+        self.receiverOrphanRelationCount = index.receiverOrphanRelationCount
+        self.missingSourceCount = index.missingSourceCount
+        self.missingReceiverCount = index.missingReceiverCount
+        return index
+
+    def _scanFocalPoints(self, index: GeometryRelationIndex, focalX: np.ndarray, focalY: np.ndarray):
+        # first pass counts the contributing stations per focal point, the second pass collects them
+        focalX = np.ascontiguousarray(focalX, dtype=np.float64)
+        focalY = np.ascontiguousarray(focalY, dtype=np.float64)
+        pointCount = focalX.shape[0]
+        groupCount = max(min(pointCount, 4 * _numbaThreadCount()), 1)
+        counts = np.zeros((pointCount, 5), dtype=np.int64)
+        emptyInt = np.empty(0, dtype=np.int64)
+        emptyFloat = np.empty(0, dtype=np.float64)
+        sourceX, sourceY = index.sourceArrays[3:5]
+        receiverX, receiverY = index.receiverArrays[3:5]
+        relationIndex = index.relationSourceIndex(self.apertureRadius)
+        scanArgs = (relationIndex, sourceX, sourceY, receiverX, receiverY, focalX, focalY, float(self.apertureRadius), counts)
+        scan_cfp_focal_points_numba(*scanArgs, emptyInt, emptyInt, emptyInt, emptyFloat, emptyInt, emptyFloat, groupCount)
+
+        sourceOffsets = np.zeros(pointCount + 1, dtype=np.int64)
+        receiverOffsets = np.zeros(pointCount + 1, dtype=np.int64)
+        np.cumsum(counts[:, 3], out=sourceOffsets[1:])
+        np.cumsum(counts[:, 4], out=receiverOffsets[1:])
+        sourceStations = np.empty(sourceOffsets[-1], dtype=np.int64)
+        sourceWeights = np.empty(sourceOffsets[-1], dtype=np.float64)
+        receiverStations = np.empty(receiverOffsets[-1], dtype=np.int64)
+        receiverWeights = np.empty(receiverOffsets[-1], dtype=np.float64)
+        scan_cfp_focal_points_numba(*scanArgs, sourceOffsets, receiverOffsets, sourceStations, sourceWeights, receiverStations, receiverWeights, groupCount)
+
+        return counts, (sourceOffsets, sourceStations, sourceWeights), (receiverOffsets, receiverStations, receiverWeights)
+
+    @staticmethod
+    def _accumulateFocalPoint(accumulator: CfpBeamAccumulator, index: GeometryRelationIndex, sources, receivers, p: int) -> None:
+        sourceOffsets, sourceStations, sourceWeights = sources
+        receiverOffsets, receiverStations, receiverWeights = receivers
+        sourceRows = sourceStations[sourceOffsets[p]:sourceOffsets[p + 1]]
+        receiverRows = receiverStations[receiverOffsets[p]:receiverOffsets[p + 1]]
+        sourceX, sourceY, sourceZ = index.sourceArrays[3:]
+        receiverX, receiverY, receiverZ = index.receiverArrays[3:]
+        accumulator.accumulateCoordinates(
+            sourceX[sourceRows],
+            sourceY[sourceRows],
+            sourceZ[sourceRows],
+            receiverX[receiverRows],
+            receiverY[receiverRows],
+            receiverZ[receiverRows],
+            sourceWeights[sourceOffsets[p]:sourceOffsets[p + 1]],
+            receiverWeights[receiverOffsets[p]:receiverOffsets[p + 1]],
+        )
+
     def _scanGeometryTables(self) -> bool:
         if self.srcGeom is None or self.relGeom is None or self.recGeom is None:
             self.survey.errorText = 'source, relation, or receiver geometry table has not been defined'
@@ -1740,94 +1724,23 @@ class CfpFromGeometryTablesWorker(QObject):
         if not self.beamAccumulator.initializeGrid():
             return False
 
-        totalRelations = int(self.relGeom.shape[0])
-        self.totalRelationCount = totalRelations
-        self.chunkCount = (totalRelations + self.chunkSize - 1) // self.chunkSize if totalRelations > 0 else 0
-
-        if totalRelations == 0:
+        if self.relGeom.shape[0] == 0:
             self.survey.progress.emit(100)
             self.survey.message.emit(f'CFP from {self.sourceName} - no relation records available')
             return True
 
-        self.survey.message.emit(f'CFP from {self.sourceName} - building geometry scan arrays')
-        activeSourceArrays, inactiveSourceArrays = self._buildSourceScanArrays()
-        sourceInd, sourceLine, sourcePoint, sourceX, sourceY, sourceZ = activeSourceArrays
-        inactiveSourceInd, inactiveSourceLine, inactiveSourcePoint, _, _, _ = inactiveSourceArrays
-        _, _, receiverPoint, receiverX, receiverY, receiverZ, receiverGroupInd, receiverGroupLine, receiverGroupStart, receiverGroupEnd = self._buildReceiverScanArrays()
+        index = self._prepareRelationIndex()
+        if index is None:
+            self.survey.errorText = f'CFP from {self.sourceName} cancelled'
+            return False
 
-        sourceWeights = np.zeros(sourceInd.shape[0], dtype=np.float64)
-        receiverWeights = np.zeros(receiverPoint.shape[0], dtype=np.float64)
-        apertureRadiusSquared = self.apertureRadius * self.apertureRadius
+        counts, sources, receivers = self._scanFocalPoints(index, np.array([self.focalX]), np.array([self.focalY]))
+        self.contributingRelationCount = int(counts[0, 0])
+        self.contributingTraceCount = int(counts[0, 1])
+        self.totalTraceCount = int(counts[0, 2])
 
-        currentThread = QThread.currentThread()
-        for chunkIndex in range(self.chunkCount):
-            if currentThread.isInterruptionRequested():
-                self.survey.errorText = f'CFP from {self.sourceName} cancelled'
-                return False
-
-            startRow = chunkIndex * self.chunkSize
-            endRow = min(startRow + self.chunkSize, totalRelations)
-            chunkArrays = self._relationChunkArrays(self.relGeom[startRow:endRow])
-            (
-                totalTraceCount,
-                contributingRelationCount,
-                contributingTraceCount,
-                inactiveSourceRelationCount,
-                sourceOrphanRelationCount,
-                receiverOrphanRelationCount,
-                missingSourceCount,
-                missingReceiverCount,
-            ) = scanCfpGeometryRelationsSafe(
-                *chunkArrays,
-                sourceInd,
-                sourceLine,
-                sourcePoint,
-                sourceX,
-                sourceY,
-                inactiveSourceInd,
-                inactiveSourceLine,
-                inactiveSourcePoint,
-                receiverGroupInd,
-                receiverGroupLine,
-                receiverGroupStart,
-                receiverGroupEnd,
-                receiverPoint,
-                receiverX,
-                receiverY,
-                sourceWeights,
-                receiverWeights,
-                self.focalX,
-                self.focalY,
-                apertureRadiusSquared,
-            )
-            self.totalTraceCount += int(totalTraceCount)
-            self.contributingRelationCount += int(contributingRelationCount)
-            self.contributingTraceCount += int(contributingTraceCount)
-            self.inactiveSourceRelationCount += int(inactiveSourceRelationCount)
-            self.sourceOrphanRelationCount += int(sourceOrphanRelationCount)
-            self.receiverOrphanRelationCount += int(receiverOrphanRelationCount)
-            self.missingSourceCount += int(missingSourceCount)
-            self.missingReceiverCount += int(missingReceiverCount)
-
-            progress = ((chunkIndex + 1) * 100) // self.chunkCount
-            self.survey.progress.emit(progress)
-            self.survey.message.emit(f'CFP from {self.sourceName} - processed chunk {chunkIndex + 1:,}/{self.chunkCount:,}')
-
-        self.survey.progress.emit(100)
         self.survey.message.emit(f'CFP from {self.sourceName} - Please wait, finalizing images...')
-
-        sourceMask = sourceWeights > 0.0
-        receiverMask = receiverWeights > 0.0
-        self.beamAccumulator.accumulateCoordinates(
-            sourceX[sourceMask],
-            sourceY[sourceMask],
-            sourceZ[sourceMask],
-            receiverX[receiverMask],
-            receiverY[receiverMask],
-            receiverZ[receiverMask],
-            sourceWeights[sourceMask],
-            receiverWeights[receiverMask],
-        )
+        self._accumulateFocalPoint(self.beamAccumulator, index, sources, receivers, 0)
 
         self.survey.progress.emit(0)
         self.beamAccumulator.finalizeImages(
@@ -1864,5 +1777,132 @@ class CfpFromGeometryTablesWorker(QObject):
             maxDipDegrees=self.maxDipDegrees,
             apertureRadius=self.apertureRadius,
             vint=self.vint,
+            relationIndex=self.builtRelationIndex,
             **payload,
         )
+
+
+class CfpMultiPointFromGeometryTablesWorker(CfpFromGeometryTablesWorker):
+    """CFP point analysis at many focal points, from a single pass over the geometry tables.
+
+    The relation index bucketed on source position lets each focal point visit only the relations whose source lies
+    within a cell of its aperture; all focal points are scanned in parallel. Beams and Radon images are evaluated per focal point.
+    """
+
+    def __init__(self, request: CfpMultiPointFromGeometryTablesRequest):
+        super().__init__(request)
+        self.transformMode = getattr(request, 'transformMode', config.cfpTransformMode)
+        focalPoints = request.focalPoints if request.focalPoints is not None else np.empty((0, 2))
+        self.focalPoints = np.ascontiguousarray(np.asarray(focalPoints, dtype=np.float64).reshape(-1, 2))
+        self.pointSummary = np.zeros(self.focalPoints.shape[0], dtype=CFP_POINT_SUMMARY_DTYPE)
+        self.resolutionImages = None
+        self.radonAvpImages = None
+        self.selectedPointIndex = -1
+        self.selectedPayload = {}
+
+    def _scanGeometryTables(self) -> bool:
+        if self.srcGeom is None or self.relGeom is None or self.recGeom is None:
+            self.survey.errorText = 'source, relation, or receiver geometry table has not been defined'
+            return False
+
+        pointCount = self.focalPoints.shape[0]
+        if pointCount == 0:
+            self.survey.errorText = 'no CFP focal points have been defined'
+            return False
+
+        # 1. resolve all relations once (or reuse the index of unchanged tables)
+        index = self._prepareRelationIndex(30)
+        if index is None:
+            self.survey.errorText = f'CFP from {self.sourceName} cancelled'
+            return False
+
+        # 2. scan all focal points in parallel
+        self.survey.message.emit(f'CFP from {self.sourceName} - scanning {pointCount:,} focal points')
+        counts, sources, receivers = self._scanFocalPoints(index, self.focalPoints[:, 0], self.focalPoints[:, 1])
+        self.survey.progress.emit(40)
+
+        self.pointSummary['focalX'] = self.focalPoints[:, 0]
+        self.pointSummary['focalY'] = self.focalPoints[:, 1]
+        self.pointSummary['contributingRelationCount'] = counts[:, 0]
+        self.pointSummary['contributingTraceCount'] = counts[:, 1]
+        self.pointSummary['totalTraceCount'] = counts[:, 2]
+        self.pointSummary['sourceCount'] = counts[:, 3]
+        self.pointSummary['receiverCount'] = counts[:, 4]
+
+        # 3. beams and Radon images per focal point
+        currentThread = QThread.currentThread()
+        for p in range(pointCount):
+            if currentThread.isInterruptionRequested():
+                self.survey.errorText = f'CFP from {self.sourceName} cancelled'
+                return False
+
+            focalX, focalY = float(self.focalPoints[p, 0]), float(self.focalPoints[p, 1])
+            accumulator = CfpBeamAccumulator(
+                self.survey, self.focalZ, self.frequency, self.vint, self.maxDipDegrees, focalX, focalY, self.cfpArray, self.radonSize, self.transformMode
+            )
+            if not accumulator.initializeGrid():
+                return False
+
+            self._accumulateFocalPoint(accumulator, index, sources, receivers, p)
+            accumulator.finalizeImages()
+            self._storePointImages(p, accumulator)
+
+            self.survey.progress.emit(40 + ((p + 1) * 60) // pointCount)
+            self.survey.message.emit(f'CFP from {self.sourceName} - focal point {p + 1:,}/{pointCount:,}')
+
+        return True
+
+    def _storePointImages(self, p: int, accumulator: CfpBeamAccumulator) -> None:
+        # stored in Roll plot x/y order, like the images of the selected point
+        resolutionImage = _copyCfpImageForRollPlot(accumulator.resolutionImage)
+        radonAvpImage = _copyCfpImageForRollPlot(accumulator.radonAvpImage)
+        if self.resolutionImages is None:
+            pointCount = self.focalPoints.shape[0]
+            self.resolutionImages = np.zeros((pointCount,) + resolutionImage.shape, dtype=np.float32)
+            self.radonAvpImages = np.zeros((pointCount,) + radonAvpImage.shape, dtype=np.float32)
+
+        self.resolutionImages[p] = resolutionImage
+        self.radonAvpImages[p] = radonAvpImage
+        self.pointSummary[p]['sourceSnr'] = accumulator.sourceSnr
+        self.pointSummary[p]['receiverSnr'] = accumulator.receiverSnr
+        self.pointSummary[p]['avpSnr'] = accumulator.avpSnr
+
+        # keep the full image set of the weakest contributing point only
+        selected = self.selectedPointIndex
+        if self.pointSummary[p]['contributingTraceCount'] > 0 and (selected < 0 or accumulator.avpSnr < self.pointSummary[selected]['avpSnr']):
+            self.selectedPointIndex = p
+            self.selectedPayload = accumulator.buildPayload()
+
+    def buildResult(self, success: bool) -> CfpMultiPointFromGeometryTablesResult:
+        selected = self.selectedPointIndex
+        point = self.pointSummary[selected] if selected >= 0 else None            # trace counts within the aperture of the selected point
+        return CfpMultiPointFromGeometryTablesResult(
+            success=success,
+            errorText='' if success else self.survey.errorText,
+            sourceName=self.sourceName,
+            chunkCount=self.chunkCount,
+            totalRelationCount=self.totalRelationCount,
+            contributingRelationCount=int(point['contributingRelationCount']) if point is not None else 0,
+            totalTraceCount=int(point['totalTraceCount']) if point is not None else 0,
+            contributingTraceCount=int(point['contributingTraceCount']) if point is not None else 0,
+            inactiveSourceCount=self.inactiveSourceCount,
+            inactiveReceiverCount=self.inactiveReceiverCount,
+            inactiveSourceRelationCount=self.inactiveSourceRelationCount,
+            sourceOrphanRelationCount=self.sourceOrphanRelationCount,
+            receiverOrphanRelationCount=self.receiverOrphanRelationCount,
+            missingSourceCount=self.missingSourceCount,
+            missingReceiverCount=self.missingReceiverCount,
+            focalX=float(self.focalPoints[selected, 0]) if selected >= 0 else 0.0,
+            focalY=float(self.focalPoints[selected, 1]) if selected >= 0 else 0.0,
+            focalZ=self.focalZ,
+            frequency=self.frequency,
+            maxDipDegrees=self.maxDipDegrees,
+            apertureRadius=self.apertureRadius,
+            vint=self.vint,
+            relationIndex=self.builtRelationIndex,
+            pointSummary=self.pointSummary,
+            resolutionImages=self.resolutionImages,
+            radonAvpImages=self.radonAvpImages,
+            selectedPointIndex=selected,
+            **self.selectedPayload,
+        )